@@ -1,14 +1,16 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify
 from flask_cors import CORS
-from sentence_transformers import SentenceTransformer, util
-import numpy as np
-import json
-import torch
 import os
+import time
 from routes.search import SearchService, SearchServiceException
 from routes.extract import ExtractService, ExtractServiceException
 from routes.health import HealthService, HealthServiceException
 from routes.delete import DeleteService, DeleteServiceException
+from routes.jobs import JobService, JobServiceException
+from routes.encoder import EncoderService, EncoderServiceException
+from routes.metrics import MetricsService
+from routes.logging_service import LoggingService
+from database.postgres import DatabaseService, DatabaseServiceException
 app = Flask(__name__)
 
 
@@ -18,8 +20,16 @@ app = Flask(__name__)
 """GLOBAL VARIABLES"""
 
 
-# Global variables to store model and data
-model = None
+# Global variables to store model and data (the model itself is held by EncoderService)
+MODEL_PATH = os.path.join(os.path.dirname(__file__), 'my_model_dir')
+
+# Opt-in: run /extract as a background job (202 + job_id, poll /extract/status/<job_id>) instead of
+# answering 200 with the results inside the request
+ASYNC_EXTRACT = os.getenv("EXTRACT_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Per-request log lines (LOG_LEVEL=DEBUG), see routes/logging_service.py
+request_logger = LoggingService.get_logger("request")
+startup_logger = LoggingService.get_logger("startup")
 
 """-------------------------------------------------------------------------------------------------------"""
 
@@ -38,24 +48,61 @@ def integrateCORS():
 
 
 def load_model_and_data():
-    """Load the model and data on startup"""
-    global model
-    
+    """Start loading the model on startup: in a background thread, on first use or blocking (MODEL_LOAD_MODE)"""
+    EncoderService.start_model_load(MODEL_PATH)
+
+
+def migrate_database_schema():
+    """
+    Create/upgrade the database tables once at startup (in the gunicorn master), so no request runs DDL.
+    The connection pool opened for it is closed again: a pool created before gunicorn forks would hand
+    every worker the same server connections, without the pool's threads to refill or check them.
+    """
+    if not DatabaseService.SCHEMA_AUTO_MIGRATE:
+        return
     try:
-        # Load the sentence transformer model
-        model_path = os.path.join(os.path.dirname(__file__), 'my_model_dir')
-        model = SentenceTransformer(model_path, device='cpu')
-        
-        print(f"🤖 Model: {model}")
-        print(f"🖥️  Model device: CPU (forced)")
-        
-    except Exception as e:
-        print(f"❌ Error loading model and data: {e}")
-        raise e
+        DatabaseService.ensure_table_exists()
+    except DatabaseServiceException as e:
+        startup_logger.warning("Database schema not migrated at startup (saves retry it): %s", e)
+    finally:
+        DatabaseService.close_connection_pool()
+
+
+def get_model():
+    """Get the loaded model, waiting up to MODEL_READY_TIMEOUT seconds for a background load to finish"""
+    return EncoderService.get_model(MODEL_PATH, timeout=EncoderService.READY_TIMEOUT)
+
+
+def model_unavailable(e):
+    """503 response for requests that need the model while it is still loading or failed to load"""
+    status = EncoderService.model_status()
+    response = jsonify({"error": str(e), "status": "error" if status["error"] else "loading", "model": status})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+
+@app.before_request
+def bind_request_id():
+    """Stamp this request's log records with its X-Request-ID (generated when the client sends none)"""
+    g.request_id = LoggingService.bind_request_id(request.headers.get('X-Request-ID'))
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def log_request(response):
+    """Echo the request id to the client and log the request's status and duration at debug level"""
+    response.headers['X-Request-ID'] = g.get('request_id', LoggingService.current_request_id())
+    if 'request_start' in g:
+        request_logger.debug("%s %s", request.method, request.path, extra={
+            "status": response.status_code, "ms": round((time.perf_counter() - g.request_start) * 1000, 2)
+        })
+    return response
 
 
 integrateCORS()
 
+migrate_database_schema()
+
 load_model_and_data()
 
 
@@ -80,6 +127,23 @@ def extractJsonParameters(data) -> dict:
     return {"user_uuid" : user_uuid, "conversations_data" : conversations_data}
 
 
+def extractStreamParameters(req) -> dict:
+    # Streamed upload: conversations.json as the raw body (?uuid=...) or as a multipart "file" field
+    if req.mimetype == 'multipart/form-data':
+        user_uuid = req.form.get('uuid') or req.args.get('uuid')
+        upload = req.files.get('file')
+        if not upload:
+            raise ExtractServiceException("Conversation file is required (multipart field 'file')")
+        stream = upload.stream
+    else:
+        user_uuid = req.args.get('uuid')
+        stream = req.stream
+    if not user_uuid:
+        raise ExtractServiceException("UUID is required")
+    
+    return {"user_uuid" : user_uuid, "stream" : stream}
+
+
 
 
 
@@ -97,11 +161,23 @@ def extract():
         response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
         return response
 
-    if not model:
-        load_model_and_data()
+    try:
+        model = get_model()
+    except EncoderServiceException as e:
+        return model_unavailable(e)
     
     try:
+        if not request.is_json:
+            return extract_stream(model)
+        
         extract = extractJsonParameters(request.get_json())
+        
+        if ASYNC_EXTRACT:
+            # Queue the heavy parse/encode/save work and return the job id straight away
+            job = JobService.submit_extract_job(extract['conversations_data'], extract['user_uuid'], model, MODEL_PATH)
+            job["status_url"] = f"/extract/status/{job['job_id']}"
+            return jsonify(job), 202
+        
         # Use the extract service to process the data
         result = ExtractService.extract_service(extract['conversations_data'], extract['user_uuid'], model)
         return jsonify(result)
@@ -109,11 +185,44 @@ def extract():
     except ExtractServiceException as e:
         # Handle extract service specific exceptions
         return jsonify({"error": str(e)}), 400
+    except JobServiceException as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         # Handle unexpected errors
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+def extract_stream(model):
+    """Handle a streamed /extract upload, parsing conversations one at a time instead of via request.get_json()"""
+    upload = extractStreamParameters(request)
+    
+    if not ASYNC_EXTRACT:
+        result = ExtractService.extract_stream_service(upload['stream'], upload['user_uuid'], model)
+        return jsonify(result)
+    
+    # The body has to be consumed before the response, so parsing happens here and the job embeds and saves
+    processed_data = ExtractService.process_conversation_stream(upload['stream'], upload['user_uuid'])
+    job = JobService.submit_extract_job(None, upload['user_uuid'], model, MODEL_PATH, processed_data=processed_data)
+    job["status_url"] = f"/extract/status/{job['job_id']}"
+    return jsonify(job), 202
+
+
+@app.route('/extract/status/<job_id>', methods=['GET', 'OPTIONS'])
+def extract_status(job_id):
+    """API endpoint for polling the status (queued, running, completed, failed) of an extract job"""
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'ok'})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        return response
+
+    try:
+        return jsonify(JobService.get_job_status(job_id))
+    except JobServiceException as e:
+        return jsonify({"error": str(e), "status": "not_found"}), 404
+
+
 
 
 
@@ -147,8 +256,10 @@ def search_documents_and_extract_results():
         response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
         return response
 
-    if not model:
-        load_model_and_data()
+    try:
+        model = get_model()
+    except EncoderServiceException as e:
+        return model_unavailable(e)
     
     try:
         
@@ -164,6 +275,50 @@ def search_documents_and_extract_results():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+def searchBatchJsonParameters(data) -> dict:
+    queries = data.get('queries')
+    uuid = data.get('uuid', '').strip()
+    if not isinstance(queries, list) or not queries or not uuid:
+        raise SearchServiceException("Queries (a non-empty list) and uuid cannot be empty")
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        raise SearchServiceException("Every query must be a non-empty string")
+    if len(queries) > SearchService.BATCH_MAX_QUERIES:
+        raise SearchServiceException(f"At most {SearchService.BATCH_MAX_QUERIES} queries per batch")
+    top_k = data.get('top_k', 6)
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+        raise SearchServiceException("top_k must be a positive integer")
+    return {"uuid": uuid, "queries": [query.strip() for query in queries], "top_k": top_k}
+
+
+@app.route('/search/batch', methods=['POST', 'OPTIONS'])
+def search_batch():
+    """API endpoint for running several queries against one user's documents, returning a top k list per query"""
+    
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'ok'})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        return response
+
+    try:
+        search = searchBatchJsonParameters(request.get_json(silent=True) or {})
+    except SearchServiceException as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        model = get_model()
+    except EncoderServiceException as e:
+        return model_unavailable(e)
+    
+    try:
+        results = SearchService.search_batch(search['uuid'], search['queries'], search['top_k'], model) # backend/routes/search.py
+        return jsonify(results)
+        
+    except SearchServiceException as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
 """--------------------------------------------------------------------------------------------------------------------------------------------------------"""
 
 """DELETE SERVICES"""
@@ -233,7 +388,8 @@ def health(uuid):
     
     try:
         # Use the health service
-        health_status = HealthService.health_service(model, uuid)
+        # Never waits for the model - a background load in progress reports model_loaded: false
+        health_status = HealthService.health_service(EncoderService.current_model(), uuid)
         return jsonify(health_status)
         
     except HealthServiceException as e:
@@ -255,6 +411,19 @@ def health(uuid):
 
 
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once the model is loaded, 503 while it is loading or after a failed load"""
+    status = EncoderService.model_status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-stage search and extract latency histograms in the Prometheus text format"""
+    return Response(MetricsService.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/')
 def index():
     """Main page"""
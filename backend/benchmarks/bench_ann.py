@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare exact top-k search with the per-user ANN (IVF) index on a synthetic clustered matrix of
+L2-normalized embeddings: index build time and size, per-query latency and recall@k.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ann [--rows 200000] [--dim 384] [--queries 100] [--top-k 6] [--nprobe 8 16 32 64]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.ann_index import AnnIndexService
+from routes.search import SearchService
+from benchmarks.bench_quantization import make_embeddings, recall_at_k
+
+
+def main():
+    """
+    Main function that builds the index and prints exact vs ANN search results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64])
+    args = parser.parse_args()
+
+    doc_embeddings = torch.from_numpy(make_embeddings(args.rows, args.dim, args.clusters))
+    rng = np.random.default_rng(1)
+    queries = doc_embeddings[torch.from_numpy(rng.integers(0, args.rows, args.queries))]
+    queries = queries + 0.3 * torch.from_numpy(rng.standard_normal((args.queries, args.dim), dtype=np.float32))
+
+    start = time.perf_counter()
+    index_bytes = AnnIndexService.serialize(AnnIndexService.build(doc_embeddings))
+    build_s = time.perf_counter() - start
+    ann_index = AnnIndexService.load(index_bytes, args.rows)
+    print(f"🗂️  {args.rows}x{args.dim}: index with {len(ann_index['centroids'])} lists built in {build_s:.1f} s ({len(index_bytes) / 1e6:.1f} MB)")
+
+    expected = []
+    start = time.perf_counter()
+    for query in queries:
+        scores = SearchService.calculate_normalized_similarities(query, doc_embeddings)
+        expected.append(torch.topk(scores, k=args.top_k).indices[0].tolist())
+    print(f"⏱️  exact         {(time.perf_counter() - start) * 1000 / args.queries:8.2f} ms/query   recall@{args.top_k}: 1.0000")
+
+    for nprobe in args.nprobe:
+        AnnIndexService.NPROBE = nprobe
+        found = []
+        start = time.perf_counter()
+        for query in queries:
+            found.append(AnnIndexService.search(query, doc_embeddings, ann_index, args.top_k)["top_indices"][0].tolist())
+        elapsed_ms = (time.perf_counter() - start) * 1000 / args.queries
+        print(f"⏱️  nprobe={nprobe:<5} {elapsed_ms:8.2f} ms/query   recall@{args.top_k}: {recall_at_k(expected, found):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark decoding a user's stored embeddings on the search path: the old
+frombuffer -> reshape -> copy -> from_numpy decode against the zero-copy
+SearchService.wrap_embedding_buffer, on a synthetic 100k x 384 float32 matrix.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_decode [--rows 100000] [--dim 384] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.search import SearchService
+
+
+def decode_with_copy(embeddings_bytes, embedding_shape):
+    """The previous decode: frombuffer, reshape, then a writable copy"""
+    embeddings_np = np.frombuffer(embeddings_bytes, dtype=np.float32).reshape(embedding_shape)
+    return torch.from_numpy(embeddings_np.copy()).cpu()
+
+
+def decode_zero_copy(embeddings_bytes, embedding_shape):
+    """The current decode: a read-only view of the fetched bytes"""
+    return SearchService.wrap_embedding_buffer(embeddings_bytes, embedding_shape)
+
+
+def measure(decode, embeddings_bytes, embedding_shape, repeat):
+    """
+    Time a decode function and measure its peak traced allocation.
+
+    Returns:
+        dict: Median milliseconds per decode and peak bytes allocated by one decode
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(embeddings_bytes, embedding_shape)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    embeddings = decode(embeddings_bytes, embedding_shape)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del embeddings
+
+    return {"median_ms": float(np.median(timings)), "peak_bytes": peak}
+
+
+def main():
+    """
+    Main function that runs both decoders and prints the comparison.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    shape = (args.rows, args.dim)
+    rng = np.random.default_rng(0)
+    embeddings_bytes = rng.standard_normal(shape, dtype=np.float32).tobytes()
+    query = torch.from_numpy(rng.standard_normal(args.dim, dtype=np.float32))
+
+    print(f"📦 Stored matrix: {shape[0]}x{shape[1]} float32 ({len(embeddings_bytes) / 1e6:.1f} MB)")
+    results = {
+        "copy": measure(decode_with_copy, embeddings_bytes, shape, args.repeat),
+        "zero-copy": measure(decode_zero_copy, embeddings_bytes, shape, args.repeat),
+    }
+    for name, result in results.items():
+        print(f"⏱️  {name:<10} decode: {result['median_ms']:8.3f} ms   peak alloc: {result['peak_bytes'] / 1e6:8.2f} MB")
+
+    saved = results["copy"]["peak_bytes"] - results["zero-copy"]["peak_bytes"]
+    print(f"✅ Zero-copy saves {saved / 1e6:.1f} MB and {results['copy']['median_ms'] - results['zero-copy']['median_ms']:.2f} ms per load")
+
+    # Scoring reads the read-only tensor directly
+    embeddings = decode_zero_copy(embeddings_bytes, shape)
+    start = time.perf_counter()
+    SearchService.calculate_normalized_similarities(query, embeddings)
+    print(f"🔍 Dot-product scoring on the read-only tensor: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare the encoder backends (ENCODER_BACKEND): load time, per-query encode latency and peak
+resident set of the PyTorch SentenceTransformer against its ONNX export (float32 and int8).
+Each backend runs in its own process so the resident sets do not mix.
+
+Export the ONNX graphs first (pythonFiles/preload.py does this), then from the backend directory:
+    python -m benchmarks.bench_encoder [--model-path my_model_dir] [--queries 200] [--threads 1]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BACKENDS = {
+    "torch": {"ENCODER_BACKEND": "torch"},
+    "onnx": {"ENCODER_BACKEND": "onnx", "ENCODER_ONNX_QUANTIZED": "false"},
+    "onnx-int8": {"ENCODER_BACKEND": "onnx", "ENCODER_ONNX_QUANTIZED": "true"},
+}
+
+QUERIES = [
+    "how do I reverse a linked list in python",
+    "explain the difference between TCP and UDP",
+    "what is a good name for a golden retriever",
+    "summarize the plot of moby dick",
+    "write a SQL query that finds duplicate emails",
+]
+
+
+def run_single(model_path, queries, threads):
+    """
+    Load the configured encoder and time single-query encodes (runs inside the child process)
+
+    Returns:
+        dict: Backend class, load seconds, median/p95 milliseconds per query and peak RSS in MB
+    """
+    if threads:
+        os.environ.setdefault("ENCODER_ONNX_THREADS", str(threads))
+    from routes.encoder import EncoderService
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    start = time.perf_counter()
+    model = EncoderService.load_model(model_path)
+    load_s = time.perf_counter() - start
+
+    model.encode(QUERIES[0])  # warm up
+    timings = []
+    for index in range(queries):
+        start = time.perf_counter()
+        model.encode(QUERIES[index % len(QUERIES)])
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    return {
+        "model": type(model).__name__,
+        "load_s": load_s,
+        "median_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def main():
+    """
+    Main function that runs every backend in a child process and prints the comparison.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=os.path.join(os.path.dirname(__file__), '..', 'my_model_dir'))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1, help="intra-op threads for every backend (0 = library default)")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.model_path, args.queries, args.threads)))
+        return
+
+    print(f"🤖 Encoder {os.path.abspath(args.model_path)}, {args.queries} single-query encodes, {args.threads or 'default'} thread(s)")
+    for name, env in BACKENDS.items():
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_encoder", "--single", "--model-path", args.model_path,
+             "--queries", str(args.queries), "--threads", str(args.threads)],
+            env={**os.environ, **env}, capture_output=True, text=True,
+            cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        )
+        if completed.returncode != 0:
+            print(f"❌ {name}: {completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(
+            f"⏱️  {name:<10} ({result['model']}) load: {result['load_s']:5.2f} s   "
+            f"median: {result['median_ms']:6.2f} ms   p95: {result['p95_ms']:6.2f} ms   peak RSS: {result['peak_rss_mb']:7.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare single-query encoding under concurrency: every client calling model.encode on its own
+(what each Flask worker does without the encoder server) against the encoder server coalescing the
+clients' queries into micro-batches (ENCODER_SERVER_MAX_WAIT_MS), reporting throughput, latency and
+the average batch the server formed.
+
+Needs the saved model in my_model_dir. From the backend directory:
+    python -m benchmarks.bench_encoder_server [--clients 8] [--duration 10] [--max-wait-ms 0 2 5 10]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.encoder import EncoderService
+from routes.encoder_server import RemoteSentenceEncoder
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+WORDS = "how do i learn python what is deep learning explain databases cooking travel music history".split()
+
+
+def run_clients(encode, clients, duration):
+    """
+    Call encode(query) from concurrent client threads for duration seconds
+
+    Returns:
+        dict: queries per second and median/p95 latency in ms
+    """
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        while time.time() < stop_at:
+            query = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+            start = time.perf_counter()
+            encode(query)
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "qps": len(latencies) / duration,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    }
+
+
+def report(label, result, extra=""):
+    """Print one comparison line"""
+    print(f"⏱️  {label:<22} {result['qps']:8.1f} queries/s   p50 {result['p50_ms']:7.2f} ms   p95 {result['p95_ms']:7.2f} ms{extra}")
+
+
+def main():
+    """
+    Main function that runs the in-process baseline and the server at each max wait.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=os.path.join(BACKEND_DIR, 'my_model_dir'))
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[0, 2, 5, 10])
+    args = parser.parse_args()
+
+    print(f"🖥️  {os.cpu_count()} CPU(s), {args.clients} concurrent clients, {args.duration:.0f} s per run")
+    model = EncoderService.load_model(args.model_path, use_server=False)
+    model.encode("warm up")
+    report("in-process encode", run_clients(model.encode, args.clients, args.duration))
+    del model
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"bench-encoder-{os.getpid()}.sock")
+    for max_wait_ms in args.max_wait_ms:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "routes.encoder_server", "--socket", socket_path, "--model-path", args.model_path],
+            cwd=BACKEND_DIR, env={**os.environ, "ENCODER_SERVER_MAX_WAIT_MS": str(max_wait_ms)},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            encoder = RemoteSentenceEncoder(socket_path, connect_timeout=300)
+            encoder.encode("warm up")
+            before = encoder.stats()
+            result = run_clients(encoder.encode, args.clients, args.duration)
+            after = encoder.stats()
+            batch = (after["texts"] - before["texts"]) / max(1, after["batches"] - before["batches"])
+            report(f"server, wait {max_wait_ms:g} ms", result, f"   avg batch {batch:5.1f}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Load test /search against gunicorn (gunicorn.conf.py) with an increasing number of workers and report
+throughput, latency and memory, to check that throughput scales with workers while the preloaded
+model and the shared embedding files keep memory from scaling with them.
+
+A synthetic user is uploaded once through /extract (database, or the JSON file fallback) and removed
+at the end. Needs the saved model in my_model_dir. From the backend directory:
+    python -m benchmarks.bench_load [--workers 1 2 4] [--clients 8] [--duration 20] [--documents 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid as uuid_lib
+
+from benchmarks.synthetic_export import generate_conversations
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TOPICS = ["python", "databases", "cooking", "travel", "music", "finance", "gardening", "history"]
+
+
+def request(url, payload=None, method=None, timeout=60):
+    """
+    Send a JSON request
+
+    Returns:
+        tuple: (HTTP status, parsed JSON body or None)
+    """
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, OSError):
+        return 0, None
+
+
+def start_server(workers, port):
+    """Start gunicorn with the given worker count and wait until /ready reports the model loaded"""
+    env = {**os.environ, "GUNICORN_WORKERS": str(workers), "GUNICORN_BIND": f"127.0.0.1:{port}", "EXTRACT_ASYNC": "false"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        if request(f"http://127.0.0.1:{port}/ready", timeout=5)[0] == 200:
+            return server
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("gunicorn did not become ready within 600 s")
+
+
+def memory_mb(server):
+    """
+    Resident (RSS) and proportional (PSS, shared pages split between processes) memory of the
+    gunicorn master and its workers
+
+    Returns:
+        tuple: (total RSS MB, total PSS MB), PSS is None where /proc/<pid>/smaps_rollup is unavailable
+    """
+    pids = [server.pid]
+    try:
+        with open(f"/proc/{server.pid}/task/{server.pid}/children") as f:
+            pids += [int(pid) for pid in f.read().split()]
+    except OSError:
+        pass
+
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+            rss += int(fields["Rss"].split()[0]) / 1024
+            pss += int(fields["Pss"].split()[0]) / 1024
+        except (OSError, KeyError, ValueError):
+            return None, None
+    return rss, pss
+
+
+def run_load(port, user_uuid, clients, duration):
+    """
+    Send /search requests from concurrent clients for duration seconds
+
+    Returns:
+        dict: completed requests, errors, requests per second and median/p95 latency in ms
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        while time.time() < stop_at:
+            query = f"how do I get better at {rng.choice(TOPICS)} {rng.randint(0, 10 ** 6)}"
+            start = time.perf_counter()
+            status, _body = request(f"http://127.0.0.1:{port}/search", {"uuid": user_uuid, "query": query})
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / duration,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else float("nan"),
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else float("nan")
+    }
+
+
+def main():
+    """
+    Main function that load tests every worker count and prints the comparison.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=0, help="concurrent clients (0 = 2 x the largest worker count)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per worker count")
+    parser.add_argument("--documents", type=int, default=2000, help="documents in the synthetic user")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    clients = args.clients or 2 * max(args.workers)
+    user_uuid = f"bench-load-{uuid_lib.uuid4().hex[:8]}"
+    print(f"🖥️  {os.cpu_count()} CPU(s), {clients} clients, {args.duration:.0f} s per run, {args.documents} documents")
+
+    seeded = False
+    baseline_rps = None
+    for workers in args.workers:
+        server = start_server(workers, args.port)
+        try:
+            if not seeded:
+                status, body = request(
+                    f"http://127.0.0.1:{args.port}/extract",
+                    {"uuid": user_uuid, "data": generate_conversations(args.documents)}, timeout=1800
+                )
+                if status != 200:
+                    raise RuntimeError(f"Seeding the synthetic user failed ({status}): {body}")
+                seeded = True
+
+            run_load(args.port, user_uuid, clients, min(3.0, args.duration))  # Warm every worker's cache
+            result = run_load(args.port, user_uuid, clients, args.duration)
+            rss, pss = memory_mb(server)
+            baseline_rps = baseline_rps or result["rps"]
+            memory = f"RSS {rss:7.1f} MB  PSS {pss:7.1f} MB" if rss is not None else "memory n/a"
+            print(
+                f"⏱️  {workers} worker(s): {result['rps']:7.1f} req/s (x{result['rps'] / baseline_rps:4.2f})   "
+                f"p50 {result['p50_ms']:7.1f} ms   p95 {result['p95_ms']:7.1f} ms   "
+                f"errors {result['errors']}   {memory}"
+            )
+        finally:
+            if workers == args.workers[-1] and seeded:
+                request(f"http://127.0.0.1:{args.port}/delete/{user_uuid}", method="DELETE")
+            server.terminate()
+            server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
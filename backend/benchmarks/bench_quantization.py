@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare the embedding storage dtypes (EMBEDDING_STORAGE_DTYPE): stored size, decode time and
+recall@k of the top-k search results against float32, on a synthetic clustered matrix of
+L2-normalized embeddings (the layout extract saves).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_quantization [--rows 100000] [--dim 384] [--queries 200] [--top-k 6]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.embedding_codec import EmbeddingCodec
+from routes.search import SearchService
+
+
+def make_embeddings(rows, dim, clusters, seed=0):
+    """
+    Build unit-length embeddings grouped around topic centers, so nearest neighbours are close
+    in score the way real prompt embeddings are
+
+    Returns:
+        np.ndarray: (rows, dim) float32 embeddings
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    embeddings = centers[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dim), dtype=np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def top_k_indices(query_embeddings, doc_embeddings, top_k):
+    """Indices of the top_k dot-product scores for each query"""
+    scores = torch.from_numpy(query_embeddings) @ doc_embeddings.T
+    return torch.topk(scores, k=top_k, dim=1).indices.numpy()
+
+
+def recall_at_k(expected, found):
+    """Fraction of the float32 top-k that is also in the quantized top-k, averaged over queries"""
+    return float(np.mean([len(set(e) & set(f)) / len(e) for e, f in zip(expected, found)]))
+
+
+def main():
+    """
+    Main function that encodes the matrix in each dtype and prints the comparison.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--clusters", type=int, default=500)
+    args = parser.parse_args()
+
+    embeddings = make_embeddings(args.rows, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = embeddings[rng.integers(0, args.rows, args.queries)] + 0.3 * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    shape = embeddings.shape
+
+    print(f"📦 {shape[0]}x{shape[1]} normalized embeddings, {args.queries} queries, recall@{args.top_k} vs float32")
+    expected = None
+    for dtype in EmbeddingCodec.SUPPORTED_DTYPES:
+        stored = EmbeddingCodec.encode(embeddings, dtype)
+
+        start = time.perf_counter()
+        doc_embeddings = SearchService.wrap_embedding_buffer(stored, shape, dtype)
+        decode_ms = (time.perf_counter() - start) * 1000
+
+        found = top_k_indices(queries, doc_embeddings, args.top_k)
+        if expected is None:
+            expected = found
+        print(
+            f"📊 {dtype:<8} stored: {len(stored) / 1e6:8.1f} MB   decode: {decode_ms:8.2f} ms   "
+            f"recall@{args.top_k}: {recall_at_k(expected, found):.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Compare the search scoring backends (SEARCH_SCORING_BACKEND): per-query latency of scoring a
+query against every stored embedding and ranking the top k, for both the normalized (dot
+product) and legacy (full cosine) paths, on a synthetic float32 matrix.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_scoring [--rows 100000] [--dim 384] [--queries 50] [--top-k 6]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.scoring import ScoringService
+
+
+def time_backend(backend, queries, doc_embeddings, top_k, normalized):
+    """
+    Score and rank every query with one backend
+
+    Returns:
+        tuple: (median milliseconds per query, list of top-k index lists)
+    """
+    score = backend.normalized_similarities if normalized else backend.cosine_similarities
+    timings = []
+    rankings = []
+    for query in queries:
+        start = time.perf_counter()
+        _scores, top_indices = backend.top_k(score(query, doc_embeddings), top_k)
+        timings.append((time.perf_counter() - start) * 1000)
+        rankings.append(list(np.asarray(top_indices).reshape(-1)))
+    return float(np.median(timings)), rankings
+
+
+def main():
+    """
+    Main function that runs every backend and prints the comparison.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=6)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.rows, args.dim), dtype=np.float32)
+    normalized_embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = [torch.from_numpy(query) for query in rng.standard_normal((args.queries, args.dim), dtype=np.float32)]
+
+    print(f"📦 {args.rows}x{args.dim} float32, {args.queries} queries, top {args.top_k} (torch threads: {torch.get_num_threads()})")
+    for normalized, matrix in ((True, normalized_embeddings), (False, embeddings)):
+        path = "normalized" if normalized else "cosine"
+        reference = None
+        for name, backend in ScoringService.BACKENDS.items():
+            median_ms, rankings = time_backend(backend, queries, backend.as_matrix(matrix), args.top_k, normalized)
+            reference = reference or rankings
+            same = sum(ranking == expected for ranking, expected in zip(rankings, reference))
+            print(f"⏱️  {path:<10} {name:<6} {median_ms:8.2f} ms/query   same ranking as torch: {same}/{len(rankings)}")
+
+
+if __name__ == "__main__":
+    main()
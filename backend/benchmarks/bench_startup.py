@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measure app startup for each MODEL_LOAD_MODE: how long `import app` takes (with `python -X importtime`
+breaking it down by module), when the first request to / is served, and when the model is ready (loaded
+by the first request needing it, in lazy mode). Each mode runs in a fresh interpreter so nothing is
+already imported.
+
+Needs the saved model in my_model_dir (pythonFiles/preload.py). From the backend directory:
+    python -m benchmarks.bench_startup [--modes lazy background eager] [--top 10]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs inside the child interpreter; prints one JSON line of timings
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+heavy_at_import = [name for name in ('torch', 'sentence_transformers', 'transformers') if name in sys.modules]
+client = app.app.test_client()
+first_response = client.get('/').status_code
+served = time.perf_counter() - start
+try:
+    app.get_model()  # Waits for a background load, loads on first use in lazy mode
+except app.EncoderServiceException:
+    pass
+print(json.dumps({
+    'import_s': imported, 'first_response_s': served, 'first_response_status': first_response,
+    'ready_s': time.perf_counter() - start, 'ready': app.EncoderService.model_status()['ready'],
+    'heavy_at_import': heavy_at_import
+}))
+"""
+
+
+def parse_importtime(stderr, top):
+    """
+    Parse `-X importtime` output
+
+    Returns:
+        list: (cumulative milliseconds, module) of the top slowest imports, by cumulative time
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us) / 1000, module.rstrip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    """
+    Main function that starts the app once per load mode and prints the timings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["lazy", "background", "eager"])
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list per mode")
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT],
+            env={**os.environ, "MODEL_LOAD_MODE": mode}, capture_output=True, text=True, cwd=BACKEND_DIR
+        )
+        if completed.returncode != 0:
+            print(f"❌ {mode}: {completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(
+            f"⏱️  {mode:<10} import app: {result['import_s']:6.2f} s   first / ({result['first_response_status']}): "
+            f"{result['first_response_s']:6.2f} s   model ready: {result['ready_s']:6.2f} s"
+            f"{'' if result['ready'] else ' (load failed)'}   heavy modules at import: {', '.join(result['heavy_at_import']) or 'none'}"
+        )
+        for cumulative_ms, module in parse_importtime(completed.stderr, args.top):
+            print(f"      {cumulative_ms:9.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Reproducible search/extract benchmark suite on synthetic ChatGPT exports (benchmarks/synthetic_export.py).
+
+For every scale (number of prompts) it measures:
+  - parse: json.load of the generated conversations.json
+  - extract_tree: ExtractService.extract_conversation_tree
+  - create_embeddings: ExtractService.create_embeddings on up to --encode-sample documents
+    (documents/s; the embedding cache is bypassed unless --embedding-cache)
+  - save / load: ExtractService.save_data and a cold SearchService.integrate_extraction, through
+    Postgres when it is reachable and the file store fallback otherwise (reported as "storage")
+  - search: end-to-end POST /search through the Flask app, p50/p95/p99 over --queries unique queries,
+    plus the mean of every search stage recorded by MetricsService
+
+Results are written to a JSON file (--output) together with the commit, machine and settings of
+the run; --compare prints every metric's change against an earlier results file.
+
+Documents beyond --encode-sample are embedded with a hashing encoder (bag of hashed words, no
+model), so save/load/search can run at 100k-1m prompts; --encoder hashing uses it throughout.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_suite [--scales 1k 10k] [--encoder model|hashing] [--queries 200]
+        [--output results.json] [--compare earlier.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid as uuid_lib
+import zlib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The app must not start loading the model in the background when it is imported
+os.environ.setdefault("MODEL_LOAD_MODE", "lazy")
+
+from benchmarks.synthetic_export import write_export, parse_count, format_count, TOPICS, FILLER
+from database.postgres import DatabaseService
+from routes.extract import ExtractService
+from routes.search import SearchService
+from routes.delete import DeleteService
+from routes.cache import CacheService
+from routes.embedding_cache import EmbeddingCacheService
+from routes.ann_index import AnnIndexService
+from routes.encoder import EncoderService
+from routes.metrics import MetricsService
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class HashingEncoder:
+    """
+    Model-free stand-in for a SentenceTransformer: each word adds +-1 to a dimension picked by its
+    CRC32, so texts sharing words get similar vectors. Deterministic across runs and processes.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.model_card_data = SimpleNamespace(base_model=f"hashing-encoder-{dim}")
+        self._words = {}
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                slot = self._words.get(word)
+                if slot is None:
+                    digest = zlib.crc32(word.encode("utf-8"))
+                    slot = self._words.setdefault(word, (digest % self.dim, 1.0 if digest & (1 << 31) else -1.0))
+                embeddings[row, slot[0]] += slot[1]
+        embeddings[:, 0] += 1e-3  # No all-zero rows
+        if convert_to_tensor:
+            embeddings = torch.from_numpy(embeddings)
+        return embeddings[0] if single else embeddings
+
+
+def percentiles(values):
+    """
+    Returns:
+        dict: p50/p95/p99/mean/max of values in milliseconds
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "max_ms": float(values.max())
+    }
+
+
+def timed(function, *args, **kwargs):
+    """
+    Returns:
+        tuple: (function's result, seconds it took)
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def git_commit():
+    """Commit the benchmarked tree is at (None outside a git checkout)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_scale(prompts, args, model, client):
+    """
+    Run every stage for one scale
+
+    Returns:
+        dict: Metrics of this scale
+    """
+    label = format_count(prompts)
+    result = {"scale": label, "prompts": prompts}
+    print(f"\n📦 {label} prompts")
+
+    export_path = os.path.join(args.export_dir, f"conversations-{label}-seed{args.seed}.json")
+    if not os.path.exists(export_path):
+        _size, result["generate_s"] = timed(write_export, export_path, prompts, seed=args.seed)
+    result["export_mb"] = os.path.getsize(export_path) / 1e6
+
+    def load_export():
+        with open(export_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    conversations, result["parse_s"] = timed(load_export)
+    processed_data, result["extract_tree_s"] = timed(ExtractService.extract_conversation_tree, conversations, "bench")
+    del conversations
+    result["documents"] = len(processed_data)
+    print(f"⏱️  parse {result['parse_s']:.2f} s, extract_conversation_tree {result['extract_tree_s']:.2f} s ({result['documents']} documents)")
+
+    # Encoding throughput on a sample; the rest of the corpus gets hashing-encoder vectors
+    keys = list(processed_data.keys())
+    sample = {key: processed_data[key] for key in keys[:args.encode_sample]}
+    (sample_embeddings, _sample_keys), encode_s = timed(ExtractService.create_embeddings, sample, model)
+    result["create_embeddings"] = {"documents": len(sample), "seconds": encode_s, "documents_per_s": len(sample) / encode_s}
+    print(f"⏱️  create_embeddings {len(sample)} documents in {encode_s:.2f} s ({len(sample) / encode_s:.0f} documents/s)")
+
+    embeddings = sample_embeddings
+    if len(keys) > len(sample):
+        filler = HashingEncoder(embeddings.shape[-1]).encode(keys[len(sample):])
+        embeddings = np.concatenate([embeddings, filler])
+    embeddings = ExtractService.normalize_embeddings(embeddings)
+    ann_index, result["ann_build_s"] = timed(AnnIndexService.build_for_storage, embeddings, normalized=True)
+
+    user_uuid = f"bench-suite-{label}-{uuid_lib.uuid4().hex[:8]}"
+    try:
+        save_result, result["save_s"] = timed(
+            ExtractService.save_data, user_uuid, processed_data, keys, embeddings,
+            embedding_meta=ExtractService.create_embedding_meta(normalized=True), ann_index=ann_index
+        )
+        result["storage"] = DatabaseService.STORAGE_MODE if "database_result" in save_result else "file"
+        del processed_data, embeddings
+
+        load_times = []
+        for _repeat in range(args.load_repeats):
+            CacheService.invalidate(user_uuid)
+            _extraction, seconds = timed(SearchService.integrate_extraction, user_uuid)
+            load_times.append(seconds)
+        result["load_s"] = float(np.median(load_times))
+        print(f"⏱️  save {result['save_s']:.2f} s, cold load {result['load_s']:.3f} s ({result['storage']})")
+
+        # End-to-end /search: one cold request, then unique warm queries (no query cache hits)
+        CacheService.invalidate(user_uuid)
+        search = lambda query: client.post('/search', json={"uuid": user_uuid, "query": query, "top_k": args.top_k})
+        response, cold_s = timed(search, "warm up the user cache")
+        if response.status_code != 200:
+            raise RuntimeError(f"/search failed ({response.status_code}): {response.get_data(as_text=True)[:200]}")
+        result["search_cold_ms"] = cold_s * 1000
+
+        rng = np.random.default_rng(args.seed)
+        MetricsService.reset()
+        latencies = []
+        for number in range(args.queries):
+            words = list(rng.choice(TOPICS, 2)) + list(rng.choice(FILLER, int(rng.integers(3, 9))))
+            _response, seconds = timed(search, f"{' '.join(words)} {number}")
+            latencies.append(seconds * 1000)
+        result["search"] = percentiles(latencies)
+        result["search_stages_mean_ms"] = {
+            key.split("/", 1)[1]: histogram["sum"] / histogram["count"] * 1000
+            for key, histogram in MetricsService.snapshot().items()
+            if key.startswith("search/") and histogram["count"]
+        }
+        search_result = result["search"]
+        print(f"⏱️  /search p50 {search_result['p50_ms']:.2f} ms, p95 {search_result['p95_ms']:.2f} ms, p99 {search_result['p99_ms']:.2f} ms (cold {result['search_cold_ms']:.1f} ms)")
+    finally:
+        if not args.keep_data:
+            DeleteService.delete_service(user_uuid)
+            CacheService.invalidate(user_uuid)
+
+    return result
+
+
+def flatten(metrics, prefix=""):
+    """Flatten nested metrics into {"a.b": number}"""
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(previous_path, results):
+    """Print every metric of this run next to the same metric of an earlier results file"""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {run["scale"]: run for run in json.load(f)["results"]}
+
+    print(f"\n📊 Compared with {previous_path} (time metrics: lower is better)")
+    for run in results:
+        if run["scale"] not in previous:
+            continue
+        before, after = flatten(previous[run["scale"]]), flatten(run)
+        for key in sorted(set(before) & set(after)):
+            if before[key] and key not in ("prompts", "documents", "create_embeddings.documents"):
+                change = (after[key] - before[key]) / before[key] * 100
+                print(f"  {run['scale']:>4} {key:<38} {before[key]:12.3f} -> {after[key]:12.3f}  ({change:+6.1f}%)")
+
+
+def main():
+    """
+    Main function that runs every scale and writes the results file.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=["1k", "10k"], help="prompt counts, e.g. 1k 10k 100k 1m")
+    parser.add_argument("--encoder", choices=["model", "hashing"], default="model")
+    parser.add_argument("--model-path", default=os.path.join(BACKEND_DIR, 'my_model_dir'))
+    parser.add_argument("--encode-sample", type=int, default=2000, help="most documents embedded by create_embeddings")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--load-repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--export-dir", default=os.path.join(tempfile.gettempdir(), "chatgpt-augmenter-bench"),
+                        help="generated exports are kept here and reused by later runs")
+    parser.add_argument("--embedding-cache", action="store_true", help="let create_embeddings use the persistent embedding cache")
+    parser.add_argument("--keep-data", action="store_true", help="keep the benchmark users after the run")
+    parser.add_argument("--output", default=f"bench_suite_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    EmbeddingCacheService.ENABLED = args.embedding_cache
+
+    import app
+    if args.encoder == "hashing":
+        model = HashingEncoder()
+        EncoderService._model = model  # Served by /search instead of loading my_model_dir
+    else:
+        app.MODEL_PATH = args.model_path
+        model = app.get_model()
+    client = app.app.test_client()
+
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "encoder": args.encoder if args.encoder == "hashing" else EmbeddingCacheService.resolve_model_id(model),
+        "storage_mode": DatabaseService.STORAGE_MODE,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    }
+    print(f"🖥️  {meta['cpus']} CPU(s), encoder {meta['encoder']}, commit {meta['commit']}")
+
+    results = [run_scale(parse_count(scale), args, model, client) for scale in args.scales]
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
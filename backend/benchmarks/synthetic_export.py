@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic ChatGPT conversations.json exports for benchmarks.
+
+Conversations look like a real export: a root node without a message, a system node, then
+alternating user/assistant turns linked through parent/children, plus title and timestamps. Every
+prompt is unique, so an export with N prompts extracts to exactly N documents. The same prompt
+count and seed always produce the same export.
+
+Usage (from the backend directory):
+    python -m benchmarks.synthetic_export --prompts 10k --output /tmp/conversations-10k.json [--seed 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import uuid as uuid_lib
+
+TOPICS = [
+    "python", "databases", "cooking", "travel", "music", "finance", "gardening", "history", "linux",
+    "javascript", "statistics", "photography", "fitness", "chemistry", "writing", "networking"
+]
+TEMPLATES = [
+    "How do I get better at {topic} when I only have {minutes} minutes a day?",
+    "Explain {topic} to me like I am new to it, with an example about {other}.",
+    "What are common mistakes people make with {topic} and how do I avoid them?",
+    "Compare {topic} and {other}: which should I learn first and why?",
+    "Write a short plan for a week of {topic} practice that also covers {other}.",
+    "Why does my {topic} project fail when I add {other} to it?",
+    "Summarize the history of {topic} in a few paragraphs.",
+    "Give me three exercises about {topic} with increasing difficulty."
+]
+FILLER = (
+    "the a to of and in that is for it with as on be this you can by are or from at an your more "
+    "practice example step data result first then because usually when each time should start small "
+    "improve build test check read write learn try simple common problem solution approach detail"
+).split()
+
+SCALES = {"k": 1000, "m": 1000000}
+
+
+def parse_count(value):
+    """
+    Parse a prompt count such as 1000, 10k or 1m
+
+    Returns:
+        int: Number of prompts
+    """
+    value = str(value).strip().lower()
+    if value and value[-1] in SCALES:
+        return int(float(value[:-1]) * SCALES[value[-1]])
+    return int(value)
+
+
+def format_count(count):
+    """Short label of a prompt count (1000 -> 1k, 1000000 -> 1m)"""
+    for suffix, size in sorted(SCALES.items(), key=lambda item: -item[1]):
+        if count >= size and count % size == 0:
+            return f"{count // size}{suffix}"
+    return str(count)
+
+
+def iter_conversations(prompts, seed=0, max_turns=6, response_words=(20, 200)):
+    """
+    Yield synthetic conversations holding exactly prompts user prompts in total
+
+    Args:
+        prompts (int): Total number of user prompts (= extracted documents)
+        seed (int): Random seed
+        max_turns (int): Most user/assistant turns per conversation
+        response_words (tuple): (min, max) words per assistant response
+
+    Yields:
+        dict: One conversation in the ChatGPT export format
+    """
+    rng = random.Random(seed)
+    # Responses are slices of one long word stream, much faster than choosing every word
+    stream = [rng.choice(FILLER) for _ in range(1 << 16)]
+    created = 1700000000.0
+    index = 0
+    while index < prompts:
+        turns = min(rng.randint(1, max_turns), prompts - index)
+        node_id = lambda: str(uuid_lib.UUID(int=rng.getrandbits(128)))
+        root_id, system_id = node_id(), node_id()
+        mapping = {
+            root_id: {"id": root_id, "message": None, "parent": None, "children": [system_id]},
+            system_id: {"id": system_id, "parent": root_id, "children": [], "message": {
+                "id": system_id, "author": {"role": "system"}, "content": {"content_type": "text", "parts": [""]}
+            }}
+        }
+        parent = system_id
+        topic = rng.choice(TOPICS)
+        for _turn in range(turns):
+            prompt = rng.choice(TEMPLATES).format(topic=topic, other=rng.choice(TOPICS), minutes=rng.randint(5, 90))
+            start = rng.randrange(len(stream) - response_words[1])
+            response = " ".join(stream[start:start + rng.randint(*response_words)])
+            for role, text in (("user", f"{prompt} (#{index})"), ("assistant", f"{response.capitalize()}.")):
+                current = node_id()
+                mapping[parent]["children"].append(current)
+                mapping[current] = {"id": current, "parent": parent, "children": [], "message": {
+                    "id": current, "author": {"role": role}, "create_time": created,
+                    "content": {"content_type": "text", "parts": [text]}
+                }}
+                parent = current
+                created += rng.uniform(1, 120)
+            index += 1
+        yield {
+            "title": f"{topic.capitalize()} questions",
+            "create_time": created,
+            "update_time": created,
+            "mapping": mapping,
+            "current_node": parent,
+            "conversation_id": node_id()
+        }
+
+
+def generate_conversations(prompts, seed=0, **kwargs):
+    """
+    Build a synthetic export in memory (see iter_conversations for the arguments)
+
+    Returns:
+        list: Conversations, as json.load would return them from conversations.json
+    """
+    return list(iter_conversations(prompts, seed=seed, **kwargs))
+
+
+def write_export(path, prompts, seed=0, **kwargs):
+    """
+    Write a synthetic conversations.json one conversation at a time (constant memory at any scale)
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for number, conversation in enumerate(iter_conversations(prompts, seed=seed, **kwargs)):
+            if number:
+                f.write(",\n")
+            json.dump(conversation, f, ensure_ascii=False)
+        f.write("]\n")
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+def main():
+    """
+    Main function that writes one synthetic export.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", default="1k", help="number of prompts, e.g. 1000, 10k or 1m")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=6)
+    args = parser.parse_args()
+
+    prompts = parse_count(args.prompts)
+    size = write_export(args.output, prompts, seed=args.seed, max_turns=args.max_turns)
+    print(f"✅ Wrote {format_count(prompts)} prompts ({size / 1e6:.1f} MB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import numpy as np
+
+
+class DocumentCodecException(Exception):
+    """Custom exception for packed document encode/decode errors"""
+    pass
+
+
+class DocumentCodec:
+    """
+    Packed layout for a user's documents (prompt -> response), in embedding-row order:
+
+    - blob:    the UTF-8 prompt and response of every document, back to back
+    - offsets: 2 * rows + 1 little-endian uint64 byte offsets into blob; document i's prompt is
+               blob[offsets[2i]:offsets[2i + 1]] and its response blob[offsets[2i + 1]:offsets[2i + 2]]
+
+    A reader only slices the documents it needs out of the blob, so the search path never decodes
+    the whole corpus (compare the processed_data JSON, which has to be parsed completely).
+    """
+
+    OFFSET_DTYPE = np.dtype("<u8")
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """ENCODE / DECODE FUNCTIONS"""
+
+    @staticmethod
+    def pack(keys, data):
+        """
+        Pack documents in key order
+
+        Args:
+            keys (list): Prompts in embedding-row order
+            data (dict): Prompt -> response
+
+        Returns:
+            tuple: (blob bytes, offsets bytes)
+
+        Raises:
+            DocumentCodecException: If a key has no document
+        """
+        parts = []
+        offsets = np.empty(2 * len(keys) + 1, dtype=DocumentCodec.OFFSET_DTYPE)
+        position = 0
+        for row, key in enumerate(keys):
+            if key not in data:
+                raise DocumentCodecException(f"No document for key at row {row}")
+            for column, text in enumerate((key, data[key])):
+                encoded = str(text).encode("utf-8")
+                offsets[2 * row + column] = position
+                parts.append(encoded)
+                position += len(encoded)
+        offsets[-1] = position
+        return b"".join(parts), offsets.tobytes()
+
+    @staticmethod
+    def open(blob, offsets):
+        """
+        Wrap packed documents for reading without copying them
+
+        Args:
+            blob (bytes or buffer): Packed prompts and responses (e.g. a memory map)
+            offsets (bytes or buffer): Offsets written by pack
+
+        Returns:
+            PackedDocuments: Reader over the packed documents
+
+        Raises:
+            DocumentCodecException: If the offsets do not match the blob
+        """
+        return PackedDocuments(blob, offsets)
+
+
+class PackedDocuments:
+    """Read access to documents packed by DocumentCodec.pack (only requested documents are decoded)"""
+
+    def __init__(self, blob, offsets):
+        self._blob = memoryview(blob).cast("B") if len(blob) else memoryview(b"")
+        self._offsets = np.frombuffer(offsets, dtype=DocumentCodec.OFFSET_DTYPE) if len(offsets) else np.zeros(1, dtype=DocumentCodec.OFFSET_DTYPE)
+        if len(self._offsets) % 2 != 1 or int(self._offsets[-1]) != len(self._blob):
+            raise DocumentCodecException("Document offsets do not match the packed documents")
+
+    def __len__(self):
+        return len(self._offsets) // 2
+
+    @property
+    def nbytes(self):
+        """Size of the packed documents and their offsets in bytes"""
+        return self._blob.nbytes + self._offsets.nbytes
+
+    def get(self, ordinal):
+        """
+        Decode one document
+
+        Args:
+            ordinal (int): Row of the document
+
+        Returns:
+            tuple: (prompt, response)
+        """
+        start, middle, end = (int(offset) for offset in self._offsets[2 * ordinal:2 * ordinal + 3])
+        return (
+            str(self._blob[start:middle], "utf-8"),
+            str(self._blob[middle:end], "utf-8")
+        )
+
+    def fetch(self, ordinals):
+        """
+        Decode the requested documents (same contract as DatabaseService.load_documents_by_ordinal)
+
+        Args:
+            ordinals (list): Document rows
+
+        Returns:
+            dict: Mapping of ordinal to (prompt, response); out-of-range ordinals are left out
+        """
+        return {int(ordinal): self.get(int(ordinal)) for ordinal in ordinals if 0 <= int(ordinal) < len(self)}
+
+    def to_dict(self):
+        """
+        Decode every document (for callers that need the whole corpus, not the search path)
+
+        Returns:
+            tuple: (keys in row order, prompt -> response dict)
+        """
+        keys, data = [], {}
+        for ordinal in range(len(self)):
+            key, content = self.get(ordinal)
+            keys.append(key)
+            data[key] = content
+        return keys, data
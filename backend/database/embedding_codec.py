@@ -0,0 +1,129 @@
+import numpy as np
+
+
+class EmbeddingCodecException(Exception):
+    """Custom exception for embedding encode/decode errors"""
+    pass
+
+
+class EmbeddingCodec:
+    """
+    Byte layouts for stored embedding matrices, selected by embedding_meta["dtype"]:
+
+    - float32: rows * dim float32 values (lossless, the legacy layout)
+    - float16: rows * dim float16 values (half the size)
+    - int8:    rows float32 per-row scales followed by rows * dim int8 codes, where
+               value = code * scale and scale = max(|row|) / 127 (about a quarter of the size)
+
+    embedding_shape always records the logical (rows, dim) shape, whatever the dtype.
+    """
+
+    SUPPORTED_DTYPES = ("float32", "float16", "int8")
+    INT8_MAX = 127
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """ENCODE / DECODE FUNCTIONS"""
+
+    @staticmethod
+    def encode(embeddings, dtype="float32"):
+        """
+        Encode a (rows, dim) embedding matrix for storage
+
+        Args:
+            embeddings (torch.Tensor or np.ndarray): float embeddings
+            dtype (str): One of SUPPORTED_DTYPES
+
+        Returns:
+            bytes: Stored representation of the matrix
+
+        Raises:
+            EmbeddingCodecException: If dtype is not supported
+        """
+        dtype = EmbeddingCodec.validate_dtype(dtype)
+        embeddings_np = embeddings.cpu().numpy() if hasattr(embeddings, 'cpu') else np.asarray(embeddings)
+
+        if dtype == "float32":
+            return np.ascontiguousarray(embeddings_np, dtype=np.float32).tobytes()
+        if dtype == "float16":
+            return np.ascontiguousarray(embeddings_np, dtype=np.float16).tobytes()
+
+        embeddings_np = np.asarray(embeddings_np, dtype=np.float32)
+        scales = (np.abs(embeddings_np).max(axis=1) / EmbeddingCodec.INT8_MAX).astype(np.float32)
+        safe_scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(embeddings_np / safe_scales[:, None]), -EmbeddingCodec.INT8_MAX, EmbeddingCodec.INT8_MAX).astype(np.int8)
+        return scales.tobytes() + codes.tobytes()
+
+    @staticmethod
+    def decode(embeddings_buffer, embedding_shape, dtype="float32"):
+        """
+        Decode stored embeddings back to a float32 (rows, dim) matrix
+
+        float32 buffers are viewed without copying (the result is read-only); float16 and int8
+        buffers are dequantized into a new array.
+
+        Args:
+            embeddings_buffer (bytes or buffer): Stored embeddings
+            embedding_shape (tuple): Logical (rows, dim) shape
+            dtype (str): dtype the buffer was encoded with
+
+        Returns:
+            np.ndarray: float32 embeddings
+
+        Raises:
+            EmbeddingCodecException: If dtype is not supported
+        """
+        dtype = EmbeddingCodec.validate_dtype(dtype)
+
+        if dtype == "float32":
+            return np.frombuffer(embeddings_buffer, dtype=np.float32).reshape(embedding_shape)
+        if dtype == "float16":
+            return np.frombuffer(embeddings_buffer, dtype=np.float16).reshape(embedding_shape).astype(np.float32)
+
+        rows = int(embedding_shape[0])
+        scales = np.frombuffer(embeddings_buffer, dtype=np.float32, count=rows)
+        codes = np.frombuffer(embeddings_buffer, dtype=np.int8, offset=rows * 4).reshape(embedding_shape)
+        return codes.astype(np.float32) * scales[:, None]
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """HELPER FUNCTIONS"""
+
+    @staticmethod
+    def validate_dtype(dtype):
+        """
+        Check a storage dtype name
+
+        Returns:
+            str: The lower-cased dtype ("float32" when dtype is empty)
+
+        Raises:
+            EmbeddingCodecException: If dtype is not supported
+        """
+        dtype = (dtype or "float32").lower()
+        if dtype not in EmbeddingCodec.SUPPORTED_DTYPES:
+            raise EmbeddingCodecException(
+                f"Unsupported embedding storage dtype '{dtype}' (expected one of {', '.join(EmbeddingCodec.SUPPORTED_DTYPES)})"
+            )
+        return dtype
+
+    @staticmethod
+    def dtype_from_meta(embedding_meta):
+        """Storage dtype recorded in embedding_meta (float32 for legacy rows without one)"""
+        return (embedding_meta or {}).get("dtype") or "float32"
+
+    @staticmethod
+    def infer_shape(byte_count, rows, dtype="float32"):
+        """
+        Infer the (rows, dim) shape of a buffer whose row count is known
+
+        Args:
+            byte_count (int): Length of the stored buffer
+            rows (int): Number of embedding rows
+            dtype (str): dtype the buffer was encoded with
+
+        Returns:
+            tuple: (rows, dim)
+        """
+        dtype = EmbeddingCodec.validate_dtype(dtype)
+        if dtype == "int8":
+            return (rows, (byte_count - rows * 4) // rows)
+        return (rows, byte_count // np.dtype(dtype).itemsize // rows)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Migrate user data from the single-row users layout to the normalized
+documents/user_embeddings layout used by DB_STORAGE_MODE=normalized
+(and pgvector, which also writes the document_vectors rows).
+
+Usage (from the backend directory):
+    python -m database.migrate              # migrate every user
+    python -m database.migrate <uuid> ...   # migrate specific users
+    python -m database.migrate --schema     # only create/upgrade the tables (run with a role that
+                                            # has DDL rights when DB_SCHEMA_AUTO_MIGRATE=false)
+"""
+
+import sys
+from database.postgres import DatabaseService, DatabaseServiceException
+
+
+def migrate_users(uuids):
+    """
+    Migrate the given users, or every user when no UUIDs are given.
+
+    Args:
+        uuids (list): UUIDs to migrate (empty for all)
+
+    Returns:
+        bool: True if every migration succeeded
+    """
+    if not uuids:
+        result = DatabaseService.migrate_all_users_to_normalized()
+        for uuid in result["migrated"]:
+            print(f"✅ Migrated {uuid}")
+        for uuid, error in result["failed"].items():
+            print(f"❌ {uuid}: {error}")
+        return not result["failed"]
+
+    all_succeeded = True
+    for uuid in uuids:
+        try:
+            result = DatabaseService.migrate_user_to_normalized(uuid)
+            print(f"✅ Migrated {uuid} ({result['documents_migrated']} documents)")
+        except DatabaseServiceException as e:
+            print(f"❌ {uuid}: {e}")
+            all_succeeded = False
+    return all_succeeded
+
+
+def main():
+    """
+    Main function that runs the migration for the UUIDs given on the command line.
+    """
+    if sys.argv[1:] == ["--schema"]:
+        print("🔄 Creating/upgrading database tables")
+        try:
+            DatabaseService.ensure_table_exists()
+        except DatabaseServiceException as e:
+            print(f"❌ Schema migration failed: {e}")
+            sys.exit(1)
+        print("✅ Database schema is up to date")
+        sys.exit(0)
+
+    print("🔄 Migrating users table to normalized documents layout")
+    try:
+        DatabaseService.ensure_table_exists()
+        succeeded = migrate_users(sys.argv[1:])
+    except DatabaseServiceException as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    sys.exit(0 if succeeded else 1)
+
+
+if __name__ == "__main__":
+    main()
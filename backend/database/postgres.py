@@ -1,13 +1,28 @@
 import psycopg
 import json
+import hashlib
 import sys
 import os
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
+from database.embedding_codec import EmbeddingCodec
+from database.document_codec import DocumentCodec, DocumentCodecException
+from routes.metrics import MetricsService
+from routes.logging_service import LoggingService
+
+try:
+    from psycopg_pool import ConnectionPool, PoolTimeout
+except ImportError:
+    # psycopg[pool] not installed - fall back to one connection per operation
+    ConnectionPool = None
+    PoolTimeout = None
 
 # Load environment variables from .env file in the same directory
 load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
 
+logger = LoggingService.get_logger("postgres")
+
 
 class DatabaseServiceException(Exception):
     """Custom exception for database service errors"""
@@ -36,13 +51,44 @@ class DatabaseService:
         "password": os.getenv("DB_PASSWORD"),
     }
 
+    # Connection pool settings - shared by every DatabaseService operation in this process
+    POOL_PARAMS = {
+        "enabled": os.getenv("DB_POOL_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    }
+
+    # Storage layout for user data: "blob" (one users row holding the whole corpus),
+    # "normalized" (one documents row per prompt/response pair plus a user_embeddings row) or
+    # "pgvector" (normalized plus a per-document vector column searched inside Postgres)
+    STORAGE_MODE = os.getenv("DB_STORAGE_MODE", "blob").lower()
+
+    # Create/upgrade the tables at startup and on a process's first save; false leaves the schema to
+    # python -m database.migrate --schema (e.g. when the app's role has no DDL rights)
+    SCHEMA_AUTO_MIGRATE = os.getenv("DB_SCHEMA_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+    # pgvector settings - vector dimension of the encoder and HNSW search breadth
+    PGVECTOR_PARAMS = {
+        "dimension": int(os.getenv("PGVECTOR_DIMENSION", "384")),
+        "ef_search": int(os.getenv("PGVECTOR_EF_SEARCH", "100")),
+    }
+
+    _pool = None
+    _pool_lock = threading.Lock()
+    _tables_ready = False
+    _vector_tables_ready = False
+    _iterative_scan = None  # whether the installed pgvector has hnsw.iterative_scan (>= 0.8), read once
+
     """--------------------------------------------------------------------------------------------------------------"""
     """CONNECTION MANAGEMENT FUNCTIONS"""
     
     @staticmethod
     def get_database_connection():
         """
-        Establish connection to PostgreSQL database
+        Get a connection to PostgreSQL database, borrowed from the shared pool when pooling is available
+        (hand it back with _close_connection)
         
         Returns:
             psycopg.Connection: Database connection
@@ -54,12 +100,96 @@ class DatabaseService:
             raise DatabaseServiceException("Invalid connection parameters")
             
         try:
+            pool = DatabaseService._get_connection_pool()
+            if pool is not None:
+                return pool.getconn(timeout=DatabaseService.POOL_PARAMS["timeout"])
             return DatabaseService._attempt_connection()
         except Exception as e:
             if isinstance(e, DatabaseServiceException):
                 raise
+            if PoolTimeout is not None and isinstance(e, PoolTimeout):
+                raise DatabaseServiceException(f"Timed out waiting for a pooled database connection: {str(e)}")
             raise DatabaseServiceException(f"Database connection failed: {str(e)}")
     
+    @staticmethod
+    def _get_connection_pool():
+        """
+        Get the process-wide connection pool, creating it on first use
+        
+        Returns:
+            ConnectionPool or None: The shared pool, or None when pooling is disabled or psycopg_pool is missing
+            
+        Raises:
+            DatabaseServiceException: If the pool cannot be opened
+        """
+        if ConnectionPool is None or not DatabaseService.POOL_PARAMS["enabled"]:
+            return None
+        if DatabaseService._pool is not None:
+            return DatabaseService._pool
+        
+        with DatabaseService._pool_lock:
+            if DatabaseService._pool is None:
+                DatabaseService._pool = DatabaseService._create_connection_pool()
+            return DatabaseService._pool
+    
+    @staticmethod
+    def _create_connection_pool():
+        """Open a connection pool using the first connection string format that works"""
+        params = DatabaseService.POOL_PARAMS
+        conninfo = DatabaseService._resolve_conninfo()
+        
+        pool_kwargs = {
+            "min_size": params["min_size"],
+            "max_size": max(params["max_size"], params["min_size"]),
+            "timeout": params["timeout"],
+            "max_idle": params["max_idle"],
+            "open": False,
+        }
+        # Health check each connection as it is handed out (psycopg_pool >= 3.2)
+        if hasattr(ConnectionPool, "check_connection"):
+            pool_kwargs["check"] = ConnectionPool.check_connection
+        
+        pool = ConnectionPool(conninfo, **pool_kwargs)
+        try:
+            pool.open(wait=True, timeout=params["timeout"])
+        except Exception as e:
+            pool.close()
+            raise DatabaseServiceException(f"Failed to open database connection pool: {str(e)}")
+        return pool
+    
+    @staticmethod
+    def _resolve_conninfo():
+        """Find the first connection string format the server accepts"""
+        connection_attempts = DatabaseService._get_connection_strings()
+        
+        for i, conn_string in enumerate(connection_attempts, 1):
+            try:
+                with psycopg.connect(conn_string):
+                    return conn_string
+            except psycopg.Error as attempt_error:
+                if i == len(connection_attempts):
+                    raise DatabaseServiceException(f"All connection methods failed. Last error: {attempt_error}")
+    
+    @staticmethod
+    def close_connection_pool():
+        """Close the shared connection pool (e.g. on shutdown or after fork); it is reopened on next use"""
+        with DatabaseService._pool_lock:
+            pool = DatabaseService._pool
+            DatabaseService._pool = None
+        if pool is not None:
+            pool.close()
+    
+    @staticmethod
+    def _forget_pool_after_fork():
+        """
+        Drop the pool a forked child inherited (registered with os.register_at_fork). The inherited
+        connections belong to the parent and the pool's threads did not survive the fork, so the child
+        opens its own pool on first use; the old one is not closed, which would close the parent's
+        server connections too.
+        """
+        DatabaseService._pool = None
+        DatabaseService._pool_lock = threading.Lock()
+    
     @staticmethod
     def _validate_connection_params():
         """Validate that all required connection parameters are present"""
@@ -93,7 +223,11 @@ class DatabaseService:
     @staticmethod
     def ensure_table_exists():
         """
-        Create users table if it doesn't exist
+        Create the tables and add columns introduced since they were created (the schema migration)
+        
+        Runs once at startup (app.py, unless DB_SCHEMA_AUTO_MIGRATE=false) and from
+        python -m database.migrate --schema. Read paths never run DDL: ALTER TABLE takes an ACCESS
+        EXCLUSIVE lock and fails for roles without DDL rights.
         
         Raises:
             DatabaseServiceException: If table creation fails
@@ -115,13 +249,38 @@ class DatabaseService:
             conn = DatabaseService.get_database_connection()
             cur = conn.cursor()
             
-            create_table_query = DatabaseService._get_table_creation_query()
-            cur.execute(create_table_query)
+            cur.execute(DatabaseService._get_table_creation_query())
+            if DatabaseService.STORAGE_MODE == "pgvector":
+                # Optional: without the extension search keeps scoring the stored embeddings
+                cur.execute("SAVEPOINT document_vectors_schema;")
+                try:
+                    cur.execute(DatabaseService._get_vector_table_creation_query())
+                    cur.execute("RELEASE SAVEPOINT document_vectors_schema;")
+                    DatabaseService._vector_tables_ready = True
+                except psycopg.Error:
+                    cur.execute("ROLLBACK TO SAVEPOINT document_vectors_schema;")
             conn.commit()
+            DatabaseService._tables_ready = True
+            
+        except Exception:
+            if conn:
+                conn.rollback()
+            DatabaseService._tables_ready = False
+            raise
             
         finally:
             DatabaseService._close_connection(cur, conn)
     
+    @staticmethod
+    def _create_tables(cur):
+        """Run the table creation SQL inside a save's transaction, once per process (skipped without DB_SCHEMA_AUTO_MIGRATE)"""
+        if DatabaseService._tables_ready or not DatabaseService.SCHEMA_AUTO_MIGRATE:
+            return
+        
+        create_table_query = DatabaseService._get_table_creation_query()
+        cur.execute(create_table_query)
+        DatabaseService._tables_ready = True
+    
     @staticmethod
     def _get_table_creation_query():
         """Get the SQL query for table creation"""
@@ -134,21 +293,95 @@ class DatabaseService:
             embedding_shape JSONB,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
+        CREATE TABLE IF NOT EXISTS documents (
+            uuid TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            prompt TEXT NOT NULL,
+            response TEXT NOT NULL,
+            content_hash TEXT,
+            PRIMARY KEY (uuid, ordinal)
+        );
+        ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+        CREATE TABLE IF NOT EXISTS user_embeddings (
+            uuid TEXT PRIMARY KEY,
+            embeddings BYTEA,
+            embedding_shape JSONB,
+            document_count INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model_id TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            embedding BYTEA NOT NULL,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (model_id, text_hash)
+        );
+        CREATE INDEX IF NOT EXISTS embedding_cache_last_used ON embedding_cache (last_used_at);
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS embedding_meta JSONB;
+        ALTER TABLE user_embeddings ADD COLUMN IF NOT EXISTS embedding_meta JSONB;
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS ann_index BYTEA;
+        ALTER TABLE user_embeddings ADD COLUMN IF NOT EXISTS ann_index BYTEA;
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS documents BYTEA;
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS document_offsets BYTEA;
+        """
+    
+    @staticmethod
+    def compute_content_hash(prompt, response):
+        """
+        Hash one prompt/response pair so re-uploads can be diffed against stored documents
+        
+        Args:
+            prompt (str): Prompt text (document key)
+            response (str): Response text
+            
+        Returns:
+            str: Hex SHA-256 digest of the pair
+        """
+        return hashlib.sha256(json.dumps([str(prompt), str(response)], ensure_ascii=False).encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _uses_document_rows():
+        """Whether the configured storage mode keeps one documents row per prompt/response pair"""
+        return DatabaseService.STORAGE_MODE in ("normalized", "pgvector")
+    
+    @staticmethod
+    def _get_vector_table_creation_query():
+        """Get the SQL query for the pgvector table and its HNSW cosine index"""
+        return f"""
+        CREATE EXTENSION IF NOT EXISTS vector;
+        CREATE TABLE IF NOT EXISTS document_vectors (
+            uuid TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            embedding vector({int(DatabaseService.PGVECTOR_PARAMS["dimension"])}) NOT NULL,
+            PRIMARY KEY (uuid, ordinal)
+        );
+        CREATE INDEX IF NOT EXISTS document_vectors_embedding_hnsw
+            ON document_vectors USING hnsw (embedding vector_cosine_ops);
         """
     
     @staticmethod
     def _close_connection(cursor, connection):
-        """Safely close database cursor and connection"""
+        """
+        Safely close database cursor and close the connection (or return it to the pool it came from).
+        Read paths never commit, so their open transaction is rolled back here: the pool would
+        otherwise log a warning and roll it back itself on every returned connection.
+        """
         if cursor:
             cursor.close()
         if connection:
-            connection.close()
+            pool = DatabaseService._pool
+            if pool is not None and getattr(connection, "_pool", None) is pool:
+                if connection.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+                    connection.rollback()
+                pool.putconn(connection)
+            else:
+                connection.close()
 
     """--------------------------------------------------------------------------------------------------------------"""
     """SAVE OPERATIONS (for routes/extract.py)"""
     
     @staticmethod
-    def execute_save_query(user_uuid, processed_data, key_order, embeddings, embedding_shape):
+    def execute_save_query(user_uuid, processed_data, key_order, embeddings, embedding_shape, changed_ordinals=None, embedding_meta=None, ann_index=None):
         """
         Execute the database save query (stores processed data, key ordering, and embeddings with shape)
         
@@ -158,6 +391,10 @@ class DatabaseService:
             key_order (list): List of keys in their preserved order
             embeddings (bytes): Embeddings data converted to bytes
             embedding_shape (tuple): Original shape of the embeddings array
+            changed_ordinals (list): Ordinals that differ from the stored documents; when given in
+                normalized/pgvector mode only those rows are rewritten (None rewrites everything)
+            embedding_meta (dict): How the embeddings were written (e.g. {"normalized": true}); None for legacy data
+            ann_index (bytes): Serialized ANN index over the embeddings (None when the user has none)
             
         Returns:
             dict: Query execution result
@@ -169,9 +406,14 @@ class DatabaseService:
             if not user_uuid:
                 raise DatabaseServiceException("User UUID is required")
             
+            if DatabaseService._uses_document_rows():
+                return DatabaseService._execute_normalized_save(
+                    user_uuid, processed_data, key_order, embeddings, embedding_shape, changed_ordinals, embedding_meta, ann_index
+                )
+            
             # Validate and prepare data
             prepared_data = DatabaseService._prepare_save_data(
-                processed_data, key_order, embeddings, embedding_shape
+                processed_data, key_order, embeddings, embedding_shape, embedding_meta, ann_index
             )
             
             # Execute save operation
@@ -183,7 +425,7 @@ class DatabaseService:
             raise DatabaseServiceException(f"Database save operation failed: {str(e)}")
     
     @staticmethod
-    def _prepare_save_data(processed_data, key_order, embeddings, embedding_shape):
+    def _prepare_save_data(processed_data, key_order, embeddings, embedding_shape, embedding_meta=None, ann_index=None):
         """Prepare and validate data for database save"""
         try:
             # Ensure processed_data is a valid dict
@@ -206,11 +448,23 @@ class DatabaseService:
             else:
                 embedding_shape = list(embedding_shape)
             
+            # Packed documents serve search (which slices out only the top-k), re-extracts and migrations
+            # (see DocumentCodec); the data JSON is only written when they cannot be packed, so the
+            # corpus is stored once. Rows written before the packed columns existed keep their data
+            try:
+                documents, document_offsets = DocumentCodec.pack(key_order, processed_data)
+            except DocumentCodecException:
+                documents, document_offsets = None, None
+            
             return {
-                'data_json': DatabaseService._convert_to_json(processed_data),
+                'data_json': DatabaseService._convert_to_json(processed_data) if documents is None else None,
                 'key_order_json': DatabaseService._convert_to_json(key_order),
                 'embeddings': embeddings,
-                'embedding_shape_json': DatabaseService._convert_to_json(embedding_shape)
+                'embedding_shape_json': DatabaseService._convert_to_json(embedding_shape),
+                'embedding_meta_json': json.dumps(embedding_meta) if embedding_meta else None,
+                'ann_index': ann_index,
+                'documents': documents,
+                'document_offsets': document_offsets
             }
         except Exception as e:
             raise DatabaseServiceException(f"Failed to prepare data for database save: {str(e)}")
@@ -248,8 +502,8 @@ class DatabaseService:
             conn = DatabaseService.get_database_connection()
             cur = conn.cursor()
             
-            # Ensure table exists before inserting
-            DatabaseService.ensure_table_exists()
+            # Ensure table exists before inserting (same connection, skipped once the tables are known to exist)
+            DatabaseService._create_tables(cur)
             
             # Execute upsert query
             user_query = DatabaseService._get_upsert_query()
@@ -258,7 +512,11 @@ class DatabaseService:
                 prepared_data['data_json'],
                 prepared_data['key_order_json'],
                 prepared_data['embeddings'],
-                prepared_data['embedding_shape_json']
+                prepared_data['embedding_shape_json'],
+                prepared_data.get('embedding_meta_json'),
+                prepared_data.get('ann_index'),
+                prepared_data.get('documents'),
+                prepared_data.get('document_offsets')
             ))
             conn.commit()
             
@@ -267,6 +525,8 @@ class DatabaseService:
         except Exception as e:
             if conn:
                 conn.rollback()
+            # The tables may have been dropped underneath us - recheck them on the next save
+            DatabaseService._tables_ready = False
             raise DatabaseServiceException(f"Database save execution failed: {str(e)}")
             
         finally:
@@ -276,13 +536,17 @@ class DatabaseService:
     def _get_upsert_query():
         """Get the SQL query for user data upsert"""
         return """
-        INSERT INTO users (uuid, data, key_order, embeddings, embedding_shape) 
-        VALUES (%s, %s, %s, %s, %s)
+        INSERT INTO users (uuid, data, key_order, embeddings, embedding_shape, embedding_meta, ann_index, documents, document_offsets) 
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT (uuid) DO UPDATE SET 
             data = EXCLUDED.data,
             key_order = EXCLUDED.key_order,
             embeddings = EXCLUDED.embeddings,
             embedding_shape = EXCLUDED.embedding_shape,
+            embedding_meta = EXCLUDED.embedding_meta,
+            ann_index = EXCLUDED.ann_index,
+            documents = EXCLUDED.documents,
+            document_offsets = EXCLUDED.document_offsets,
             created_at = CURRENT_TIMESTAMP;
         """
     
@@ -298,6 +562,265 @@ class DatabaseService:
             "embedding_shape": json.loads(prepared_data['embedding_shape_json'])
         }
 
+    """--------------------------------------------------------------------------------------------------------------"""
+    """NORMALIZED SAVE OPERATIONS (DB_STORAGE_MODE=normalized or pgvector)"""
+    
+    @staticmethod
+    def _execute_normalized_save(user_uuid, processed_data, key_order, embeddings, embedding_shape, changed_ordinals=None, embedding_meta=None, ann_index=None):
+        """Replace (or patch, when changed_ordinals is given) a user's documents and embeddings rows in one transaction"""
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            DatabaseService._create_tables(cur)
+            operation = "replace"
+            rows_affected = None
+            if changed_ordinals is not None:
+                rows_affected = DatabaseService._patch_normalized_rows(
+                    cur, user_uuid, processed_data, key_order, embeddings, embedding_shape, changed_ordinals, embedding_meta, ann_index
+                )
+            if rows_affected is None:
+                rows_affected = DatabaseService._write_normalized_rows(
+                    cur, user_uuid, processed_data, key_order, embeddings, embedding_shape, embedding_meta, ann_index
+                )
+            else:
+                operation = "patch"
+            document_count = len(key_order) if key_order is not None else len(processed_data or {})
+            # Drop any blob-layout row so the two layouts never disagree
+            cur.execute("DELETE FROM users WHERE uuid = %s;", (user_uuid,))
+            conn.commit()
+            
+            return {
+                "rows_affected": rows_affected,
+                "operation": operation,
+                "storage_mode": DatabaseService.STORAGE_MODE,
+                "file_path": f"PostgreSQL database (user: {user_uuid})",
+                "key_order_saved": document_count,
+                "embeddings_saved": len(embeddings) if embeddings else 0,
+                "embedding_shape": list(embedding_shape) if embedding_shape is not None else []
+            }
+            
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            DatabaseService._tables_ready = False
+            raise DatabaseServiceException(f"Database save execution failed: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+    
+    @staticmethod
+    def _write_normalized_rows(cur, user_uuid, processed_data, key_order, embeddings, embedding_shape, embedding_meta=None, ann_index=None):
+        """Write one documents row per key (ordinal = position in key_order) plus the embeddings row"""
+        processed_data = processed_data or {}
+        key_order = list(key_order) if key_order is not None else list(processed_data.keys())
+        embedding_shape = list(embedding_shape) if embedding_shape is not None else []
+        
+        cur.execute("DELETE FROM documents WHERE uuid = %s;", (user_uuid,))
+        with cur.copy("COPY documents (uuid, ordinal, prompt, response, content_hash) FROM STDIN") as copy:
+            for ordinal, key in enumerate(key_order):
+                response = str(processed_data.get(key, ""))
+                copy.write_row((user_uuid, ordinal, str(key), response, DatabaseService.compute_content_hash(key, response)))
+        
+        DatabaseService._upsert_user_embeddings(cur, user_uuid, embeddings, embedding_shape, len(key_order), embedding_meta, ann_index)
+        
+        if DatabaseService.STORAGE_MODE == "pgvector":
+            DatabaseService._write_vector_rows(cur, user_uuid, embeddings, embedding_shape, embedding_meta=embedding_meta)
+        
+        return len(key_order)
+    
+    @staticmethod
+    def _patch_normalized_rows(cur, user_uuid, processed_data, key_order, embeddings, embedding_shape, changed_ordinals, embedding_meta=None, ann_index=None):
+        """
+        Rewrite only the changed documents rows of a user, trim rows past the new end and replace the
+        embeddings row, so a re-upload costs time proportional to what changed
+        
+        Returns:
+            int or None: Number of documents rows written, or None if the user has no normalized rows
+            yet (the caller then writes everything)
+        """
+        processed_data = processed_data or {}
+        key_order = list(key_order) if key_order is not None else list(processed_data.keys())
+        embedding_shape = list(embedding_shape) if embedding_shape is not None else []
+        
+        # Lock the user's embeddings row so concurrent uploads for the same user serialize here
+        cur.execute("SELECT document_count FROM user_embeddings WHERE uuid = %s FOR UPDATE;", (user_uuid,))
+        if cur.fetchone() is None:
+            return None
+        
+        changed = sorted({int(ordinal) for ordinal in changed_ordinals if 0 <= int(ordinal) < len(key_order)})
+        cur.execute("DELETE FROM documents WHERE uuid = %s AND ordinal >= %s;", (user_uuid, len(key_order)))
+        if changed:
+            rows = []
+            for ordinal in changed:
+                key = key_order[ordinal]
+                response = str(processed_data.get(key, ""))
+                rows.append((user_uuid, ordinal, str(key), response, DatabaseService.compute_content_hash(key, response)))
+            cur.executemany("""
+            INSERT INTO documents (uuid, ordinal, prompt, response, content_hash)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (uuid, ordinal) DO UPDATE SET
+                prompt = EXCLUDED.prompt,
+                response = EXCLUDED.response,
+                content_hash = EXCLUDED.content_hash;
+            """, rows)
+        
+        DatabaseService._upsert_user_embeddings(cur, user_uuid, embeddings, embedding_shape, len(key_order), embedding_meta, ann_index)
+        
+        if DatabaseService.STORAGE_MODE == "pgvector":
+            DatabaseService._write_vector_rows(cur, user_uuid, embeddings, embedding_shape, ordinals=changed, embedding_meta=embedding_meta)
+        
+        return len(changed)
+    
+    @staticmethod
+    def _upsert_user_embeddings(cur, user_uuid, embeddings, embedding_shape, document_count, embedding_meta=None, ann_index=None):
+        """Insert or replace a user's embeddings row (and the ANN index built over it)"""
+        cur.execute("""
+        INSERT INTO user_embeddings (uuid, embeddings, embedding_shape, document_count, embedding_meta, ann_index)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (uuid) DO UPDATE SET
+            embeddings = EXCLUDED.embeddings,
+            embedding_shape = EXCLUDED.embedding_shape,
+            document_count = EXCLUDED.document_count,
+            embedding_meta = EXCLUDED.embedding_meta,
+            ann_index = EXCLUDED.ann_index,
+            created_at = CURRENT_TIMESTAMP;
+        """, (user_uuid, embeddings, json.dumps(list(embedding_shape)), document_count,
+              json.dumps(embedding_meta) if embedding_meta else None, ann_index))
+    
+    @staticmethod
+    def _write_vector_rows(cur, user_uuid, embeddings, embedding_shape, ordinals=None, embedding_meta=None):
+        """
+        Write one pgvector row per document inside a savepoint, so a missing extension or a
+        dimension mismatch only disables server-side search (the BYTEA embeddings still work)
+        
+        Args:
+            ordinals (list): Only rewrite these rows (and drop rows past the end); None rewrites all
+            embedding_meta (dict): Storage metadata of embeddings (its dtype says how to decode them)
+        
+        Returns:
+            bool: True if the vector rows were written
+        """
+        cur.execute("SAVEPOINT document_vectors_write;")
+        try:
+            if not DatabaseService._vector_tables_ready and DatabaseService.SCHEMA_AUTO_MIGRATE:
+                cur.execute(DatabaseService._get_vector_table_creation_query())
+            
+            vectors = None
+            if embeddings and embedding_shape:
+                vectors = EmbeddingCodec.decode(embeddings, embedding_shape, EmbeddingCodec.dtype_from_meta(embedding_meta))
+            
+            if ordinals is None:
+                cur.execute("DELETE FROM document_vectors WHERE uuid = %s;", (user_uuid,))
+                ordinals = range(len(vectors)) if vectors is not None else []
+            else:
+                ordinals = [int(ordinal) for ordinal in ordinals]
+                row_count = len(vectors) if vectors is not None else 0
+                cur.execute(
+                    "DELETE FROM document_vectors WHERE uuid = %s AND (ordinal = ANY(%s) OR ordinal >= %s);",
+                    (user_uuid, ordinals, row_count)
+                )
+            
+            if vectors is not None:
+                with cur.copy("COPY document_vectors (uuid, ordinal, embedding) FROM STDIN") as copy:
+                    for ordinal in ordinals:
+                        copy.write_row((user_uuid, ordinal, DatabaseService._to_vector_literal(vectors[ordinal])))
+            
+            cur.execute("RELEASE SAVEPOINT document_vectors_write;")
+            DatabaseService._vector_tables_ready = True
+            return True
+            
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT document_vectors_write;")
+            DatabaseService._vector_tables_ready = False
+            logger.error("pgvector write failed, search will use stored embeddings: %s", e)
+            return False
+    
+    @staticmethod
+    def _to_vector_literal(vector):
+        """Format a 1-D float array as a pgvector text literal"""
+        return "[" + ",".join(repr(float(value)) for value in vector) + "]"
+    
+    @staticmethod
+    def migrate_user_to_normalized(uuid):
+        """
+        Move one user from the blob users row to the normalized documents/user_embeddings layout
+        
+        Args:
+            uuid (str): User's UUID
+            
+        Returns:
+            dict: Migration result
+            
+        Raises:
+            UserNotFoundException: If the user has no blob-layout row
+            DatabaseServiceException: If the migration fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            DatabaseService._create_tables(cur)
+            cur.execute(
+                """
+                SELECT CASE WHEN documents IS NULL THEN data END, key_order, embeddings, embedding_shape, embedding_meta,
+                    ann_index, documents, document_offsets
+                FROM users WHERE uuid = %s FOR UPDATE;
+                """,
+                (uuid,)
+            )
+            raw_data = cur.fetchone()
+            if not raw_data:
+                raise UserNotFoundException(f"User with UUID '{uuid}' not found in the users table")
+            
+            user_data = DatabaseService._process_loaded_data(raw_data)
+            document_count = DatabaseService._write_normalized_rows(
+                cur, uuid, user_data["processed_data"], user_data["key_order"],
+                user_data["embeddings"], user_data["embedding_shape"], user_data["embedding_meta"], user_data["ann_index"]
+            )
+            cur.execute("DELETE FROM users WHERE uuid = %s;", (uuid,))
+            conn.commit()
+            
+            return {"success": True, "uuid": uuid, "documents_migrated": document_count}
+            
+        except UserNotFoundException:
+            if conn:
+                conn.rollback()
+            raise
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise DatabaseServiceException(f"Migration to normalized layout failed for {uuid}: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+    
+    @staticmethod
+    def migrate_all_users_to_normalized():
+        """
+        Migrate every blob-layout user to the normalized layout (one transaction per user)
+        
+        Returns:
+            dict: Lists of migrated and failed UUIDs
+        """
+        migrated = []
+        failed = {}
+        
+        for uuid, _created_at in DatabaseService.list_all_users():
+            try:
+                DatabaseService.migrate_user_to_normalized(uuid)
+                migrated.append(uuid)
+            except DatabaseServiceException as e:
+                failed[uuid] = str(e)
+        
+        return {"migrated": migrated, "failed": failed}
+
     """--------------------------------------------------------------------------------------------------------------"""
     """LOAD OPERATIONS (for routes/search.py)"""
     
@@ -320,10 +843,12 @@ class DatabaseService:
                 raise DatabaseServiceException("User UUID is required")
             
             # Execute load query
-            raw_data = DatabaseService._execute_user_load(uuid)
+            with MetricsService.timer("search", "db_fetch"):
+                raw_data = DatabaseService._execute_user_load(uuid)
             
             # Process and return formatted data
-            return DatabaseService._process_loaded_data(raw_data)
+            with MetricsService.timer("search", "json_parse"):
+                return DatabaseService._process_loaded_data(raw_data)
             
         except Exception as e:
             if isinstance(e, DatabaseServiceException):
@@ -340,8 +865,14 @@ class DatabaseService:
             conn = DatabaseService.get_database_connection()
             cur = conn.cursor()
             
-            # Query for user data, key ordering, embeddings, and shape
-            user_query = "SELECT data, key_order, embeddings, embedding_shape FROM users WHERE uuid = %s;"
+            # Query for user data, key ordering, embeddings, shape, how the embeddings were written and their ANN index
+            # (data and key_order come back as JSON text, parsed by _process_loaded_data instead of while fetching;
+            # rows with packed documents are decoded from those and send no data JSON)
+            user_query = """
+            SELECT CASE WHEN documents IS NULL THEN data::text END, key_order::text, embeddings, embedding_shape, embedding_meta,
+                ann_index, documents, document_offsets
+            FROM users WHERE uuid = %s;
+            """
             cur.execute(user_query, (uuid,))
             user_result = cur.fetchone()
             
@@ -355,14 +886,25 @@ class DatabaseService:
     
     @staticmethod
     def _process_loaded_data(raw_data):
-        """Process raw database data into structured format"""
-        data_json, key_order_json, embeddings_bytes, embedding_shape_json = raw_data
+        """Process raw database data into structured format (documents and document_offsets, when selected, replace data)"""
+        data_json, key_order_json, embeddings_bytes, embedding_shape_json = raw_data[:4]
+        embedding_meta_json = raw_data[4] if len(raw_data) > 4 else None
+        ann_index = raw_data[5] if len(raw_data) > 5 else None
+        documents = raw_data[6] if len(raw_data) > 7 else None
+        
+        if documents is not None:
+            key_order, processed_data = DocumentCodec.open(documents, raw_data[7]).to_dict()
+        else:
+            processed_data = DatabaseService._parse_processed_data(data_json)
+            key_order = DatabaseService._parse_key_order(key_order_json)
         
         return {
-            "processed_data": DatabaseService._parse_processed_data(data_json),
-            "key_order": DatabaseService._parse_key_order(key_order_json),
+            "processed_data": processed_data,
+            "key_order": key_order,
             "embeddings": embeddings_bytes,
-            "embedding_shape": DatabaseService._parse_embedding_shape(embedding_shape_json)
+            "embedding_shape": DatabaseService._parse_embedding_shape(embedding_shape_json),
+            "embedding_meta": DatabaseService._parse_embedding_meta(embedding_meta_json),
+            "ann_index": ann_index
         }
     
     @staticmethod
@@ -402,6 +944,479 @@ class DatabaseService:
         else:
             return None
 
+    @staticmethod
+    def _parse_embedding_meta(embedding_meta_json):
+        """Parse embedding metadata from database JSON (an empty dict for rows written before it existed)"""
+        if isinstance(embedding_meta_json, str):
+            return json.loads(embedding_meta_json)
+        elif isinstance(embedding_meta_json, dict):
+            return embedding_meta_json
+        else:
+            return {}
+
+    @staticmethod
+    def load_user_version(uuid):
+        """
+        Read when the row search loads a user from was last written (every save refreshes its created_at),
+        so a cached copy can be checked without loading the user again
+        
+        Args:
+            uuid (str): User's UUID
+            
+        Returns:
+            datetime or None: Write time of the user_embeddings row (normalized modes) or users row, None if
+            the user has no data
+            
+        Raises:
+            DatabaseServiceException: If the query fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            if DatabaseService._uses_document_rows():
+                # Same order as search: the normalized row, else a blob row that was not migrated yet
+                cur.execute("""
+                SELECT COALESCE(
+                    (SELECT created_at FROM user_embeddings WHERE uuid = %s),
+                    (SELECT created_at FROM users WHERE uuid = %s)
+                );
+                """, (uuid, uuid))
+            else:
+                cur.execute("SELECT created_at FROM users WHERE uuid = %s;", (uuid,))
+            row = cur.fetchone()
+            return row[0] if row else None
+            
+        except Exception as e:
+            if isinstance(e, DatabaseServiceException):
+                raise
+            raise DatabaseServiceException(f"Failed to load user version: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+
+    @staticmethod
+    def load_user_search_data_from_database(uuid):
+        """
+        Load what search needs from the blob-layout users row: the embeddings and the packed documents,
+        without the data JSON (rows written before the packed columns existed fall back to it)
+        
+        Args:
+            uuid (str): User's UUID
+            
+        Returns:
+            dict: embeddings, embedding_shape, embedding_meta, ann_index and version (see load_user_version),
+            plus either document_count and documents (PackedDocuments) or, for older rows, processed_data and key_order
+            
+        Raises:
+            DatabaseServiceException: If data loading fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            if not uuid:
+                raise DatabaseServiceException("User UUID is required")
+            
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            with MetricsService.timer("search", "db_fetch"):
+                cur.execute("""
+                SELECT embeddings, embedding_shape, embedding_meta, ann_index, documents, document_offsets,
+                    CASE WHEN documents IS NULL THEN data::text END, CASE WHEN documents IS NULL THEN key_order::text END,
+                    created_at
+                FROM users WHERE uuid = %s;
+                """, (uuid,))
+                row = cur.fetchone()
+            if not row:
+                raise DatabaseServiceException(f"Data for user UUID {uuid} not found in database")
+            
+            embeddings_bytes, embedding_shape_json, embedding_meta_json, ann_index, documents, document_offsets = row[:6]
+            user_data = {
+                "embeddings": embeddings_bytes,
+                "embedding_shape": DatabaseService._parse_embedding_shape(embedding_shape_json),
+                "embedding_meta": DatabaseService._parse_embedding_meta(embedding_meta_json),
+                "ann_index": ann_index,
+                "version": row[8] if len(row) > 8 else None
+            }
+            if documents is not None:
+                packed_documents = DocumentCodec.open(documents, document_offsets)
+                user_data["documents"] = packed_documents
+                user_data["document_count"] = len(packed_documents)
+            else:
+                with MetricsService.timer("search", "json_parse"):
+                    user_data["processed_data"] = DatabaseService._parse_processed_data(row[6])
+                    user_data["key_order"] = DatabaseService._parse_key_order(row[7])
+            return user_data
+            
+        except Exception as e:
+            if isinstance(e, DatabaseServiceException):
+                raise
+            raise DatabaseServiceException(f"Failed to load user data: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+
+    @staticmethod
+    def load_user_embeddings_from_database(uuid):
+        """
+        Load only the embedding matrix of a normalized-layout user (no documents)
+        
+        Args:
+            uuid (str): User's UUID
+            
+        Returns:
+            dict: Embeddings bytes, embedding shape, embedding metadata, ANN index bytes, document count and
+            version (see load_user_version)
+            
+        Raises:
+            UserNotFoundException: If the user has no normalized-layout data
+            DatabaseServiceException: If data loading fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            if not uuid:
+                raise DatabaseServiceException("User UUID is required")
+            
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            cur.execute("SELECT to_regclass('user_embeddings') IS NOT NULL;")
+            if not cur.fetchone()[0]:
+                raise UserNotFoundException(f"Data for user UUID {uuid} not found in normalized tables")
+            
+            with MetricsService.timer("search", "db_fetch"):
+                cur.execute(
+                    "SELECT embeddings, embedding_shape, document_count, embedding_meta, ann_index, created_at FROM user_embeddings WHERE uuid = %s;",
+                    (uuid,)
+                )
+                row = cur.fetchone()
+            if not row:
+                raise UserNotFoundException(f"Data for user UUID {uuid} not found in normalized tables")
+            
+            embeddings_bytes, embedding_shape_json, document_count = row[:3]
+            return {
+                "embeddings": embeddings_bytes,
+                "embedding_shape": DatabaseService._parse_embedding_shape(embedding_shape_json),
+                "embedding_meta": DatabaseService._parse_embedding_meta(row[3] if len(row) > 3 else None),
+                "ann_index": row[4] if len(row) > 4 else None,
+                "document_count": document_count,
+                "version": row[5] if len(row) > 5 else None
+            }
+            
+        except Exception as e:
+            if isinstance(e, DatabaseServiceException):
+                raise
+            raise DatabaseServiceException(f"Failed to load user embeddings: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+    
+    @staticmethod
+    def search_nearest_documents(uuid, query_vector, top_k):
+        """
+        Run a cosine nearest-neighbour search for one user inside Postgres (pgvector HNSW index)
+        
+        Args:
+            uuid (str): User's UUID
+            query_vector (array-like): 1-D query embedding
+            top_k (int): Number of results to return
+            
+        Returns:
+            list: (ordinal, prompt, response, similarity) tuples, best match first; empty if the
+            user has no vector rows, or if pgvector < 0.8 found fewer than top_k (its HNSW scan
+            filters by user after the index lookup, so the caller scores the stored embeddings instead)
+            
+        Raises:
+            DatabaseServiceException: If the query fails (e.g. the extension is not installed)
+        """
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            vector_literal = DatabaseService._to_vector_literal(query_vector)
+            # Keep scanning the index until k rows for this user are found (pgvector >= 0.8; older
+            # versions reject the setting, which would abort the transaction)
+            if DatabaseService._iterative_scan is None:
+                DatabaseService._iterative_scan = DatabaseService._pgvector_has_iterative_scan(cur)
+            if DatabaseService._iterative_scan:
+                cur.execute("SET LOCAL hnsw.iterative_scan = strict_order;")
+            cur.execute(f"SET LOCAL hnsw.ef_search = {int(DatabaseService.PGVECTOR_PARAMS['ef_search'])};")
+            with MetricsService.timer("search", "pgvector_search"):
+                cur.execute("""
+                SELECT d.ordinal, d.prompt, d.response, 1 - (v.embedding <=> %s::vector) AS similarity
+                FROM document_vectors v
+                JOIN documents d ON d.uuid = v.uuid AND d.ordinal = v.ordinal
+                WHERE v.uuid = %s
+                ORDER BY v.embedding <=> %s::vector
+                LIMIT %s;
+                """, (vector_literal, uuid, vector_literal, int(top_k)))
+                rows = cur.fetchall()
+            conn.commit()
+            
+            if not DatabaseService._iterative_scan and len(rows) < int(top_k):
+                return []
+            return rows
+            
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise DatabaseServiceException(f"pgvector search failed: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+    
+    @staticmethod
+    def _pgvector_has_iterative_scan(cur):
+        """Whether the installed pgvector extension supports hnsw.iterative_scan (logs once when it does not)"""
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector';")
+        row = cur.fetchone()
+        if not row:
+            return False
+        try:
+            version = tuple(int(part) for part in str(row[0]).split(".")[:2])
+        except ValueError:
+            version = (0, 0)
+        if version >= (0, 8):
+            return True
+        logger.warning(
+            "pgvector %s has no hnsw.iterative_scan (needs 0.8): searches that find fewer than top_k rows "
+            "for a user fall back to scoring the stored embeddings", row[0]
+        )
+        return False
+    
+    @staticmethod
+    def load_documents_by_ordinal(uuid, ordinals):
+        """
+        Fetch only the requested prompt/response rows of a normalized-layout user
+        
+        Args:
+            uuid (str): User's UUID
+            ordinals (list): Document ordinals (rows of the embedding matrix)
+            
+        Returns:
+            dict: Mapping of ordinal to (prompt, response)
+            
+        Raises:
+            DatabaseServiceException: If the query fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            with MetricsService.timer("search", "db_fetch"):
+                cur.execute(
+                    "SELECT ordinal, prompt, response FROM documents WHERE uuid = %s AND ordinal = ANY(%s);",
+                    (uuid, [int(ordinal) for ordinal in ordinals])
+                )
+                return {ordinal: (prompt, response) for ordinal, prompt, response in cur.fetchall()}
+            
+        except Exception as e:
+            raise DatabaseServiceException(f"Failed to load documents: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+
+    @staticmethod
+    def load_content_index(uuid):
+        """
+        Load what an incremental re-extract needs to diff an upload against stored data: the stored
+        key order, one content hash per document and the embedding matrix (no responses are sent
+        back for rows that already carry a hash)
+        
+        Args:
+            uuid (str): User's UUID
+            
+        Returns:
+            dict: key_order, content_hashes, embeddings (bytes), embedding_shape, embedding_meta and layout
+            ("documents" for normalized rows, "blob" for the users row)
+            
+        Raises:
+            UserNotFoundException: If the user has no stored data
+            DatabaseServiceException: If data loading fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            if not uuid:
+                raise DatabaseServiceException("User UUID is required")
+            
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            if DatabaseService._uses_document_rows():
+                cur.execute("SELECT to_regclass('user_embeddings') IS NOT NULL;")
+                if cur.fetchone()[0]:
+                    cur.execute(
+                        "SELECT embeddings, embedding_shape, document_count, embedding_meta FROM user_embeddings WHERE uuid = %s;",
+                        (uuid,)
+                    )
+                    embeddings_row = cur.fetchone()
+                    if embeddings_row:
+                        cur.execute("""
+                        SELECT prompt, content_hash, CASE WHEN content_hash IS NULL THEN response END
+                        FROM documents WHERE uuid = %s ORDER BY ordinal;
+                        """, (uuid,))
+                        rows = cur.fetchall()
+                        embeddings_bytes, embedding_shape_json, document_count = embeddings_row[:3]
+                        if len(rows) == document_count:
+                            return {
+                                "key_order": [prompt for prompt, _content_hash, _response in rows],
+                                "content_hashes": [
+                                    content_hash or DatabaseService.compute_content_hash(prompt, response)
+                                    for prompt, content_hash, response in rows
+                                ],
+                                "embeddings": embeddings_bytes,
+                                "embedding_shape": DatabaseService._parse_embedding_shape(embedding_shape_json),
+                                "embedding_meta": DatabaseService._parse_embedding_meta(
+                                    embeddings_row[3] if len(embeddings_row) > 3 else None
+                                ),
+                                "layout": "documents"
+                            }
+            
+            cur.execute("SELECT to_regclass('users') IS NOT NULL;")
+            if cur.fetchone()[0]:
+                # Rows with packed documents are indexed from those; data is only read for older rows
+                cur.execute("""
+                SELECT CASE WHEN documents IS NULL THEN data END, key_order, embeddings, embedding_shape, embedding_meta,
+                    NULL, documents, document_offsets
+                FROM users WHERE uuid = %s;
+                """, (uuid,))
+                raw_data = cur.fetchone()
+                if raw_data:
+                    user_data = DatabaseService._process_loaded_data(raw_data)
+                    processed_data = user_data["processed_data"]
+                    key_order = user_data["key_order"] or list(processed_data.keys())
+                    return {
+                        "key_order": key_order,
+                        "content_hashes": [
+                            DatabaseService.compute_content_hash(key, processed_data.get(key, "")) for key in key_order
+                        ],
+                        "embeddings": user_data["embeddings"],
+                        "embedding_shape": user_data["embedding_shape"],
+                        "embedding_meta": user_data["embedding_meta"],
+                        "layout": "blob"
+                    }
+            
+            raise UserNotFoundException(f"Data for user UUID {uuid} not found in database")
+            
+        except Exception as e:
+            if isinstance(e, DatabaseServiceException):
+                raise
+            raise DatabaseServiceException(f"Failed to load content index: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """EMBEDDING CACHE OPERATIONS (for routes/embedding_cache.py)"""
+    
+    @staticmethod
+    def load_cached_embeddings(model_id, text_hashes):
+        """
+        Fetch cached embeddings for the given text hashes and mark them as recently used
+        
+        Args:
+            model_id (str): Identifier of the model that produced the embeddings
+            text_hashes (list): SHA-256 hex digests of normalized texts
+            
+        Returns:
+            dict: Mapping of text hash to float32 embedding bytes (missing hashes are absent)
+            
+        Raises:
+            DatabaseServiceException: If the query fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            DatabaseService._create_tables(cur)
+            cur.execute("""
+            UPDATE embedding_cache SET last_used_at = CURRENT_TIMESTAMP
+            WHERE model_id = %s AND text_hash = ANY(%s)
+            RETURNING text_hash, embedding;
+            """, (model_id, list(text_hashes)))
+            rows = cur.fetchall()
+            conn.commit()
+            
+            return {text_hash: bytes(embedding) for text_hash, embedding in rows}
+            
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            DatabaseService._tables_ready = False
+            raise DatabaseServiceException(f"Failed to load cached embeddings: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+    
+    @staticmethod
+    def store_cached_embeddings(model_id, entries, max_entries):
+        """
+        Insert new embeddings into the cache, then evict the least recently used rows above max_entries
+        
+        Args:
+            model_id (str): Identifier of the model that produced the embeddings
+            entries (list): (text_hash, float32 embedding bytes) pairs
+            max_entries (int): Maximum number of rows kept across all models
+            
+        Returns:
+            int: Number of rows evicted
+            
+        Raises:
+            DatabaseServiceException: If the write fails
+        """
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            DatabaseService._create_tables(cur)
+            if entries:
+                cur.executemany("""
+                INSERT INTO embedding_cache (model_id, text_hash, embedding)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (model_id, text_hash) DO UPDATE SET embedding = EXCLUDED.embedding, last_used_at = CURRENT_TIMESTAMP;
+                """, [(model_id, text_hash, embedding) for text_hash, embedding in entries])
+            
+            cur.execute("""
+            DELETE FROM embedding_cache WHERE ctid IN (
+                SELECT ctid FROM embedding_cache ORDER BY last_used_at
+                LIMIT GREATEST((SELECT COUNT(*) FROM embedding_cache) - %s, 0)
+            );
+            """, (int(max_entries),))
+            evicted = max(cur.rowcount, 0)
+            conn.commit()
+            
+            return evicted
+            
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            DatabaseService._tables_ready = False
+            raise DatabaseServiceException(f"Failed to store cached embeddings: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
+
     """--------------------------------------------------------------------------------------------------------------"""
     """UTILITY OPERATIONS (for database management)"""
     
@@ -527,7 +1542,19 @@ class DatabaseService:
             if not uuid:
                 raise DatabaseServiceException("User UUID is required for deletion")
             
-            return DatabaseService._execute_delete_query(uuid)
+            if not DatabaseService._uses_document_rows():
+                return DatabaseService._execute_delete_query(uuid)
+            
+            # Normalized mode: remove the documents/embeddings rows, then any unmigrated users row
+            normalized_rows = DatabaseService._execute_normalized_delete_query(uuid)
+            try:
+                result = DatabaseService._execute_delete_query(uuid)
+            except (TableNotFoundException, UserNotFoundException):
+                if not normalized_rows:
+                    raise
+                return {"success": True, "deleted_rows": normalized_rows, "uuid": uuid}
+            result["deleted_rows"] += normalized_rows
+            return result
             
         except (TableNotFoundException, UserNotFoundException):
             # Re-raise specific exceptions without wrapping them
@@ -589,9 +1616,41 @@ class DatabaseService:
             
         finally:
             DatabaseService._close_connection(cur, conn)
+    
+    @staticmethod
+    def _execute_normalized_delete_query(uuid):
+        """Delete a user's documents and user_embeddings rows, returning the number of documents removed"""
+        conn = None
+        cur = None
+        
+        try:
+            conn = DatabaseService.get_database_connection()
+            cur = conn.cursor()
+            
+            cur.execute("SELECT to_regclass('user_embeddings') IS NOT NULL;")
+            if not cur.fetchone()[0]:
+                return 0
+            
+            cur.execute("DELETE FROM documents WHERE uuid = %s;", (uuid,))
+            deleted_documents = cur.rowcount
+            cur.execute("DELETE FROM user_embeddings WHERE uuid = %s;", (uuid,))
+            deleted_embeddings = cur.rowcount
+            cur.execute("SELECT to_regclass('document_vectors') IS NOT NULL;")
+            if cur.fetchone()[0]:
+                cur.execute("DELETE FROM document_vectors WHERE uuid = %s;", (uuid,))
+            conn.commit()
+            
+            return max(deleted_documents, deleted_embeddings, 0)
+            
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise DatabaseServiceException(f"Database delete execution failed: {str(e)}")
+            
+        finally:
+            DatabaseService._close_connection(cur, conn)
 
 
-
-
-
-
+# Every forked process (e.g. each gunicorn worker) gets its own connection pool
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=DatabaseService._forget_pool_after_fork)
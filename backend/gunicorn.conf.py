@@ -0,0 +1,103 @@
+"""
+Gunicorn configuration (used by the Dockerfile: gunicorn --config gunicorn.conf.py app:app)
+
+Runs a single worker unless GUNICORN_WORKERS asks for more (0 = one per available CPU). The app,
+and with it the model, is loaded once in the master before workers are forked (preload_app), so
+every worker shares the model's memory copy-on-write instead of loading its own copy. With several
+workers, extract job status is shared through EXTRACT_JOB_DIR (routes/jobs.py) and cached user data
+is checked against the stored version on every hit (routes/cache.py), so any worker may answer. Per-user embedding matrices are shared between
+workers through memory-mapped files in SHARED_EMBEDDINGS_DIR (see routes/shared_embeddings.py),
+and their /metrics stage histograms through METRICS_DIR (see routes/metrics.py).
+
+With ENCODER_SERVER_SOCKET set, the model lives in a separate encoder server process started here
+(routes/encoder_server.py) that micro-batches every worker's encode calls; workers hold no model.
+
+Environment overrides: GUNICORN_BIND, GUNICORN_WORKERS, GUNICORN_THREADS, GUNICORN_WORKER_CLASS,
+GUNICORN_TIMEOUT, GUNICORN_TORCH_THREADS. Measure throughput scaling with benchmarks/bench_load.py.
+"""
+
+import gc
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+def available_cpus():
+    """CPUs this process may run on (respects container CPU affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+CPUS = available_cpus()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8080")
+workers = int(os.getenv("GUNICORN_WORKERS", "1")) or CPUS
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+preload_app = True
+accesslog = "-"
+errorlog = "-"
+
+# Encoding is CPU bound: split the cores between workers instead of every worker using all of them
+TORCH_THREADS = int(os.getenv("GUNICORN_TORCH_THREADS", "0")) or max(1, CPUS // workers)
+
+# The master must finish loading the model before it forks: a background loader thread would not
+# survive the fork, and every worker would load a private copy
+os.environ.setdefault("MODEL_LOAD_MODE", "eager")
+os.environ.setdefault("ENCODER_ONNX_THREADS", str(TORCH_THREADS))
+if workers > 1:
+    shared_root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    os.environ.setdefault("SHARED_EMBEDDINGS_DIR", os.path.join(shared_root, "chatgpt-augmenter-embeddings"))
+    # Every worker writes its stage histograms here so /metrics reports all workers, whichever answers
+    os.environ.setdefault("METRICS_DIR", os.path.join(shared_root, "chatgpt-augmenter-metrics"))
+    # Extract job status, so an /extract/status poll can land on any worker (an empty value from
+    # .env.example still gets the shared directory: per-worker job status would 404 on other workers)
+    os.environ["EXTRACT_JOB_DIR"] = os.getenv("EXTRACT_JOB_DIR") or os.path.join(shared_root, "chatgpt-augmenter-jobs")
+
+# Start the encoder server before the app is preloaded, so the master connects to it instead of loading the model
+encoder_server = None
+if os.getenv("ENCODER_SERVER_SOCKET") and os.getenv("ENCODER_SERVER_AUTOSTART", "true").lower() in ("1", "true", "yes"):
+    encoder_server = subprocess.Popen(
+        [sys.executable, "-m", "routes.encoder_server", "--socket", os.environ["ENCODER_SERVER_SOCKET"]],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+
+def on_starting(server):
+    """Drop stage histograms and job status files written by workers of an earlier run"""
+    for name in ("METRICS_DIR", "EXTRACT_JOB_DIR"):
+        if os.getenv(name):
+            shutil.rmtree(os.environ[name], ignore_errors=True)
+
+
+def when_ready(server):
+    """Freeze everything the master loaded so the garbage collector never writes to the shared pages"""
+    gc.collect()
+    gc.freeze()
+    server.log.info(
+        f"Preloaded app: {workers} {worker_class} worker(s) x {threads} thread(s), "
+        f"{TORCH_THREADS} torch thread(s) per worker, shared embeddings: {os.getenv('SHARED_EMBEDDINGS_DIR') or 'off'}"
+    )
+
+
+def post_fork(server, worker):
+    """
+    Limit each worker's intra-op threads (torch was imported by the master while loading the model).
+    Each worker also drops any database pool inherited from the master and opens its own on first use
+    (database/postgres.py registers DatabaseService._forget_pool_after_fork with os.register_at_fork).
+    """
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(TORCH_THREADS)
+
+
+def on_exit(server):
+    """Stop the encoder server started with gunicorn"""
+    if encoder_server is not None:
+        encoder_server.terminate()
+        encoder_server.wait(timeout=30)
@@ -1,5 +1,11 @@
 from sentence_transformers import SentenceTransformer
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.encoder import EncoderService, EncoderServiceException
 
 
 
@@ -13,4 +19,11 @@ model = SentenceTransformer('paraphrase-MiniLM-L6-v2')  # or your fine-tuned mod
 
 
 # Save entire model to local directory
-model.save('../my_model_dir')
\ No newline at end of file
+model.save('../my_model_dir')
+
+# Export the encoder to ONNX (plus an int8-quantized copy) for ENCODER_BACKEND=onnx
+if os.getenv("PRELOAD_EXPORT_ONNX", "true").lower() in ("1", "true", "yes"):
+    try:
+        EncoderService.export_onnx('../my_model_dir', quantize=EncoderService.ONNX_QUANTIZED)
+    except EncoderServiceException as e:
+        print(f"⚠️  Skipping ONNX export, the PyTorch model will be used: {e}")
@@ -0,0 +1,286 @@
+import io
+import os
+import numpy as np
+from routes.scoring import ScoringService, NumpyScoringBackend
+from routes.logging_service import LoggingService
+
+
+logger = LoggingService.get_logger("ann_index")
+
+class AnnIndexServiceException(Exception):
+    """Custom exception for ANN index errors"""
+    pass
+
+
+class AnnIndexService:
+    """
+    Per-user approximate nearest neighbour index (an inverted file / IVF index). It is built, loaded
+    and searched with torch (imported on first use), or entirely in NumPy when the numpy scoring
+    backend is selected (SEARCH_SCORING_BACKEND=numpy).
+
+    Extract clusters a user's L2-normalized embeddings around centroids with spherical k-means and
+    stores, next to the embeddings, the centroids plus the document ordinals of each cluster. Search
+    scores the query against the centroids, then exactly scores only the documents in the NPROBE
+    closest clusters instead of the whole matrix.
+    """
+
+    # ANN index settings - loaded from environment
+    ENABLED = os.getenv("ANN_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+    MIN_DOCUMENTS = int(os.getenv("ANN_INDEX_MIN_DOCUMENTS", "50000"))  # Smaller corpora use exact search
+    LISTS = int(os.getenv("ANN_INDEX_LISTS", "0"))  # Number of clusters (0 = sqrt of the document count)
+    NPROBE = int(os.getenv("ANN_INDEX_NPROBE", "32"))  # Clusters scanned per query
+    TRAIN_SAMPLE = int(os.getenv("ANN_INDEX_TRAIN_SAMPLE", "50000"))  # Rows k-means is trained on
+    ITERATIONS = int(os.getenv("ANN_INDEX_ITERATIONS", "10"))  # k-means iterations
+
+    FORMAT_VERSION = 1
+    _CHUNK_ROWS = 8192
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """BUILD FUNCTIONS (used by routes/extract.py)"""
+
+    @staticmethod
+    def build_for_storage(embeddings, normalized=True):
+        """
+        Build and serialize an index for a user's embeddings when the corpus is large enough
+
+        Args:
+            embeddings (torch.Tensor): Document embeddings about to be saved
+            normalized (bool): Whether rows are unit length (the index ranks by dot product)
+
+        Returns:
+            bytes or None: Serialized index, or None when disabled, below MIN_DOCUMENTS, or the build
+            failed (search then stays exact)
+        """
+        document_count = len(embeddings)
+        if not AnnIndexService.ENABLED or not normalized or document_count < max(AnnIndexService.MIN_DOCUMENTS, 1):
+            return None
+
+        try:
+            logger.info("Building ANN index for %d documents...", document_count)
+            return AnnIndexService.serialize(AnnIndexService.build(embeddings))
+        except Exception as e:
+            logger.warning("ANN index build failed, search will stay exact: %s", e)
+            return None
+
+    @staticmethod
+    def build(embeddings, lists=None, seed=0):
+        """
+        Cluster unit-length embeddings with spherical k-means and group document ordinals by cluster
+
+        Args:
+            embeddings (torch.Tensor or np.ndarray): (rows, dim) L2-normalized embeddings
+            lists (int): Number of clusters (defaults to LISTS, or sqrt of the row count)
+            seed (int): Random seed for the training sample and initial centroids
+
+        Returns:
+            dict: centroids (lists, dim) float32 matrix, offsets (lists + 1) int64 array and
+            ids int64 ordinals ordered by cluster (cluster c owns ids[offsets[c]:offsets[c + 1]]);
+            the matrices are NumPy arrays with the numpy scoring backend and tensors otherwise
+
+        Raises:
+            AnnIndexServiceException: If there are no embeddings
+        """
+        document_count = len(embeddings)
+        if document_count == 0:
+            raise AnnIndexServiceException("Cannot build an ANN index without embeddings")
+
+        lists = lists or AnnIndexService.LISTS or int(np.sqrt(document_count))
+        lists = max(1, min(lists, document_count))
+        generator = np.random.default_rng(seed)
+        if AnnIndexService._uses_numpy():
+            return AnnIndexService._build_numpy(embeddings, lists, generator)
+
+        import torch
+        embeddings = torch.as_tensor(embeddings, dtype=torch.float32)
+        sample_size = min(document_count, max(AnnIndexService.TRAIN_SAMPLE, lists))
+        sample = embeddings[torch.from_numpy(np.sort(generator.choice(document_count, sample_size, replace=False)))]
+        centroids = sample[torch.from_numpy(generator.choice(sample_size, lists, replace=False))].clone()
+
+        for _ in range(max(AnnIndexService.ITERATIONS, 1)):
+            assignments = AnnIndexService._assign(sample, centroids)
+            sums = torch.zeros_like(centroids).index_add_(0, assignments, sample)
+            counts = torch.bincount(assignments, minlength=lists)
+            # Empty clusters keep their previous centroid
+            sums[counts == 0] = centroids[counts == 0]
+            centroids = torch.nn.functional.normalize(sums, p=2, dim=-1)
+
+        assignments = AnnIndexService._assign(embeddings, centroids)
+        ids = torch.argsort(assignments, stable=True)
+        offsets = np.concatenate(([0], np.cumsum(torch.bincount(assignments, minlength=lists).numpy()))).astype(np.int64)
+
+        return {"centroids": centroids, "offsets": offsets, "ids": ids}
+
+    @staticmethod
+    def _build_numpy(embeddings, lists, generator):
+        """build() without torch: the same spherical k-means with NumPy matrix products"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        document_count = len(embeddings)
+        sample_size = min(document_count, max(AnnIndexService.TRAIN_SAMPLE, lists))
+        sample = embeddings[np.sort(generator.choice(document_count, sample_size, replace=False))]
+        centroids = sample[generator.choice(sample_size, lists, replace=False)].copy()
+
+        for _ in range(max(AnnIndexService.ITERATIONS, 1)):
+            assignments = AnnIndexService._assign_numpy(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=lists)
+            # Empty clusters keep their previous centroid
+            sums[counts == 0] = centroids[counts == 0]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), NumpyScoringBackend._EPSILON)
+
+        assignments = AnnIndexService._assign_numpy(embeddings, centroids)
+        ids = np.argsort(assignments, kind="stable").astype(np.int64)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=lists)))).astype(np.int64)
+
+        return {"centroids": centroids, "offsets": offsets, "ids": ids}
+
+    @staticmethod
+    def _assign_numpy(embeddings, centroids):
+        """Index of the closest centroid for every row, computed in chunks to bound memory"""
+        return np.concatenate([
+            np.argmax(embeddings[start:start + AnnIndexService._CHUNK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(embeddings), AnnIndexService._CHUNK_ROWS)
+        ])
+
+    @staticmethod
+    def _uses_numpy():
+        """Whether the selected scoring backend keeps search free of torch tensors"""
+        return ScoringService.get_backend() is NumpyScoringBackend
+
+    @staticmethod
+    def _assign(embeddings, centroids):
+        """Index of the closest centroid for every row, computed in chunks to bound memory"""
+        import torch
+        return torch.cat([
+            torch.argmax(embeddings[start:start + AnnIndexService._CHUNK_ROWS] @ centroids.T, dim=1)
+            for start in range(0, len(embeddings), AnnIndexService._CHUNK_ROWS)
+        ])
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """SEARCH FUNCTIONS (used by routes/search.py)"""
+
+    @staticmethod
+    def should_use(ann_index, document_count):
+        """Whether a search over document_count rows should go through ann_index instead of exact scoring"""
+        return (
+            ann_index is not None
+            and AnnIndexService.ENABLED
+            and document_count >= AnnIndexService.MIN_DOCUMENTS
+            and len(ann_index["ids"]) == document_count
+        )
+
+    @staticmethod
+    def search(query_embedding, doc_embeddings, ann_index, top_k):
+        """
+        Score only the documents in the NPROBE clusters closest to the query
+
+        Args:
+            query_embedding (torch.Tensor): Query embedding
+            doc_embeddings (torch.Tensor or np.ndarray): L2-normalized document embeddings the index was built from
+            ann_index (dict): Index from build() or load()
+            top_k (int): Number of top results
+
+        Returns:
+            dict or None: {'cos_scores', 'top_indices'} like SearchService.get_top_k_results, as NumPy
+            arrays when doc_embeddings is one or the numpy scoring backend is selected (rows that were
+            not scanned hold NaN), or None when the probed clusters hold fewer than top_k documents
+        """
+        if AnnIndexService._uses_numpy():
+            return AnnIndexService._search_numpy(query_embedding, doc_embeddings, ann_index, top_k)
+
+        import torch
+        as_numpy = isinstance(doc_embeddings, np.ndarray)
+        doc_embeddings = torch.as_tensor(doc_embeddings)
+        query_embedding = torch.nn.functional.normalize(torch.as_tensor(query_embedding).float().reshape(1, -1), p=2, dim=-1)
+        centroids, offsets, ids = torch.as_tensor(ann_index["centroids"]), ann_index["offsets"], torch.as_tensor(ann_index["ids"])
+
+        nprobe = max(1, min(AnnIndexService.NPROBE, len(centroids)))
+        probed = torch.topk(query_embedding @ centroids.T, k=nprobe).indices[0].tolist()
+        candidates = torch.cat([ids[offsets[cluster]:offsets[cluster + 1]] for cluster in probed])
+        if len(candidates) < top_k:
+            return None
+
+        candidate_scores = (doc_embeddings[candidates] @ query_embedding.T).flatten()
+        top = torch.topk(candidate_scores, k=top_k)
+
+        cos_scores = torch.full((len(doc_embeddings),), float("nan"))
+        cos_scores[candidates] = candidate_scores
+        top_indices = candidates[top.indices].reshape(1, -1)
+        if as_numpy:
+            return {"cos_scores": cos_scores.numpy(), "top_indices": top_indices.numpy()}
+        return {"cos_scores": cos_scores, "top_indices": top_indices}
+
+    @staticmethod
+    def _search_numpy(query_embedding, doc_embeddings, ann_index, top_k):
+        """search() without torch: matrix products plus np.argpartition over the probed clusters"""
+        query_embedding = NumpyScoringBackend._normalized_query(query_embedding)
+        centroids, offsets, ids = np.asarray(ann_index["centroids"]), ann_index["offsets"], np.asarray(ann_index["ids"])
+
+        nprobe = max(1, min(AnnIndexService.NPROBE, len(centroids)))
+        _centroid_scores, probed = NumpyScoringBackend.top_k(centroids @ query_embedding, nprobe)
+        candidates = np.concatenate([ids[offsets[cluster]:offsets[cluster + 1]] for cluster in probed[0]])
+        if len(candidates) < top_k:
+            return None
+
+        candidate_scores = np.asarray(doc_embeddings[candidates], dtype=np.float32) @ query_embedding
+        _candidate_scores, top = NumpyScoringBackend.top_k(candidate_scores, top_k)
+
+        cos_scores = np.full(len(doc_embeddings), np.nan, dtype=np.float32)
+        cos_scores[candidates] = candidate_scores
+        return {"cos_scores": cos_scores, "top_indices": candidates[top]}
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """SERIALIZATION FUNCTIONS"""
+
+    @staticmethod
+    def serialize(ann_index):
+        """
+        Serialize an index for storage next to the embeddings
+
+        Returns:
+            bytes: .npz archive of the index arrays
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            version=np.array(AnnIndexService.FORMAT_VERSION),
+            centroids=np.asarray(ann_index["centroids"], dtype=np.float32),
+            offsets=np.asarray(ann_index["offsets"], dtype=np.int64),
+            ids=np.asarray(ann_index["ids"], dtype=np.int32)
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def load(index_bytes, document_count):
+        """
+        Deserialize a stored index, ignoring it if it does not match the stored embeddings
+
+        Args:
+            index_bytes (bytes): Stored index (None for users without one)
+            document_count (int): Number of stored embedding rows
+
+        Returns:
+            dict or None: Index usable by search() (NumPy arrays with the numpy scoring backend,
+            tensors otherwise), or None (search stays exact)
+        """
+        if not index_bytes:
+            return None
+
+        try:
+            with np.load(io.BytesIO(bytes(index_bytes)), allow_pickle=False) as archive:
+                if int(archive["version"]) != AnnIndexService.FORMAT_VERSION:
+                    raise AnnIndexServiceException(f"unsupported index version {int(archive['version'])}")
+                ann_index = {
+                    "centroids": archive["centroids"],
+                    "offsets": archive["offsets"],
+                    "ids": archive["ids"].astype(np.int64)
+                }
+            if not AnnIndexService._uses_numpy():
+                import torch
+                ann_index["centroids"], ann_index["ids"] = torch.from_numpy(ann_index["centroids"]), torch.from_numpy(ann_index["ids"])
+            if len(ann_index["ids"]) != document_count or int(ann_index["offsets"][-1]) != document_count:
+                raise AnnIndexServiceException(f"index covers {len(ann_index['ids'])} documents, expected {document_count}")
+            return ann_index
+        except Exception as e:
+            logger.warning("Ignoring stored ANN index, search will stay exact: %s", e)
+            return None
@@ -0,0 +1,335 @@
+import os
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+class CacheService:
+    """
+    Process-wide LRU cache of decoded user search data (embeddings, keys and documents) keyed by uuid
+
+    Every entry remembers the version of the stored data it was decoded from, which get checks on
+    each hit, so an upload or delete handled by another worker is noticed on the next search. Entries
+    also expire after TTL_SECONDS, which bounds staleness when the version cannot be read.
+    """
+
+    # Memory budget for all cached users - loaded from environment (bytes, 0 disables the cache)
+    MAX_BYTES = int(os.getenv("USER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Seconds an entry may be served before it is reloaded (0 = no expiry)
+    TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "600"))
+
+    _entries = OrderedDict()
+    _sizes = {}
+    _versions = {}
+    _stored_at = {}
+    _total_bytes = 0
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+    _stale = 0
+    _lock = threading.Lock()
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """CACHE ACCESS FUNCTIONS"""
+
+    @staticmethod
+    def get(uuid, validate=None):
+        """
+        Get cached search data for a user and mark it as most recently used
+
+        Args:
+            uuid (str): User's UUID
+            validate (callable): Called with the version the entry was cached with (entries cached
+                without one are not checked); returning False drops the entry as stale
+
+        Returns:
+            dict or None: Cached extraction dict, or None on a miss
+        """
+        with CacheService._lock:
+            entry = CacheService._entries.get(uuid)
+            if entry is None:
+                CacheService._misses += 1
+                return None
+
+            version = CacheService._versions.get(uuid)
+            if CacheService.TTL_SECONDS > 0 and time.monotonic() - CacheService._stored_at[uuid] > CacheService.TTL_SECONDS:
+                CacheService._remove(uuid)
+                CacheService._stale += 1
+                CacheService._misses += 1
+                return None
+
+        # Checking the version may hit the database, so it runs without holding the lock
+        if validate is not None and version is not None and not validate(version):
+            with CacheService._lock:
+                if CacheService._entries.get(uuid) is entry:
+                    CacheService._remove(uuid)
+                CacheService._stale += 1
+                CacheService._misses += 1
+            return None
+
+        with CacheService._lock:
+            if uuid in CacheService._entries:
+                CacheService._entries.move_to_end(uuid)
+            CacheService._hits += 1
+        return entry
+
+    @staticmethod
+    def put(uuid, extraction, version=None):
+        """
+        Cache search data for a user, evicting least recently used users to stay within MAX_BYTES
+
+        Args:
+            uuid (str): User's UUID
+            extraction (dict): Dictionary containing doc_embeddings, data and keys
+            version: Version of the stored data the extraction was decoded from (None if unknown)
+
+        Returns:
+            bool: True if the entry was cached, False if it does not fit the budget
+        """
+        size = CacheService.estimate_size(extraction)
+
+        with CacheService._lock:
+            CacheService._remove(uuid)
+
+            if size > CacheService.MAX_BYTES:
+                return False
+
+            while CacheService._entries and CacheService._total_bytes + size > CacheService.MAX_BYTES:
+                oldest_uuid = next(iter(CacheService._entries))
+                CacheService._remove(oldest_uuid)
+                CacheService._evictions += 1
+
+            CacheService._entries[uuid] = extraction
+            CacheService._sizes[uuid] = size
+            CacheService._versions[uuid] = version
+            CacheService._stored_at[uuid] = time.monotonic()
+            CacheService._total_bytes += size
+            return True
+
+    @staticmethod
+    def invalidate(uuid):
+        """
+        Drop the cached search data for a user (called whenever the user's stored data changes)
+
+        Args:
+            uuid (str): User's UUID
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        if not uuid or not isinstance(uuid, str):
+            return False
+        with CacheService._lock:
+            return CacheService._remove(uuid.strip())
+
+    @staticmethod
+    def clear():
+        """Drop every cached entry and reset counters"""
+        with CacheService._lock:
+            CacheService._entries.clear()
+            CacheService._sizes.clear()
+            CacheService._versions.clear()
+            CacheService._stored_at.clear()
+            CacheService._total_bytes = 0
+            CacheService._hits = 0
+            CacheService._misses = 0
+            CacheService._evictions = 0
+            CacheService._stale = 0
+
+    @staticmethod
+    def stats():
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Entry count, memory usage and hit/miss/eviction/stale counters
+        """
+        with CacheService._lock:
+            return {
+                "entries": len(CacheService._entries),
+                "total_bytes": CacheService._total_bytes,
+                "max_bytes": CacheService.MAX_BYTES,
+                "ttl_seconds": CacheService.TTL_SECONDS,
+                "hits": CacheService._hits,
+                "misses": CacheService._misses,
+                "evictions": CacheService._evictions,
+                "stale": CacheService._stale
+            }
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """HELPER FUNCTIONS"""
+
+    @staticmethod
+    def _remove(uuid):
+        """Remove an entry (caller must hold the lock)"""
+        if uuid not in CacheService._entries:
+            return False
+        del CacheService._entries[uuid]
+        CacheService._versions.pop(uuid, None)
+        CacheService._stored_at.pop(uuid, None)
+        CacheService._total_bytes -= CacheService._sizes.pop(uuid, 0)
+        return True
+
+    @staticmethod
+    def estimate_size(extraction):
+        """
+        Estimate the memory held by an extraction dict
+
+        Args:
+            extraction (dict): Dictionary containing doc_embeddings, data and keys
+
+        Returns:
+            int: Approximate size in bytes
+        """
+        size = 0
+
+        embeddings = extraction.get('doc_embeddings')
+        if embeddings is not None:
+            if hasattr(embeddings, 'element_size'):
+                size += embeddings.element_size() * embeddings.nelement()
+            else:
+                size += getattr(embeddings, 'nbytes', 0)
+
+        data = extraction.get('data')
+        if isinstance(data, dict):
+            size += sys.getsizeof(data)
+            for key, value in data.items():
+                size += sys.getsizeof(key) + sys.getsizeof(value)
+
+        # Packed documents (see DocumentCodec) are reached through their bound fetch method
+        documents = getattr(extraction.get('fetch_documents'), '__self__', None)
+        size += getattr(documents, 'nbytes', 0)
+
+        keys = extraction.get('keys')
+        if keys is not None:
+            # Keys normally share their string objects with data, so only count the list itself
+            size += sys.getsizeof(keys)
+
+        ann_index = extraction.get('ann_index')
+        if ann_index is not None:
+            size += sum(
+                value.element_size() * value.nelement() if hasattr(value, 'element_size') else getattr(value, 'nbytes', 0)
+                for value in ann_index.values()
+            )
+
+        return size
+
+
+class QueryEmbeddingCacheService:
+    """Process-wide LRU cache of encoded search queries with a TTL, keyed by model and normalized query"""
+
+    # Query cache settings - loaded from environment (0 entries disables the cache, 0 seconds disables expiry)
+    MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+    TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+    LOWERCASE = os.getenv("QUERY_CACHE_LOWERCASE", "false").lower() in ("1", "true", "yes")  # only for uncased models
+
+    _entries = OrderedDict()
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+    _expirations = 0
+    _lock = threading.Lock()
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """CACHE ACCESS FUNCTIONS"""
+
+    @staticmethod
+    def get(model, query):
+        """
+        Get a cached query embedding and mark it as most recently used
+
+        Args:
+            model: SentenceTransformer model the embedding was encoded with
+            query (str): Search query
+
+        Returns:
+            torch.Tensor or None: Cached embedding (shared, do not modify in place), or None on a miss
+        """
+        key = QueryEmbeddingCacheService._make_key(model, query)
+        with QueryEmbeddingCacheService._lock:
+            entry = QueryEmbeddingCacheService._entries.get(key)
+            # The entry holds the model itself so a recycled id() can never match another model
+            if entry is None or entry[0] is not model:
+                QueryEmbeddingCacheService._misses += 1
+                return None
+
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                del QueryEmbeddingCacheService._entries[key]
+                QueryEmbeddingCacheService._expirations += 1
+                QueryEmbeddingCacheService._misses += 1
+                return None
+
+            QueryEmbeddingCacheService._entries.move_to_end(key)
+            QueryEmbeddingCacheService._hits += 1
+            return entry[1]
+
+    @staticmethod
+    def put(model, query, embedding):
+        """
+        Cache a query embedding, evicting the least recently used queries beyond MAX_ENTRIES
+
+        Args:
+            model: SentenceTransformer model the embedding was encoded with
+            query (str): Search query
+            embedding (torch.Tensor): Query embedding
+        """
+        if QueryEmbeddingCacheService.MAX_ENTRIES <= 0:
+            return
+
+        key = QueryEmbeddingCacheService._make_key(model, query)
+        ttl = QueryEmbeddingCacheService.TTL_SECONDS
+        expires_at = time.monotonic() + ttl if ttl > 0 else None
+
+        with QueryEmbeddingCacheService._lock:
+            QueryEmbeddingCacheService._entries[key] = (model, embedding, expires_at)
+            QueryEmbeddingCacheService._entries.move_to_end(key)
+            while len(QueryEmbeddingCacheService._entries) > QueryEmbeddingCacheService.MAX_ENTRIES:
+                QueryEmbeddingCacheService._entries.popitem(last=False)
+                QueryEmbeddingCacheService._evictions += 1
+
+    @staticmethod
+    def clear():
+        """Drop every cached query and reset counters"""
+        with QueryEmbeddingCacheService._lock:
+            QueryEmbeddingCacheService._entries.clear()
+            QueryEmbeddingCacheService._hits = 0
+            QueryEmbeddingCacheService._misses = 0
+            QueryEmbeddingCacheService._evictions = 0
+            QueryEmbeddingCacheService._expirations = 0
+
+    @staticmethod
+    def stats():
+        """
+        Get query cache statistics
+
+        Returns:
+            dict: Entry count, limits and hit/miss/eviction/expiration counters with the hit rate
+        """
+        with QueryEmbeddingCacheService._lock:
+            lookups = QueryEmbeddingCacheService._hits + QueryEmbeddingCacheService._misses
+            return {
+                "entries": len(QueryEmbeddingCacheService._entries),
+                "max_entries": QueryEmbeddingCacheService.MAX_ENTRIES,
+                "ttl_seconds": QueryEmbeddingCacheService.TTL_SECONDS,
+                "hits": QueryEmbeddingCacheService._hits,
+                "misses": QueryEmbeddingCacheService._misses,
+                "hit_rate": QueryEmbeddingCacheService._hits / lookups if lookups else 0.0,
+                "evictions": QueryEmbeddingCacheService._evictions,
+                "expirations": QueryEmbeddingCacheService._expirations
+            }
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """HELPER FUNCTIONS"""
+
+    @staticmethod
+    def normalize_query(query):
+        """Normalize a query for cache lookup (NFC, collapsed whitespace, optionally lowercased)"""
+        normalized = " ".join(unicodedata.normalize("NFC", str(query)).split())
+        return normalized.lower() if QueryEmbeddingCacheService.LOWERCASE else normalized
+
+    @staticmethod
+    def _make_key(model, query):
+        """Build the cache key for a model and query"""
+        return (id(model), QueryEmbeddingCacheService.normalize_query(query))
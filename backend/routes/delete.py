@@ -1,6 +1,13 @@
 import os
 import json
 from database.postgres import DatabaseService, DatabaseServiceException, TableNotFoundException, UserNotFoundException
+from routes.cache import CacheService
+from routes.shared_embeddings import SharedEmbeddingsService
+from routes.logging_service import LoggingService
+from routes.file_store import FileStoreService, FileStoreServiceException
+
+
+logger = LoggingService.get_logger("delete")
 
 
 class DeleteServiceException(Exception):
@@ -39,7 +46,7 @@ class DeleteService:
             user_uuid = user_uuid.strip()
             
             # Step 1: Attempt to delete from database first
-            print(f"🗑️  Attempting database deletion for user {user_uuid[:8]}...")
+            logger.debug("Attempting database deletion for user %s...", user_uuid[:8])
             db_result = DeleteService.delete_from_database(user_uuid)
             
             if db_result["success"]:
@@ -52,11 +59,21 @@ class DeleteService:
                     "source": "database"
                 }
             
-            # Step 2: Fallback to JSON file deletion
-            print(f"🗂️  Database deletion failed, attempting JSON file deletion for user {user_uuid[:8]}...")
+            # Step 2: Fallback to the file store and JSON file deletion (a user may have both from older versions)
+            logger.warning("Database deletion failed, attempting file deletion for user %s...", user_uuid[:8])
+            store_result = DeleteService.delete_from_file_store(user_uuid)
             json_result = DeleteService.delete_from_json_file(user_uuid)
             
-            if json_result["success"]:
+            if store_result["success"]:
+                return {
+                    "success": True,
+                    "message": f"Successfully deleted data for UUID: {user_uuid} from the file store",
+                    "uuid": user_uuid,
+                    "status": "deleted_from_file_store",
+                    "source": "file_store",
+                    "file_path": store_result.get("file_path")
+                }
+            elif json_result["success"]:
                 return {
                     "success": True,
                     "message": f"Successfully deleted data for UUID: {user_uuid} from JSON file",
@@ -79,6 +96,10 @@ class DeleteService:
             if isinstance(e, DeleteServiceException):
                 raise
             raise DeleteServiceException(f"Delete service failed: {str(e)}")
+        finally:
+            # Stop serving searches from the cached copy of this user's data
+            CacheService.invalidate(user_uuid)
+            SharedEmbeddingsService.delete(user_uuid)
 
     """--------------------------------------------------------------------------------------------------------------"""
     """DELETE FROM DATABASE"""
@@ -127,6 +148,30 @@ class DeleteService:
                 "error_type": "DatabaseServiceException"
             }
 
+    """--------------------------------------------------------------------------------------------------------------"""
+    """DELETE FROM FILE STORE"""
+
+    # SUBROOT FUNCTION
+    @staticmethod
+    def delete_from_file_store(user_uuid):
+        """
+        Delete user data from the file store (see routes/file_store.py)
+        
+        Args:
+            user_uuid (str): User's UUID to delete
+            
+        Returns:
+            dict: File store deletion result
+        """
+        try:
+            user_dir = FileStoreService.user_dir(user_uuid)
+            if not FileStoreService.delete(user_uuid):
+                return {"success": False, "error": f"No file store data for UUID {user_uuid}", "file_path": user_dir}
+            logger.info("Deleted file store directory: %s", user_dir)
+            return {"success": True, "file_path": user_dir}
+        except (FileStoreServiceException, OSError) as e:
+            return {"success": False, "error": f"File store deletion failed: {str(e)}", "file_path": "unknown"}
+
     """--------------------------------------------------------------------------------------------------------------"""
     """DELETE FROM JSON FILE"""
 
@@ -209,7 +254,7 @@ class DeleteService:
         """
         # Check if the JSON file exists
         if not os.path.exists(json_file_path):
-            print(f"❌ JSON file not found: {json_file_path}")
+            logger.warning("JSON file not found: %s", json_file_path)
             return {
                 "valid": False,
                 "error": f"JSON file not found: {json_file_path}"
@@ -217,7 +262,7 @@ class DeleteService:
         
         # Verify it's actually a file (not a directory)
         if not os.path.isfile(json_file_path):
-            print(f"❌ Path exists but is not a file: {json_file_path}")
+            logger.warning("Path exists but is not a file: %s", json_file_path)
             return {
                 "valid": False,
                 "error": f"Path exists but is not a file: {json_file_path}"
@@ -260,7 +305,7 @@ class DeleteService:
         """
         try:
             os.remove(json_file_path)
-            print(f"✅ Successfully deleted JSON file: {json_file_path}")
+            logger.info("Deleted JSON file: %s", json_file_path)
             
             return {
                 "success": True,
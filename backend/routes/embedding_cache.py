@@ -0,0 +1,155 @@
+import os
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+from database.postgres import DatabaseService, DatabaseServiceException
+from routes.logging_service import LoggingService
+
+
+logger = LoggingService.get_logger("embedding_cache")
+
+class EmbeddingCacheService:
+    """Persistent content-addressed cache of prompt embeddings keyed by (model id, sha256 of normalized text), shared by all users"""
+
+    # Embedding cache settings - loaded from environment
+    ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+    MODEL_ID = os.getenv("EMBEDDING_CACHE_MODEL_ID", "")  # Overrides the id derived from the model
+
+    _hits = 0
+    _misses = 0
+    _writes = 0
+    _evictions = 0
+    _errors = 0
+    _lock = threading.Lock()
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """CACHE ACCESS FUNCTIONS"""
+
+    @staticmethod
+    def lookup(texts, model):
+        """
+        Look up cached embeddings for a batch of texts in one query
+
+        Args:
+            texts (list): Texts about to be encoded
+            model: SentenceTransformer model that would encode them
+
+        Returns:
+            dict: Mapping of text index to float32 embedding (an empty dict when disabled or unavailable)
+        """
+        if not EmbeddingCacheService.ENABLED or not texts:
+            return {}
+
+        hashes = [EmbeddingCacheService.text_hash(text) for text in texts]
+        try:
+            cached = DatabaseService.load_cached_embeddings(EmbeddingCacheService.resolve_model_id(model), set(hashes))
+        except DatabaseServiceException as e:
+            logger.warning("Embedding cache unavailable, encoding everything: %s", e)
+            EmbeddingCacheService._record(errors=1)
+            return {}
+
+        found = {
+            index: np.frombuffer(cached[text_hash], dtype=np.float32)
+            for index, text_hash in enumerate(hashes) if text_hash in cached
+        }
+        EmbeddingCacheService._record(hits=len(found), misses=len(texts) - len(found))
+        return found
+
+    @staticmethod
+    def store(texts, embeddings, model):
+        """
+        Write newly encoded embeddings back to the cache in one batch (evicting least recently used rows)
+
+        Args:
+            texts (list): Texts that were encoded
+            embeddings (np.ndarray): float32 embeddings, one row per text
+            model: SentenceTransformer model that encoded them
+
+        Returns:
+            bool: True if the embeddings were stored
+        """
+        if not EmbeddingCacheService.ENABLED or not texts:
+            return False
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        entries = {EmbeddingCacheService.text_hash(text): embeddings[index].tobytes() for index, text in enumerate(texts)}
+        try:
+            evicted = DatabaseService.store_cached_embeddings(
+                EmbeddingCacheService.resolve_model_id(model), list(entries.items()), EmbeddingCacheService.MAX_ENTRIES
+            )
+        except DatabaseServiceException as e:
+            logger.warning("Embedding cache write failed: %s", e)
+            EmbeddingCacheService._record(errors=1)
+            return False
+
+        EmbeddingCacheService._record(writes=len(entries), evictions=evicted)
+        return True
+
+    @staticmethod
+    def stats():
+        """
+        Get embedding cache counters for this process
+
+        Returns:
+            dict: Hit/miss/write/eviction/error counters and the hit rate
+        """
+        with EmbeddingCacheService._lock:
+            lookups = EmbeddingCacheService._hits + EmbeddingCacheService._misses
+            return {
+                "enabled": EmbeddingCacheService.ENABLED,
+                "max_entries": EmbeddingCacheService.MAX_ENTRIES,
+                "hits": EmbeddingCacheService._hits,
+                "misses": EmbeddingCacheService._misses,
+                "hit_rate": EmbeddingCacheService._hits / lookups if lookups else 0.0,
+                "writes": EmbeddingCacheService._writes,
+                "evictions": EmbeddingCacheService._evictions,
+                "errors": EmbeddingCacheService._errors
+            }
+
+    @staticmethod
+    def reset_stats():
+        """Reset the counters"""
+        with EmbeddingCacheService._lock:
+            EmbeddingCacheService._hits = 0
+            EmbeddingCacheService._misses = 0
+            EmbeddingCacheService._writes = 0
+            EmbeddingCacheService._evictions = 0
+            EmbeddingCacheService._errors = 0
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """HELPER FUNCTIONS"""
+
+    @staticmethod
+    def text_hash(text):
+        """SHA-256 of the text after Unicode NFC normalization and trimming surrounding whitespace"""
+        normalized = unicodedata.normalize("NFC", str(text)).strip()
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def resolve_model_id(model):
+        """
+        Identify the model so vectors from different models never mix
+
+        Returns:
+            str: EMBEDDING_CACHE_MODEL_ID if set, otherwise the model's base model name and dimension
+        """
+        if EmbeddingCacheService.MODEL_ID:
+            return EmbeddingCacheService.MODEL_ID
+
+        name = getattr(getattr(model, "model_card_data", None), "base_model", None)
+        if not isinstance(name, str) or not name:
+            name = type(model).__name__
+        try:
+            dimension = model.get_sentence_embedding_dimension()
+        except Exception:
+            dimension = None
+        return f"{name}:{dimension}" if isinstance(dimension, int) else name
+
+    @staticmethod
+    def _record(**counts):
+        """Add to the counters"""
+        with EmbeddingCacheService._lock:
+            for name, count in counts.items():
+                setattr(EmbeddingCacheService, f"_{name}", getattr(EmbeddingCacheService, f"_{name}") + count)
@@ -0,0 +1,427 @@
+import os
+import json
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+from routes.logging_service import LoggingService
+
+try:
+    import onnxruntime
+except ImportError:
+    # onnxruntime not installed - ENCODER_BACKEND=onnx falls back to the PyTorch model
+    onnxruntime = None
+
+
+logger = LoggingService.get_logger("encoder")
+
+class EncoderServiceException(Exception):
+    """Custom exception for encoder loading and export errors"""
+    pass
+
+
+class OnnxSentenceEncoder:
+    """
+    SentenceTransformer stand-in that runs the exported transformer with onnxruntime and pools the token
+    embeddings in NumPy. It implements the parts of the SentenceTransformer API the services use:
+    encode(), get_sentence_embedding_dimension() and model_card_data.
+    """
+
+    def __init__(self, model_path, quantized=True, threads=0):
+        """
+        Load an encoder exported by EncoderService.export_onnx
+
+        Args:
+            model_path (str): Saved SentenceTransformer directory (with an onnx/ subdirectory)
+            quantized (bool): Use the int8-quantized graph instead of the float32 one
+            threads (int): onnxruntime intra-op threads (0 = onnxruntime default)
+
+        Raises:
+            EncoderServiceException: If onnxruntime or the exported graph is missing
+        """
+        if onnxruntime is None:
+            raise EncoderServiceException("onnxruntime is not installed")
+
+        onnx_file = EncoderService.onnx_file(model_path, quantized)
+        if not os.path.exists(onnx_file):
+            raise EncoderServiceException(f"{onnx_file} not found, run pythonFiles/preload.py to export it")
+
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.onnx_file = onnx_file
+        self.session = onnxruntime.InferenceSession(onnx_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+        self.max_seq_length = EncoderService._read_json(model_path, "sentence_bert_config.json").get("max_seq_length") or 128
+        self.pooling = EncoderService._read_json(model_path, os.path.join("1_Pooling", "config.json"))
+        self.normalize = any(
+            module.get("type", "").endswith("Normalize") for module in EncoderService._read_json(model_path, "modules.json", [])
+        )
+        self.dimension = EncoderService._read_json(model_path, "config.json").get("hidden_size")
+        # Quantized vectors differ slightly from the PyTorch ones, so they get their own embedding cache id
+        self.model_card_data = SimpleNamespace(
+            base_model=f"{os.path.basename(os.path.normpath(model_path))}-onnx{'-int8' if quantized else ''}"
+        )
+
+    def __repr__(self):
+        return f"OnnxSentenceEncoder({self.onnx_file})"
+
+    def get_sentence_embedding_dimension(self):
+        """Size of the sentence embeddings"""
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, convert_to_numpy=True,
+               show_progress_bar=False, normalize_embeddings=False, **kwargs):
+        """
+        Encode one sentence or a list of sentences like SentenceTransformer.encode
+
+        Args:
+            sentences (str or list): Text(s) to encode
+            batch_size (int): Sentences per onnxruntime call
+            convert_to_tensor (bool): Return a torch tensor instead of a NumPy array
+            normalize_embeddings (bool): L2-normalize the embeddings
+
+        Returns:
+            np.ndarray or torch.Tensor: float32 embeddings, 1-D for a single sentence
+        """
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+
+        batches = []
+        for start in range(0, len(sentences), max(batch_size, 1)):
+            batches.append(self._encode_batch(sentences[start:start + batch_size]))
+        embeddings = np.concatenate(batches) if batches else np.empty((0, self.dimension or 0), dtype=np.float32)
+
+        if self.normalize or normalize_embeddings:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(np.ascontiguousarray(embeddings))
+        return embeddings
+
+    def _encode_batch(self, sentences):
+        """Tokenize, run the graph and pool one batch"""
+        tokens = self.tokenizer(
+            sentences, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        attention_mask = tokens["attention_mask"].astype(np.int64)
+        feed = {}
+        for name in self.input_names:
+            if name in tokens:
+                feed[name] = tokens[name].astype(np.int64)
+            else:
+                feed[name] = np.zeros_like(attention_mask)
+        token_embeddings = self.session.run(None, feed)[0]
+        return EncoderService.pool(token_embeddings, attention_mask, self.pooling)
+
+
+class EncoderService:
+    """
+    Loads the sentence encoder (PyTorch SentenceTransformer or its ONNX export), keeps the app's shared
+    model with its readiness state, and exports the encoder to ONNX
+    """
+
+    # Encoder settings - loaded from environment
+    BACKEND = os.getenv("ENCODER_BACKEND", "torch").lower()  # "torch" or "onnx"
+    ONNX_QUANTIZED = os.getenv("ENCODER_ONNX_QUANTIZED", "true").lower() in ("1", "true", "yes")
+    ONNX_THREADS = int(os.getenv("ENCODER_ONNX_THREADS", "0"))
+
+    # Encoder server (routes/encoder_server.py): when set, workers encode through it instead of loading the model
+    SERVER_SOCKET = os.getenv("ENCODER_SERVER_SOCKET", "")
+    SERVER_TIMEOUT = float(os.getenv("ENCODER_SERVER_TIMEOUT", "60"))  # Seconds per encode request
+    SERVER_CONNECT_TIMEOUT = float(os.getenv("ENCODER_SERVER_CONNECT_TIMEOUT", "120"))  # Seconds to wait for it to start
+    DEFAULT_SERVER_SOCKET = "/tmp/chatgpt-augmenter-encoder.sock"
+
+    # Startup settings: "background" loads in a thread at startup, "lazy" on the first request that
+    # needs the model, "eager" blocks startup until the model is loaded
+    LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background").lower()
+    READY_TIMEOUT = float(os.getenv("MODEL_READY_TIMEOUT", "120"))  # Seconds a request waits for a background load
+
+    ONNX_DIR = "onnx"
+
+    _model = None
+    _loader = None
+    _loading = False
+    _load_error = None
+    _load_seconds = None
+    _lock = threading.Lock()  # Guards the loader thread handle
+    _load_lock = threading.Lock()  # Held for the whole load so concurrent first uses load once
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """LOAD FUNCTIONS"""
+
+    @staticmethod
+    def load_model(model_path, backend=None, use_server=True):
+        """
+        Load the encoder for the configured backend, or connect to the encoder server when
+        ENCODER_SERVER_SOCKET is set (falling back to a local model if it cannot be reached)
+
+        Args:
+            model_path (str): Saved SentenceTransformer directory
+            backend (str): "torch" or "onnx" (defaults to ENCODER_BACKEND)
+            use_server (bool): Whether ENCODER_SERVER_SOCKET applies (False inside the server itself)
+
+        Returns:
+            SentenceTransformer, OnnxSentenceEncoder or RemoteSentenceEncoder: Model with a
+            SentenceTransformer-style encode()
+        """
+        if use_server and EncoderService.SERVER_SOCKET:
+            from routes.encoder_server import RemoteSentenceEncoder, EncoderServerException
+            try:
+                return RemoteSentenceEncoder(
+                    EncoderService.SERVER_SOCKET, timeout=EncoderService.SERVER_TIMEOUT,
+                    connect_timeout=EncoderService.SERVER_CONNECT_TIMEOUT
+                )
+            except EncoderServerException as e:
+                logger.warning("Encoder server unavailable, loading the model in this process: %s", e)
+
+        backend = (backend or EncoderService.BACKEND).lower()
+        if backend == "onnx":
+            try:
+                return OnnxSentenceEncoder(
+                    model_path, quantized=EncoderService.ONNX_QUANTIZED, threads=EncoderService.ONNX_THREADS
+                )
+            except EncoderServiceException as e:
+                logger.warning("ONNX encoder unavailable, loading the PyTorch model: %s", e)
+
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_path, device='cpu')
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """SHARED MODEL FUNCTIONS (used by app.py)"""
+
+    @staticmethod
+    def start_model_load(model_path, mode=None):
+        """
+        Start loading the shared model without importing torch on the caller's import path.
+        Does nothing if the model is already loaded or being loaded.
+
+        Args:
+            model_path (str): Saved SentenceTransformer directory
+            mode (str): "background", "lazy" or "eager" (defaults to LOAD_MODE)
+
+        Raises:
+            EncoderServiceException: If an eager load fails
+        """
+        mode = (mode or EncoderService.LOAD_MODE).lower()
+        if mode == "eager":
+            EncoderService._load_once(model_path)
+            return
+        if mode == "lazy":
+            print("💤 Model will load on first use")
+            return
+
+        with EncoderService._lock:
+            if EncoderService._model is not None or EncoderService._loader is not None:
+                return
+            EncoderService._loader = threading.Thread(
+                target=EncoderService._load_in_background, args=(model_path,), name="model-loader", daemon=True
+            )
+            EncoderService._loader.start()
+        print("⏳ Loading model in the background")
+
+    @staticmethod
+    def get_model(model_path, timeout=None):
+        """
+        Get the shared model, waiting for a background load in progress or loading it in the
+        calling thread on first use (lazy mode, or a retry after a failed load)
+
+        Args:
+            model_path (str): Saved SentenceTransformer directory
+            timeout (float): Seconds to wait for a background load (None waits until it finishes)
+
+        Returns:
+            SentenceTransformer or OnnxSentenceEncoder: The loaded model
+
+        Raises:
+            EncoderServiceException: If the model is still loading after timeout or fails to load
+        """
+        if EncoderService._model is not None:
+            return EncoderService._model
+
+        loader = EncoderService._loader
+        if loader is not None and loader.is_alive():
+            loader.join(timeout)
+            if loader.is_alive():
+                raise EncoderServiceException("Model is still loading, retry shortly")
+            if EncoderService._model is not None:
+                return EncoderService._model
+
+        return EncoderService._load_once(model_path)
+
+    @staticmethod
+    def current_model():
+        """The shared model if it has finished loading, otherwise None (never blocks)"""
+        return EncoderService._model
+
+    @staticmethod
+    def model_status():
+        """
+        Readiness of the shared model
+
+        Returns:
+            dict: ready, loading, load mode, load time in seconds and the last load error
+        """
+        return {
+            "ready": EncoderService._model is not None,
+            "loading": EncoderService._loading,
+            "load_mode": EncoderService.LOAD_MODE,
+            "load_seconds": EncoderService._load_seconds,
+            "error": EncoderService._load_error
+        }
+
+    @staticmethod
+    def unload_model():
+        """Forget the shared model and its load state (the next get_model loads it again)"""
+        with EncoderService._lock, EncoderService._load_lock:
+            EncoderService._model = None
+            EncoderService._loader = None
+            EncoderService._load_error = None
+            EncoderService._load_seconds = None
+
+    @staticmethod
+    def _load_once(model_path):
+        """Load the shared model unless another thread already did (callers serialize on the load lock)"""
+        with EncoderService._load_lock:
+            if EncoderService._model is not None:
+                return EncoderService._model
+
+            EncoderService._loading = True
+            start = time.perf_counter()
+            try:
+                model = EncoderService.load_model(model_path)
+            except Exception as e:
+                EncoderService._load_error = str(e)
+                print(f"❌ Error loading model: {e}")
+                raise EncoderServiceException(f"Model failed to load: {str(e)}")
+            finally:
+                EncoderService._loading = False
+                EncoderService._load_seconds = round(time.perf_counter() - start, 3)
+
+            EncoderService._model = model
+            EncoderService._load_error = None
+            print(f"🤖 Model: {model}")
+            print(f"🖥️  Model device: CPU (forced), loaded in {EncoderService._load_seconds:.2f}s")
+            return model
+
+    @staticmethod
+    def _load_in_background(model_path):
+        """Background loader thread body (errors are kept for model_status and retried on first use)"""
+        try:
+            EncoderService._load_once(model_path)
+        except EncoderServiceException:
+            pass
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """EXPORT FUNCTIONS (used by pythonFiles/preload.py)"""
+
+    @staticmethod
+    def export_onnx(model_path, quantize=True, opset=17):
+        """
+        Export the transformer of a saved SentenceTransformer to onnx/model.onnx (token embeddings output)
+        and, optionally, an int8 dynamically quantized onnx/model_quantized.onnx
+
+        Args:
+            model_path (str): Saved SentenceTransformer directory
+            quantize (bool): Also write the int8-quantized graph
+            opset (int): ONNX opset version
+
+        Returns:
+            list: Paths of the written graphs
+
+        Raises:
+            EncoderServiceException: If the export fails
+        """
+        try:
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            class TokenEmbeddings(torch.nn.Module):
+                """Maps positional ONNX inputs to the transformer's keyword arguments"""
+
+                def __init__(self, transformer, input_names):
+                    super().__init__()
+                    self.transformer = transformer
+                    self.input_names = input_names
+
+                def forward(self, *inputs):
+                    return self.transformer(**dict(zip(self.input_names, inputs))).last_hidden_state
+
+            # Eager attention and a padded sample batch keep the attention mask in the traced graph
+            transformer = AutoModel.from_pretrained(model_path, attn_implementation="eager")
+            transformer.eval()
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            sample = tokenizer(["export sample sentence", "export"], padding=True, return_tensors="pt")
+            input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+            os.makedirs(os.path.join(model_path, EncoderService.ONNX_DIR), exist_ok=True)
+            onnx_file = EncoderService.onnx_file(model_path, quantized=False)
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+            with torch.no_grad():
+                torch.onnx.export(
+                    TokenEmbeddings(transformer, input_names),
+                    tuple(sample[name] for name in input_names),
+                    onnx_file,
+                    input_names=input_names,
+                    output_names=["token_embeddings"],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=opset,
+                    dynamo=False
+                )
+            written = [onnx_file]
+            print(f"📦 Exported ONNX encoder to {onnx_file}")
+
+            if quantize:
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                quantized_file = EncoderService.onnx_file(model_path, quantized=True)
+                quantize_dynamic(onnx_file, quantized_file, weight_type=QuantType.QInt8)
+                written.append(quantized_file)
+                print(f"📦 Wrote int8-quantized ONNX encoder to {quantized_file}")
+
+            return written
+        except Exception as e:
+            raise EncoderServiceException(f"ONNX export failed: {str(e)}")
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """HELPER FUNCTIONS"""
+
+    @staticmethod
+    def onnx_file(model_path, quantized):
+        """Path of the exported float32 or int8 graph"""
+        return os.path.join(model_path, EncoderService.ONNX_DIR, "model_quantized.onnx" if quantized else "model.onnx")
+
+    @staticmethod
+    def pool(token_embeddings, attention_mask, pooling_config):
+        """
+        Pool (batch, sequence, hidden) token embeddings into sentence embeddings the way the saved
+        SentenceTransformer Pooling module does (mean by default, CLS or max when configured)
+
+        Returns:
+            np.ndarray: float32 (batch, hidden) embeddings
+        """
+        token_embeddings = np.asarray(token_embeddings, dtype=np.float32)
+        mask = attention_mask[..., None].astype(np.float32)
+        # Newer configs name the mode ("pooling_mode": "cls"), older ones set pooling_mode_<mode>_token(s) flags
+        mode = pooling_config.get("pooling_mode")
+        if mode == "cls" or pooling_config.get("pooling_mode_cls_token"):
+            return token_embeddings[:, 0]
+        if mode == "max" or pooling_config.get("pooling_mode_max_tokens"):
+            return np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        return (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    @staticmethod
+    def _read_json(model_path, name, default=None):
+        """Read a JSON config file of the saved model (default/{} when missing)"""
+        path = os.path.join(model_path, name)
+        if not os.path.exists(path):
+            return {} if default is None else default
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
@@ -0,0 +1,398 @@
+"""
+Local embedding inference server: one process holds the model and encodes for every Flask worker.
+
+Concurrent requests are coalesced into micro-batches (up to ENCODER_SERVER_MAX_BATCH texts, waiting
+at most ENCODER_SERVER_MAX_WAIT_MS for more to arrive), so N workers searching at once cost one
+transformer call instead of N. Workers talk to it over a Unix socket through RemoteSentenceEncoder,
+which EncoderService.load_model returns when ENCODER_SERVER_SOCKET is set.
+
+Run it from the backend directory (gunicorn.conf.py starts it automatically):
+    python -m routes.encoder_server [--socket /tmp/chatgpt-augmenter-encoder.sock] [--model-path my_model_dir]
+"""
+
+import os
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import argparse
+from types import SimpleNamespace
+import numpy as np
+
+
+class EncoderServerException(Exception):
+    """Custom exception for encoder server and client errors"""
+    pass
+
+
+class MicroBatcher:
+    """Coalesces concurrent encode requests into single model.encode calls on one batching thread"""
+
+    def __init__(self, model, max_batch=64, max_wait_ms=5.0):
+        """
+        Start the batching thread
+
+        Args:
+            model: SentenceTransformer or OnnxSentenceEncoder
+            max_batch (int): Texts that end a batch early
+            max_wait_ms (float): How long the first request of a batch waits for others to join it
+        """
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.stats = {"requests": 0, "texts": 0, "batches": 0}
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="encoder-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts, timeout=None):
+        """
+        Encode texts as part of the next micro-batch
+
+        Args:
+            texts (list): Texts to encode
+            timeout (float): Seconds to wait for the batch (None waits indefinitely)
+
+        Returns:
+            np.ndarray: float32 (len(texts), dim) embeddings
+
+        Raises:
+            EncoderServerException: If encoding fails or times out
+        """
+        pending = {"texts": list(texts), "done": threading.Event(), "result": None, "error": None}
+        self._requests.put(pending)
+        if not pending["done"].wait(timeout):
+            raise EncoderServerException("Timed out waiting for the encoder")
+        if pending["error"]:
+            raise EncoderServerException(pending["error"])
+        return pending["result"]
+
+    def _run(self):
+        """Take the oldest request, gather more until the batch is full or the deadline passes, encode"""
+        while True:
+            batch = [self._requests.get()]
+            count = len(batch[0]["texts"])
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                count += len(pending["texts"])
+            self._encode(batch)
+
+    def _encode(self, batch):
+        """Encode every text of the batch in one call and hand each request its rows"""
+        texts = [text for pending in batch for text in pending["texts"]]
+        try:
+            embeddings = np.asarray(self.model.encode(
+                texts, batch_size=self.max_batch, convert_to_numpy=True, show_progress_bar=False
+            ), dtype=np.float32).reshape(len(texts), -1)
+            start = 0
+            for pending in batch:
+                pending["result"] = embeddings[start:start + len(pending["texts"])]
+                start += len(pending["texts"])
+            self.stats["requests"] += len(batch)
+            self.stats["texts"] += len(texts)
+            self.stats["batches"] += 1
+        except Exception as e:
+            for pending in batch:
+                pending["error"] = f"Encoding failed: {str(e)}"
+        finally:
+            for pending in batch:
+                pending["done"].set()
+
+
+class EncoderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server with one thread per connection; all of them share one MicroBatcher"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, model, max_batch=64, max_wait_ms=5.0):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.batcher = MicroBatcher(model, max_batch, max_wait_ms)
+        self.info = {
+            "dimension": model.get_sentence_embedding_dimension(),
+            "base_model": getattr(getattr(model, "model_card_data", None), "base_model", None) or type(model).__name__
+        }
+        super().__init__(socket_path, _EncoderRequestHandler)
+
+
+class _EncoderRequestHandler(socketserver.BaseRequestHandler):
+    """Serves info and encode requests on one client connection until the client closes it"""
+
+    def handle(self):
+        while True:
+            try:
+                request, _payload = EncoderServerService.receive_message(self.request)
+            except EncoderServerException:
+                return
+
+            try:
+                if request.get("op") == "info":
+                    EncoderServerService.send_message(self.request, {**self.server.info, "stats": dict(self.server.batcher.stats)})
+                elif request.get("op") == "encode":
+                    embeddings = self.server.batcher.submit(request.get("texts") or [])
+                    EncoderServerService.send_message(self.request, {"shape": list(embeddings.shape)}, embeddings.tobytes())
+                else:
+                    EncoderServerService.send_message(self.request, {"error": f"Unknown op {request.get('op')!r}"})
+            except EncoderServerException as e:
+                EncoderServerService.send_message(self.request, {"error": str(e)})
+
+
+class RemoteSentenceEncoder:
+    """
+    SentenceTransformer stand-in that encodes through the encoder server. It implements the parts of the
+    SentenceTransformer API the services use: encode(), get_sentence_embedding_dimension() and
+    model_card_data (the server model's id, so cached embeddings stay keyed by the real model).
+    """
+
+    def __init__(self, socket_path, timeout=60.0, connect_timeout=0.0):
+        """
+        Connect to the encoder server and read the model's dimension and id
+
+        Args:
+            socket_path (str): Server's Unix socket
+            timeout (float): Seconds to wait for an encode response
+            connect_timeout (float): Seconds to keep retrying while the server starts (0 = one attempt)
+
+        Raises:
+            EncoderServerException: If the server cannot be reached
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                info = self._call({"op": "info"})[0]
+                break
+            except EncoderServerException:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+
+        self.dimension = info.get("dimension")
+        self.model_card_data = SimpleNamespace(base_model=info.get("base_model"))
+        # Connections are per process and thread; drop the one opened here so forked workers open their own
+        self._close()
+
+    def __repr__(self):
+        return f"RemoteSentenceEncoder({self.socket_path}, {self.model_card_data.base_model})"
+
+    def get_sentence_embedding_dimension(self):
+        """Size of the sentence embeddings"""
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, convert_to_numpy=True,
+               show_progress_bar=False, normalize_embeddings=False, **kwargs):
+        """
+        Encode one sentence or a list of sentences like SentenceTransformer.encode; the server batches
+        them with other workers' requests
+
+        Args:
+            sentences (str or list): Text(s) to encode
+            convert_to_tensor (bool): Return a torch tensor instead of a NumPy array
+            normalize_embeddings (bool): L2-normalize the embeddings
+
+        Returns:
+            np.ndarray or torch.Tensor: float32 embeddings, 1-D for a single sentence
+
+        Raises:
+            EncoderServerException: If the server fails or cannot be reached
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        response, payload = self._call({"op": "encode", "texts": texts})
+        embeddings = np.frombuffer(payload, dtype=np.float32).reshape(response["shape"]).copy()
+
+        if normalize_embeddings:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings)
+        return embeddings
+
+    def stats(self):
+        """Batching statistics of the server (requests, texts and batches encoded)"""
+        return self._call({"op": "info"})[0].get("stats", {})
+
+    def _call(self, request):
+        """
+        Send a request on this thread's connection and check the reply
+
+        Only failures that mean the server never got the request are retried (once): connecting
+        (refused, or the socket is missing while the server restarts) and sending on a kept
+        connection the server already closed. A timeout or a failure while waiting for the reply
+        is raised at once - resending would encode the batch a second time on a server that is
+        already busy with it.
+        """
+        for attempt in range(2):
+            reused = getattr(self._local, "connection", None) is not None and self._local.pid == os.getpid()
+            try:
+                connection = self._connection()
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                if attempt:
+                    raise EncoderServerException(f"Encoder server at {self.socket_path} unavailable: {str(e)}")
+                continue
+            except OSError as e:
+                raise EncoderServerException(f"Encoder server at {self.socket_path} unavailable: {str(e)}")
+
+            try:
+                EncoderServerService.send_message(connection, request)
+            except (BrokenPipeError, ConnectionResetError) as e:
+                self._close()
+                if attempt or not reused:
+                    raise EncoderServerException(f"Encoder server at {self.socket_path} unavailable: {str(e)}")
+                continue
+            except OSError as e:
+                self._close()
+                raise EncoderServerException(f"Encoder server at {self.socket_path} unavailable: {str(e)}")
+
+            try:
+                response, payload = EncoderServerService.receive_message(connection)
+                break
+            except socket.timeout:
+                self._close()
+                raise EncoderServerException(f"Encoder server at {self.socket_path} timed out after {self.timeout}s")
+            except (OSError, EncoderServerException) as e:
+                self._close()
+                raise EncoderServerException(f"Encoder server at {self.socket_path} unavailable: {str(e)}")
+        if response.get("error"):
+            raise EncoderServerException(response["error"])
+        return response, payload
+
+    def _connection(self):
+        """
+        This thread's connection, reopened after a fork
+
+        Raises:
+            OSError: If the server cannot be connected to
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.settimeout(self.timeout)
+            connection.connect(self.socket_path)
+        except OSError:
+            connection.close()
+            raise
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _close(self):
+        """Close this thread's connection (another process's inherited socket is only forgotten)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+
+class EncoderServerService:
+    """Settings, wire format and entry point of the encoder server"""
+
+    # Encoder server settings - loaded from environment
+    MAX_BATCH = int(os.getenv("ENCODER_SERVER_MAX_BATCH", "64"))
+    MAX_WAIT_MS = float(os.getenv("ENCODER_SERVER_MAX_WAIT_MS", "5"))
+
+    _HEADER = struct.Struct("!II")  # JSON length, payload length
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """WIRE FORMAT FUNCTIONS"""
+
+    @staticmethod
+    def send_message(connection, message, payload=b""):
+        """Send a JSON message followed by an optional binary payload"""
+        body = json.dumps(message).encode("utf-8")
+        connection.sendall(EncoderServerService._HEADER.pack(len(body), len(payload)) + body + payload)
+
+    @staticmethod
+    def receive_message(connection):
+        """
+        Receive a message sent by send_message
+
+        Returns:
+            tuple: (decoded JSON message, payload bytes)
+
+        Raises:
+            EncoderServerException: If the connection closes mid-message
+        """
+        body_length, payload_length = EncoderServerService._HEADER.unpack(
+            EncoderServerService._receive_exactly(connection, EncoderServerService._HEADER.size)
+        )
+        message = json.loads(EncoderServerService._receive_exactly(connection, body_length))
+        return message, EncoderServerService._receive_exactly(connection, payload_length)
+
+    @staticmethod
+    def _receive_exactly(connection, length):
+        """Read exactly length bytes"""
+        buffer = bytearray()
+        while len(buffer) < length:
+            chunk = connection.recv(min(length - len(buffer), 1 << 20))
+            if not chunk:
+                raise EncoderServerException("Connection closed")
+            buffer += chunk
+        return bytes(buffer)
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """SERVER FUNCTIONS"""
+
+    @staticmethod
+    def serve(socket_path, model_path, backend=None):
+        """
+        Load the model and serve encode requests until interrupted
+
+        Args:
+            socket_path (str): Unix socket to listen on
+            model_path (str): Saved SentenceTransformer directory
+            backend (str): Encoder backend, "torch" or "onnx" (defaults to ENCODER_BACKEND)
+        """
+        from routes.encoder import EncoderService
+
+        model = EncoderService.load_model(model_path, backend=backend, use_server=False)
+        with EncoderServer(socket_path, model, EncoderServerService.MAX_BATCH, EncoderServerService.MAX_WAIT_MS) as server:
+            print(
+                f"🧠 Encoder server listening on {socket_path} "
+                f"(batches of up to {EncoderServerService.MAX_BATCH} texts, {EncoderServerService.MAX_WAIT_MS} ms max wait)"
+            )
+            try:
+                server.serve_forever()
+            finally:
+                if os.path.exists(socket_path):
+                    os.remove(socket_path)
+
+
+def main():
+    """
+    Main function that starts the encoder server.
+    """
+    from routes.encoder import EncoderService
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=EncoderService.SERVER_SOCKET or EncoderService.DEFAULT_SERVER_SOCKET)
+    parser.add_argument("--model-path", default=os.path.join(os.path.dirname(__file__), '..', 'my_model_dir'))
+    parser.add_argument("--backend", default=None, help="torch or onnx (defaults to ENCODER_BACKEND)")
+    args = parser.parse_args()
+
+    try:
+        EncoderServerService.serve(args.socket, args.model_path, args.backend)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
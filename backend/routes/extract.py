@@ -1,10 +1,25 @@
 import json
 import numpy as np
-import torch
-from sentence_transformers import SentenceTransformer
 import base64
+import codecs
 import os
 from database.postgres import DatabaseService, DatabaseServiceException
+from database.embedding_codec import EmbeddingCodec
+from routes.cache import CacheService
+from routes.embedding_cache import EmbeddingCacheService
+from routes.ann_index import AnnIndexService
+from routes.metrics import MetricsService
+from routes.logging_service import LoggingService
+from routes.file_store import FileStoreService, FileStoreServiceException
+
+try:
+    import ijson
+except ImportError:
+    # ijson not installed - streamed uploads use the json.JSONDecoder fallback parser
+    ijson = None
+
+
+logger = LoggingService.get_logger("extract")
 
 
 class ExtractServiceException(Exception):
@@ -14,12 +29,27 @@ class ExtractServiceException(Exception):
 
 class ExtractService:
 
+    # Number of prompts encoded per model.encode call - loaded from environment
+    ENCODE_BATCH_SIZE = int(os.getenv("EXTRACT_ENCODE_BATCH_SIZE", "64"))
+
+    # Re-uploads only embed prompts that are not already stored - loaded from environment
+    INCREMENTAL = os.getenv("EXTRACT_INCREMENTAL", "true").lower() in ("1", "true", "yes")
+
+    # Bytes read from a streamed upload at a time - loaded from environment
+    STREAM_CHUNK_SIZE = int(os.getenv("EXTRACT_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+    # Precision embeddings are stored in: float32, float16 or int8 - loaded from environment
+    STORAGE_DTYPE = EmbeddingCodec.validate_dtype(os.getenv("EMBEDDING_STORAGE_DTYPE", "float32"))
+
+    # Smallest norm divided by in normalize_embeddings, so all-zero rows stay zero
+    _NORM_EPSILON = 1e-12
+
 
     """--------------------------------------------------------------------------------------------------------------"""
     """ROOT FUNCTION"""
 
     @staticmethod
-    def extract_service(conversations_data, user_uuid, model):
+    def extract_service(conversations_data, user_uuid, model, progress_callback=None):
         """
         Main service function for extracting and processing conversations
         
@@ -27,6 +57,7 @@ class ExtractService:
             conversations_data (list): Raw conversation data
             user_uuid (str): User's UUID
             model: SentenceTransformer model
+            progress_callback (callable): Optional progress_callback(encoded, total) for embedding progress
             
         Returns:
             dict: Processing result with database save confirmation
@@ -45,23 +76,123 @@ class ExtractService:
 
 
             # Step 1: Process conversations (similar to exportData())
-            print(f"🔄 Processing conversations for user {user_uuid[:8]}...")
-            processed_data = ExtractService.process_conversations(conversations_data, user_uuid)
+            logger.info("Processing conversations for user %s...", user_uuid[:8])
+            with MetricsService.timer("extract", "parse"):
+                processed_data = ExtractService.process_conversations(conversations_data, user_uuid)
+            
+            return ExtractService.extract_processed_service(processed_data, user_uuid, model, progress_callback=progress_callback)
+            
+        except Exception as e:
+            if isinstance(e, ExtractServiceException):
+                raise
+            raise ExtractServiceException(f"Extract service failed: {str(e)}")
+
+    @staticmethod
+    def extract_stream_service(stream, user_uuid, model, progress_callback=None):
+        """
+        Extract service for a streamed conversations.json upload (raw request body or uploaded file),
+        parsed one conversation at a time instead of as one materialized list
+        
+        Args:
+            stream: Binary file-like object containing the conversations.json array
+            user_uuid (str): User's UUID
+            model: SentenceTransformer model
+            progress_callback (callable): Optional progress_callback(encoded, total) for embedding progress
+            
+        Returns:
+            dict: Processing result with database save confirmation
+            
+        Raises:
+            ExtractServiceException: If any step fails
+        """
+        try:
+            if not model:
+                raise ExtractServiceException("Model not available for creating embeddings")
+            if not user_uuid:
+                raise ExtractServiceException("User UUID is required")
+
+            with MetricsService.timer("extract", "parse"):
+                processed_data = ExtractService.process_conversation_stream(stream, user_uuid)
+            return ExtractService.extract_processed_service(processed_data, user_uuid, model, progress_callback=progress_callback)
             
-            # Step 2: Create embeddings
-            print(f"🧠 Creating embeddings for {len(processed_data)} documents...")
-            embeddings, keys = ExtractService.create_embeddings(processed_data, model)
+        except Exception as e:
+            if isinstance(e, ExtractServiceException):
+                raise
+            raise ExtractServiceException(f"Extract service failed: {str(e)}")
+
+    @staticmethod
+    def extract_processed_service(processed_data, user_uuid, model, progress_callback=None):
+        """
+        Embed and save already processed conversation data (steps 2 and 3 of extract_service)
+        
+        Args:
+            processed_data (dict): Processed conversation data (prompt -> response)
+            user_uuid (str): User's UUID
+            model: SentenceTransformer model
+            progress_callback (callable): Optional progress_callback(encoded, total) for embedding progress
+            
+        Returns:
+            dict: Processing result with database save confirmation
+            
+        Raises:
+            ExtractServiceException: If any step fails
+        """
+        try:
+
+            if not model:
+                raise ExtractServiceException("Model not available for creating embeddings")
+            if not processed_data:
+                raise ExtractServiceException("No valid conversations found in the data. Make sure to check you uploaded the right conversations.json file")
+            if not user_uuid:
+                raise ExtractServiceException("User UUID is required")
+
+            # Step 2: Create embeddings (only for new prompts when the user already has stored data)
+            with MetricsService.timer("extract", "load_previous"):
+                previous = ExtractService.load_previous_extraction(user_uuid) if ExtractService.INCREMENTAL else None
+            changed_ordinals = None
+            with MetricsService.timer("extract", "encode"):
+                if previous:
+                    embeddings, keys, diff = ExtractService.create_incremental_embeddings(
+                        processed_data, model, previous, progress_callback=progress_callback
+                    )
+                    changed_ordinals = diff["changed_ordinals"] if previous.get("layout") == "documents" else None
+                else:
+                    logger.info("Creating embeddings for %d documents...", len(processed_data))
+                    encode_stats = {"encoded": len(processed_data), "cached": 0}
+                    embeddings, keys = ExtractService.create_embeddings(
+                        processed_data, model, progress_callback=progress_callback, stats=encode_stats
+                    )
+                    diff = {"documents_encoded": encode_stats["encoded"], "documents_cached": encode_stats["cached"], "documents_reused": 0}
+                
+                # L2-normalize once here so every search is a plain dot product
+                embeddings = ExtractService.normalize_embeddings(embeddings)
+            
+            # Large corpora get an ANN index, saved next to the embeddings
+            with MetricsService.timer("extract", "ann_build"):
+                ann_index = AnnIndexService.build_for_storage(embeddings, normalized=True)
             
             # Step 3: Save to database (mock)
-            print(f"💾 Saving to database...")
-            db_result = ExtractService.save_data(user_uuid, processed_data, keys, embeddings)
+            logger.debug("Saving to database...")
+            with MetricsService.timer("extract", "save"):
+                db_result = ExtractService.save_data(
+                    user_uuid, processed_data, keys, embeddings,
+                    changed_ordinals=changed_ordinals,
+                    embedding_meta=ExtractService.create_embedding_meta(
+                        normalized=True, model_id=EmbeddingCacheService.resolve_model_id(model)
+                    ),
+                    ann_index=ann_index
+                )
             
             return {
                 "success": True,
                 "user_uuid": user_uuid,
                 "message": f"Successfully processed {len(processed_data)} conversation segments",
                 "total_documents": len(processed_data),
+                "documents_encoded": diff["documents_encoded"],
+                "documents_cached": diff["documents_cached"],
+                "documents_reused": diff["documents_reused"],
                 "embeddings_shape": list(embeddings.shape),
+                "ann_index_built": ann_index is not None,
                 "database_result": db_result
             }
             
@@ -112,51 +243,168 @@ class ExtractService:
         docs = {}
             
         for point in conversations_data:
-            if 'mapping' not in point:
-                continue
+            ExtractService.extract_conversation_documents(point, docs)
+        
+        return docs
+
+
+    @staticmethod
+    def extract_conversation_documents(point, docs):
+        """
+        Add the prompt/response pairs of one conversation to docs
+        
+        Args:
+            point (dict): One conversation from the ChatGPT export
+            docs (dict): Prompt -> response mapping to update in place
+        """
+        if not isinstance(point, dict) or 'mapping' not in point:
+            return
+            
+        pointers = point['mapping']
+        keys = pointers.keys()
+        user = "dummy"
+        
+        for key in keys:
+            value = pointers[key]
+            if value.get('message') is not None:
+                content = value['message']['content']
+                text = ""
                 
-            pointers = point['mapping']
-            keys = pointers.keys()
-            user = "dummy"
-            
-            for key in keys:
-                value = pointers[key]
-                if value.get('message') is not None:
-                    content = value['message']['content']
-                    text = ""
-                    
-                    if 'parts' in content and content['parts']:
-                        text = str(content['parts'][0])
-                    elif 'text' in content:
-                        text = str(content['text'])
-                    
-                    if text.strip():  # Only process non-empty text
-                        role = value['message']['author']['role']
-                        if role == "user":
-                            user = text
-                        elif role != "system":
-                            # Only add to docs if the response text is non-empty
-                            if user.strip() and user != "dummy":
-                                docs[user] = text
+                if 'parts' in content and content['parts']:
+                    text = str(content['parts'][0])
+                elif 'text' in content:
+                    text = str(content['text'])
+                
+                if text.strip():  # Only process non-empty text
+                    role = value['message']['author']['role']
+                    if role == "user":
+                        user = text
+                    elif role != "system":
+                        # Only add to docs if the response text is non-empty
+                        if user.strip() and user != "dummy":
+                            docs[user] = text
+
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """STREAMED UPLOADS (conversations.json parsed one conversation at a time)"""
+
+
+    #SUBROOT FUNCTION
+    @staticmethod
+    def process_conversation_stream(stream, user_uuid):
+        """
+        Process a streamed conversations.json so only one conversation is materialized at a time
+        
+        Args:
+            stream: Binary file-like object containing the conversations.json array
+            user_uuid (str): User's UUID for identification
+            
+        Returns:
+            dict: Processed conversation data
+            
+        Raises:
+            ExtractServiceException: If the stream is not a JSON array or holds no conversations
+        """
+        logger.info("Streaming conversations for user %s...", user_uuid[:8])
+        docs = {}
+        for point in ExtractService.iter_conversations(stream):
+            ExtractService.extract_conversation_documents(point, docs)
         
+        if not docs:
+            raise ExtractServiceException("No valid conversations found in the data. Make sure to check you uploaded the right conversations.json file")
         return docs
 
+    @staticmethod
+    def iter_conversations(stream, chunk_size=None):
+        """
+        Yield the conversations of a JSON array one at a time
+        
+        Args:
+            stream: Binary file-like object containing a JSON array
+            chunk_size (int): Bytes read at a time (defaults to STREAM_CHUNK_SIZE)
+            
+        Yields:
+            dict: One conversation
+            
+        Raises:
+            ExtractServiceException: If the stream is not a valid JSON array
+        """
+        chunk_size = max(1, int(chunk_size or ExtractService.STREAM_CHUNK_SIZE))
+        if ijson is None:
+            yield from ExtractService._iter_json_array(stream, chunk_size)
+            return
+        
+        try:
+            yield from ijson.items(stream, 'item', use_float=True, buf_size=chunk_size)
+        except ijson.JSONError as e:
+            raise ExtractServiceException(f"Invalid conversations JSON: {str(e)}")
+
+    @staticmethod
+    def _iter_json_array(stream, chunk_size):
+        """Incrementally decode the elements of a JSON array with json.JSONDecoder.raw_decode"""
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        buffer = ""
+        position = 0
+        read_size = chunk_size
+        started = False
+        eof = False
+        
+        while True:
+            need_more = False
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            
+            if position == len(buffer):
+                need_more = True
+            elif not started:
+                if buffer[position] != "[":
+                    raise ExtractServiceException("Conversations data must be a list")
+                started = True
+                position += 1
+            elif buffer[position] == "]":
+                return
+            elif buffer[position] == ",":
+                position += 1
+            else:
+                try:
+                    element, position = decoder.raw_decode(buffer, position)
+                    read_size = chunk_size
+                    yield element
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise ExtractServiceException(f"Invalid conversations JSON: {str(e)}")
+                    # The element spans past the buffer - read bigger chunks so re-decoding stays cheap
+                    need_more = True
+                    read_size = min(read_size * 2, 64 * 1024 * 1024)
+            
+            if need_more:
+                if eof:
+                    raise ExtractServiceException("Invalid conversations JSON: unexpected end of data")
+                chunk = stream.read(read_size)
+                eof = not chunk
+                buffer = buffer[position:] + text_decoder.decode(chunk or b"", final=eof)
+                position = 0
+
 
     """--------------------------------------------------------------------------------------------------------------"""
     """CREATING EMBEDDINGS FOR CONVERSATIONS"""
 
     #SUBROOT FUNCTION
     @staticmethod
-    def create_embeddings(processed_data, model):
+    def create_embeddings(processed_data, model, batch_size=None, progress_callback=None, stats=None):
         """
         Create embeddings from processed conversation data
         
         Args:
             processed_data (dict): Processed conversation data
             model: SentenceTransformer model
+            batch_size (int): Prompts per encode call (defaults to ENCODE_BATCH_SIZE)
+            progress_callback (callable): Optional progress_callback(encoded, total)
+            stats (dict): Optional dict that receives the encoded/cached counts (see encode_texts)
             
         Returns:
-            torch.Tensor: Document embeddings
+            np.ndarray: float32 document embeddings
             
         Raises:
             ExtractServiceException: If embedding creation fails
@@ -165,24 +413,284 @@ class ExtractService:
         if not texts:
             raise ExtractServiceException("No text found in processed data for embedding creation")
         
-        # Create embeddings
-        embeddings = model.encode(texts, convert_to_tensor=True)
-        # Ensure embeddings are on CPU
-        embeddings = embeddings.cpu()
+        # Create embeddings batch by batch into one float32 matrix (already on CPU), skipping cached prompts
+        embeddings = ExtractService.encode_texts(texts, model, batch_size, progress_callback, stats=stats)
         
         return embeddings, texts
+
+    @staticmethod
+    def encode_texts(texts, model, batch_size=None, progress_callback=None, stats=None):
+        """
+        Encode texts, taking embeddings of previously seen texts from the persistent embedding cache
+        
+        Cached embeddings are looked up in one query before encoding and the newly encoded ones are
+        written back in one batch. Cached rows whose dimension does not match the model (written by
+        another model under the same id) are re-encoded and overwritten; the other rows are kept.
+        
+        Args:
+            texts (list): Texts to encode
+            model: SentenceTransformer model
+            batch_size (int): Texts per encode call (defaults to ENCODE_BATCH_SIZE)
+            progress_callback (callable): Optional progress_callback(encoded, total)
+            stats (dict): Optional dict that receives "encoded" (texts run through the model) and
+                "cached" (texts taken from the embedding cache)
+            
+        Returns:
+            np.ndarray: float32 embeddings in the same order as texts
+        """
+        cached = EmbeddingCacheService.lookup(texts, model)
+        missing = [index for index in range(len(texts)) if index not in cached]
+        
+        encoded = None
+        if missing:
+            missing_texts = [texts[index] for index in missing]
+            encoded = ExtractService.encode_texts_in_batches(missing_texts, model, batch_size, progress_callback)
+            EmbeddingCacheService.store(missing_texts, encoded, model)
+        
+        stale = []
+        if cached:
+            if encoded is not None:
+                dimension = encoded.shape[-1]
+            elif len({len(vector) for vector in cached.values()}) > 1:
+                # Nothing encoded yet to compare against - encode one text to learn the model's dimension
+                dimension = ExtractService.encode_texts_in_batches(texts[:1], model, 1).shape[-1]
+            else:
+                dimension = len(next(iter(cached.values())))
+            stale = sorted(index for index, vector in cached.items() if len(vector) != dimension)
+        
+        if stale:
+            # Cache rows from a different model under the same id - re-encode just those rows
+            logger.warning("Embedding cache dimension mismatch, re-encoding %d cached texts", len(stale))
+            stale_texts = [texts[index] for index in stale]
+            stale_encoded = ExtractService.encode_texts_in_batches(stale_texts, model, batch_size)
+            EmbeddingCacheService.store(stale_texts, stale_encoded, model)
+            for row, index in enumerate(stale):
+                cached[index] = stale_encoded[row]
+        
+        if stats is not None:
+            stats["encoded"] = len(missing) + len(stale)
+            stats["cached"] = len(texts) - stats["encoded"]
+        if not cached:
+            return encoded
+        
+        logger.info("Reused %d/%d embeddings from the embedding cache", len(cached) - len(stale), len(texts))
+        embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+        for index, vector in cached.items():
+            embeddings[index] = vector
+        if encoded is not None:
+            embeddings[missing] = encoded
+        if progress_callback and (stale or not missing):
+            progress_callback(len(texts), len(texts))
+        
+        return embeddings
+
+    @staticmethod
+    def encode_texts_in_batches(texts, model, batch_size=None, progress_callback=None):
+        """
+        Encode texts in fixed-size batches so peak memory is one batch plus the result matrix
+        
+        Texts are length-sorted so each batch pads to similar lengths, and every batch is
+        written straight into a preallocated float32 array at the texts' original positions.
+        
+        Args:
+            texts (list): Texts to encode
+            model: SentenceTransformer model
+            batch_size (int): Texts per encode call (defaults to ENCODE_BATCH_SIZE)
+            progress_callback (callable): Optional progress_callback(encoded, total)
+            
+        Returns:
+            np.ndarray: float32 embeddings in the same order as texts
+        """
+        batch_size = max(1, int(batch_size or ExtractService.ENCODE_BATCH_SIZE))
+        total = len(texts)
+        order = sorted(range(total), key=lambda i: len(texts[i]), reverse=True)
+        
+        embeddings = None
+        reported_decile = 0
+        for start in range(0, total, batch_size):
+            batch_indices = order[start:start + batch_size]
+            batch_embeddings = ExtractService._to_float32_array(model.encode(
+                [texts[i] for i in batch_indices],
+                batch_size=len(batch_indices),
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ))
+            
+            if embeddings is None:
+                embeddings = np.empty((total, batch_embeddings.shape[-1]), dtype=np.float32)
+            embeddings[batch_indices] = batch_embeddings
+            
+            encoded = min(start + batch_size, total)
+            if progress_callback:
+                progress_callback(encoded, total)
+            if encoded * 10 // total > reported_decile:
+                reported_decile = encoded * 10 // total
+                logger.debug("Encoded %d/%d documents", encoded, total)
+        
+        return embeddings
+
+    @staticmethod
+    def normalize_embeddings(embeddings):
+        """
+        L2-normalize each embedding row so cosine similarity becomes a dot product
+        
+        Args:
+            embeddings (np.ndarray or torch.Tensor): Document embeddings
+            
+        Returns:
+            np.ndarray: float32 embeddings with unit-length rows (all-zero rows stay zero)
+        """
+        embeddings = ExtractService._to_float32_array(embeddings)
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        return embeddings / np.maximum(norms, ExtractService._NORM_EPSILON)
+
+    @staticmethod
+    def create_embedding_meta(normalized, dtype=None, model_id=None):
+        """
+        Describe how embeddings are stored, saved alongside embedding_shape
+        
+        Args:
+            normalized (bool): Whether rows were L2-normalized before saving
+            dtype (str): Storage dtype (defaults to STORAGE_DTYPE)
+            model_id (str): Encoder that produced the rows (EmbeddingCacheService.resolve_model_id)
+            
+        Returns:
+            dict: Embedding metadata
+        """
+        embedding_meta = {"normalized": bool(normalized), "dtype": EmbeddingCodec.validate_dtype(dtype or ExtractService.STORAGE_DTYPE)}
+        if model_id:
+            embedding_meta["model_id"] = model_id
+        return embedding_meta
+
+    @staticmethod
+    def _to_float32_array(batch_embeddings):
+        """Convert an encode() result (numpy array or tensor) to a 2-D float32 numpy array"""
+        if hasattr(batch_embeddings, 'cpu'):
+            batch_embeddings = batch_embeddings.cpu().numpy()
+        return np.asarray(batch_embeddings, dtype=np.float32).reshape(-1, np.shape(batch_embeddings)[-1])
             
         
 
 
 
+    """--------------------------------------------------------------------------------------------------------------"""
+    """INCREMENTAL RE-EXTRACT (only embed what changed since the last upload)"""
+
+    @staticmethod
+    def load_previous_extraction(user_uuid):
+        """
+        Load the stored key order, content hashes and embeddings of a user's last upload
+        
+        Args:
+            user_uuid (str): User's UUID
+            
+        Returns:
+            dict or None: Content index from DatabaseService.load_content_index, or from
+            FileStoreService.load_content_index when the database has none or is unavailable; None if
+            the user has no stored data in either (a full extract is done instead)
+        """
+        try:
+            return DatabaseService.load_content_index(user_uuid)
+        except DatabaseServiceException as db_error:
+            try:
+                return FileStoreService.load_content_index(user_uuid)
+            except FileStoreServiceException as file_error:
+                logger.debug("No previous upload to diff against for user %s (%s; %s), embedding everything", user_uuid[:8], db_error, file_error)
+                return None
+
+    @staticmethod
+    def create_incremental_embeddings(processed_data, model, previous, progress_callback=None):
+        """
+        Create embeddings by reusing stored rows for prompts that were already embedded
+        
+        Previously stored keys keep their relative order and new keys are appended, so a re-upload
+        that only adds conversations changes only the rows at the end. Embeddings depend on the
+        prompt alone, so a prompt whose response changed keeps its embedding but its row is still
+        reported as changed. Stored rows are only reused when they were written by the same encoder
+        (model_id in embedding_meta, the id the embedding cache is keyed on); vectors of another model,
+        backend or quantization are never mixed in, even at the same dimension.
+        
+        Args:
+            processed_data (dict): Processed conversation data
+            model: SentenceTransformer model
+            previous (dict): Content index of the last upload (see load_previous_extraction)
+            progress_callback (callable): Optional progress_callback(encoded, total)
+            
+        Returns:
+            tuple: (float32 embeddings array, ordered keys, diff dict with changed_ordinals,
+            documents_encoded, documents_cached and documents_reused)
+            
+        Raises:
+            ExtractServiceException: If embedding creation fails
+        """
+        if not processed_data:
+            raise ExtractServiceException("No text found in processed data for embedding creation")
+        
+        previous_keys = list(previous.get("key_order") or [])
+        previous_hashes = list(previous.get("content_hashes") or [])
+        previous_embeddings = None
+        if previous.get("embeddings") and previous.get("embedding_shape"):
+            previous_embeddings = EmbeddingCodec.decode(
+                previous["embeddings"], previous["embedding_shape"],
+                EmbeddingCodec.dtype_from_meta(previous.get("embedding_meta"))
+            )
+        if previous_embeddings is None or len(previous_embeddings) != len(previous_keys):
+            # Stored data is unusable for reuse - fall back to a full encode
+            previous_keys, previous_hashes, previous_embeddings = [], [], None
+        elif (previous.get("embedding_meta") or {}).get("model_id") != EmbeddingCacheService.resolve_model_id(model):
+            # Written by another encoder (or before the encoder was recorded) - the vectors are not comparable
+            logger.info("Stored embeddings come from a different encoder, re-encoding all documents...")
+            previous_keys, previous_hashes, previous_embeddings = [], [], None
+        
+        previous_rows = {key: row for row, key in enumerate(previous_keys)}
+        keys = [key for key in previous_keys if key in processed_data]
+        keys += [key for key in processed_data if key not in previous_rows]
+        new_texts = [key for key in keys if key not in previous_rows]
+        
+        logger.info("Creating embeddings for %d new documents (%d reused)...", len(new_texts), len(keys) - len(new_texts))
+        new_embeddings = None
+        encode_stats = {"encoded": 0, "cached": 0}
+        if new_texts:
+            new_embeddings = ExtractService.encode_texts(new_texts, model, progress_callback=progress_callback, stats=encode_stats)
+            if previous_embeddings is not None and new_embeddings.shape[-1] != previous_embeddings.shape[-1]:
+                # The model changed since the last upload - stored vectors are not comparable
+                logger.warning("Embedding dimension changed, re-encoding all %d documents...", len(keys))
+                previous_rows, previous_embeddings = {}, None
+                new_texts = keys
+                new_embeddings = ExtractService.encode_texts(keys, model, progress_callback=progress_callback, stats=encode_stats)
+        
+        dimension = new_embeddings.shape[-1] if new_embeddings is not None else previous_embeddings.shape[-1]
+        embeddings = np.empty((len(keys), dimension), dtype=np.float32)
+        new_rows = iter(range(len(new_texts)))
+        for ordinal, key in enumerate(keys):
+            if key in previous_rows:
+                embeddings[ordinal] = previous_embeddings[previous_rows[key]]
+            else:
+                embeddings[ordinal] = new_embeddings[next(new_rows)]
+        
+        changed_ordinals = [
+            ordinal for ordinal, key in enumerate(keys)
+            if ordinal >= len(previous_keys)
+            or previous_keys[ordinal] != key
+            or ordinal >= len(previous_hashes)
+            or previous_hashes[ordinal] != DatabaseService.compute_content_hash(key, processed_data[key])
+        ]
+        
+        return embeddings, keys, {
+            "changed_ordinals": changed_ordinals,
+            "documents_encoded": encode_stats["encoded"],
+            "documents_cached": encode_stats["cached"],
+            "documents_reused": len(keys) - len(new_texts)
+        }
+
+
     """--------------------------------------------------------------------------------------------------------------"""
     """SAVE ALL DATA TO DATABASE"""
 
 
     #SUBROOT FUNCTION
     @staticmethod
-    def save_data(user_uuid, processed_data, keys, embeddings):
+    def save_data(user_uuid, processed_data, keys, embeddings, changed_ordinals=None, embedding_meta=None, ann_index=None):
         """
         Save data to database with fallback to file storage
         
@@ -191,6 +699,9 @@ class ExtractService:
             processed_data (dict): Processed conversation data
             keys (list): Ordered list of document keys
             embeddings (torch.Tensor): Document embeddings
+            changed_ordinals (list): Ordinals that differ from the stored documents (None for a full write)
+            embedding_meta (dict): Embedding metadata from create_embedding_meta (None for legacy data)
+            ann_index (bytes): Serialized ANN index from AnnIndexService (None for exact search only)
             
         Returns:
             dict: Save operation result
@@ -203,32 +714,44 @@ class ExtractService:
         if embeddings is None:
             raise ExtractServiceException("Embeddings are required for saving")
         
-        # Try database save first
-        try:
-            return ExtractService.save_data_to_database(user_uuid, processed_data, keys, embeddings)
-        except (ImportError, ExtractServiceException) as db_error:
-            print(f"Database save failed, falling back to file: {db_error}")
-        
-        # Fallback to file save
         try:
-            return ExtractService.save_data_to_file(user_uuid, processed_data, keys, embeddings)
-        except Exception as file_error:
-            raise ExtractServiceException(f"Both database and file save failed. File error: {str(file_error)}")
+            # Try database save first
+            try:
+                return ExtractService.save_data_to_database(
+                    user_uuid, processed_data, keys, embeddings,
+                    changed_ordinals=changed_ordinals, embedding_meta=embedding_meta, ann_index=ann_index
+                )
+            except (ImportError, ExtractServiceException) as db_error:
+                logger.warning("Database save failed, falling back to file: %s", db_error)
+            
+            # Fallback to file save
+            try:
+                return ExtractService.save_data_to_file(
+                    user_uuid, processed_data, keys, embeddings, embedding_meta=embedding_meta, ann_index=ann_index
+                )
+            except Exception as file_error:
+                raise ExtractServiceException(f"Both database and file save failed. File error: {str(file_error)}")
+        finally:
+            # Stored data changed (or may have), so searches must reload it
+            CacheService.invalidate(user_uuid)
 
 
 
     @staticmethod
-    def save_data_to_database(user_uuid, processed_data, keys, embeddings):
+    def save_data_to_database(user_uuid, processed_data, keys, embeddings, changed_ordinals=None, embedding_meta=None, ann_index=None):
                    
         try:
             # Convert embeddings tensor to bytes for PostgreSQL
-            embeddings_bytes = ExtractService.convert_tensor_to_bytes(embeddings)
+            embeddings_bytes = ExtractService.convert_tensor_to_bytes(embeddings, EmbeddingCodec.dtype_from_meta(embedding_meta))
             # Get embedding shape for reconstruction
             embedding_shape = ExtractService.create_embedding_shape(embeddings)
 
             key_order = keys  # Explicit key ordering
 
-            db_result = DatabaseService.execute_save_query(user_uuid, processed_data, key_order, embeddings_bytes, embedding_shape)
+            db_result = DatabaseService.execute_save_query(
+                user_uuid, processed_data, key_order, embeddings_bytes, embedding_shape,
+                changed_ordinals=changed_ordinals, embedding_meta=embedding_meta, ann_index=ann_index
+            )
             return {
                 "success": True,
                 "user_uuid": user_uuid,
@@ -245,12 +768,13 @@ class ExtractService:
             raise ExtractServiceException(f"Unknown error for database upload: {str(e)}")
 
     @staticmethod
-    def convert_tensor_to_bytes(embeddings):
+    def convert_tensor_to_bytes(embeddings, dtype="float32"):
         """
-        Convert tensor to bytes for lossless storage
+        Convert tensor to bytes for storage (lossless for float32, quantized for float16/int8)
         
         Args:
             embeddings (torch.Tensor): Embeddings tensor
+            dtype (str): Storage dtype (see EmbeddingCodec)
             
         Returns:
             bytes: Binary representation of embeddings
@@ -259,9 +783,7 @@ class ExtractService:
             ExtractServiceException: If tensor conversion fails
         """
             
-        embeddings_np = embeddings.cpu().numpy() if hasattr(embeddings, 'cpu') else embeddings
-        embeddings_bytes = embeddings_np.tobytes()
-        return embeddings_bytes
+        return EmbeddingCodec.encode(embeddings, dtype)
         
     
     @staticmethod
@@ -285,15 +807,17 @@ class ExtractService:
 
     
     @staticmethod
-    def save_data_to_file(user_uuid, processed_data, keys, embeddings):
+    def save_data_to_file(user_uuid, processed_data, keys, embeddings, embedding_meta=None, ann_index=None):
         """
-        Save data to JSON file with base64 encoded embeddings
+        Save data to the file store (memory-mapped embeddings and packed documents, see FileStoreService)
         
         Args:
             user_uuid (str): User's UUID
             processed_data (dict): Processed conversation data
             keys (list): Ordered list of document keys
             embeddings (torch.Tensor): Document embeddings
+            embedding_meta (dict): Embedding metadata from create_embedding_meta (None for legacy data)
+            ann_index (bytes): Serialized ANN index (None for exact search only)
             
         Returns:
             dict: Save operation result
@@ -302,23 +826,14 @@ class ExtractService:
             ExtractServiceException: If file save fails
         """
         try:
-            # Convert embeddings to base64 for JSON storage
-            embeddings_b64 = ExtractService.convert_tensor_to_base64(embeddings)
-            user_data = {
-                user_uuid: {
-                    "embeddings": embeddings_b64,
-                    "processed_data": processed_data,
-                    "key_order": keys  # Preserve key ordering like database storage
-                }
-            }
-            file_path = os.path.join(os.path.dirname(__file__), '..', 'data/conversations', f'{user_uuid}userData.json')
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            file_path = FileStoreService.save(
+                user_uuid, keys, processed_data, embeddings, embedding_meta=embedding_meta, ann_index=ann_index
+            )
             
-            # Save to JSON file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, indent=2, ensure_ascii=False)
+            # A userData.json written by an older version would otherwise outlive this upload
+            legacy_path = os.path.join(os.path.dirname(__file__), '..', 'data/conversations', f'{user_uuid}userData.json')
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
 
             return {
                 "success": True,
@@ -326,20 +841,20 @@ class ExtractService:
                 "file_path": file_path,
                 "total_documents": len(processed_data)
             }
-        except ExtractServiceException:
-            # Re-raise tensor conversion errors
-            raise
+        except FileStoreServiceException as e:
+            raise ExtractServiceException(str(e))
         except Exception as e:
             raise ExtractServiceException(f"Failed to save data to file: {str(e)}")
 
 
     @staticmethod
-    def convert_tensor_to_base64(embeddings):
+    def convert_tensor_to_base64(embeddings, dtype="float32"):
         """
         Convert tensor to base64 for JSON storage compatibility
         
         Args:
             embeddings (torch.Tensor): Embeddings tensor
+            dtype (str): Storage dtype (see EmbeddingCodec)
             
         Returns:
             str: Base64 encoded embeddings
@@ -348,8 +863,7 @@ class ExtractService:
             ExtractServiceException: If tensor conversion fails
         """
         
-        embeddings_np = embeddings.cpu().numpy() if hasattr(embeddings, 'cpu') else embeddings
-        embeddings_bytes = embeddings_np.tobytes()
+        embeddings_bytes = EmbeddingCodec.encode(embeddings, dtype)
         embeddings_b64 = base64.b64encode(embeddings_bytes).decode('utf-8')
         return embeddings_b64
         
@@ -0,0 +1,335 @@
+import os
+import json
+import shutil
+import uuid as uuid_lib
+import numpy as np
+from database.embedding_codec import EmbeddingCodec
+from database.document_codec import DocumentCodec, DocumentCodecException
+from database.postgres import DatabaseService
+
+
+class FileStoreServiceException(Exception):
+    """Custom exception for file store errors"""
+    pass
+
+
+class FileStoreNotFoundException(FileStoreServiceException):
+    """The user has no data in the file store"""
+    pass
+
+
+class FileStoreService:
+    """
+    On-disk storage used when Postgres is unavailable: one directory per upload holding
+
+    - embeddings.bin: the stored embedding matrix (EmbeddingCodec layout of embedding_meta["dtype"])
+    - documents.bin / documents.idx: prompts and responses packed by DocumentCodec
+    - ann_index.bin: the serialized ANN index (only for corpora that have one)
+    - content_index.json: key order and content hashes, read only by incremental extract
+    - meta.json: document count, embedding shape and embedding_meta (written last)
+
+    Each upload is written to its own directory under VERSIONS_DIR and the user's entry in DIR is a
+    symlink to it, swapped atomically with os.replace, so the user's data is never missing while an
+    upload replaces it.
+
+    Search memory-maps the binary files, so loading a user reads no JSON besides meta.json and
+    decodes only the top-k documents; float32 embeddings are used straight from the page cache
+    (shared by every worker) without being copied.
+    """
+
+    # File store settings - loaded from environment
+    DIR = os.getenv("FILE_STORE_DIR", "") or os.path.join(os.path.dirname(__file__), '..', 'data', 'conversations')
+
+    VERSION = 1
+    VERSIONS_DIR = ".versions"
+    META_FILE = "meta.json"
+    EMBEDDINGS_FILE = "embeddings.bin"
+    DOCUMENTS_FILE = "documents.bin"
+    OFFSETS_FILE = "documents.idx"
+    ANN_INDEX_FILE = "ann_index.bin"
+    CONTENT_INDEX_FILE = "content_index.json"
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """SAVE FUNCTIONS (used by routes/extract.py)"""
+
+    @staticmethod
+    def save(user_uuid, keys, processed_data, embeddings, embedding_meta=None, ann_index=None):
+        """
+        Write a user's documents and embeddings, replacing any earlier upload
+
+        The files are written to a new version directory, then the user's symlink is pointed at it
+        in one os.replace, so searches never map a half-written upload and never find the user
+        missing. The previous version directory is removed afterwards (searches that already mapped
+        its files keep reading them).
+
+        Args:
+            user_uuid (str): User's UUID
+            keys (list): Prompts in embedding-row order
+            processed_data (dict): Prompt -> response
+            embeddings (torch.Tensor or np.ndarray): (rows, dim) document embeddings
+            embedding_meta (dict): Embedding metadata (its "dtype" selects the stored precision)
+            ann_index (bytes): Serialized ANN index (None for exact search only)
+
+        Returns:
+            str: The user's directory (the symlink)
+
+        Raises:
+            FileStoreServiceException: If the files cannot be written
+        """
+        user_dir = FileStoreService.user_dir(user_uuid)
+        version_name = os.path.join(FileStoreService.VERSIONS_DIR, f"{user_uuid}.{uuid_lib.uuid4().hex}")
+        version_dir = os.path.join(FileStoreService.DIR, version_name)
+        temp_link = f"{user_dir}.link-{uuid_lib.uuid4().hex}"
+        try:
+            blob, offsets = DocumentCodec.pack(keys, processed_data)
+            embeddings_bytes = EmbeddingCodec.encode(embeddings, EmbeddingCodec.dtype_from_meta(embedding_meta))
+            embedding_shape = [int(size) for size in embeddings.shape]
+            if embedding_shape[0] != len(keys):
+                raise FileStoreServiceException(f"{embedding_shape[0]} embedding rows for {len(keys)} documents")
+
+            os.makedirs(version_dir)
+            files = {
+                FileStoreService.EMBEDDINGS_FILE: embeddings_bytes,
+                FileStoreService.DOCUMENTS_FILE: blob,
+                FileStoreService.OFFSETS_FILE: offsets
+            }
+            if ann_index:
+                files[FileStoreService.ANN_INDEX_FILE] = ann_index
+            files[FileStoreService.CONTENT_INDEX_FILE] = json.dumps({
+                "key_order": list(keys),
+                "content_hashes": [DatabaseService.compute_content_hash(key, processed_data[key]) for key in keys]
+            }, ensure_ascii=False).encode('utf-8')
+            for name, content in files.items():
+                with open(os.path.join(version_dir, name), 'wb') as f:
+                    f.write(content)
+            with open(os.path.join(version_dir, FileStoreService.META_FILE), 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": FileStoreService.VERSION,
+                    "document_count": len(keys),
+                    "embedding_shape": embedding_shape,
+                    "embedding_meta": embedding_meta or {}
+                }, f)
+
+            previous_dir = FileStoreService._version_dir(user_dir)
+            if previous_dir is None and os.path.isdir(user_dir):
+                # Directory written before uploads were versioned - a symlink cannot replace it in place
+                previous_dir = f"{version_dir}.legacy"
+                os.rename(user_dir, previous_dir)
+            os.symlink(version_name, temp_link)
+            os.replace(temp_link, user_dir)
+            if previous_dir is not None:
+                shutil.rmtree(previous_dir, ignore_errors=True)
+            return user_dir
+
+        except (OSError, DocumentCodecException) as e:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            if os.path.lexists(temp_link):
+                os.remove(temp_link)
+            raise FileStoreServiceException(f"Failed to write file store for user: {str(e)}")
+
+    @staticmethod
+    def _version_dir(user_dir):
+        """Version directory a user's symlink points at (None for a missing user or an unversioned directory)"""
+        try:
+            return os.path.join(FileStoreService.DIR, os.readlink(user_dir))
+        except OSError:
+            return None
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """LOAD FUNCTIONS (used by routes/search.py)"""
+
+    @staticmethod
+    def load(user_uuid):
+        """
+        Map a user's stored files
+
+        Args:
+            user_uuid (str): User's UUID
+
+        Returns:
+            dict: embeddings (buffer in the EmbeddingCodec layout), embedding_shape, embedding_meta,
+            ann_index (bytes or None), document_count, documents (PackedDocuments) and version
+
+        Raises:
+            FileStoreNotFoundException: If the user has no data in the file store
+            FileStoreServiceException: If the files are unreadable or inconsistent
+        """
+        user_dir = FileStoreService.user_dir(user_uuid)
+        try:
+            return FileStoreService._load_version(user_uuid, user_dir)
+        except FileNotFoundError:
+            # A save swapped the link and removed the version being read - read the new one instead
+            if FileStoreService.current_version(user_uuid) is None:
+                raise FileStoreNotFoundException(f"Data for user UUID {user_uuid} not found in the file store")
+            try:
+                return FileStoreService._load_version(user_uuid, user_dir)
+            except OSError as retry_error:
+                raise FileStoreServiceException(f"Failed to load file store for user: {str(retry_error)}")
+
+    @staticmethod
+    def _load_version(user_uuid, user_dir):
+        """
+        Map every file of the version the user's symlink points at (see load)
+
+        Raises:
+            FileNotFoundError: If the version directory disappeared while being read
+            FileStoreNotFoundException: If the user has no data in the file store
+            FileStoreServiceException: If the files are unreadable or inconsistent
+        """
+        version_dir = FileStoreService._version_dir(user_dir)
+        if version_dir is not None:
+            # Read every file from this version, even if a save swaps the link meanwhile
+            user_dir, version = version_dir, os.path.basename(version_dir)
+        else:
+            version = FileStoreService.current_version(user_uuid)
+            if version is None:
+                raise FileStoreNotFoundException(f"Data for user UUID {user_uuid} not found in the file store")
+
+        try:
+            with open(os.path.join(user_dir, FileStoreService.META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") != FileStoreService.VERSION:
+                raise FileStoreServiceException(f"Unsupported file store version {meta.get('version')}")
+
+            ann_path = os.path.join(user_dir, FileStoreService.ANN_INDEX_FILE)
+            ann_index = None
+            if os.path.isfile(ann_path):
+                with open(ann_path, 'rb') as f:
+                    ann_index = f.read()
+
+            documents = DocumentCodec.open(
+                FileStoreService._map(os.path.join(user_dir, FileStoreService.DOCUMENTS_FILE)),
+                FileStoreService._map(os.path.join(user_dir, FileStoreService.OFFSETS_FILE))
+            )
+            if len(documents) != meta["document_count"]:
+                raise FileStoreServiceException("Document index does not match meta.json")
+
+            return {
+                "embeddings": FileStoreService._map(os.path.join(user_dir, FileStoreService.EMBEDDINGS_FILE)),
+                "embedding_shape": tuple(meta["embedding_shape"]),
+                "embedding_meta": meta.get("embedding_meta") or {},
+                "ann_index": ann_index,
+                "document_count": meta["document_count"],
+                "documents": documents,
+                "version": version
+            }
+
+        except (FileStoreServiceException, FileNotFoundError):
+            raise
+        except (OSError, ValueError, KeyError, DocumentCodecException) as e:
+            raise FileStoreServiceException(f"Failed to load file store for user: {str(e)}")
+
+    @staticmethod
+    def load_content_index(user_uuid):
+        """
+        Load what incremental extract diffs a re-upload against (the file store counterpart of
+        DatabaseService.load_content_index)
+
+        Uploads written before content_index.json existed get their keys and hashes from the packed
+        documents instead.
+
+        Args:
+            user_uuid (str): User's UUID
+
+        Returns:
+            dict: key_order, content_hashes, embeddings (bytes), embedding_shape, embedding_meta and
+            layout ("files": every save rewrites the whole upload)
+
+        Raises:
+            FileStoreNotFoundException: If the user has no data in the file store
+            FileStoreServiceException: If the files are unreadable or inconsistent
+        """
+        stored = FileStoreService.load(user_uuid)
+        if isinstance(stored["version"], str):
+            version_dir = os.path.join(FileStoreService.DIR, FileStoreService.VERSIONS_DIR, stored["version"])
+        else:
+            version_dir = FileStoreService.user_dir(user_uuid)
+        try:
+            # Read from the loaded version; if a save removed it meanwhile, the mapped documents still work
+            with open(os.path.join(version_dir, FileStoreService.CONTENT_INDEX_FILE), 'r', encoding='utf-8') as f:
+                content_index = json.load(f)
+            key_order, content_hashes = content_index["key_order"], content_index["content_hashes"]
+        except FileNotFoundError:
+            key_order, data = stored["documents"].to_dict()
+            content_hashes = [DatabaseService.compute_content_hash(key, data[key]) for key in key_order]
+        except (OSError, ValueError, KeyError) as e:
+            raise FileStoreServiceException(f"Failed to load content index for user: {str(e)}")
+
+        if len(key_order) != stored["document_count"] or len(content_hashes) != len(key_order):
+            raise FileStoreServiceException("Content index does not match meta.json")
+
+        return {
+            "key_order": key_order,
+            "content_hashes": content_hashes,
+            "embeddings": bytes(stored["embeddings"]),
+            "embedding_shape": stored["embedding_shape"],
+            "embedding_meta": stored["embedding_meta"],
+            "layout": "files"
+        }
+
+    @staticmethod
+    def current_version(user_uuid):
+        """
+        Identify the user's current upload without loading it (every save writes a new version directory)
+
+        Args:
+            user_uuid (str): User's UUID
+
+        Returns:
+            str or tuple or None: Name of the version directory the user's symlink points at ((inode,
+            mtime in ns) of meta.json for an unversioned directory), None if the user has no data in
+            the file store
+        """
+        user_dir = FileStoreService.user_dir(user_uuid)
+        version_dir = FileStoreService._version_dir(user_dir)
+        if version_dir is not None:
+            return os.path.basename(version_dir) if os.path.isdir(version_dir) else None
+        try:
+            stat = os.stat(os.path.join(user_dir, FileStoreService.META_FILE))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    @staticmethod
+    def _map(path):
+        """Read-only memory map of a whole file (an empty buffer for an empty file, which cannot be mapped)"""
+        if os.path.getsize(path) == 0:
+            return b""
+        return np.memmap(path, dtype=np.uint8, mode='r')
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """MAINTENANCE FUNCTIONS (used by routes/delete.py)"""
+
+    @staticmethod
+    def delete(user_uuid):
+        """
+        Remove a user's symlink and the version directory it points at
+
+        Args:
+            user_uuid (str): User's UUID
+
+        Returns:
+            bool: True if the user had data in the file store
+        """
+        user_dir = FileStoreService.user_dir(user_uuid)
+        version_dir = FileStoreService._version_dir(user_dir)
+        if version_dir is not None:
+            os.remove(user_dir)
+            shutil.rmtree(version_dir, ignore_errors=True)
+            return True
+        if not os.path.isdir(user_dir):
+            return False
+        shutil.rmtree(user_dir)
+        return True
+
+    @staticmethod
+    def user_dir(user_uuid):
+        """
+        Directory holding one user's files
+
+        Raises:
+            FileStoreServiceException: If the UUID could escape the store directory
+        """
+        if not user_uuid or os.path.basename(user_uuid) != user_uuid or user_uuid in (".", "..", FileStoreService.VERSIONS_DIR):
+            raise FileStoreServiceException("Invalid user UUID for the file store")
+        return os.path.join(FileStoreService.DIR, user_uuid)
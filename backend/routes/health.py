@@ -1,5 +1,7 @@
 
 from routes.search import SearchService, SearchServiceException
+from routes.embedding_cache import EmbeddingCacheService
+from routes.cache import CacheService, QueryEmbeddingCacheService
 
 
 
@@ -55,17 +57,22 @@ class HealthService:
             doc_embeddings = data_dict['doc_embeddings']
             keys = data_dict['keys']
 
+            # Normalized storage keeps documents in the database and only reports a count
+            lazy_documents = data_dict.get('fetch_documents') is not None
+
             model_loaded = model is not None
-            data_loaded = data is not None
+            data_loaded = data is not None or lazy_documents
             embeddings_loaded = doc_embeddings is not None
-            keys_available = keys is not None and len(keys) > 0
+            if lazy_documents:
+                total_documents = data_dict.get('document_count') or 0
+            else:
+                # Get document count safely
+                total_documents = len(keys) if keys else 0
+            keys_available = total_documents > 0
             
             # Determine overall health status
             is_healthy = all([model_loaded, data_loaded, embeddings_loaded, keys_available])
             
-            # Get document count safely
-            total_documents = len(keys) if keys else 0
-            
             return {
                 "uuid" : uuid,
                 "status": "healthy" if is_healthy else "not_ready",
@@ -74,7 +81,10 @@ class HealthService:
                 "embeddings_loaded": embeddings_loaded,
                 "keys_available": keys_available,
                 "total_documents": total_documents,
-                "ready_for_search": is_healthy
+                "ready_for_search": is_healthy,
+                "embedding_cache": EmbeddingCacheService.stats(),
+                "user_cache": CacheService.stats(),
+                "query_cache": QueryEmbeddingCacheService.stats()
             }
             
         except Exception as e:
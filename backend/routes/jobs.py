@@ -0,0 +1,318 @@
+import os
+import json
+import threading
+import contextvars
+import time
+import uuid as uuid_lib
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from routes.extract import ExtractService, ExtractServiceException
+from routes.cache import CacheService
+from routes.logging_service import LoggingService
+
+logger = LoggingService.get_logger("jobs")
+
+
+class JobServiceException(Exception):
+    """Custom exception for job service errors"""
+    pass
+
+
+# Model used by extract jobs inside a process-pool worker (loaded once per worker process)
+_worker_model = None
+
+
+class JobService:
+    """
+    Background worker pool for /extract jobs with job status tracking
+
+    Jobs run in the process that accepted them. With EXTRACT_JOB_DIR set, every status change is also
+    written to {EXTRACT_JOB_DIR}/{job_id}.json, so /extract/status answers from whichever gunicorn
+    worker the poll lands on (gunicorn.conf.py sets it when it starts several workers). The file is
+    written outside the job lock from a snapshot, and progress-only updates at most every
+    PROGRESS_PERSIST_INTERVAL_MS.
+    """
+
+    # Job pool settings - loaded from environment
+    EXECUTOR_TYPE = os.getenv("EXTRACT_JOB_EXECUTOR", "thread").lower()  # "thread" or "process"
+    MAX_WORKERS = int(os.getenv("EXTRACT_JOB_WORKERS", "1"))
+    MAX_FINISHED_JOBS = int(os.getenv("EXTRACT_JOB_HISTORY", "100"))
+    DIR = os.getenv("EXTRACT_JOB_DIR", "")
+    PROGRESS_PERSIST_INTERVAL_MS = int(os.getenv("EXTRACT_JOB_PROGRESS_INTERVAL_MS", "1000"))
+
+    _jobs = OrderedDict()
+    _lock = threading.Lock()
+    _executor = None
+
+    # job_id -> (monotonic time, sequence) of the last status snapshot taken for the file (guarded by _lock)
+    _persist_snapshots = {}
+    # job_id -> sequence of the status on disk, so an older snapshot never overwrites a newer one
+    _persist_lock = threading.Lock()
+    _persisted_sequences = {}
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """JOB SUBMISSION AND STATUS FUNCTIONS"""
+
+    @staticmethod
+    def submit_extract_job(conversations_data, user_uuid, model, model_path=None, processed_data=None):
+        """
+        Queue an extract job and return immediately
+
+        Args:
+            conversations_data (list): Raw conversation data (None when processed_data is given)
+            user_uuid (str): User's UUID
+            model: SentenceTransformer model (used by thread workers)
+            model_path (str): Model directory loaded by process workers
+            processed_data (dict): Already processed conversation data (e.g. from a streamed upload,
+                which has to be read before the request ends); the job then only embeds and saves
+
+        Returns:
+            dict: Initial job status including the job_id
+
+        Raises:
+            JobServiceException: If the job cannot be queued
+        """
+        if not user_uuid:
+            raise JobServiceException("User UUID is required")
+
+        job_id = uuid_lib.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "user_uuid": user_uuid,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": {"encoded": 0, "total": 0},
+            "result": None,
+            "error": None
+        }
+
+        with JobService._lock:
+            JobService._jobs[job_id] = job
+            snapshot = JobService._snapshot_for_persist(job)
+            JobService._prune_finished_jobs()
+        JobService._persist_job(snapshot)
+
+        try:
+            if JobService.EXECUTOR_TYPE == "process":
+                # Process workers cannot report progress back, so the job stays "queued" until it finishes
+                executor = JobService._get_executor(model_path)
+                future = executor.submit(_run_extract_in_process, conversations_data, user_uuid, processed_data)
+                future.add_done_callback(lambda f: JobService._finish_process_job(job_id, user_uuid, f))
+            else:
+                executor = JobService._get_executor(model_path)
+                # Run in a copy of the request's context so the job's log records keep its request id
+                executor.submit(
+                    contextvars.copy_context().run,
+                    JobService._run_extract_job, job_id, conversations_data, user_uuid, model, processed_data
+                )
+        except Exception as e:
+            JobService._update_job(job_id, status="failed", error=f"Failed to queue extract job: {str(e)}", finished_at=time.time())
+            raise JobServiceException(f"Failed to queue extract job: {str(e)}")
+
+        return JobService.get_job_status(job_id)
+
+    @staticmethod
+    def get_job_status(job_id):
+        """
+        Get the status of an extract job
+
+        Args:
+            job_id (str): Job ID returned by submit_extract_job
+
+        Returns:
+            dict: Job status (queued, running, completed or failed) with result or error
+
+        Raises:
+            JobServiceException: If the job ID is unknown (to this process and, with EXTRACT_JOB_DIR, to every worker)
+        """
+        with JobService._lock:
+            job = JobService._jobs.get(job_id)
+            if job is not None:
+                return JobService._copy_job(job)
+
+        # Accepted by another worker
+        status = JobService._load_persisted_job(job_id)
+        if status is None:
+            raise JobServiceException(f"Extract job {job_id} not found")
+        return status
+
+    @staticmethod
+    def shutdown(wait=True):
+        """Stop the worker pool (a new one is created on the next submission)"""
+        with JobService._lock:
+            executor = JobService._executor
+            JobService._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """WORKER FUNCTIONS"""
+
+    @staticmethod
+    def _run_extract_job(job_id, conversations_data, user_uuid, model, processed_data=None):
+        """Run one extract job on a worker thread, recording progress and outcome"""
+        JobService._update_job(job_id, status="running", started_at=time.time())
+
+        def report_progress(encoded, total):
+            JobService._update_job(job_id, progress={"encoded": encoded, "total": total})
+
+        try:
+            if processed_data is not None:
+                result = ExtractService.extract_processed_service(processed_data, user_uuid, model, progress_callback=report_progress)
+            else:
+                result = ExtractService.extract_service(conversations_data, user_uuid, model, progress_callback=report_progress)
+            JobService._update_job(job_id, status="completed", result=result, finished_at=time.time())
+        except ExtractServiceException as e:
+            JobService._update_job(job_id, status="failed", error=str(e), finished_at=time.time())
+        except Exception as e:
+            JobService._update_job(job_id, status="failed", error=f"Server error: {str(e)}", finished_at=time.time())
+
+    @staticmethod
+    def _finish_process_job(job_id, user_uuid, future):
+        """Record the outcome of a job that ran in a process worker"""
+        # The save happened in another process, so drop this process's cached copy of the user
+        CacheService.invalidate(user_uuid)
+
+        try:
+            result = future.result()
+            JobService._update_job(job_id, status="completed", result=result, finished_at=time.time())
+        except ExtractServiceException as e:
+            JobService._update_job(job_id, status="failed", error=str(e), finished_at=time.time())
+        except Exception as e:
+            JobService._update_job(job_id, status="failed", error=f"Server error: {str(e)}", finished_at=time.time())
+
+    @staticmethod
+    def _get_executor(model_path=None):
+        """Create the worker pool on first use (after any gunicorn fork)"""
+        with JobService._lock:
+            if JobService._executor is None:
+                workers = max(1, JobService.MAX_WORKERS)
+                if JobService.EXECUTOR_TYPE == "process":
+                    if not model_path:
+                        raise JobServiceException("model_path is required for process-based extract jobs")
+                    # spawn: never fork a process that holds torch threads
+                    JobService._executor = ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_process_worker,
+                        initargs=(model_path,)
+                    )
+                else:
+                    JobService._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract-job")
+            return JobService._executor
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """HELPER FUNCTIONS"""
+
+    @staticmethod
+    def _update_job(job_id, **fields):
+        """Update fields of a tracked job and persist the new status (see _snapshot_for_persist)"""
+        with JobService._lock:
+            job = JobService._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            snapshot = JobService._snapshot_for_persist(job, progress_only=fields.keys() == {"progress"})
+        JobService._persist_job(snapshot)
+
+    @staticmethod
+    def _copy_job(job):
+        """Copy of a job's status that later updates do not change"""
+        status = dict(job)
+        status["progress"] = dict(job["progress"])
+        return status
+
+    @staticmethod
+    def _prune_finished_jobs():
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS (caller must hold the lock)"""
+        finished = [job_id for job_id, job in JobService._jobs.items() if job["status"] in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - JobService.MAX_FINISHED_JOBS)]:
+            del JobService._jobs[job_id]
+            JobService._persist_snapshots.pop(job_id, None)
+            JobService._persisted_sequences.pop(job_id, None)
+            if JobService.DIR:
+                try:
+                    os.remove(JobService._job_path(job_id))
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def _job_path(job_id):
+        """Status file of a job in EXTRACT_JOB_DIR (None for IDs that are not one of ours)"""
+        if not job_id or not str(job_id).isalnum():
+            return None
+        return os.path.join(JobService.DIR, f"{job_id}.json")
+
+    @staticmethod
+    def _snapshot_for_persist(job, progress_only=False):
+        """
+        Take the status to write for the other workers (caller must hold the lock)
+
+        Args:
+            job (dict): Tracked job
+            progress_only (bool): Whether only the progress changed; such updates are skipped when the
+                last snapshot is younger than PROGRESS_PERSIST_INTERVAL_MS
+
+        Returns:
+            tuple or None: (status copy, sequence) for _persist_job, None when there is nothing to write
+        """
+        if not JobService.DIR:
+            return None
+        now = time.monotonic()
+        taken_at, sequence = JobService._persist_snapshots.get(job["job_id"], (None, 0))
+        if progress_only and taken_at is not None and (now - taken_at) * 1000 < JobService.PROGRESS_PERSIST_INTERVAL_MS:
+            return None
+        JobService._persist_snapshots[job["job_id"]] = (now, sequence + 1)
+        return JobService._copy_job(job), sequence + 1
+
+    @staticmethod
+    def _persist_job(snapshot):
+        """Write a status snapshot from _snapshot_for_persist (called without the job lock; no-op for None)"""
+        if snapshot is None:
+            return
+        job, sequence = snapshot
+        path = JobService._job_path(job["job_id"])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with JobService._persist_lock:
+            if sequence < JobService._persisted_sequences.get(job["job_id"], 0):
+                # A newer status of this job is already on disk
+                return
+            try:
+                os.makedirs(JobService.DIR, exist_ok=True)
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(job, f, default=str)
+                os.replace(temp_path, path)
+                JobService._persisted_sequences[job["job_id"]] = sequence
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning("Could not write status of extract job %s: %s", job["job_id"], e)
+
+    @staticmethod
+    def _load_persisted_job(job_id):
+        """Read a job's status written by any worker (None if there is none)"""
+        if not JobService.DIR:
+            return None
+        path = JobService._job_path(job_id)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def _init_process_worker(model_path):
+    """Load the model once in each process-pool worker"""
+    global _worker_model
+    from routes.encoder import EncoderService
+    _worker_model = EncoderService.load_model(model_path)
+
+
+def _run_extract_in_process(conversations_data, user_uuid, processed_data=None):
+    """Run an extract job inside a process-pool worker"""
+    if processed_data is not None:
+        return ExtractService.extract_processed_service(processed_data, user_uuid, _worker_model)
+    return ExtractService.extract_service(conversations_data, user_uuid, _worker_model)
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+import contextvars
+import uuid as uuid_lib
+
+
+# Id of the request being handled by the current thread ("-" outside requests)
+_request_id = contextvars.ContextVar("request_id", default="-")
+
+# LogRecord attributes that are not extra fields passed with extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps every record with the id of the request it was logged for"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """One human-readable line per record, with extra fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = LoggingService.extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record (for log collectors), extra fields included as keys"""
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+            **LoggingService.extra_fields(record)
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking (or erroring) when the queue is full"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class LoggingService:
+    """
+    Structured, level-gated logging for the request paths.
+
+    Loggers from get_logger(name) hand records to a bounded in-memory queue; a background listener
+    thread writes them to stdout, so a request never waits on log I/O (records are dropped, and
+    counted, if the queue is full). Every record carries the id of the request it was logged for
+    (the X-Request-ID header, or a generated one), set by app.py for each request.
+
+    Per-request chatter (loaded rows, decoded shapes, timings) is logged at DEBUG and silenced by the
+    default LOG_LEVEL=INFO; fallbacks are WARNING and failures ERROR.
+    """
+
+    # Logging settings - loaded from environment
+    LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text or json
+    QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    ROOT_LOGGER = "chatgpt_augmenter"
+
+    _handler = None
+    _listener = None
+    _lock = threading.Lock()
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """LOGGER FUNCTIONS (used by routes/search.py, routes/extract.py and routes/delete.py)"""
+
+    @staticmethod
+    def get_logger(name):
+        """
+        Get a logger writing through the shared queue
+
+        Args:
+            name (str): Logger name, usually the module (e.g. "search")
+
+        Returns:
+            logging.Logger: The chatgpt_augmenter.<name> logger
+        """
+        LoggingService.configure()
+        return logging.getLogger(f"{LoggingService.ROOT_LOGGER}.{name}")
+
+    @staticmethod
+    def configure():
+        """Attach the queue handler and start the listener thread (only the first call does anything)"""
+        with LoggingService._lock:
+            if LoggingService._handler is not None:
+                return
+
+            root = logging.getLogger(LoggingService.ROOT_LOGGER)
+            root.setLevel(LoggingService.LEVEL)
+            root.propagate = False
+
+            LoggingService._handler = DroppingQueueHandler(queue.Queue(LoggingService.QUEUE_SIZE))
+            LoggingService._handler.addFilter(RequestIdFilter())
+            root.addHandler(LoggingService._handler)
+            LoggingService._start_listener()
+
+            # The listener thread does not survive a fork (gunicorn preloads the app in the master)
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=LoggingService._restart_after_fork)
+            atexit.register(LoggingService.stop)
+
+    @staticmethod
+    def stop():
+        """Write out every queued record and stop the listener thread"""
+        listener = LoggingService._listener
+        LoggingService._listener = None
+        if listener is not None:
+            listener.stop()
+
+    @staticmethod
+    def _start_listener():
+        """Start the thread that writes queued records to stdout"""
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if LoggingService.FORMAT == "json" else TextFormatter())
+        LoggingService._listener = logging.handlers.QueueListener(LoggingService._handler.queue, output)
+        LoggingService._listener.start()
+
+    @staticmethod
+    def _restart_after_fork():
+        """Give a forked worker its own queue and listener thread"""
+        LoggingService._handler.queue = queue.Queue(LoggingService.QUEUE_SIZE)
+        LoggingService._start_listener()
+
+    @staticmethod
+    def extra_fields(record):
+        """
+        Fields passed with extra={...} when the record was logged
+
+        Returns:
+            dict: Field name -> value, in the order they were given
+        """
+        return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """REQUEST ID FUNCTIONS (used by app.py)"""
+
+    @staticmethod
+    def bind_request_id(request_id=None):
+        """
+        Set the id stamped on records logged by the current request
+
+        Args:
+            request_id (str): Incoming X-Request-ID header (a new id is generated when missing)
+
+        Returns:
+            str: The request id in effect
+        """
+        request_id = (request_id or "").strip()[:64] or uuid_lib.uuid4().hex[:16]
+        _request_id.set(request_id)
+        return request_id
+
+    @staticmethod
+    def current_request_id():
+        """
+        Returns:
+            str: Id of the request being handled ("-" outside requests)
+        """
+        return _request_id.get()
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from routes.logging_service import LoggingService
+
+
+logger = LoggingService.get_logger("metrics")
+
+class MetricsService:
+    """
+    Per-stage latency histograms for the search and extract paths, exported in the Prometheus text
+    format by GET /metrics.
+
+    Code under measurement wraps each stage in MetricsService.timer(operation, stage); every timing
+    is counted into fixed buckets (METRICS_BUCKETS seconds) of one histogram per operation, labelled
+    by stage. Histograms live in the process that recorded them. With several gunicorn workers,
+    METRICS_DIR lets every worker write its histograms to <METRICS_DIR>/<pid>.json (at most once per
+    METRICS_FLUSH_SECONDS) so whichever worker answers /metrics reports all of them.
+    """
+
+    # Metrics settings - loaded from environment
+    ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    BUCKETS = tuple(sorted(float(bound) for bound in os.getenv(
+        "METRICS_BUCKETS", "0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60,120"
+    ).split(",") if bound.strip()))
+    DIR = os.getenv("METRICS_DIR", "")  # Empty keeps histograms per process (a tmpfs such as /dev/shm is ideal)
+    FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+
+    # Help text of each operation's histogram (operations without an entry get a generic one)
+    HELP = {
+        "search": "Seconds spent in each stage of a search request",
+        "extract": "Seconds spent in each stage of an extract request"
+    }
+
+    _histograms = {}  # "operation/stage" -> {"buckets": per-bucket counts (last is +Inf), "sum", "count"}
+    _lock = threading.Lock()
+    _last_flush = 0.0
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """RECORDING FUNCTIONS (used by routes/search.py, routes/extract.py and database/postgres.py)"""
+
+    @staticmethod
+    @contextmanager
+    def timer(operation, stage):
+        """
+        Time the wrapped block as one observation of operation's stage (recorded even if it raises)
+
+        Args:
+            operation (str): Histogram the stage belongs to ("search" or "extract")
+            stage (str): Stage label, e.g. "db_fetch" or "encode"
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            MetricsService.observe(operation, stage, time.perf_counter() - start)
+
+    @staticmethod
+    def observe(operation, stage, seconds):
+        """
+        Count one duration into operation's histogram
+
+        Args:
+            operation (str): Histogram the stage belongs to
+            stage (str): Stage label
+            seconds (float): Measured duration
+        """
+        if not MetricsService.ENABLED:
+            return
+
+        with MetricsService._lock:
+            histogram = MetricsService._histograms.get(f"{operation}/{stage}")
+            if histogram is None:
+                histogram = {"buckets": [0] * (len(MetricsService.BUCKETS) + 1), "sum": 0.0, "count": 0}
+                MetricsService._histograms[f"{operation}/{stage}"] = histogram
+            histogram["buckets"][bisect.bisect_left(MetricsService.BUCKETS, seconds)] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+            flush = MetricsService.DIR and time.monotonic() - MetricsService._last_flush >= MetricsService.FLUSH_SECONDS
+
+        if flush:
+            MetricsService.flush()
+
+    @staticmethod
+    def snapshot():
+        """
+        Copy this process's histograms
+
+        Returns:
+            dict: "operation/stage" -> {"buckets", "sum", "count"}
+        """
+        with MetricsService._lock:
+            return {
+                name: {"buckets": list(histogram["buckets"]), "sum": histogram["sum"], "count": histogram["count"]}
+                for name, histogram in MetricsService._histograms.items()
+            }
+
+    @staticmethod
+    def reset():
+        """Forget every recorded observation of this process"""
+        with MetricsService._lock:
+            MetricsService._histograms.clear()
+            MetricsService._last_flush = 0.0
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """SHARING BETWEEN WORKERS"""
+
+    @staticmethod
+    def flush():
+        """Write this process's histograms to <DIR>/<pid>.json (a failed write only skips this flush)"""
+        if not MetricsService.DIR:
+            return
+
+        path = os.path.join(MetricsService.DIR, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        try:
+            with MetricsService._lock:
+                MetricsService._last_flush = time.monotonic()
+            os.makedirs(MetricsService.DIR, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"bounds": list(MetricsService.BUCKETS), "histograms": MetricsService.snapshot()}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", MetricsService.DIR, e)
+
+    @staticmethod
+    def collect():
+        """
+        Merge this process's histograms with the ones other workers wrote to DIR
+
+        Returns:
+            dict: "operation/stage" -> {"buckets", "sum", "count"} summed over every process
+        """
+        merged = MetricsService.snapshot()
+        if not MetricsService.DIR or not os.path.isdir(MetricsService.DIR):
+            return merged
+
+        own_file = f"{os.getpid()}.json"
+        for name in os.listdir(MetricsService.DIR):
+            if not name.endswith(".json") or name == own_file:
+                continue
+            try:
+                with open(os.path.join(MetricsService.DIR, name), 'r', encoding='utf-8') as f:
+                    written = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if written.get("bounds") != list(MetricsService.BUCKETS):
+                # Written with different METRICS_BUCKETS - the counts cannot be added up
+                continue
+            for key, histogram in written.get("histograms", {}).items():
+                total = merged.setdefault(key, {"buckets": [0] * (len(MetricsService.BUCKETS) + 1), "sum": 0.0, "count": 0})
+                total["buckets"] = [a + b for a, b in zip(total["buckets"], histogram["buckets"])]
+                total["sum"] += histogram["sum"]
+                total["count"] += histogram["count"]
+        return merged
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """EXPORT FUNCTIONS (used by app.py)"""
+
+    @staticmethod
+    def render_prometheus():
+        """
+        Render every histogram in the Prometheus text exposition format (version 0.0.4)
+
+        Returns:
+            str: One <operation>_stage_seconds histogram per operation, with a stage label
+        """
+        histograms = MetricsService.collect()
+        bounds = [MetricsService._format_bound(bound) for bound in MetricsService.BUCKETS] + ["+Inf"]
+
+        lines = []
+        for operation in sorted({key.split("/", 1)[0] for key in histograms}):
+            metric = f"{operation}_stage_seconds"
+            help_text = MetricsService.HELP.get(operation, f"Seconds spent in each stage of {operation}")
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+
+            for key in sorted(key for key in histograms if key.split("/", 1)[0] == operation):
+                stage = key.split("/", 1)[1]
+                histogram = histograms[key]
+                cumulative = 0
+                for bound, count in zip(bounds, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram["sum"]!r}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {histogram["count"]}')
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    @staticmethod
+    def _format_bound(bound):
+        """Bucket bound as Prometheus writes it (1.0 -> "1.0", 0.005 -> "0.005")"""
+        return repr(float(bound))
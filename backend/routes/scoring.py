@@ -0,0 +1,184 @@
+import os
+import warnings
+import numpy as np
+
+
+class ScoringServiceException(Exception):
+    """Custom exception for scoring backend errors"""
+    pass
+
+
+class TorchScoringBackend:
+    """
+    Scores CPU tensors with sentence_transformers.util.pytorch_cos_sim, a matrix product and torch.topk.
+    torch is imported on first use so importing the app does not pay for it.
+    """
+
+    name = "torch"
+
+    @staticmethod
+    def as_matrix(embeddings_np):
+        """Wrap a decoded float32 (rows, dim) array as a tensor sharing its memory"""
+        import torch
+        with warnings.catch_warnings():
+            # Stored embeddings are wrapped read-only without copying; search never writes to them
+            warnings.filterwarnings("ignore", message="The given NumPy array is not writable", category=UserWarning)
+            return torch.from_numpy(embeddings_np)
+
+    @staticmethod
+    def as_vector(embedding_np):
+        """Wrap a float32 query embedding (NumPy output of model.encode) as a tensor sharing its memory"""
+        import torch
+        return torch.from_numpy(np.asarray(embedding_np, dtype=np.float32))
+
+    @staticmethod
+    def cosine_similarities(query_embedding, doc_embeddings):
+        """Cosine similarity of the query against every document row, shape (1, num_docs)"""
+        from sentence_transformers import util
+        return util.pytorch_cos_sim(query_embedding, doc_embeddings)
+
+    @staticmethod
+    def normalized_similarities(query_embedding, doc_embeddings):
+        """Cosine similarity against unit-length document rows (only the query is normalized), shape (1, num_docs)"""
+        import torch
+        query_embedding = torch.nn.functional.normalize(torch.as_tensor(query_embedding).float().reshape(1, -1), p=2, dim=-1)
+        return query_embedding @ torch.as_tensor(doc_embeddings).T
+
+    @staticmethod
+    def top_k(cos_scores, k):
+        """
+        Rank the k best scores
+
+        Returns:
+            tuple: (flattened scores, (1, k) indices of the best scores in descending order)
+        """
+        import torch
+        _top_scores, top_indices = torch.topk(cos_scores, k=k)
+        return cos_scores.flatten(), top_indices
+
+    @staticmethod
+    def batch_similarities(query_embeddings, doc_embeddings, normalized):
+        """Similarity of every query row against every document row in one matrix product, shape (num_queries, num_docs)"""
+        import torch
+        query_embeddings = torch.as_tensor(query_embeddings).float()
+        if normalized:
+            query_embeddings = torch.nn.functional.normalize(query_embeddings, p=2, dim=-1)
+            return query_embeddings @ torch.as_tensor(doc_embeddings).T
+        from sentence_transformers import util
+        return util.pytorch_cos_sim(query_embeddings, doc_embeddings)
+
+    @staticmethod
+    def batch_top_k(scores, k):
+        """(num_queries, k) indices of each row's best scores in descending order"""
+        import torch
+        return torch.topk(scores, k=k, dim=1).indices
+
+
+class NumpyScoringBackend:
+    """Scores NumPy arrays with a BLAS matrix-vector product and np.argpartition (no torch tensors)"""
+
+    name = "numpy"
+    _EPSILON = 1e-12
+
+    @staticmethod
+    def as_matrix(embeddings_np):
+        """Decoded float32 (rows, dim) arrays are used as they are"""
+        return embeddings_np
+
+    @staticmethod
+    def as_vector(embedding_np):
+        """Query embeddings (NumPy output of model.encode) are used as float32 arrays"""
+        return np.asarray(embedding_np, dtype=np.float32)
+
+    @staticmethod
+    def cosine_similarities(query_embedding, doc_embeddings):
+        """Cosine similarity of the query against every document row, shape (1, num_docs)"""
+        doc_embeddings = np.asarray(doc_embeddings, dtype=np.float32)
+        query_embedding = NumpyScoringBackend._normalized_query(query_embedding)
+        doc_norms = np.maximum(np.linalg.norm(doc_embeddings, axis=1), NumpyScoringBackend._EPSILON)
+        return (np.dot(doc_embeddings, query_embedding) / doc_norms).reshape(1, -1)
+
+    @staticmethod
+    def normalized_similarities(query_embedding, doc_embeddings):
+        """Cosine similarity against unit-length document rows (only the query is normalized), shape (1, num_docs)"""
+        doc_embeddings = np.asarray(doc_embeddings, dtype=np.float32)
+        return np.dot(doc_embeddings, NumpyScoringBackend._normalized_query(query_embedding)).reshape(1, -1)
+
+    @staticmethod
+    def top_k(cos_scores, k):
+        """
+        Rank the k best scores: argpartition finds them in linear time, then only those k are sorted
+
+        Returns:
+            tuple: (flattened scores, (1, k) indices of the best scores in descending order)
+        """
+        scores = np.asarray(cos_scores).reshape(-1)
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        top_indices = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return scores, top_indices.reshape(1, -1)
+
+    @staticmethod
+    def batch_similarities(query_embeddings, doc_embeddings, normalized):
+        """Similarity of every query row against every document row in one matrix product, shape (num_queries, num_docs)"""
+        doc_embeddings = np.asarray(doc_embeddings, dtype=np.float32)
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        query_embeddings = query_embeddings / np.maximum(
+            np.linalg.norm(query_embeddings, axis=1, keepdims=True), NumpyScoringBackend._EPSILON
+        )
+        scores = np.dot(query_embeddings, doc_embeddings.T)
+        if not normalized:
+            scores /= np.maximum(np.linalg.norm(doc_embeddings, axis=1), NumpyScoringBackend._EPSILON)
+        return scores
+
+    @staticmethod
+    def batch_top_k(scores, k):
+        """(num_queries, k) indices of each row's best scores in descending order (argpartition per row)"""
+        scores = np.asarray(scores)
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=1)
+
+    @staticmethod
+    def _normalized_query(query_embedding):
+        """Query embedding (tensor or array) as a unit-length float32 vector"""
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        return query_embedding / max(float(np.linalg.norm(query_embedding)), NumpyScoringBackend._EPSILON)
+
+
+class ScoringService:
+    """Selects the backend search scores document embeddings with"""
+
+    # Scoring backend: torch or numpy - loaded from environment
+    BACKEND = os.getenv("SEARCH_SCORING_BACKEND", "torch").lower()
+
+    BACKENDS = {
+        TorchScoringBackend.name: TorchScoringBackend,
+        NumpyScoringBackend.name: NumpyScoringBackend
+    }
+
+    @staticmethod
+    def get_backend(name=None):
+        """
+        Get a scoring backend
+
+        Args:
+            name (str): Backend name (defaults to BACKEND)
+
+        Returns:
+            class: TorchScoringBackend or NumpyScoringBackend
+
+        Raises:
+            ScoringServiceException: If the backend name is unknown
+        """
+        name = (name or ScoringService.BACKEND).lower()
+        if name not in ScoringService.BACKENDS:
+            raise ScoringServiceException(
+                f"Unknown scoring backend '{name}' (expected one of {', '.join(ScoringService.BACKENDS)})"
+            )
+        return ScoringService.BACKENDS[name]
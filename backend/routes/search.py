@@ -1,21 +1,34 @@
-from sentence_transformers import SentenceTransformer, util
-import torch
 import json
 import base64
 import numpy as np
 import os
-from database.postgres import DatabaseService, DatabaseServiceException
+import time
+from functools import partial
+from database.postgres import DatabaseService, DatabaseServiceException, UserNotFoundException
+from database.embedding_codec import EmbeddingCodec
+from routes.cache import CacheService, QueryEmbeddingCacheService
+from routes.ann_index import AnnIndexService
+from routes.scoring import ScoringService
+from routes.shared_embeddings import SharedEmbeddingsService
+from routes.file_store import FileStoreService, FileStoreServiceException, FileStoreNotFoundException
+from routes.metrics import MetricsService
+from routes.logging_service import LoggingService
 
 
 
 model = None
 
+logger = LoggingService.get_logger("search")
+
 class SearchServiceException(Exception):
     """Custom exception for search service errors"""
     pass
 
 
 class SearchService:
+    # Batch search settings - loaded from environment
+    BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "32"))
+
     """--------------------------------------------------------------------------------------------------------------"""
     """MAIN SEARCH FUNCTION"""
     
@@ -36,50 +49,178 @@ class SearchService:
         Raises:
             SearchServiceException: If search fails
         """
+        with MetricsService.timer("search", "total"):
+            return SearchService._search_documents(uuid, query, top_k, model)
+
+    @staticmethod
+    def _search_documents(uuid, query, top_k, model):
+        """Search for one query without the "total" timer (search_batch times the whole batch instead)"""
         try:
             # Validate inputs
             if not all([model, query, uuid]):
                 raise SearchServiceException("Model, query, or uuid not provided")
-            
+        
+            # pgvector storage: nearest neighbours are found inside Postgres
+            if DatabaseService.STORAGE_MODE == "pgvector":
+                results = SearchService.search_with_pgvector(uuid, query, top_k, model)
+                if results is not None:
+                    return {
+                        "results": results,
+                        "query": query,
+                        "total_results": len(results)
+                    }
+        
             # Extract data from database
             database_extraction = SearchService.integrate_extraction(uuid)
-            
+        
             # Calculate similarity scores
             cos_package = SearchService.query_doc_similarity_scores_UNCHANGED(
                 query, top_k, model, 
                 database_extraction['doc_embeddings'], 
-                database_extraction['keys']
+                database_extraction['keys'],
+                normalized=database_extraction.get('normalized', False),
+                ann_index=database_extraction.get('ann_index')
             )
-            
+        
             # Extract scores and indices
             cos_scores = cos_package['cos_scores']
             top_indices = cos_package['top_indices']
-            
+        
             # Format results
-            results = SearchService.create_results_from_scores_UNCHANGED(
-                cos_scores, top_indices, 
-                database_extraction['data'], 
-                database_extraction['keys']
-            )
-            
+            if database_extraction.get('fetch_documents') is not None:
+                # Normalized storage: only the winning documents are fetched
+                results = SearchService.create_results_from_documents(
+                    cos_scores, top_indices,
+                    database_extraction['fetch_documents']
+                )
+            else:
+                results = SearchService.create_results_from_scores_UNCHANGED(
+                    cos_scores, top_indices, 
+                    database_extraction['data'], 
+                    database_extraction['keys']
+                )
+        
             return {
                 "results": results, 
                 "query": query, 
                 "total_results": len(results)
             }
-            
+        
         except Exception as e:
             if isinstance(e, SearchServiceException):
                 raise
             raise SearchServiceException(f"Search operation failed: {str(e)}")
 
+    @staticmethod
+    def search_batch(uuid, queries, top_k, model):
+        """
+        Search one user's documents for several queries at once: the user's data is loaded once, the
+        queries are encoded in one model.encode call and scored with one matrix-matrix product
+        
+        Args:
+            uuid (str): User's UUID
+            queries (list): Search queries
+            top_k (int): Number of top results to return per query
+            model: SentenceTransformer model
+            
+        Returns:
+            dict: Per-query results (in request order) and the number of queries
+            
+        Raises:
+            SearchServiceException: If the queries are invalid or search fails
+        """
+        with MetricsService.timer("search", "total"):
+            try:
+                if not all([model, queries, uuid]):
+                    raise SearchServiceException("Model, queries, or uuid not provided")
+                if len(queries) > SearchService.BATCH_MAX_QUERIES:
+                    raise SearchServiceException(f"At most {SearchService.BATCH_MAX_QUERIES} queries per batch")
+            
+                if DatabaseService.STORAGE_MODE == "pgvector":
+                    # Postgres ranks each query with its own ORDER BY ... LIMIT k
+                    results = [
+                        SearchService._search_documents(uuid, query, top_k, model)
+                        for query in queries
+                    ]
+                    return {"results": results, "total_queries": len(results)}
+            
+                database_extraction = SearchService.integrate_extraction(uuid)
+            
+                cos_packages = SearchService.query_doc_similarity_scores_batch(
+                    queries, top_k, model,
+                    database_extraction['doc_embeddings'],
+                    database_extraction['keys'],
+                    normalized=database_extraction.get('normalized', False),
+                    ann_index=database_extraction.get('ann_index')
+                )
+            
+                fetch_documents = database_extraction.get('fetch_documents')
+                if fetch_documents is not None:
+                    # Normalized storage: fetch the winning documents of every query in one round trip
+                    ordinals = sorted({int(idx) for package in cos_packages for idx in package['top_indices'][0]})
+                    documents = fetch_documents(ordinals)
+                    fetch_documents = lambda _ordinals: documents
+            
+                results = []
+                for query, cos_package in zip(queries, cos_packages):
+                    if fetch_documents is not None:
+                        query_results = SearchService.create_results_from_documents(
+                            cos_package['cos_scores'], cos_package['top_indices'], fetch_documents
+                        )
+                    else:
+                        query_results = SearchService.create_results_from_scores_UNCHANGED(
+                            cos_package['cos_scores'], cos_package['top_indices'],
+                            database_extraction['data'],
+                            database_extraction['keys']
+                        )
+                    results.append({"results": query_results, "query": query, "total_results": len(query_results)})
+            
+                return {"results": results, "total_queries": len(results)}
+            
+            except Exception as e:
+                if isinstance(e, SearchServiceException):
+                    raise
+                raise SearchServiceException(f"Batch search operation failed: {str(e)}")
+
+    @staticmethod
+    def search_with_pgvector(uuid, query, top_k, model):
+        """
+        Search with an ORDER BY embedding <=> query LIMIT k query executed by Postgres
+        
+        Args:
+            uuid (str): User's UUID
+            query (str): Search query
+            top_k (int): Number of top results to return
+            model: SentenceTransformer model
+            
+        Returns:
+            list or None: Formatted search results, or None if the caller should fall back to
+            scoring the stored BYTEA embeddings (no vector rows for this user, or pgvector unavailable)
+        """
+        try:
+            with MetricsService.timer("search", "query_encode"):
+                query_embedding = SearchService.encode_query_to_embedding(query, model)
+            rows = DatabaseService.search_nearest_documents(uuid, np.asarray(query_embedding), top_k)
+        except DatabaseServiceException as e:
+            logger.warning("pgvector search failed, falling back to stored embeddings: %s", e)
+            return None
+
+        if not rows:
+            return None
+
+        with MetricsService.timer("search", "result_formatting"):
+            return [
+                {"key": prompt, "similarity": float(similarity), "content": response}
+                for _ordinal, prompt, response, similarity in rows
+            ]
+
     """--------------------------------------------------------------------------------------------------------------"""
     """DATABASE EXTRACTION FUNCTIONS"""
     
     @staticmethod
     def integrate_extraction(uuid):
         """
-        Extract data with preserved key ordering from database or JSON file
+        Extract data with preserved key ordering from the in-memory cache, database or JSON file
         
         Args:
             uuid (str): User's UUID
@@ -91,40 +232,125 @@ class SearchService:
             SearchServiceException: If data extraction fails
         """
 
+        cached = CacheService.get(uuid, validate=partial(SearchService.is_current_version, uuid))
+        if cached is not None:
+            return cached
+
         try:
             result = SearchService.integrate_database_extraction(uuid)
+            CacheService.put(uuid, result, result.get("version"))
             return result
         except(SearchServiceException, ImportError) as db_error:
-            print(f"❌ PostgreSQL load failed, falling back to JSON: {db_error}")
+            logger.warning("PostgreSQL load failed, falling back to the file store: %s", db_error)
         
 
         try:
             result = SearchService.integrate_file_extraction(uuid) 
+            CacheService.put(uuid, result, result.get("version"))
             return result
         except SearchServiceException as e:
             raise SearchServiceException(f"Database extraction failed (could be an invalid uuid): {str(e)}")
 
     
+    @staticmethod
+    def is_current_version(uuid, version):
+        """
+        Whether a cached extraction still matches the user's stored data (checked on every cache hit, so
+        an upload or delete handled by another worker is seen by this one)
+        
+        Args:
+            uuid (str): User's UUID
+            version (tuple): (source, token) recorded in the extraction when it was loaded
+            
+        Returns:
+            bool: False if the stored data was replaced or deleted; True when the version is unknown or
+            cannot be read (the cache TTL bounds how long such an entry is served)
+        """
+        source, token = version
+        if token is None:
+            return True
+        try:
+            return SearchService.load_version(uuid, source) == token
+        except (DatabaseServiceException, FileStoreServiceException, OSError) as e:
+            logger.debug("Could not check the cached data version, serving the cached copy: %s", e)
+            return True
+
+    @staticmethod
+    def load_version(uuid, source):
+        """
+        Read the version of a user's stored data without loading it
+        
+        Args:
+            uuid (str): User's UUID
+            source (str): Where the data was loaded from: "database", "file_store" or "json_file"
+            
+        Returns:
+            Version token (None if the user has no data there)
+            
+        Raises:
+            DatabaseServiceException: If the database cannot be queried
+            FileStoreServiceException: If the UUID is not a valid file store name
+        """
+        if source == "database":
+            return DatabaseService.load_user_version(uuid)
+        if source == "file_store":
+            return FileStoreService.current_version(uuid)
+        try:
+            return os.stat(SearchService.get_user_data_file_path(uuid)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
     @staticmethod
     def integrate_database_extraction(uuid):
 
         try:
-            user_data = DatabaseService.load_user_data_from_database(uuid)
-            data_source = "PostgreSQL"
-            print(f"✅ Loaded data from PostgreSQL database")
+            if DatabaseService._uses_document_rows():
+                try:
+                    return SearchService.integrate_normalized_extraction(uuid)
+                except UserNotFoundException:
+                    # Not migrated yet - read the blob-layout users row below
+                    pass
+
+            start = time.perf_counter()
+            user_data = DatabaseService.load_user_search_data_from_database(uuid)
+            packed_documents = user_data.get('documents')
+            logger.debug("Loaded data from PostgreSQL database", extra={
+                "rows": len(packed_documents) if packed_documents is not None else len(user_data['key_order']),
+                "ms": round((time.perf_counter() - start) * 1000, 2)
+            })
             
-            # Extract processed_data and key ordering
-            processed_data = user_data['processed_data']
-            keys = user_data['key_order']
             embeddings_bytes = user_data.get('embeddings')
             embedding_shape = user_data.get('embedding_shape')
             
-            embeddings = SearchService.recreate_doc_embeddings_from_database(embeddings_bytes, embedding_shape)
+            embeddings = SearchService.recreate_doc_embeddings_from_database(
+                embeddings_bytes, embedding_shape, user_data.get('embedding_meta'),
+                share_key=(uuid, ("database", user_data.get('version')))
+            )
+            
+            # Packed documents: only the top-k are sliced out per search (see DocumentCodec)
+            if packed_documents is not None:
+                return {
+                    "doc_embeddings": embeddings,
+                    "data": None,
+                    "keys": None,
+                    "normalized": SearchService.is_normalized(user_data.get('embedding_meta')),
+                    "ann_index": AnnIndexService.load(user_data.get('ann_index'), len(embeddings)),
+                    "document_count": user_data['document_count'],
+                    "fetch_documents": packed_documents.fetch,
+                    "version": ("database", user_data.get('version'))
+                }
+            
+            # Rows written before the packed columns existed: processed_data and key ordering
+            processed_data = user_data['processed_data']
+            keys = user_data['key_order']
             
             return {
                     "doc_embeddings": embeddings,
                     "data": processed_data,
-                    "keys": keys  # Use preserved key ordering
+                    "keys": keys,  # Use preserved key ordering
+                    "normalized": SearchService.is_normalized(user_data.get('embedding_meta')),
+                    "ann_index": AnnIndexService.load(user_data.get('ann_index'), len(embeddings)),
+                    "version": ("database", user_data.get('version'))
             }
         except SearchServiceException:
             raise
@@ -133,20 +359,102 @@ class SearchService:
         except Exception as e:
             raise SearchServiceException(e)
 
+
+    @staticmethod
+    def integrate_normalized_extraction(uuid):
+        """
+        Load only the embedding matrix of a normalized-layout user; documents are fetched per search by ordinal
+        
+        Args:
+            uuid (str): User's UUID
+            
+        Returns:
+            dict: Dictionary containing embeddings, document_count and a fetch_documents(ordinals) callable
+            
+        Raises:
+            UserNotFoundException: If the user has no normalized-layout data
+            SearchServiceException: If the embeddings cannot be decoded
+        """
+        start = time.perf_counter()
+        embedding_data = DatabaseService.load_user_embeddings_from_database(uuid)
+        logger.debug("Loaded embeddings from PostgreSQL normalized tables", extra={
+            "rows": embedding_data['document_count'], "ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+
+        embeddings = SearchService.recreate_doc_embeddings_from_database(
+            embedding_data['embeddings'], embedding_data['embedding_shape'], embedding_data.get('embedding_meta'),
+            share_key=(uuid, ("database", embedding_data.get('version')))
+        )
+
+        return {
+            "doc_embeddings": embeddings,
+            "data": None,
+            "keys": None,
+            "normalized": SearchService.is_normalized(embedding_data.get('embedding_meta')),
+            "ann_index": AnnIndexService.load(embedding_data.get('ann_index'), len(embeddings)),
+            "document_count": embedding_data['document_count'],
+            "fetch_documents": partial(DatabaseService.load_documents_by_ordinal, uuid),
+            "version": ("database", embedding_data.get('version'))
+        }
     
     @staticmethod
-    def recreate_doc_embeddings_from_database(embeddings_bytes, embedding_shape):
-        #  Convert bytes back to numpy array with proper shape, then to torch tensor
+    def is_normalized(embedding_meta):
+        """
+        Whether stored embeddings were L2-normalized at write time
+        
+        Args:
+            embedding_meta (dict): Stored embedding metadata (None or {} for legacy rows)
+            
+        Returns:
+            bool: True if search can use a plain dot product; legacy rows keep full cosine similarity
+        """
+        return bool(embedding_meta and embedding_meta.get('normalized'))
+
+    @staticmethod
+    def recreate_doc_embeddings_from_database(embeddings_bytes, embedding_shape, embedding_meta=None, share_key=None):
+        #  Wrap the fetched float32 bytes as a read-only (rows, dim) tensor without copying them;
+        #  float16/int8 rows (see embedding_meta["dtype"]) are dequantized to float32 once here.
+        #  share_key is (uuid, version) of the stored data, see wrap_embedding_buffer
         try:
-            print(f"🔄 Loading embeddings from database bytes (shape: {embedding_shape})")
-            embeddings_np = np.frombuffer(embeddings_bytes, dtype=np.float32)
-            embeddings_np = embeddings_np.reshape(embedding_shape)
-            embeddings = torch.from_numpy(embeddings_np.copy())  # Create writable copy
-            # Ensure embeddings are on CPU
-            embeddings = embeddings.cpu()
+            start = time.perf_counter()
+            with MetricsService.timer("search", "embedding_decode"):
+                embeddings = SearchService.wrap_embedding_buffer(
+                    embeddings_bytes, embedding_shape, EmbeddingCodec.dtype_from_meta(embedding_meta), share_key
+                )
+            logger.debug("Decoded embeddings from database bytes", extra={
+                "shape": tuple(embeddings.shape), "ms": round((time.perf_counter() - start) * 1000, 2)
+            })
             return embeddings
         except Exception as e:
             raise SearchServiceException("recreating doc_embeddings failed, mostly likely a corrupt embedding_bytes or embedding_shape")
+
+    @staticmethod
+    def wrap_embedding_buffer(embeddings_buffer, embedding_shape, dtype="float32", share_key=None):
+        """
+        View a float32 embeddings buffer as a CPU matrix that shares the buffer's memory (no copy)
+        
+        The matrix is read-only in practice (bytes from the database are immutable); every scoring
+        function only reads it. Quantized (float16/int8) buffers are dequantized into a new matrix.
+        With SHARED_EMBEDDINGS_DIR set and a share_key given, the matrix is instead a read-only
+        memory map of a file that every gunicorn worker loading the same version shares; workers that
+        find the file already written map it without decoding the buffer.
+        
+        Args:
+            embeddings_buffer (bytes or buffer): Stored embeddings
+            embedding_shape (tuple): (rows, dim) shape of the matrix
+            dtype (str): Storage dtype of the buffer (see EmbeddingCodec)
+            share_key (tuple): (uuid, version) the buffer was loaded with (None keeps a private matrix)
+            
+        Returns:
+            torch.Tensor or np.ndarray: float32 embeddings in the scoring backend's type (backed by
+            embeddings_buffer when dtype is float32, or by the shared file)
+        """
+        decode = partial(EmbeddingCodec.decode, embeddings_buffer, embedding_shape, dtype)
+        if share_key is None:
+            embeddings_np = decode()
+        else:
+            embeddings_np = SharedEmbeddingsService.share(*share_key, embedding_shape, decode)
+        return ScoringService.get_backend().as_matrix(embeddings_np)
         
 
 
@@ -154,21 +462,31 @@ class SearchService:
     @staticmethod
     def integrate_file_extraction(uuid):
         """
-        Extract data from JSON file with key ordering preservation
+        Extract data from the file store, or from a userData.json written by an older version
         
         Args:
             uuid (str): User's UUID
             
         Returns:
-            dict: Dictionary containing embeddings, processed_data, and keys in correct order
+            dict: Dictionary containing embeddings, processed_data, and keys in correct order (or,
+            for the file store, document_count and a fetch_documents(ordinals) callable)
             
         Raises:
             SearchServiceException: If file extraction fails
         """
+        try:
+            return SearchService.integrate_file_store_extraction(uuid)
+        except FileStoreNotFoundException:
+            pass
+        except FileStoreServiceException as e:
+            raise SearchServiceException(e)
+        
         # Load user data from JSON file
         try:
+            start = time.perf_counter()
+            version = SearchService.load_version(uuid, "json_file")
             user_data = SearchService.load_user_data_from_file(uuid)
-            print(f"✅ Loaded data from JSON file")
+            logger.debug("Loaded data from JSON file", extra={"ms": round((time.perf_counter() - start) * 1000, 2)})
             
             # Extract processed_data and key ordering
             if 'processed_data' in user_data:
@@ -191,7 +509,12 @@ class SearchService:
             return {
                 "doc_embeddings": embeddings,
                 "data": processed_data,
-                "keys": keys  # Use preserved key ordering
+                "keys": keys,  # Use preserved key ordering
+                "normalized": SearchService.is_normalized(user_data.get('embedding_meta')),
+                "ann_index": AnnIndexService.load(
+                    base64.b64decode(user_data['ann_index']) if user_data.get('ann_index') else None, len(embeddings)
+                ),
+                "version": ("json_file", version)
             }
         except SearchServiceException:
             raise
@@ -199,6 +522,60 @@ class SearchService:
             raise SearchServiceException(e)
 
     
+    @staticmethod
+    def integrate_file_store_extraction(uuid):
+        """
+        Map a user's file store files: embeddings are used in place and documents are sliced out of the
+        packed documents file per search, so nothing is parsed per query
+        
+        Args:
+            uuid (str): User's UUID
+            
+        Returns:
+            dict: Dictionary containing embeddings, document_count and a fetch_documents(ordinals) callable
+            
+        Raises:
+            FileStoreNotFoundException: If the user has no data in the file store
+            FileStoreServiceException: If the files are unreadable
+            SearchServiceException: If the embeddings cannot be decoded
+        """
+        start = time.perf_counter()
+        with MetricsService.timer("search", "file_read"):
+            stored = FileStoreService.load(uuid)
+        logger.debug("Mapped data from the file store", extra={
+            "rows": stored['document_count'], "ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+        
+        dtype = EmbeddingCodec.dtype_from_meta(stored['embedding_meta'])
+        try:
+            with MetricsService.timer("search", "embedding_decode"):
+                if dtype == "float32":
+                    # Already a read-only mapping every worker shares through the page cache
+                    embeddings_np = EmbeddingCodec.decode(stored['embeddings'], stored['embedding_shape'], dtype)
+                    embeddings = ScoringService.get_backend().as_matrix(embeddings_np)
+                else:
+                    embeddings = SearchService.wrap_embedding_buffer(
+                        stored['embeddings'], stored['embedding_shape'], dtype, (uuid, ("file_store", stored['version']))
+                    )
+        except Exception as e:
+            raise SearchServiceException("recreating doc_embeddings failed, mostly likely a corrupt embeddings file or meta.json")
+        
+        return {
+            "doc_embeddings": embeddings,
+            "data": None,
+            "keys": None,
+            "normalized": SearchService.is_normalized(stored['embedding_meta']),
+            "ann_index": AnnIndexService.load(stored['ann_index'], len(embeddings)),
+            "document_count": stored['document_count'],
+            "fetch_documents": stored['documents'].fetch,
+            "version": ("file_store", stored['version'])
+        }
+
+    @staticmethod
+    def get_user_data_file_path(uuid):
+        """Path of the userData.json an older version wrote for a user"""
+        return os.path.join(os.path.dirname(__file__), '..', 'data/conversations', f'{uuid}userData.json')
+
     @staticmethod
     def load_user_data_from_file(uuid):
         """
@@ -215,15 +592,18 @@ class SearchService:
         """
         try:
             # Define the file path
-            file_path = os.path.join(os.path.dirname(__file__), '..', 'data/conversations', f'{uuid}userData.json')
+            file_path = SearchService.get_user_data_file_path(uuid)
             
             # Check if file exists
             if not os.path.exists(file_path):
                 raise SearchServiceException("conversations.json not found, reupload (most likely the rare case in which the database was cleaned at the time of upload)")
             
             # Load the JSON file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                user_data_file = json.load(f)
+            with MetricsService.timer("search", "file_read"):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    user_data_text = f.read()
+            with MetricsService.timer("search", "json_parse"):
+                user_data_file = json.loads(user_data_text)
             
             # Check if UUID exists in the data
             if uuid not in user_data_file:
@@ -242,68 +622,33 @@ class SearchService:
        
         if user_data and 'embeddings' in user_data:
             # Decode from base64 in user_data
-            print(f"🔄 Loading embeddings from base64 in user_data")
-            embeddings_b64 = user_data['embeddings']
-            embeddings_bytes = base64.b64decode(embeddings_b64)
-            embeddings_np = np.frombuffer(embeddings_bytes, dtype=np.float32)
-            
-            # Try to infer shape from processed_data if no explicit shape
-            if 'processed_data' in user_data:
-                num_docs = len(user_data['processed_data'])
-                embedding_dim = len(embeddings_np) // num_docs
-                embeddings_np = embeddings_np.reshape(num_docs, embedding_dim)
-                print(f"🔄 Inferred embedding shape: ({num_docs}, {embedding_dim})")
-            
-            embeddings = torch.from_numpy(embeddings_np)
-            # Ensure embeddings are on CPU
-            embeddings = embeddings.cpu()
-
+            start = time.perf_counter()
+            with MetricsService.timer("search", "embedding_decode"):
+                embeddings_b64 = user_data['embeddings']
+                embeddings_bytes = base64.b64decode(embeddings_b64)
+                embedding_shape = (-1,)
+                dtype = EmbeddingCodec.dtype_from_meta(user_data.get('embedding_meta'))
+                
+                # Try to infer shape from processed_data if no explicit shape
+                if 'processed_data' in user_data:
+                    num_docs = len(user_data['processed_data'])
+                    embedding_shape = EmbeddingCodec.infer_shape(len(embeddings_bytes), num_docs, dtype)
+                
+                # The decoded bytes are only referenced by the tensor, so wrap them instead of copying
+                embeddings = SearchService.wrap_embedding_buffer(embeddings_bytes, embedding_shape, dtype)
+            logger.debug("Decoded embeddings from base64 in user_data", extra={
+                "shape": tuple(embeddings.shape), "ms": round((time.perf_counter() - start) * 1000, 2)
+            })
             return embeddings
         else:
-            print(f"❌ No embeddings found - checked database and user_data")
+            logger.error("No embeddings found - checked database and user_data")
             raise SearchServiceException(f"No embeddings found in database, file, or user data for UUID {uuid}")
 
-        
-    
-    # @staticmethod
-    # def decode_embeddings_from_base64(embeddings_b64, num_docs):
-    #     """
-    #     Decode base64 embeddings back to PyTorch tensor
-        
-    #     Args:
-    #         embeddings_b64 (str): Base64 encoded embeddings
-    #         num_docs (int): Number of documents for reshaping
-            
-    #     Returns:
-    #         torch.Tensor: Decoded embeddings tensor
-            
-    #     Raises:
-    #         SearchServiceException: If decoding fails
-    #     """
-    #     try:
-    #         # Decode base64 to bytes
-    #         embeddings_bytes = base64.b64decode(embeddings_b64)
-            
-    #         # Convert bytes to numpy array
-    #         embeddings_np = np.frombuffer(embeddings_bytes, dtype=np.float32)
-            
-    #         # Reshape embeddings (assuming 2D: num_docs x embedding_dim)
-    #         embedding_dim = len(embeddings_np) // num_docs
-    #         embeddings_np = embeddings_np.reshape(num_docs, embedding_dim)
-            
-    #         # Convert to PyTorch tensor
-    #         embeddings = torch.from_numpy(embeddings_np)
-            
-    #         return embeddings
-            
-    #     except Exception as e:
-    #         raise SearchServiceException(f"Failed to decode embeddings: {str(e)}")
-
     """--------------------------------------------------------------------------------------------------------------"""
     """SIMILARITY SCORING FUNCTIONS"""
     
     @staticmethod
-    def query_doc_similarity_scores_UNCHANGED(query, top_k, model, doc_embeddings, keys):
+    def query_doc_similarity_scores_UNCHANGED(query, top_k, model, doc_embeddings, keys, normalized=False, ann_index=None):
         """
         Calculate similarity scores between query and documents
         
@@ -313,6 +658,8 @@ class SearchService:
             model: SentenceTransformer model
             doc_embeddings (torch.Tensor): Document embeddings
             keys (list): Document keys
+            normalized (bool): Whether doc_embeddings rows are already unit length
+            ann_index (dict): Loaded ANN index over doc_embeddings (None for exact search)
             
         Returns:
             dict: Similarity scores and top indices
@@ -322,13 +669,26 @@ class SearchService:
         """
         try:
             # Encode the query
-            query_embedding = SearchService.encode_query_to_embedding(query, model)
-            
-            # Calculate cosine similarities
-            cos_scores = SearchService.calculate_cosine_similarities(query_embedding, doc_embeddings)
+            with MetricsService.timer("search", "query_encode"):
+                query_embedding = SearchService.encode_query_to_embedding(query, model)
+            
+            # Large corpora with an index only score the documents in the closest clusters
+            if normalized and AnnIndexService.should_use(ann_index, len(doc_embeddings)):
+                with MetricsService.timer("search", "ann_search"):
+                    result = AnnIndexService.search(query_embedding, doc_embeddings, ann_index, top_k)
+                if result is not None:
+                    return result
+            
+            # Calculate cosine similarities (a single matrix-vector product for pre-normalized rows)
+            with MetricsService.timer("search", "scoring"):
+                if normalized:
+                    cos_scores = SearchService.calculate_normalized_similarities(query_embedding, doc_embeddings)
+                else:
+                    cos_scores = SearchService.calculate_cosine_similarities(query_embedding, doc_embeddings)
             
             # Get top k results
-            result = SearchService.get_top_k_results(cos_scores, top_k, keys)
+            with MetricsService.timer("search", "top_k"):
+                result = SearchService.get_top_k_results(cos_scores, top_k, keys)
             
             return result
             
@@ -337,25 +697,107 @@ class SearchService:
                 raise
             raise SearchServiceException(f"Error in creating similarity scores: {str(e)}")
     
+    @staticmethod
+    def query_doc_similarity_scores_batch(queries, top_k, model, doc_embeddings, keys, normalized=False, ann_index=None):
+        """
+        Calculate similarity scores between several queries and the documents
+        
+        Args:
+            queries (list): Search queries
+            top_k (int): Number of top results per query
+            model: SentenceTransformer model
+            doc_embeddings (torch.Tensor or np.ndarray): Document embeddings
+            keys (list): Document keys (None when documents are fetched by ordinal)
+            normalized (bool): Whether doc_embeddings rows are already unit length
+            ann_index (dict): Loaded ANN index over doc_embeddings (None for exact search)
+            
+        Returns:
+            list: One {'cos_scores', 'top_indices'} dict per query, like query_doc_similarity_scores_UNCHANGED
+            
+        Raises:
+            SearchServiceException: If similarity scoring fails
+        """
+        try:
+            with MetricsService.timer("search", "query_encode"):
+                query_embeddings = SearchService.encode_queries_to_embeddings(queries, model)
+            
+            # Large corpora with an index only score the documents in each query's closest clusters
+            if normalized and AnnIndexService.should_use(ann_index, len(doc_embeddings)):
+                with MetricsService.timer("search", "ann_search"):
+                    packages = [
+                        AnnIndexService.search(query_embedding, doc_embeddings, ann_index, top_k)
+                        for query_embedding in query_embeddings
+                    ]
+                if all(package is not None for package in packages):
+                    return packages
+            
+            backend = ScoringService.get_backend()
+            document_count = len(keys) if keys is not None else len(doc_embeddings)
+            with MetricsService.timer("search", "scoring"):
+                cos_scores = backend.batch_similarities(query_embeddings, doc_embeddings, normalized)
+            with MetricsService.timer("search", "top_k"):
+                top_indices = backend.batch_top_k(cos_scores, min(top_k, document_count))
+            
+            return [
+                {'cos_scores': cos_scores[row], 'top_indices': top_indices[row].reshape(1, -1)}
+                for row in range(len(queries))
+            ]
+            
+        except Exception as e:
+            if isinstance(e, SearchServiceException):
+                raise
+            raise SearchServiceException(f"Error in creating similarity scores: {str(e)}")
+
+    @staticmethod
+    def encode_queries_to_embeddings(queries, model):
+        """
+        Encode several queries in one model.encode call (repeated queries come from QueryEmbeddingCacheService)
+        
+        Args:
+            queries (list): Search queries
+            model: SentenceTransformer model
+            
+        Returns:
+            torch.Tensor or np.ndarray: (num_queries, dim) float32 query embeddings in the scoring backend's type
+        """
+        embeddings = {}
+        for query in queries:
+            query_embedding = QueryEmbeddingCacheService.get(model, query)
+            if query_embedding is not None:
+                embeddings[query] = query_embedding
+        
+        missing = list(dict.fromkeys(query for query in queries if query not in embeddings))
+        if missing:
+            # NumPy output, so an ONNX or remote encoder never imports torch (the backend converts below)
+            encoded = np.asarray(model.encode(missing, convert_to_numpy=True), dtype=np.float32)
+            for row, query in enumerate(missing):
+                embeddings[query] = encoded[row].copy()
+                QueryEmbeddingCacheService.put(model, query, embeddings[query])
+        
+        query_embeddings = np.stack([np.asarray(embeddings[query], dtype=np.float32) for query in queries])
+        return ScoringService.get_backend().as_matrix(query_embeddings)
+
     @staticmethod
     def encode_query_to_embedding(query, model):
         """
-        Encode search query to embedding vector
+        Encode search query to embedding vector (repeated queries come from QueryEmbeddingCacheService)
         
         Args:
             query (str): Search query
             model: SentenceTransformer model
             
         Returns:
-            torch.Tensor: Query embedding
+            torch.Tensor or np.ndarray: Query embedding in the scoring backend's type
             
         Raises:
             SearchServiceException: If query encoding fails
         """
-        query_embedding = model.encode(query, convert_to_tensor=True)
-        # Always ensure the query embedding is on CPU
-        query_embedding = query_embedding.cpu()
-        return query_embedding
+        query_embedding = QueryEmbeddingCacheService.get(model, query)
+        if query_embedding is None:
+            # NumPy output (always on CPU), so an ONNX or remote encoder never imports torch
+            query_embedding = np.asarray(model.encode(query, convert_to_numpy=True), dtype=np.float32)
+            QueryEmbeddingCacheService.put(model, query, query_embedding)
+        return ScoringService.get_backend().as_vector(query_embedding)
         
             
     
@@ -367,40 +809,49 @@ class SearchService:
         
         Args:
             query_embedding (torch.Tensor): Query embedding
-            doc_embeddings (torch.Tensor): Document embeddings
+            doc_embeddings (torch.Tensor or np.ndarray): Document embeddings
             
         Returns:
-            torch.Tensor: Cosine similarity scores
+            torch.Tensor or np.ndarray: Cosine similarity scores (in the scoring backend's type)
             
         Raises:
             SearchServiceException: If similarity calculation fails
         """
-        # Ensure both tensors are on the same device (CPU)
-        query_embedding = query_embedding.cpu()
-        doc_embeddings = doc_embeddings.cpu()
-        
-        cos_scores = util.pytorch_cos_sim(query_embedding, doc_embeddings)
+        # Both are already on CPU (queries are moved there once when encoded, documents are decoded there)
+        cos_scores = ScoringService.get_backend().cosine_similarities(query_embedding, doc_embeddings)
         return cos_scores
     
+    @staticmethod
+    def calculate_normalized_similarities(query_embedding, doc_embeddings):
+        """
+        Calculate cosine similarities against unit-length document rows (only the query is normalized)
+        
+        Args:
+            query_embedding (torch.Tensor): Query embedding
+            doc_embeddings (torch.Tensor or np.ndarray): L2-normalized document embeddings
+            
+        Returns:
+            torch.Tensor or np.ndarray: Cosine similarity scores with shape (1, num_docs)
+        """
+        return ScoringService.get_backend().normalized_similarities(query_embedding, doc_embeddings)
+    
     @staticmethod
     def get_top_k_results(cos_scores, top_k, keys):
         """
         Get top k results from similarity scores
         
         Args:
-            cos_scores (torch.Tensor): Cosine similarity scores
+            cos_scores (torch.Tensor or np.ndarray): Cosine similarity scores
             top_k (int): Number of top results to return
             keys (list): Document keys
             
         Returns:
-            dict: Top scores and indices
+            dict: Flattened scores and (1, k) top indices
        
         """
-        # Get top k results
-        top_scores, top_indices = torch.topk(cos_scores, k=min(top_k, len(keys)))
-        
-        # Flatten scores for easier access
-        cos_scores = cos_scores.flatten()
+        # Get top k results (keys is None when documents are fetched by ordinal)
+        document_count = len(keys) if keys is not None else cos_scores.shape[-1]
+        cos_scores, top_indices = ScoringService.get_backend().top_k(cos_scores, min(top_k, document_count))
         
         return {'cos_scores': cos_scores, 'top_indices': top_indices}
             
@@ -427,13 +878,14 @@ class SearchService:
             SearchServiceException: If result creation fails
         """
         try:
-            results = []
-            
-            for idx in top_indices[0]:
-                result = SearchService.format_single_result(idx, cos_scores, keys, data)
-                results.append(result)
-            
-            return results
+            with MetricsService.timer("search", "result_formatting"):
+                results = []
+                
+                for idx in top_indices[0]:
+                    result = SearchService.format_single_result(idx, cos_scores, keys, data)
+                    results.append(result)
+                
+                return results
             
         except Exception as e:
             if isinstance(e, SearchServiceException):
@@ -469,6 +921,45 @@ class SearchService:
             }
         except IndexError:
             raise SearchServiceException("idx is out of bounds for keys array given")
+
+    @staticmethod
+    def create_results_from_documents(cos_scores, top_indices, fetch_documents):
+        """
+        Create formatted results by fetching only the top-ranked documents
+        
+        Args:
+            cos_scores (torch.Tensor): Similarity scores
+            top_indices (torch.Tensor): Top result indices (document ordinals)
+            fetch_documents (callable): Maps a list of ordinals to {ordinal: (key, content)}
+            
+        Returns:
+            list: Formatted search results
+            
+        Raises:
+            SearchServiceException: If a ranked document cannot be fetched
+        """
+        try:
+            ordinals = [int(idx) for idx in top_indices[0]]
+            documents = fetch_documents(ordinals)
+            
+            with MetricsService.timer("search", "result_formatting"):
+                results = []
+                for ordinal in ordinals:
+                    if ordinal not in documents:
+                        raise SearchServiceException(f"Document {ordinal} missing from storage, reupload conversations.json")
+                    key, content = documents[ordinal]
+                    results.append({
+                        "key": key,
+                        "similarity": float(cos_scores[ordinal]),
+                        "content": content
+                    })
+                
+                return results
+            
+        except Exception as e:
+            if isinstance(e, SearchServiceException):
+                raise
+            raise SearchServiceException(f"Error in preparing results array: {str(e)}")
             
         
 
@@ -0,0 +1,198 @@
+import os
+import hashlib
+import uuid as uuid_lib
+import numpy as np
+from routes.logging_service import LoggingService
+
+
+logger = LoggingService.get_logger("shared_embeddings")
+
+
+class SharedEmbeddingsService:
+    """
+    Shares decoded embedding matrices between gunicorn workers through memory-mapped files.
+
+    The first worker that loads a version of a user's embeddings decodes them and writes the float32
+    matrix once to SHARED_EMBEDDINGS_DIR, in a file named after the user and the version of their
+    stored data; every worker then maps that file read-only. Workers loading the same version find
+    the file by name and map it without decoding anything, so the operating system keeps a single
+    copy of it in the page cache however many workers search it.
+    """
+
+    # Shared embedding settings - loaded from environment
+    DIR = os.getenv("SHARED_EMBEDDINGS_DIR", "")  # Empty disables sharing (a tmpfs such as /dev/shm is ideal)
+    MAX_MB = int(os.getenv("SHARED_EMBEDDINGS_MAX_MB", "0"))  # Oldest files are removed beyond this size (0 = half of DIR's filesystem)
+
+    SUFFIX = ".f32"
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """SHARE FUNCTIONS (used by routes/search.py)"""
+
+    @staticmethod
+    def share(user_uuid, version, embedding_shape, decode):
+        """
+        Get a read-only memory map of the shared file of a user's embeddings, decoding and writing it
+        only when no worker has shared this version yet
+
+        Args:
+            user_uuid (str): User's UUID
+            version: Version token of the stored data the embeddings come from (see SearchService.load_version)
+            embedding_shape (tuple): (rows, dim) shape of the matrix
+            decode (callable): Returns the float32 (rows, dim) matrix; only called on a miss
+
+        Returns:
+            np.ndarray: A read-only np.memmap of the shared file, or the decoded matrix itself when
+            sharing is disabled, the version is unknown, the matrix exceeds the budget, or the file
+            cannot be written
+        """
+        if not SharedEmbeddingsService.DIR or version is None:
+            return decode()
+
+        try:
+            shape = tuple(int(size) for size in embedding_shape)
+            path = SharedEmbeddingsService.shared_path(user_uuid, version, shape)
+            if os.path.exists(path):
+                # Mark the file as recently used so pruning removes it last
+                os.utime(path)
+                return np.memmap(path, dtype=np.float32, mode='r', shape=shape)
+
+            embeddings_np = np.ascontiguousarray(decode(), dtype=np.float32)
+            if embeddings_np.size == 0 or embeddings_np.nbytes > SharedEmbeddingsService.budget_bytes():
+                return embeddings_np
+            SharedEmbeddingsService._write(path, embeddings_np)
+            # Older versions of this user's matrix are never mapped again
+            SharedEmbeddingsService.delete(user_uuid, keep=path)
+            SharedEmbeddingsService.prune(keep=path)
+            return np.memmap(path, dtype=np.float32, mode='r', shape=embeddings_np.shape)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not share embeddings through %s, keeping a private copy: %s", SharedEmbeddingsService.DIR, e)
+            return decode()
+
+    @staticmethod
+    def shared_path(user_uuid, version, embedding_shape):
+        """
+        File a user's matrix is shared through: every worker loading the same version maps the same file
+
+        Returns:
+            str: <DIR>/<user digest>-<version digest>-<rows>x<dim>.f32
+        """
+        rows, dim = embedding_shape
+        version_digest = hashlib.blake2b(repr(version).encode('utf-8'), digest_size=8).hexdigest()
+        return os.path.join(
+            SharedEmbeddingsService.DIR,
+            f"{SharedEmbeddingsService._user_prefix(user_uuid)}{version_digest}-{rows}x{dim}{SharedEmbeddingsService.SUFFIX}"
+        )
+
+    @staticmethod
+    def _user_prefix(user_uuid):
+        """File name prefix of a user's shared files (a digest, so any UUID is a safe file name)"""
+        return hashlib.blake2b(str(user_uuid).encode('utf-8'), digest_size=8).hexdigest() + "-"
+
+    @staticmethod
+    def budget_bytes():
+        """
+        Total size shared files may take: MAX_MB, or half of the filesystem DIR lives on (Docker's
+        default /dev/shm is only 64 MB)
+
+        Returns:
+            int: Budget in bytes (0 when DIR's filesystem cannot be read)
+        """
+        if SharedEmbeddingsService.MAX_MB > 0:
+            return SharedEmbeddingsService.MAX_MB * 1024 * 1024
+        path = SharedEmbeddingsService.DIR
+        while path and not os.path.isdir(path):
+            path = os.path.dirname(path)
+        try:
+            stat = os.statvfs(path or ".")
+            return stat.f_blocks * stat.f_frsize // 2
+        except (OSError, AttributeError):
+            return 0
+
+    @staticmethod
+    def _write(path, embeddings_np):
+        """Write the matrix to a temporary file and rename it so no worker maps a partial file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid_lib.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(memoryview(embeddings_np).cast('B'))
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    """--------------------------------------------------------------------------------------------------------------"""
+    """MAINTENANCE FUNCTIONS"""
+
+    @staticmethod
+    def delete(user_uuid, keep=None):
+        """
+        Remove a user's shared files (used by routes/delete.py, and after sharing a newer version).
+        Workers that still map a removed file keep reading it until they drop it.
+
+        Args:
+            user_uuid (str): User's UUID
+            keep (str): Path of a file that must stay (the one just written)
+
+        Returns:
+            int: Number of files removed
+        """
+        if not SharedEmbeddingsService.DIR:
+            return 0
+        prefix = SharedEmbeddingsService._user_prefix(user_uuid)
+        try:
+            names = [
+                name for name in os.listdir(SharedEmbeddingsService.DIR)
+                if name.startswith(prefix) and name.endswith(SharedEmbeddingsService.SUFFIX)
+            ]
+        except OSError:
+            return 0
+
+        removed = 0
+        for name in names:
+            path = os.path.join(SharedEmbeddingsService.DIR, name)
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    @staticmethod
+    def prune(keep=None):
+        """
+        Remove the least recently used shared files beyond budget_bytes(). Workers that still map a
+        removed file keep reading it; its memory is released when the last mapping goes away.
+
+        Args:
+            keep (str): Path of a file that must stay (the one just written)
+
+        Returns:
+            int: Number of files removed
+        """
+        try:
+            files = []
+            for name in os.listdir(SharedEmbeddingsService.DIR):
+                if name.endswith(SharedEmbeddingsService.SUFFIX):
+                    stat = os.stat(os.path.join(SharedEmbeddingsService.DIR, name))
+                    files.append((stat.st_mtime, stat.st_size, name))
+        except OSError:
+            return 0
+
+        total = sum(size for _mtime, size, _name in files)
+        budget = SharedEmbeddingsService.budget_bytes()
+        removed = 0
+        for _mtime, size, name in sorted(files):
+            if total <= budget:
+                break
+            if os.path.join(SharedEmbeddingsService.DIR, name) == keep:
+                continue
+            try:
+                os.remove(os.path.join(SharedEmbeddingsService.DIR, name))
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        return removed
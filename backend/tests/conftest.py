@@ -5,7 +5,7 @@ Pytest configuration file for ChatGPT Augmenter backend tests
 import pytest
 import sys
 import os
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 import torch
 import numpy as np
 
@@ -82,6 +82,35 @@ def sample_processed_data():
     }
 
 
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """Start every test with empty process-wide user data and query embedding caches"""
+    from routes.cache import CacheService, QueryEmbeddingCacheService
+    CacheService.clear()
+    QueryEmbeddingCacheService.clear()
+    yield
+    CacheService.clear()
+    QueryEmbeddingCacheService.clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_embedding_cache():
+    """Keep the persistent embedding cache out of tests unless a test enables it"""
+    from routes.embedding_cache import EmbeddingCacheService
+    EmbeddingCacheService.reset_stats()
+    with patch.object(EmbeddingCacheService, 'ENABLED', False):
+        yield
+    EmbeddingCacheService.reset_stats()
+
+
+@pytest.fixture(autouse=True)
+def disable_shared_embeddings():
+    """Keep decoded embeddings in memory (no shared files) unless a test enables sharing"""
+    from routes.shared_embeddings import SharedEmbeddingsService
+    with patch.object(SharedEmbeddingsService, 'DIR', ''):
+        yield
+
+
 @pytest.fixture
 def test_uuid():
     """Test UUID for consistent testing"""
@@ -113,6 +142,11 @@ def pytest_configure(config):
         "markers", 
         "unit: marks tests as unit tests"
     )
+    # Read-only buffers (memory maps, bytes from Postgres) must be wrapped without torch's warning
+    config.addinivalue_line(
+        "filterwarnings",
+        "error:The given NumPy array is not writable:UserWarning"
+    )
 
 
 # Custom pytest collection rules
@@ -0,0 +1,150 @@
+import pytest
+import numpy as np
+import torch
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.ann_index import AnnIndexService, AnnIndexServiceException
+from routes.search import SearchService
+from routes.scoring import ScoringService
+
+
+class TestAnnIndexService:
+    """Test suite for AnnIndexService class"""
+
+    def setup_method(self):
+        """Set up clustered unit-length embeddings and a small index threshold"""
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((8, 16)).astype(np.float32)
+        embeddings = centers[np.arange(400) % 8] + 0.1 * rng.standard_normal((400, 16)).astype(np.float32)
+        self.embeddings = torch.nn.functional.normalize(torch.from_numpy(embeddings), p=2, dim=-1)
+        self.min_documents = patch.object(AnnIndexService, 'MIN_DOCUMENTS', 100)
+        self.nprobe = patch.object(AnnIndexService, 'NPROBE', 2)
+        self.min_documents.start()
+        self.nprobe.start()
+
+    def teardown_method(self):
+        """Restore the index settings"""
+        self.nprobe.stop()
+        self.min_documents.stop()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR BUILD()"""
+
+    def test_unit_build_groups_every_document_once(self):
+        """Test every ordinal appears in exactly one cluster"""
+        ann_index = AnnIndexService.build(self.embeddings, lists=8)
+
+        assert ann_index["centroids"].shape == (8, 16)
+        assert ann_index["offsets"][0] == 0 and ann_index["offsets"][-1] == 400
+        assert sorted(ann_index["ids"].tolist()) == list(range(400))
+
+    def test_unit_build_empty_embeddings(self):
+        """Test building over no rows raises"""
+        with pytest.raises(AnnIndexServiceException):
+            AnnIndexService.build(torch.empty((0, 16)))
+
+    def test_unit_build_for_storage_threshold(self):
+        """Test an index is only built for normalized corpora at or above MIN_DOCUMENTS"""
+        assert AnnIndexService.build_for_storage(self.embeddings[:99]) is None
+        assert AnnIndexService.build_for_storage(self.embeddings, normalized=False) is None
+        assert isinstance(AnnIndexService.build_for_storage(self.embeddings), bytes)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SEARCH() AND LOAD()"""
+
+    def test_unit_search_matches_exact_top_k(self):
+        """Test the probed clusters return the same top results as brute force on clustered data"""
+        ann_index = AnnIndexService.build(self.embeddings, lists=8)
+        query = self.embeddings[5] + 0.01
+
+        result = AnnIndexService.search(query, self.embeddings, ann_index, 6)
+        exact = SearchService.calculate_normalized_similarities(query, self.embeddings)
+
+        assert set(result["top_indices"][0].tolist()) == set(torch.topk(exact, k=6).indices[0].tolist())
+        top = int(result["top_indices"][0][0])
+        assert float(result["cos_scores"][top]) == pytest.approx(float(exact[0][top]), abs=1e-5)
+
+    def test_unit_search_too_few_candidates(self):
+        """Test search gives up (exact fallback) when the probed clusters are smaller than top_k"""
+        ann_index = AnnIndexService.build(self.embeddings, lists=8)
+
+        with patch.object(AnnIndexService, 'NPROBE', 1):
+            assert AnnIndexService.search(self.embeddings[0], self.embeddings, ann_index, 100) is None
+
+    def test_unit_load_round_trip_and_mismatch(self):
+        """Test a stored index loads back, and an index for another document count is ignored"""
+        index_bytes = AnnIndexService.serialize(AnnIndexService.build(self.embeddings, lists=8))
+
+        loaded = AnnIndexService.load(index_bytes, 400)
+
+        assert loaded["ids"].dtype == torch.int64
+        assert AnnIndexService.load(index_bytes, 401) is None
+        assert AnnIndexService.load(b"not an index", 400) is None
+        assert AnnIndexService.load(None, 400) is None
+
+    def test_unit_numpy_backend_builds_and_searches_without_torch(self):
+        """Test the numpy scoring backend builds, loads and searches the index with NumPy arrays only"""
+        embeddings = self.embeddings.numpy()
+
+        with patch.object(ScoringService, 'BACKEND', 'numpy'):
+            ann_index = AnnIndexService.load(AnnIndexService.serialize(AnnIndexService.build(embeddings, lists=8)), 400)
+            result = AnnIndexService.search(embeddings[5] + 0.01, embeddings, ann_index, 6)
+        exact = SearchService.calculate_normalized_similarities(self.embeddings[5] + 0.01, self.embeddings)
+
+        assert isinstance(ann_index["centroids"], np.ndarray) and isinstance(ann_index["ids"], np.ndarray)
+        assert isinstance(result["cos_scores"], np.ndarray) and result["top_indices"].shape == (1, 6)
+        assert set(result["top_indices"][0].tolist()) == set(torch.topk(exact, k=6).indices[0].tolist())
+        top = int(result["top_indices"][0][0])
+        assert float(result["cos_scores"][top]) == pytest.approx(float(exact[0][top]), abs=1e-5)
+
+    def test_unit_numpy_backend_too_few_candidates(self):
+        """Test the NumPy search path also gives up when the probed clusters are smaller than top_k"""
+        embeddings = self.embeddings.numpy()
+
+        with patch.object(ScoringService, 'BACKEND', 'numpy'), patch.object(AnnIndexService, 'NPROBE', 1):
+            ann_index = AnnIndexService.build(embeddings, lists=8)
+            assert AnnIndexService.search(embeddings[0], embeddings, ann_index, 100) is None
+
+    def test_unit_should_use_threshold(self):
+        """Test small corpora keep exact search even when an index exists"""
+        ann_index = AnnIndexService.build(self.embeddings[:50], lists=4)
+
+        assert AnnIndexService.should_use(ann_index, 50) is False
+        assert AnnIndexService.should_use(None, 400) is False
+        assert AnnIndexService.should_use(AnnIndexService.build(self.embeddings, lists=8), 400) is True
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SEARCH INTEGRATION"""
+
+    @patch('routes.search.SearchService.encode_query_to_embedding')
+    def test_integration_similarity_scores_use_index(self, mock_encode):
+        """Test normalized searches above the threshold go through the index"""
+        mock_encode.return_value = self.embeddings[3]
+        ann_index = AnnIndexService.build(self.embeddings, lists=8)
+
+        with patch('routes.search.AnnIndexService.search', wraps=AnnIndexService.search) as mock_search:
+            result = SearchService.query_doc_similarity_scores_UNCHANGED(
+                "query", 6, Mock(), self.embeddings, None, normalized=True, ann_index=ann_index
+            )
+
+        mock_search.assert_called_once()
+        assert int(result["top_indices"][0][0]) == 3
+
+    @patch('routes.search.SearchService.encode_query_to_embedding')
+    def test_integration_similarity_scores_exact_without_normalization(self, mock_encode):
+        """Test legacy (unnormalized) embeddings never use the index"""
+        mock_encode.return_value = self.embeddings[3]
+        ann_index = AnnIndexService.build(self.embeddings, lists=8)
+
+        with patch('routes.search.AnnIndexService.search') as mock_search:
+            result = SearchService.query_doc_similarity_scores_UNCHANGED(
+                "query", 6, Mock(), self.embeddings, None, normalized=False, ann_index=ann_index
+            )
+
+        mock_search.assert_not_called()
+        assert not torch.isnan(result["cos_scores"]).any()
@@ -0,0 +1,177 @@
+import torch
+import sys
+import os
+import time
+from unittest.mock import Mock, patch
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.cache import CacheService, QueryEmbeddingCacheService
+from database.document_codec import DocumentCodec
+
+
+class TestCacheService:
+    """Test suite for CacheService class"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.original_max_bytes = CacheService.MAX_BYTES
+        self.test_uuid = "test-uuid-123"
+        self.test_extraction = {
+            "doc_embeddings": torch.zeros((4, 8), dtype=torch.float32),
+            "data": {"How do I learn Python?": "Start with basics"},
+            "keys": ["How do I learn Python?"]
+        }
+
+    def teardown_method(self):
+        """Restore the configured memory budget"""
+        CacheService.MAX_BYTES = self.original_max_bytes
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR GET() / PUT() / INVALIDATE()"""
+
+    def test_unit_get_miss(self):
+        """Test get on an empty cache"""
+        assert CacheService.get(self.test_uuid) is None
+        assert CacheService.stats()["misses"] == 1
+
+    def test_unit_put_then_get_hit(self):
+        """Test a cached entry is returned on the next get"""
+        assert CacheService.put(self.test_uuid, self.test_extraction) is True
+
+        result = CacheService.get(self.test_uuid)
+
+        assert result is self.test_extraction
+        assert CacheService.stats()["hits"] == 1
+        assert CacheService.stats()["entries"] == 1
+
+    def test_unit_invalidate_removes_entry(self):
+        """Test invalidate drops the cached entry and its bytes"""
+        CacheService.put(self.test_uuid, self.test_extraction)
+
+        assert CacheService.invalidate(self.test_uuid) is True
+        assert CacheService.get(self.test_uuid) is None
+        assert CacheService.stats()["total_bytes"] == 0
+
+    def test_unit_invalidate_unknown_or_invalid_uuid(self):
+        """Test invalidate tolerates unknown and non-string uuids"""
+        assert CacheService.invalidate("missing-uuid") is False
+        assert CacheService.invalidate(None) is False
+        assert CacheService.invalidate(123) is False
+
+    def test_unit_get_drops_stale_version(self):
+        """Test a hit whose version no longer matches the stored data is dropped (e.g. written by another worker)"""
+        CacheService.put(self.test_uuid, self.test_extraction, ("database", 1))
+
+        assert CacheService.get(self.test_uuid, validate=lambda version: version == ("database", 1)) is self.test_extraction
+        assert CacheService.get(self.test_uuid, validate=lambda version: False) is None
+        assert CacheService.stats()["stale"] == 1
+        assert CacheService.stats()["entries"] == 0
+
+    def test_unit_get_expires_after_ttl(self):
+        """Test entries are reloaded after TTL_SECONDS even when their version cannot be checked"""
+        CacheService.put(self.test_uuid, self.test_extraction)
+
+        with patch.object(CacheService, 'TTL_SECONDS', 10), patch('routes.cache.time.monotonic', return_value=time.monotonic() + 11):
+            assert CacheService.get(self.test_uuid) is None
+        assert CacheService.stats()["stale"] == 1
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR LRU EVICTION AND MEMORY BUDGET"""
+
+    def test_unit_put_evicts_least_recently_used(self):
+        """Test the least recently used user is evicted when the budget is exceeded"""
+        entry_size = CacheService.estimate_size(self.test_extraction)
+        CacheService.MAX_BYTES = entry_size * 2
+
+        CacheService.put("uuid-a", self.test_extraction)
+        CacheService.put("uuid-b", self.test_extraction)
+        CacheService.get("uuid-a")  # uuid-b becomes least recently used
+        CacheService.put("uuid-c", self.test_extraction)
+
+        assert CacheService.get("uuid-a") is not None
+        assert CacheService.get("uuid-b") is None
+        assert CacheService.get("uuid-c") is not None
+        assert CacheService.stats()["evictions"] == 1
+        assert CacheService.stats()["total_bytes"] <= CacheService.MAX_BYTES
+
+    def test_unit_put_entry_larger_than_budget(self):
+        """Test an entry larger than the whole budget is not cached"""
+        CacheService.MAX_BYTES = 16
+
+        assert CacheService.put(self.test_uuid, self.test_extraction) is False
+        assert CacheService.get(self.test_uuid) is None
+
+    def test_unit_put_replaces_existing_entry(self):
+        """Test re-caching a user does not double count its bytes"""
+        CacheService.put(self.test_uuid, self.test_extraction)
+        CacheService.put(self.test_uuid, self.test_extraction)
+
+        stats = CacheService.stats()
+        assert stats["entries"] == 1
+        assert stats["total_bytes"] == CacheService.estimate_size(self.test_extraction)
+
+    def test_unit_estimate_size_counts_embeddings(self):
+        """Test the size estimate includes the embedding matrix"""
+        size = CacheService.estimate_size({"doc_embeddings": torch.zeros((10, 10), dtype=torch.float32)})
+        assert size == 400
+
+
+    def test_unit_estimate_size_counts_packed_documents(self):
+        """Test the size estimate includes packed documents reached through fetch_documents"""
+        documents = DocumentCodec.open(*DocumentCodec.pack(["prompt"], {"prompt": "response"}))
+        size = CacheService.estimate_size({"fetch_documents": documents.fetch})
+        assert size == len("promptresponse") + 3 * 8
+
+
+class TestQueryEmbeddingCacheService:
+    """Test suite for QueryEmbeddingCacheService class"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.model = Mock()
+        self.embedding = torch.tensor([0.1, 0.2])
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR GET() / PUT()"""
+
+    def test_unit_put_then_get_normalized_query(self):
+        """Test queries differing only in whitespace share an entry"""
+        QueryEmbeddingCacheService.put(self.model, "learn  python ", self.embedding)
+
+        assert QueryEmbeddingCacheService.get(self.model, "learn python") is self.embedding
+        assert QueryEmbeddingCacheService.get(self.model, "Learn python") is None
+        stats = QueryEmbeddingCacheService.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_unit_get_other_model_misses(self):
+        """Test an embedding from one model is never returned for another"""
+        QueryEmbeddingCacheService.put(self.model, "learn python", self.embedding)
+
+        assert QueryEmbeddingCacheService.get(Mock(), "learn python") is None
+
+    def test_unit_get_expired_entry(self):
+        """Test entries older than the TTL are dropped"""
+        with patch('routes.cache.time.monotonic', return_value=100.0):
+            QueryEmbeddingCacheService.put(self.model, "learn python", self.embedding)
+        with patch('routes.cache.time.monotonic', return_value=100.0 + QueryEmbeddingCacheService.TTL_SECONDS + 1):
+            assert QueryEmbeddingCacheService.get(self.model, "learn python") is None
+
+        stats = QueryEmbeddingCacheService.stats()
+        assert stats["expirations"] == 1
+        assert stats["entries"] == 0
+
+    def test_unit_put_evicts_least_recently_used(self):
+        """Test the oldest query is evicted once MAX_ENTRIES is exceeded"""
+        with patch.object(QueryEmbeddingCacheService, 'MAX_ENTRIES', 2):
+            QueryEmbeddingCacheService.put(self.model, "first", self.embedding)
+            QueryEmbeddingCacheService.put(self.model, "second", self.embedding)
+            QueryEmbeddingCacheService.get(self.model, "first")
+            QueryEmbeddingCacheService.put(self.model, "third", self.embedding)
+
+            assert QueryEmbeddingCacheService.get(self.model, "second") is None
+            assert QueryEmbeddingCacheService.get(self.model, "first") is self.embedding
+            assert QueryEmbeddingCacheService.stats()["evictions"] == 1
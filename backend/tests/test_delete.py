@@ -9,6 +9,7 @@ from unittest.mock import Mock, patch, MagicMock, mock_open
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from routes.delete import DeleteService, DeleteServiceException
+from routes.cache import CacheService
 from database.postgres import DatabaseServiceException, TableNotFoundException, UserNotFoundException
 
 
@@ -172,6 +173,19 @@ class TestDeleteService:
         assert result["success"] is True
         mock_db_delete.assert_called_once_with(self.test_uuid)  # Should be stripped
 
+    @patch('routes.delete.DeleteService.delete_from_database')
+    def test_delete_service_invalidates_user_cache(self, mock_db_delete):
+        """Test deletion drops the user's cached search data"""
+        # Arrange
+        mock_db_delete.return_value = self.mock_db_success_result
+        CacheService.put(self.test_uuid, {"doc_embeddings": None, "data": {}, "keys": []})
+        
+        # Act
+        DeleteService.delete_service(self.test_uuid)
+        
+        # Assert
+        assert CacheService.get(self.test_uuid) is None
+
     @patch('routes.delete.DeleteService.delete_from_database')
     def test_delete_service_unexpected_exception_handling(self, mock_db_delete):
         """Test handling of unexpected exceptions during deletion"""
@@ -0,0 +1,150 @@
+import pytest
+import numpy as np
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.embedding_cache import EmbeddingCacheService
+from routes.extract import ExtractService
+from database.postgres import DatabaseServiceException
+
+
+class TestEmbeddingCacheService:
+    """Test suite for EmbeddingCacheService class"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.mock_model = Mock()
+        self.texts = ["How do I learn Python?", "What is deep learning?"]
+        self.enabled = patch.object(EmbeddingCacheService, 'ENABLED', True)
+        self.model_id = patch.object(EmbeddingCacheService, 'MODEL_ID', 'test-model')
+        self.enabled.start()
+        self.model_id.start()
+
+    def teardown_method(self):
+        """Restore the cache settings"""
+        self.model_id.stop()
+        self.enabled.stop()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR LOOKUP() AND STORE()"""
+
+    @patch('routes.embedding_cache.DatabaseService.load_cached_embeddings')
+    def test_unit_lookup_counts_hits_and_misses(self, mock_load):
+        """Test lookup returns cached rows by text index and updates the counters"""
+        first_hash = EmbeddingCacheService.text_hash(self.texts[0])
+        mock_load.return_value = {first_hash: np.array([0.1, 0.2], dtype=np.float32).tobytes()}
+
+        found = EmbeddingCacheService.lookup(self.texts, self.mock_model)
+
+        assert list(found.keys()) == [0]
+        assert found[0].tolist() == pytest.approx([0.1, 0.2])
+        assert mock_load.call_args[0][0] == "test-model"
+        stats = EmbeddingCacheService.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    @patch('routes.embedding_cache.DatabaseService.load_cached_embeddings')
+    def test_unit_lookup_database_error(self, mock_load):
+        """Test an unavailable cache is treated as all misses without raising"""
+        mock_load.side_effect = DatabaseServiceException("connection failed")
+
+        assert EmbeddingCacheService.lookup(self.texts, self.mock_model) == {}
+        assert EmbeddingCacheService.stats()["errors"] == 1
+
+    @patch('routes.embedding_cache.DatabaseService.load_cached_embeddings')
+    def test_unit_lookup_disabled(self, mock_load):
+        """Test a disabled cache never queries the database"""
+        with patch.object(EmbeddingCacheService, 'ENABLED', False):
+            assert EmbeddingCacheService.lookup(self.texts, self.mock_model) == {}
+        mock_load.assert_not_called()
+
+    @patch('routes.embedding_cache.DatabaseService.store_cached_embeddings')
+    def test_unit_store_writes_hashes_and_counts_evictions(self, mock_store):
+        """Test store writes one (hash, bytes) entry per text and records evictions"""
+        mock_store.return_value = 3
+        embeddings = np.array([[0.1, 0.2], [0.3, 0.4]], dtype=np.float32)
+
+        assert EmbeddingCacheService.store(self.texts, embeddings, self.mock_model) is True
+
+        model_id, entries, max_entries = mock_store.call_args[0]
+        assert model_id == "test-model"
+        assert entries[1] == (EmbeddingCacheService.text_hash(self.texts[1]), embeddings[1].tobytes())
+        assert max_entries == EmbeddingCacheService.MAX_ENTRIES
+        stats = EmbeddingCacheService.stats()
+        assert stats["writes"] == 2
+        assert stats["evictions"] == 3
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR HELPER FUNCTIONS"""
+
+    def test_unit_text_hash_normalizes_text(self):
+        """Test composed/decomposed Unicode and surrounding whitespace hash identically"""
+        assert EmbeddingCacheService.text_hash("  café\n") == EmbeddingCacheService.text_hash("café")
+        assert EmbeddingCacheService.text_hash("a") != EmbeddingCacheService.text_hash("b")
+
+    def test_unit_resolve_model_id_from_model(self):
+        """Test the model id combines the base model name and the embedding dimension"""
+        self.mock_model.model_card_data.base_model = "all-MiniLM-L6-v2"
+        self.mock_model.get_sentence_embedding_dimension.return_value = 384
+
+        with patch.object(EmbeddingCacheService, 'MODEL_ID', ''):
+            assert EmbeddingCacheService.resolve_model_id(self.mock_model) == "all-MiniLM-L6-v2:384"
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR EXTRACT INTEGRATION"""
+
+    @patch('routes.embedding_cache.DatabaseService.store_cached_embeddings', return_value=0)
+    @patch('routes.embedding_cache.DatabaseService.load_cached_embeddings')
+    def test_integration_encode_texts_only_encodes_misses(self, mock_load, mock_store):
+        """Test extract encodes only uncached texts and writes just those back"""
+        mock_load.return_value = {
+            EmbeddingCacheService.text_hash(self.texts[1]): np.array([0.5, 0.5], dtype=np.float32).tobytes()
+        }
+        self.mock_model.encode.return_value = np.array([[0.9, 0.1]], dtype=np.float32)
+
+        embeddings = ExtractService.encode_texts(self.texts, self.mock_model)
+
+        assert isinstance(embeddings, np.ndarray)
+        assert embeddings.tolist() == [[pytest.approx(0.9), pytest.approx(0.1)], [0.5, 0.5]]
+        assert self.mock_model.encode.call_args[0][0] == [self.texts[0]]
+        assert [text_hash for text_hash, _ in mock_store.call_args[0][1]] == [EmbeddingCacheService.text_hash(self.texts[0])]
+
+    @patch('routes.embedding_cache.DatabaseService.store_cached_embeddings')
+    @patch('routes.embedding_cache.DatabaseService.load_cached_embeddings')
+    def test_integration_encode_texts_all_cached(self, mock_load, mock_store):
+        """Test a fully cached batch skips the model and reports completion"""
+        mock_load.return_value = {
+            EmbeddingCacheService.text_hash(text): np.array([1.0, 0.0], dtype=np.float32).tobytes() for text in self.texts
+        }
+        progress = []
+
+        embeddings = ExtractService.encode_texts(self.texts, self.mock_model, progress_callback=lambda done, total: progress.append((done, total)))
+
+        assert embeddings.tolist() == [[1.0, 0.0], [1.0, 0.0]]
+        self.mock_model.encode.assert_not_called()
+        mock_store.assert_not_called()
+        assert progress == [(2, 2)]
+
+    @patch('routes.embedding_cache.DatabaseService.store_cached_embeddings', return_value=0)
+    @patch('routes.embedding_cache.DatabaseService.load_cached_embeddings')
+    def test_integration_encode_texts_reencodes_only_stale_rows(self, mock_load, mock_store):
+        """Test cached rows of the wrong dimension are re-encoded alone and hits are reported separately"""
+        texts = self.texts + ["What is a tensor?"]
+        mock_load.return_value = {
+            EmbeddingCacheService.text_hash(texts[1]): np.array([0.5, 0.5], dtype=np.float32).tobytes(),
+            EmbeddingCacheService.text_hash(texts[2]): np.array([1.0, 0.0, 0.0], dtype=np.float32).tobytes()
+        }
+        self.mock_model.encode.side_effect = lambda batch, **kwargs: np.full((len(batch), 2), 0.1, dtype=np.float32)
+        stats = {}
+
+        embeddings = ExtractService.encode_texts(texts, self.mock_model, stats=stats)
+
+        assert embeddings.shape == (3, 2)
+        assert embeddings[1].tolist() == [0.5, 0.5]
+        assert [call[0][0] for call in self.mock_model.encode.call_args_list] == [[texts[0]], [texts[2]]]
+        assert stats == {"encoded": 2, "cached": 1}
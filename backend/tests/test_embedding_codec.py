@@ -0,0 +1,110 @@
+import pytest
+import numpy as np
+import torch
+from unittest.mock import patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.embedding_codec import EmbeddingCodec, EmbeddingCodecException
+from routes.extract import ExtractService
+from routes.search import SearchService
+
+
+class TestEmbeddingCodec:
+    """Test suite for EmbeddingCodec class"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((5, 8)).astype(np.float32)
+        self.embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR ENCODE() AND DECODE()"""
+
+    def test_unit_float32_round_trip_is_lossless(self):
+        """Test float32 storage keeps the exact values"""
+        encoded = EmbeddingCodec.encode(torch.from_numpy(self.embeddings), "float32")
+
+        assert len(encoded) == self.embeddings.size * 4
+        assert np.array_equal(EmbeddingCodec.decode(encoded, (5, 8), "float32"), self.embeddings)
+
+    def test_unit_float16_round_trip(self):
+        """Test float16 storage halves the size and stays close to the original"""
+        encoded = EmbeddingCodec.encode(self.embeddings, "float16")
+        decoded = EmbeddingCodec.decode(encoded, (5, 8), "float16")
+
+        assert len(encoded) == self.embeddings.size * 2
+        assert decoded.dtype == np.float32
+        assert np.abs(decoded - self.embeddings).max() < 1e-3
+
+    def test_unit_int8_round_trip(self):
+        """Test int8 storage keeps one scale per row and a small reconstruction error"""
+        encoded = EmbeddingCodec.encode(self.embeddings, "int8")
+        decoded = EmbeddingCodec.decode(encoded, (5, 8), "int8")
+
+        assert len(encoded) == 5 * 4 + self.embeddings.size
+        assert decoded.dtype == np.float32
+        max_error = np.abs(self.embeddings).max(axis=1) / 127 / 2
+        assert np.all(np.abs(decoded - self.embeddings) <= max_error[:, None] + 1e-6)
+
+    def test_unit_int8_zero_row(self):
+        """Test an all-zero row decodes to zeros instead of NaN"""
+        embeddings = np.zeros((2, 3), dtype=np.float32)
+        embeddings[1] = [0.5, -1.0, 0.25]
+
+        decoded = EmbeddingCodec.decode(EmbeddingCodec.encode(embeddings, "int8"), (2, 3), "int8")
+
+        assert decoded[0].tolist() == [0.0, 0.0, 0.0]
+        assert decoded[1].tolist() == pytest.approx([0.5, -1.0, 0.25], abs=0.01)
+
+    def test_unit_unsupported_dtype(self):
+        """Test an unknown dtype is rejected"""
+        with pytest.raises(EmbeddingCodecException):
+            EmbeddingCodec.encode(self.embeddings, "bfloat16")
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR HELPER FUNCTIONS"""
+
+    def test_unit_dtype_from_meta_defaults_to_float32(self):
+        """Test legacy rows without a dtype are read as float32"""
+        assert EmbeddingCodec.dtype_from_meta(None) == "float32"
+        assert EmbeddingCodec.dtype_from_meta({"normalized": True}) == "float32"
+        assert EmbeddingCodec.dtype_from_meta({"dtype": "int8"}) == "int8"
+
+    @pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+    def test_unit_infer_shape(self, dtype):
+        """Test the embedding dimension is recovered from the buffer length"""
+        encoded = EmbeddingCodec.encode(self.embeddings, dtype)
+
+        assert EmbeddingCodec.infer_shape(len(encoded), 5, dtype) == (5, 8)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR EXTRACT AND SEARCH INTEGRATION"""
+
+    @patch('routes.extract.DatabaseService.execute_save_query')
+    def test_integration_save_data_to_database_quantizes(self, mock_save_query):
+        """Test the dtype in embedding_meta decides the stored byte layout"""
+        mock_save_query.return_value = {"success": True}
+        embedding_meta = ExtractService.create_embedding_meta(normalized=True, dtype="int8")
+
+        ExtractService.save_data_to_database("uuid", {"a": "b"}, ["a"], torch.from_numpy(self.embeddings), embedding_meta=embedding_meta)
+
+        args, kwargs = mock_save_query.call_args
+        assert args[3] == EmbeddingCodec.encode(self.embeddings, "int8")
+        assert tuple(args[4]) == (5, 8)
+        assert kwargs["embedding_meta"] == {"normalized": True, "dtype": "int8"}
+
+    @pytest.mark.parametrize("dtype", ["float16", "int8"])
+    def test_integration_search_dequantizes_on_load(self, dtype):
+        """Test search decodes quantized rows and ranks them like the float32 originals"""
+        encoded = EmbeddingCodec.encode(self.embeddings, dtype)
+
+        doc_embeddings = SearchService.recreate_doc_embeddings_from_database(encoded, (5, 8), {"normalized": True, "dtype": dtype})
+        scores = SearchService.calculate_normalized_similarities(torch.from_numpy(self.embeddings[2]), doc_embeddings)
+
+        assert doc_embeddings.dtype == torch.float32
+        assert int(scores.argmax()) == 2
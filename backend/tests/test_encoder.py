@@ -0,0 +1,157 @@
+import pytest
+import threading
+import numpy as np
+import torch
+from unittest.mock import patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.encoder import EncoderService, EncoderServiceException, OnnxSentenceEncoder
+
+
+def build_tiny_sentence_transformer(model_path):
+    """Save a small randomly initialized BERT SentenceTransformer (no download needed)"""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+
+    hf_path = os.path.join(str(model_path), "hf")
+    os.makedirs(hf_path, exist_ok=True)
+    words = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + "how do i learn python what is deep learning".split()
+    with open(os.path.join(hf_path, "vocab.txt"), "w") as f:
+        f.write("\n".join(words))
+    BertTokenizerFast(vocab_file=os.path.join(hf_path, "vocab.txt")).save_pretrained(hf_path)
+    BertModel(BertConfig(
+        vocab_size=len(words), hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, max_position_embeddings=32
+    )).save_pretrained(hf_path)
+
+    transformer = models.Transformer(hf_path, max_seq_length=16)
+    model = SentenceTransformer(modules=[transformer, models.Pooling(16)], device='cpu')
+    model.save(os.path.join(str(model_path), "model"))
+    return os.path.join(str(model_path), "model"), model
+
+
+class TestEncoderService:
+    """Test suite for EncoderService and OnnxSentenceEncoder"""
+
+    def setup_method(self):
+        """Set up token embeddings for two sentences, the second padded after one token"""
+        self.token_embeddings = np.array([
+            [[1.0, 2.0], [3.0, 4.0]],
+            [[5.0, 6.0], [100.0, 100.0]]
+        ], dtype=np.float32)
+        self.attention_mask = np.array([[1, 1], [1, 0]])
+        EncoderService.unload_model()
+
+    def teardown_method(self):
+        """Forget the shared model loaded by a test"""
+        EncoderService.unload_model()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR POOL()"""
+
+    def test_unit_pool_mean_ignores_padding(self):
+        """Test mean pooling averages only unmasked tokens"""
+        pooled = EncoderService.pool(self.token_embeddings, self.attention_mask, {"pooling_mode": "mean"})
+
+        assert pooled.tolist() == [[2.0, 3.0], [5.0, 6.0]]
+
+    def test_unit_pool_cls_and_max(self):
+        """Test CLS and max pooling for both config styles"""
+        assert EncoderService.pool(self.token_embeddings, self.attention_mask, {"pooling_mode": "cls"}).tolist() == [[1.0, 2.0], [5.0, 6.0]]
+        assert EncoderService.pool(self.token_embeddings, self.attention_mask, {"pooling_mode_max_tokens": True}).tolist() == [[3.0, 4.0], [5.0, 6.0]]
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR LOAD_MODEL()"""
+
+    @patch('sentence_transformers.SentenceTransformer')
+    def test_unit_load_model_torch_backend(self, mock_sentence_transformer):
+        """Test the default backend loads the PyTorch SentenceTransformer on CPU"""
+        model = EncoderService.load_model("/models/encoder", backend="torch")
+
+        mock_sentence_transformer.assert_called_once_with("/models/encoder", device='cpu')
+        assert model is mock_sentence_transformer.return_value
+
+    @patch('sentence_transformers.SentenceTransformer')
+    def test_unit_load_model_onnx_falls_back_to_torch(self, mock_sentence_transformer, tmp_path):
+        """Test a missing ONNX export falls back to the PyTorch model instead of failing startup"""
+        model = EncoderService.load_model(str(tmp_path), backend="onnx")
+
+        assert model is mock_sentence_transformer.return_value
+
+    def test_unit_onnx_encoder_requires_onnxruntime(self, tmp_path):
+        """Test the ONNX encoder reports a missing onnxruntime"""
+        with patch('routes.encoder.onnxruntime', None):
+            with pytest.raises(EncoderServiceException):
+                OnnxSentenceEncoder(str(tmp_path))
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR START_MODEL_LOAD() AND GET_MODEL()"""
+
+    @patch('routes.encoder.EncoderService.load_model')
+    def test_unit_lazy_mode_loads_once_on_first_use(self, mock_load_model):
+        """Test lazy mode loads nothing at startup and the model exactly once on first use"""
+        EncoderService.start_model_load("/models/encoder", mode="lazy")
+
+        assert EncoderService.current_model() is None
+        assert EncoderService.model_status()["ready"] is False
+        assert EncoderService.get_model("/models/encoder") is mock_load_model.return_value
+        assert EncoderService.get_model("/models/encoder") is mock_load_model.return_value
+        mock_load_model.assert_called_once_with("/models/encoder")
+        assert EncoderService.model_status()["ready"] is True
+
+    @patch('routes.encoder.EncoderService.load_model')
+    def test_unit_background_load_reports_readiness(self, mock_load_model):
+        """Test requests time out while the background load runs and get the model once it finishes"""
+        release = threading.Event()
+        mock_load_model.side_effect = lambda model_path: release.wait(5) and "model"
+
+        EncoderService.start_model_load("/models/encoder", mode="background")
+        EncoderService.start_model_load("/models/encoder", mode="background")
+
+        with pytest.raises(EncoderServiceException, match="still loading"):
+            EncoderService.get_model("/models/encoder", timeout=0.01)
+        assert EncoderService.model_status()["loading"] is True
+
+        release.set()
+        assert EncoderService.get_model("/models/encoder", timeout=5) == "model"
+        assert EncoderService.model_status()["ready"] is True
+        mock_load_model.assert_called_once()
+
+    @patch('routes.encoder.EncoderService.load_model')
+    def test_unit_failed_load_is_reported_and_retried(self, mock_load_model):
+        """Test a failed eager load raises, is reported by model_status and is retried on next use"""
+        mock_load_model.side_effect = [OSError("model directory missing"), "model"]
+
+        with pytest.raises(EncoderServiceException, match="model directory missing"):
+            EncoderService.start_model_load("/models/encoder", mode="eager")
+        assert EncoderService.model_status()["error"] == "model directory missing"
+
+        assert EncoderService.get_model("/models/encoder") == "model"
+        assert EncoderService.model_status()["error"] is None
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR EXPORT_ONNX() AND ENCODE()"""
+
+    @pytest.mark.slow
+    def test_integration_export_and_encode_matches_pytorch(self, tmp_path):
+        """Test the exported float32 graph reproduces the PyTorch embeddings and the int8 graph stays close"""
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+        model_path, model = build_tiny_sentence_transformer(tmp_path)
+        texts = ["how do i learn python", "what is deep learning", "python"]
+
+        written = EncoderService.export_onnx(model_path, quantize=True)
+        expected = model.encode(texts, convert_to_numpy=True)
+        encoder = OnnxSentenceEncoder(model_path, quantized=False)
+        quantized = OnnxSentenceEncoder(model_path, quantized=True).encode(texts)
+
+        assert [os.path.basename(path) for path in written] == ["model.onnx", "model_quantized.onnx"]
+        assert np.allclose(encoder.encode(texts, batch_size=2), expected, atol=1e-5)
+        assert isinstance(encoder.encode("python", convert_to_tensor=True), torch.Tensor)
+        assert encoder.get_sentence_embedding_dimension() == 16
+        cosine = (quantized * expected).sum(axis=1) / np.linalg.norm(quantized, axis=1) / np.linalg.norm(expected, axis=1)
+        assert cosine.min() > 0.99
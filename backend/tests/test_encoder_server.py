@@ -0,0 +1,160 @@
+import pytest
+import socket
+import tempfile
+import threading
+import time
+import numpy as np
+import torch
+from types import SimpleNamespace
+from unittest.mock import patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.encoder_server import EncoderServer, EncoderServerException, EncoderServerService, MicroBatcher, RemoteSentenceEncoder
+from routes.encoder import EncoderService
+
+
+class FakeModel:
+    """Encodes each text as [length, 1.0] and records every encode call"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.model_card_data = SimpleNamespace(base_model="fake-model")
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        if self.error:
+            raise self.error
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+class TestEncoderServer:
+    """Test suite for MicroBatcher, EncoderServer and RemoteSentenceEncoder"""
+
+    def setup_method(self):
+        """Set up a short socket path (Unix socket paths are limited to about 100 characters)"""
+        self.socket_path = os.path.join(tempfile.gettempdir(), f"encoder-test-{os.getpid()}.sock")
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR MICROBATCHER"""
+
+    def test_unit_concurrent_requests_share_one_batch(self):
+        """Test requests arriving within the wait window are encoded in a single model call"""
+        model = FakeModel()
+        batcher = MicroBatcher(model, max_batch=64, max_wait_ms=500)
+        results = {}
+
+        def submit(text):
+            results[text] = batcher.submit([text], timeout=5)
+
+        threads = [threading.Thread(target=submit, args=(text,)) for text in ["a", "bb", "ccc"]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(model.calls) == 1
+        assert sorted(model.calls[0]) == ["a", "bb", "ccc"]
+        assert {text: result.tolist() for text, result in results.items()} == {
+            "a": [[1.0, 1.0]], "bb": [[2.0, 1.0]], "ccc": [[3.0, 1.0]]
+        }
+        assert batcher.stats == {"requests": 3, "texts": 3, "batches": 1}
+
+    def test_unit_full_batch_does_not_wait(self):
+        """Test a request that fills the batch is encoded without waiting for the deadline"""
+        batcher = MicroBatcher(FakeModel(), max_batch=2, max_wait_ms=10000)
+
+        start = time.monotonic()
+        batcher.submit(["a", "b"], timeout=5)
+
+        assert time.monotonic() - start < 5
+
+    def test_unit_encode_errors_reach_every_request(self):
+        """Test a failing encode call is reported to the waiting request"""
+        batcher = MicroBatcher(FakeModel(error=RuntimeError("out of memory")), max_wait_ms=0)
+
+        with pytest.raises(EncoderServerException, match="out of memory"):
+            batcher.submit(["a"], timeout=5)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR REMOTESENTENCEENCODER"""
+
+    def test_integration_remote_encoder_round_trip(self):
+        """Test the client encodes through a running server like a SentenceTransformer would"""
+        server = EncoderServer(self.socket_path, FakeModel(), max_batch=8, max_wait_ms=1)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            encoder = RemoteSentenceEncoder(self.socket_path, timeout=5)
+
+            batch = encoder.encode(["a", "bbb"])
+            single = encoder.encode("cc", convert_to_tensor=True)
+
+            assert batch.tolist() == [[1.0, 1.0], [3.0, 1.0]]
+            assert isinstance(single, torch.Tensor) and single.tolist() == [2.0, 1.0]
+            assert encoder.get_sentence_embedding_dimension() == 2
+            assert encoder.model_card_data.base_model == "fake-model"
+            assert encoder.stats()["texts"] == 3
+        finally:
+            server.shutdown()
+            server.server_close()
+            os.remove(self.socket_path)
+
+    def test_unit_remote_encoder_requires_server(self):
+        """Test connecting without a server raises"""
+        with pytest.raises(EncoderServerException, match="unavailable"):
+            RemoteSentenceEncoder(self.socket_path)
+
+    def test_integration_remote_encoder_does_not_resend_after_timeout(self):
+        """Test a timed-out encode is raised instead of being submitted to the busy server again"""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen()
+        encode_requests = []
+
+        def serve_info_and_hang():
+            while True:
+                try:
+                    connection, _ = listener.accept()
+                except OSError:
+                    return
+                with connection:
+                    try:
+                        while True:
+                            request, _ = EncoderServerService.receive_message(connection)
+                            if request["op"] == "info":
+                                EncoderServerService.send_message(connection, {"dimension": 2, "base_model": "slow-model"})
+                            else:
+                                encode_requests.append(request)
+                    except (OSError, EncoderServerException):
+                        pass
+
+        thread = threading.Thread(target=serve_info_and_hang, daemon=True)
+        thread.start()
+        try:
+            encoder = RemoteSentenceEncoder(self.socket_path, timeout=0.2)
+
+            with pytest.raises(EncoderServerException, match="timed out"):
+                encoder.encode(["slow"])
+            time.sleep(0.1)
+
+            assert len(encode_requests) == 1
+        finally:
+            listener.close()
+            os.remove(self.socket_path)
+
+    @patch('sentence_transformers.SentenceTransformer')
+    def test_unit_load_model_falls_back_without_server(self, mock_sentence_transformer):
+        """Test workers load the model themselves when the configured server is unreachable"""
+        with patch.object(EncoderService, 'SERVER_SOCKET', self.socket_path), \
+             patch.object(EncoderService, 'SERVER_CONNECT_TIMEOUT', 0):
+            model = EncoderService.load_model("/models/encoder", backend="torch")
+
+        assert model is mock_sentence_transformer.return_value
@@ -1,15 +1,19 @@
 import pytest
 import torch
 import numpy as np
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import ANY, Mock, patch
 import sys
 import os
+import io
+import json
 
 # Add the parent directory to the Python path to import modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from routes.extract import ExtractService, ExtractServiceException
-from database.postgres import DatabaseServiceException
+from routes.cache import CacheService
+from routes.embedding_cache import EmbeddingCacheService
+from database.postgres import DatabaseService, DatabaseServiceException
 
 
 class TestExtractService:
@@ -44,10 +48,11 @@ class TestExtractService:
     """----------------------------------------------------------------------------------------------------------------------------"""
     """TESTS FOR EXTRACT_SERVICE() ROOT FUNCTION"""
 
+    @patch('routes.extract.ExtractService.load_previous_extraction', return_value=None)
     @patch('routes.extract.ExtractService.save_data')
     @patch('routes.extract.ExtractService.create_embeddings')
     @patch('routes.extract.ExtractService.process_conversations')
-    def test_integration_extract_service_success(self, mock_process, mock_embeddings, mock_save):
+    def test_integration_extract_service_success(self, mock_process, mock_embeddings, mock_save, mock_previous):
         """Test successful extract_service execution"""
         # Setup mocks
         mock_process.return_value = self.test_processed_data
@@ -65,9 +70,38 @@ class TestExtractService:
         
         # Verify method calls
         mock_process.assert_called_once_with(self.test_conversations, self.test_uuid)
-        mock_embeddings.assert_called_once_with(self.test_processed_data, self.mock_model)
+        mock_embeddings.assert_called_once_with(self.test_processed_data, self.mock_model, progress_callback=None, stats=ANY)
         mock_save.assert_called_once()
 
+    @patch('routes.extract.ExtractService.save_data')
+    @patch('routes.extract.ExtractService.load_previous_extraction')
+    @patch('routes.extract.ExtractService.process_conversations')
+    def test_integration_extract_service_incremental(self, mock_process, mock_previous, mock_save):
+        """Test a re-upload only encodes new prompts and saves just the changed rows"""
+        mock_process.return_value = {"Old prompt": "Old answer", "New prompt": "New answer"}
+        mock_previous.return_value = {
+            "key_order": ["Old prompt"],
+            "content_hashes": [DatabaseService.compute_content_hash("Old prompt", "Old answer")],
+            "embeddings": np.array([[1.0, 0.0]], dtype=np.float32).tobytes(),
+            "embedding_shape": (1, 2),
+            "embedding_meta": {"normalized": True, "model_id": EmbeddingCacheService.resolve_model_id(self.mock_model)},
+            "layout": "documents"
+        }
+        self.mock_model.encode.return_value = np.array([[0.6, 0.8]], dtype=np.float32)
+        mock_save.return_value = {"success": True}
+        
+        result = ExtractService.extract_service(self.test_conversations, self.test_uuid, self.mock_model)
+        
+        assert result["documents_encoded"] == 1
+        assert result["documents_reused"] == 1
+        assert self.mock_model.encode.call_args[0][0] == ["New prompt"]
+        _uuid, _data, keys, embeddings = mock_save.call_args[0]
+        assert keys == ["Old prompt", "New prompt"]
+        assert embeddings.tolist() == [[1.0, 0.0], [pytest.approx(0.6), pytest.approx(0.8)]]
+        assert mock_save.call_args[1]["changed_ordinals"] == [1]
+        assert mock_save.call_args[1]["embedding_meta"]["normalized"] is True
+        assert mock_save.call_args[1]["embedding_meta"]["model_id"] == EmbeddingCacheService.resolve_model_id(self.mock_model)
+
     def test_unit_extract_service_no_model(self):
         """Test extract_service with missing model"""
         with pytest.raises(ExtractServiceException) as exc_info:
@@ -143,18 +177,172 @@ class TestExtractService:
 
    
 
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR STREAMED UPLOADS"""
+
+    def test_unit_process_conversation_stream_success(self):
+        """Test a streamed conversations.json gives the same documents as the parsed list"""
+        stream = io.BytesIO(json.dumps(self.test_conversations).encode("utf-8"))
+        
+        result = ExtractService.process_conversation_stream(stream, self.test_uuid)
+        
+        assert result == self.test_processed_data
+
+    @patch('routes.extract.ijson', None)
+    def test_unit_iter_conversations_fallback_parser(self):
+        """Test the fallback parser yields each element when reading small chunks"""
+        conversations = self.test_conversations + [{"title": "héllo", "mapping": {}}, {"values": [1, 2.5, None]}]
+        stream = io.BytesIO(json.dumps(conversations, ensure_ascii=False).encode("utf-8"))
+        
+        result = list(ExtractService.iter_conversations(stream, chunk_size=5))
+        
+        assert result == conversations
+
+    @patch('routes.extract.ijson', None)
+    def test_unit_iter_conversations_fallback_not_a_list(self):
+        """Test the fallback parser rejects a top-level object"""
+        with pytest.raises(ExtractServiceException) as exc_info:
+            list(ExtractService.iter_conversations(io.BytesIO(b'{"mapping": {}}')))
+        assert "Conversations data must be a list" in str(exc_info.value)
+
+    @patch('routes.extract.ijson', None)
+    def test_unit_iter_conversations_fallback_truncated(self):
+        """Test the fallback parser reports a truncated upload"""
+        with pytest.raises(ExtractServiceException) as exc_info:
+            list(ExtractService.iter_conversations(io.BytesIO(b'[{"mapping": {}}, {"map'), chunk_size=4))
+        assert "Invalid conversations JSON" in str(exc_info.value)
+
+    @patch('routes.extract.ExtractService.extract_processed_service')
+    def test_integration_extract_stream_service_success(self, mock_processed):
+        """Test extract_stream_service parses the stream and hands the documents to the embed/save steps"""
+        mock_processed.return_value = {"success": True}
+        stream = io.BytesIO(json.dumps(self.test_conversations).encode("utf-8"))
+        
+        result = ExtractService.extract_stream_service(stream, self.test_uuid, self.mock_model)
+        
+        assert result["success"] is True
+        mock_processed.assert_called_once_with(self.test_processed_data, self.test_uuid, self.mock_model, progress_callback=None)
+
     """----------------------------------------------------------------------------------------------------------------------------"""
     """TESTS FOR CREATE_EMBEDDINGS() SUBROOT FUNCTION"""
 
     def test_unit_create_embeddings_success(self):
         """Test successful create_embeddings execution"""
+        self.mock_model.encode.return_value = torch.tensor([[0.1, 0.2]])
         embeddings, keys = ExtractService.create_embeddings(self.test_processed_data, self.mock_model)
         
-        assert isinstance(embeddings, torch.Tensor)
+        assert isinstance(embeddings, np.ndarray)
         assert keys == ["How do I learn Python?"]
         self.mock_model.encode.assert_called_once()
 
 
+    def test_unit_create_embeddings_batches_preserve_order(self):
+        """Test batched encoding length-sorts inputs but returns rows in the original key order"""
+        processed_data = {"a": "1", "ccc": "2", "bb": "3"}
+        self.mock_model.encode.side_effect = lambda batch, **kwargs: np.array(
+            [[float(len(text)), 0.0] for text in batch], dtype=np.float32
+        )
+        progress = []
+        
+        embeddings, keys = ExtractService.create_embeddings(
+            processed_data, self.mock_model, batch_size=2,
+            progress_callback=lambda done, total: progress.append((done, total))
+        )
+        
+        assert keys == ["a", "ccc", "bb"]
+        assert embeddings.dtype == np.float32
+        assert embeddings[:, 0].tolist() == [1.0, 3.0, 2.0]
+        assert self.mock_model.encode.call_count == 2
+        assert self.mock_model.encode.call_args_list[0][0][0] == ["ccc", "bb"]
+        assert progress == [(2, 3), (3, 3)]
+
+    def test_unit_create_incremental_embeddings_changed_response(self):
+        """Test a changed response reuses the prompt's embedding but marks its row as changed"""
+        previous = {
+            "key_order": ["a", "b"],
+            "content_hashes": [DatabaseService.compute_content_hash("a", "1"), DatabaseService.compute_content_hash("b", "2")],
+            "embeddings": np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32).tobytes(),
+            "embedding_shape": [2, 2],
+            "embedding_meta": {"model_id": EmbeddingCacheService.resolve_model_id(self.mock_model)}
+        }
+        
+        embeddings, keys, diff = ExtractService.create_incremental_embeddings({"a": "1", "b": "changed"}, self.mock_model, previous)
+        
+        self.mock_model.encode.assert_not_called()
+        assert keys == ["a", "b"]
+        assert embeddings.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+        assert diff == {"changed_ordinals": [1], "documents_encoded": 0, "documents_cached": 0, "documents_reused": 2}
+
+    def test_unit_create_incremental_embeddings_model_change(self):
+        """Test stored embeddings from another encoder of the same dimension are re-encoded instead of reused"""
+        previous = {
+            "key_order": ["a"],
+            "content_hashes": [DatabaseService.compute_content_hash("a", "1")],
+            "embeddings": np.array([[1.0, 0.0]], dtype=np.float32).tobytes(),
+            "embedding_shape": [1, 2],
+            "embedding_meta": {"model_id": "other-model:2"}
+        }
+        self.mock_model.encode.side_effect = lambda batch, **kwargs: np.ones((len(batch), 2), dtype=np.float32)
+        
+        embeddings, keys, diff = ExtractService.create_incremental_embeddings({"a": "1"}, self.mock_model, previous)
+        
+        assert embeddings.tolist() == [[1.0, 1.0]]
+        assert diff == {"changed_ordinals": [0], "documents_encoded": 1, "documents_cached": 0, "documents_reused": 0}
+
+    def test_unit_create_incremental_embeddings_dimension_change(self):
+        """Test stored embeddings from a different model are re-encoded instead of mixed in"""
+        previous = {
+            "key_order": ["a"],
+            "content_hashes": [DatabaseService.compute_content_hash("a", "1")],
+            "embeddings": np.array([[1.0, 0.0, 0.0]], dtype=np.float32).tobytes(),
+            "embedding_shape": [1, 3]
+        }
+        self.mock_model.encode.side_effect = lambda batch, **kwargs: np.ones((len(batch), 2), dtype=np.float32)
+        
+        embeddings, keys, diff = ExtractService.create_incremental_embeddings({"a": "1", "b": "2"}, self.mock_model, previous)
+        
+        assert list(embeddings.shape) == [2, 2]
+        assert diff["documents_encoded"] == 2
+
+    @patch('routes.extract.DatabaseService.load_content_index')
+    def test_unit_load_previous_extraction_missing_user(self, mock_index, tmp_path):
+        """Test load_previous_extraction returns None so a first upload does a full extract"""
+        mock_index.side_effect = DatabaseServiceException("not found")
+        
+        with patch('routes.file_store.FileStoreService.DIR', str(tmp_path)):
+            assert ExtractService.load_previous_extraction(self.test_uuid) is None
+
+    @patch('routes.extract.ExtractService.save_data_to_database', side_effect=ExtractServiceException("database unavailable"))
+    @patch('routes.extract.DatabaseService.load_content_index', side_effect=DatabaseServiceException("database unavailable"))
+    @patch('routes.extract.EmbeddingCacheService.lookup', return_value={})
+    def test_integration_reextract_from_file_store_reuses_embeddings(self, mock_lookup, mock_index, mock_save_db, tmp_path):
+        """Test a re-upload diffs against the file store when the database is unavailable"""
+        processed_data = {"First prompt": "First answer", "Second prompt": "Second answer"}
+        self.mock_model.encode.side_effect = lambda batch, **kwargs: np.ones((len(batch), 2), dtype=np.float32)
+        
+        with patch('routes.file_store.FileStoreService.DIR', str(tmp_path)):
+            first = ExtractService.extract_processed_service(processed_data, self.test_uuid, self.mock_model)
+            second = ExtractService.extract_processed_service(processed_data, self.test_uuid, self.mock_model)
+        
+        assert first["documents_encoded"] == 2
+        assert second["documents_encoded"] == 0
+        assert second["documents_reused"] == 2
+        assert self.mock_model.encode.call_count == 1
+
+    def test_unit_normalize_embeddings(self):
+        """Test rows are scaled to unit length and zero rows stay zero"""
+        result = ExtractService.normalize_embeddings(torch.tensor([[3.0, 4.0], [0.0, 0.0]]))
+        
+        assert result.tolist() == [[pytest.approx(0.6), pytest.approx(0.8)], [0.0, 0.0]]
+
+    def test_unit_normalize_embeddings_numpy(self):
+        """Test NumPy embeddings are normalized without converting to a tensor"""
+        result = ExtractService.normalize_embeddings(np.array([[0.0, 2.0], [1.0, 1.0]], dtype=np.float32))
+        
+        assert isinstance(result, np.ndarray)
+        assert result.dtype == np.float32
+        assert np.allclose(np.linalg.norm(result, axis=1), 1.0)
+
     def test_unit_create_embeddings_empty_data(self):
         """Test create_embeddings with empty data"""
         with pytest.raises(ExtractServiceException) as exc_info:
@@ -192,6 +380,16 @@ class TestExtractService:
         mock_file_save.assert_called_once()
 
 
+    @patch('routes.extract.ExtractService.save_data_to_database')
+    def test_integration_save_data_invalidates_user_cache(self, mock_db_save):
+        """Test save_data drops the user's cached search data"""
+        mock_db_save.return_value = {"success": True, "file_path": "database"}
+        CacheService.put(self.test_uuid, {"doc_embeddings": torch.tensor([[0.1, 0.2]]), "data": {}, "keys": []})
+        
+        ExtractService.save_data(self.test_uuid, self.test_processed_data, ["How do I learn Python?"], torch.tensor([[0.1, 0.2]]))
+        
+        assert CacheService.get(self.test_uuid) is None
+
     def test_unit_save_data_no_embeddings(self):
         """Test save_data with no embeddings"""
         with pytest.raises(ExtractServiceException) as exc_info:
@@ -244,22 +442,30 @@ class TestExtractService:
     """----------------------------------------------------------------------------------------------------------------------------"""
     """TESTS FOR SAVE_DATA_TO_FILE() CHILD FUNCTION"""
 
-    @patch('routes.extract.ExtractService.convert_tensor_to_base64')
-    @patch('builtins.open', new_callable=MagicMock)
-    @patch('routes.extract.json.dump')
-    @patch('routes.extract.os.makedirs')
-    def test_integration_save_data_to_file_success(self, mock_makedirs, mock_json, mock_open, mock_convert):
-        """Test successful save_data_to_file execution"""
-        mock_convert.return_value = "base64_string"
+    def test_integration_save_data_to_file_success(self, tmp_path):
+        """Test successful save_data_to_file execution writes the user's file store directory"""
+        keys = list(self.test_processed_data)
         
-        result = ExtractService.save_data_to_file(
-            self.test_uuid, self.test_processed_data, ["key1"], torch.tensor([[0.1, 0.2]])
-        )
+        with patch('routes.file_store.FileStoreService.DIR', str(tmp_path)):
+            result = ExtractService.save_data_to_file(
+                self.test_uuid, self.test_processed_data, keys, torch.tensor([[0.1, 0.2]])
+            )
         
         assert result["success"] is True
         assert result["user_uuid"] == self.test_uuid
-        mock_makedirs.assert_called_once()
-        mock_json.assert_called_once()
+        assert result["total_documents"] == 1
+        assert result["file_path"] == str(tmp_path / self.test_uuid)
+        assert (tmp_path / self.test_uuid / "meta.json").is_file()
+
+    def test_unit_save_data_to_file_missing_document(self, tmp_path):
+        """Test save_data_to_file raises when a key has no document"""
+        with patch('routes.file_store.FileStoreService.DIR', str(tmp_path)):
+            with pytest.raises(ExtractServiceException):
+                ExtractService.save_data_to_file(
+                    self.test_uuid, self.test_processed_data, ["key1"], torch.tensor([[0.1, 0.2]])
+                )
+        
+        assert not (tmp_path / self.test_uuid).exists()
 
     """----------------------------------------------------------------------------------------------------------------------------"""
     """TESTS FOR HELPER FUNCTIONS"""
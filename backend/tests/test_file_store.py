@@ -0,0 +1,165 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.document_codec import DocumentCodec, DocumentCodecException
+from database.postgres import DatabaseService
+from routes.file_store import FileStoreService, FileStoreServiceException, FileStoreNotFoundException
+from routes.search import SearchService
+
+
+class TestFileStoreService:
+    """Test suite for DocumentCodec and FileStoreService"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.test_uuid = "test-uuid-123"
+        self.keys = ["How do I learn Python?", "Qu'est-ce que le café ☕?", "Empty answer"]
+        self.data = {self.keys[0]: "Start with basics", self.keys[1]: "Une boisson ☕", self.keys[2]: ""}
+        self.embeddings = np.arange(12, dtype=np.float32).reshape(3, 4) / 10
+
+    @pytest.fixture(autouse=True)
+    def store_dir(self, tmp_path):
+        """Point the file store at a temporary directory"""
+        with patch.object(FileStoreService, 'DIR', str(tmp_path)):
+            yield tmp_path
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR DOCUMENTCODEC"""
+
+    def test_unit_pack_round_trip(self):
+        """Test packed documents decode back to the same keys and contents (including unicode and empty text)"""
+        documents = DocumentCodec.open(*DocumentCodec.pack(self.keys, self.data))
+
+        assert len(documents) == 3
+        assert documents.get(1) == (self.keys[1], "Une boisson ☕")
+        assert documents.fetch([2, 0, 7]) == {2: (self.keys[2], ""), 0: (self.keys[0], "Start with basics")}
+        assert documents.to_dict() == (self.keys, self.data)
+
+    def test_unit_open_rejects_mismatched_offsets(self):
+        """Test offsets that do not cover the blob are rejected"""
+        blob, offsets = DocumentCodec.pack(self.keys, self.data)
+
+        with pytest.raises(DocumentCodecException):
+            DocumentCodec.open(blob[:-1], offsets)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SAVE AND LOAD"""
+
+    def test_integration_save_load_float32_is_memory_mapped(self):
+        """Test float32 embeddings are loaded as a memory map and documents are read back by ordinal"""
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings, {"dtype": "float32"})
+        stored = FileStoreService.load(self.test_uuid)
+
+        assert isinstance(stored["embeddings"], np.memmap)
+        assert stored["embedding_shape"] == (3, 4)
+        assert stored["document_count"] == 3
+        assert stored["ann_index"] is None
+        assert stored["documents"].fetch([1]) == {1: (self.keys[1], "Une boisson ☕")}
+
+    def test_integration_save_replaces_previous_upload(self, store_dir):
+        """Test a second save swaps the user's link to a new version and leaves no temporary files or old versions"""
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings, ann_index=b"index")
+        FileStoreService.save(self.test_uuid, self.keys[:1], self.data, self.embeddings[:1])
+        stored = FileStoreService.load(self.test_uuid)
+
+        assert stored["document_count"] == 1
+        assert stored["ann_index"] is None
+        assert sorted(os.listdir(store_dir)) == [FileStoreService.VERSIONS_DIR, self.test_uuid]
+        assert os.path.islink(store_dir / self.test_uuid)
+        assert os.listdir(store_dir / FileStoreService.VERSIONS_DIR) == [stored["version"]]
+
+    def test_integration_save_replaces_unversioned_directory(self, store_dir):
+        """Test a save over a directory written before uploads were versioned replaces it with a link"""
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings)
+        version_dir = store_dir / FileStoreService.VERSIONS_DIR / FileStoreService.current_version(self.test_uuid)
+        os.remove(store_dir / self.test_uuid)
+        os.rename(version_dir, store_dir / self.test_uuid)
+        assert FileStoreService.load(self.test_uuid)["document_count"] == 3
+
+        FileStoreService.save(self.test_uuid, self.keys[:1], self.data, self.embeddings[:1])
+
+        assert FileStoreService.load(self.test_uuid)["document_count"] == 1
+        assert len(os.listdir(store_dir / FileStoreService.VERSIONS_DIR)) == 1
+
+    def test_unit_load_retries_when_version_is_replaced(self):
+        """Test a load whose version directory is removed by a concurrent save reads the new version"""
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings)
+        original = FileStoreService._load_version
+        calls = []
+
+        def swap_during_first_load(user_uuid, user_dir):
+            if not calls:
+                calls.append(user_uuid)
+                FileStoreService.save(self.test_uuid, self.keys[:1], self.data, self.embeddings[:1])
+                raise FileNotFoundError("version removed")
+            return original(user_uuid, user_dir)
+
+        with patch.object(FileStoreService, '_load_version', side_effect=swap_during_first_load):
+            stored = FileStoreService.load(self.test_uuid)
+
+        assert stored["document_count"] == 1
+
+    def test_integration_load_content_index(self, store_dir):
+        """Test the key order, content hashes and embedding meta an incremental extract needs are read back"""
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings, {"dtype": "float32", "model_id": "m:4"})
+        content_index = FileStoreService.load_content_index(self.test_uuid)
+
+        assert content_index["key_order"] == self.keys
+        assert content_index["content_hashes"] == [DatabaseService.compute_content_hash(key, self.data[key]) for key in self.keys]
+        assert np.frombuffer(content_index["embeddings"], dtype=np.float32).tolist() == self.embeddings.ravel().tolist()
+        assert content_index["embedding_shape"] == (3, 4)
+        assert content_index["embedding_meta"]["model_id"] == "m:4"
+
+        # Uploads written before the content index existed fall back to the packed documents
+        os.remove(store_dir / FileStoreService.VERSIONS_DIR / FileStoreService.current_version(self.test_uuid) / FileStoreService.CONTENT_INDEX_FILE)
+        assert FileStoreService.load_content_index(self.test_uuid)["content_hashes"] == content_index["content_hashes"]
+
+    def test_unit_current_version_changes_on_save(self):
+        """Test every save gives the user a new version (what cached search data is checked against)"""
+        assert FileStoreService.current_version(self.test_uuid) is None
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings)
+        first = FileStoreService.current_version(self.test_uuid)
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings)
+
+        assert first is not None
+        assert FileStoreService.current_version(self.test_uuid) != first
+        assert FileStoreService.load(self.test_uuid)["version"] == FileStoreService.current_version(self.test_uuid)
+
+    def test_unit_load_missing_user(self):
+        """Test loading a user without data raises FileStoreNotFoundException"""
+        with pytest.raises(FileStoreNotFoundException):
+            FileStoreService.load(self.test_uuid)
+
+    def test_unit_user_dir_rejects_path_traversal(self):
+        """Test UUIDs that could escape the store directory are rejected"""
+        for user_uuid in ("../etc", "a/b", "..", ""):
+            with pytest.raises(FileStoreServiceException):
+                FileStoreService.user_dir(user_uuid)
+
+    def test_unit_delete(self):
+        """Test delete removes the user's directory and reports whether there was one"""
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings)
+
+        assert FileStoreService.delete(self.test_uuid) is True
+        assert FileStoreService.delete(self.test_uuid) is False
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SEARCH INTEGRATION"""
+
+    @pytest.mark.parametrize("dtype", ["float32", "int8"])
+    def test_integration_search_reads_file_store(self, dtype):
+        """Test integrate_file_extraction serves the file store with lazily fetched documents"""
+        FileStoreService.save(self.test_uuid, self.keys, self.data, self.embeddings, {"dtype": dtype})
+        result = SearchService.integrate_file_extraction(self.test_uuid)
+
+        assert result["data"] is None
+        assert result["document_count"] == 3
+        assert tuple(result["doc_embeddings"].shape) == (3, 4)
+        assert np.allclose(np.asarray(result["doc_embeddings"]), self.embeddings, atol=0.02)
+        assert result["fetch_documents"]([0]) == {0: (self.keys[0], "Start with basics")}
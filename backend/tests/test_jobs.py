@@ -0,0 +1,143 @@
+import pytest
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.jobs import JobService, JobServiceException
+from routes.extract import ExtractServiceException
+
+
+class TestJobService:
+    """Test suite for JobService class"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.mock_model = Mock()
+        self.test_uuid = "test-uuid-123"
+        self.test_conversations = [{"mapping": {}}]
+
+    def teardown_method(self):
+        """Stop the worker pool so every test starts with a fresh one"""
+        JobService.shutdown(wait=True)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SUBMIT_EXTRACT_JOB() AND GET_JOB_STATUS()"""
+
+    @patch('routes.jobs.ExtractService.extract_service')
+    def test_integration_submit_extract_job_completes(self, mock_extract):
+        """Test a queued job runs in the background and records its result"""
+        def fake_extract(conversations_data, user_uuid, model, progress_callback=None):
+            progress_callback(1, 1)
+            return {"success": True, "total_documents": 1}
+        mock_extract.side_effect = fake_extract
+        
+        job = JobService.submit_extract_job(self.test_conversations, self.test_uuid, self.mock_model)
+        JobService.shutdown(wait=True)
+        status = JobService.get_job_status(job["job_id"])
+        
+        assert job["status"] in ("queued", "running", "completed")
+        assert status["status"] == "completed"
+        assert status["result"] == {"success": True, "total_documents": 1}
+        assert status["progress"] == {"encoded": 1, "total": 1}
+        assert status["finished_at"] is not None
+
+    @patch('routes.jobs.ExtractService.extract_service')
+    def test_integration_submit_extract_job_failure(self, mock_extract):
+        """Test an extract error is recorded on the job instead of being raised"""
+        mock_extract.side_effect = ExtractServiceException("No valid conversations found")
+        
+        job = JobService.submit_extract_job(self.test_conversations, self.test_uuid, self.mock_model)
+        JobService.shutdown(wait=True)
+        status = JobService.get_job_status(job["job_id"])
+        
+        assert status["status"] == "failed"
+        assert status["error"] == "No valid conversations found"
+
+    @patch('routes.jobs.ExtractService.extract_service')
+    @patch('routes.jobs.ExtractService.extract_processed_service')
+    def test_integration_submit_extract_job_processed_data(self, mock_processed, mock_extract):
+        """Test a job for an already parsed (streamed) upload only embeds and saves"""
+        mock_processed.return_value = {"success": True, "total_documents": 1}
+        
+        job = JobService.submit_extract_job(None, self.test_uuid, self.mock_model, processed_data={"Prompt": "Response"})
+        JobService.shutdown(wait=True)
+        status = JobService.get_job_status(job["job_id"])
+        
+        assert status["status"] == "completed"
+        assert mock_processed.call_args[0][:3] == ({"Prompt": "Response"}, self.test_uuid, self.mock_model)
+        mock_extract.assert_not_called()
+
+    @patch('routes.jobs.ExtractService.extract_service')
+    def test_integration_job_status_shared_through_job_dir(self, mock_extract, tmp_path):
+        """Test a job accepted by one worker can be polled from another through EXTRACT_JOB_DIR"""
+        mock_extract.return_value = {"success": True, "total_documents": 1}
+        
+        with patch.object(JobService, 'DIR', str(tmp_path)):
+            job = JobService.submit_extract_job(self.test_conversations, self.test_uuid, self.mock_model)
+            JobService.shutdown(wait=True)
+            # Another worker has no in-memory record of the job
+            with patch.object(JobService, '_jobs', {}):
+                status = JobService.get_job_status(job["job_id"])
+                with pytest.raises(JobServiceException):
+                    JobService.get_job_status("../etc/passwd")
+        
+        assert status["status"] == "completed"
+        assert status["result"] == {"success": True, "total_documents": 1}
+
+    def test_unit_progress_persistence_is_throttled(self, tmp_path):
+        """Test progress-only updates are written at most once per interval while state changes always are"""
+        job = {"job_id": "abc123", "status": "running", "progress": {"encoded": 0, "total": 3}}
+        
+        with patch.object(JobService, 'DIR', str(tmp_path)), \
+             patch.object(JobService, 'PROGRESS_PERSIST_INTERVAL_MS', 60000), \
+             patch.object(JobService, '_jobs', {"abc123": job}), \
+             patch.object(JobService, '_persist_snapshots', {}), \
+             patch.object(JobService, '_persisted_sequences', {}), \
+             patch.object(JobService, '_persist_job', wraps=JobService._persist_job) as mock_persist:
+            JobService._update_job("abc123", progress={"encoded": 1, "total": 3})
+            JobService._update_job("abc123", progress={"encoded": 2, "total": 3})
+            JobService._update_job("abc123", status="completed")
+            persisted = JobService._load_persisted_job("abc123")
+        
+        assert [call[0][0] is None for call in mock_persist.call_args_list] == [False, True, False]
+        assert persisted["status"] == "completed"
+        assert persisted["progress"] == {"encoded": 2, "total": 3}
+
+    def test_unit_submit_extract_job_no_uuid(self):
+        """Test submit_extract_job with missing uuid"""
+        with pytest.raises(JobServiceException) as exc_info:
+            JobService.submit_extract_job(self.test_conversations, None, self.mock_model)
+        assert "User UUID is required" in str(exc_info.value)
+
+    def test_unit_get_job_status_unknown_job(self):
+        """Test get_job_status with an unknown job id"""
+        with pytest.raises(JobServiceException) as exc_info:
+            JobService.get_job_status("missing-job")
+        assert "not found" in str(exc_info.value)
+
+    def test_unit_process_executor_requires_model_path(self):
+        """Test process-based jobs fail to queue without a model path"""
+        with patch.object(JobService, 'EXECUTOR_TYPE', 'process'):
+            with pytest.raises(JobServiceException) as exc_info:
+                JobService.submit_extract_job(self.test_conversations, self.test_uuid, self.mock_model)
+        assert "model_path is required" in str(exc_info.value)
+
+    @patch('routes.jobs.ExtractService.extract_service')
+    def test_unit_finished_jobs_are_pruned(self, mock_extract):
+        """Test only the newest MAX_FINISHED_JOBS finished jobs are kept"""
+        mock_extract.return_value = {"success": True}
+        
+        with patch.object(JobService, 'MAX_FINISHED_JOBS', 1):
+            first = JobService.submit_extract_job(self.test_conversations, self.test_uuid, self.mock_model)
+            JobService.shutdown(wait=True)
+            second = JobService.submit_extract_job(self.test_conversations, self.test_uuid, self.mock_model)
+            JobService.shutdown(wait=True)
+            third = JobService.submit_extract_job(self.test_conversations, self.test_uuid, self.mock_model)
+            JobService.shutdown(wait=True)
+        
+        with pytest.raises(JobServiceException):
+            JobService.get_job_status(first["job_id"])
+        assert JobService.get_job_status(third["job_id"])["status"] == "completed"
@@ -0,0 +1,103 @@
+import json
+import queue
+import logging
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.logging_service import LoggingService, JsonFormatter, TextFormatter, DroppingQueueHandler, RequestIdFilter
+
+
+class ListHandler(logging.Handler):
+    """Keeps every record it handles"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLoggingService:
+    """Test suite for LoggingService class"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.root = logging.getLogger(LoggingService.ROOT_LOGGER)
+        self.handler = ListHandler()
+        self.handler.addFilter(RequestIdFilter())
+        self.root.addHandler(self.handler)
+        self.level = self.root.level
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        self.root.removeHandler(self.handler)
+        self.root.setLevel(self.level)
+        LoggingService.bind_request_id("-")
+
+    def make_record(self, **extra):
+        """Log one record through a service logger and return it"""
+        LoggingService.get_logger("test").info("Loaded %d rows", 3, extra=extra)
+        return self.handler.records[-1]
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR REQUEST IDS"""
+
+    def test_unit_records_carry_request_id(self):
+        """Test records logged during a request carry the bound request id"""
+        request_id = LoggingService.bind_request_id("abc123")
+
+        assert request_id == "abc123"
+        assert self.make_record().request_id == "abc123"
+
+    def test_unit_bind_request_id_generates_missing_id(self):
+        """Test a request without X-Request-ID gets a generated id"""
+        request_id = LoggingService.bind_request_id(None)
+
+        assert len(request_id) == 16
+        assert LoggingService.current_request_id() == request_id
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR FORMATTERS AND LEVELS"""
+
+    def test_unit_json_formatter_includes_extra_fields(self):
+        """Test JSON lines hold the message, request id and extra fields"""
+        LoggingService.bind_request_id("req-1")
+        payload = json.loads(JsonFormatter().format(self.make_record(rows=3, ms=1.5)))
+
+        assert payload["message"] == "Loaded 3 rows"
+        assert payload["request_id"] == "req-1"
+        assert payload["logger"] == "chatgpt_augmenter.test"
+        assert (payload["rows"], payload["ms"]) == (3, 1.5)
+
+    def test_unit_text_formatter_appends_extra_fields(self):
+        """Test text lines end with the extra fields as key=value"""
+        line = TextFormatter().format(self.make_record(rows=3))
+
+        assert line.endswith("chatgpt_augmenter.test: Loaded 3 rows rows=3")
+
+    def test_unit_debug_records_are_level_gated(self):
+        """Test per-request debug chatter is dropped at INFO and kept at DEBUG"""
+        logger = LoggingService.get_logger("test")
+
+        self.root.setLevel(logging.INFO)
+        logger.debug("Decoded embeddings")
+        self.root.setLevel(logging.DEBUG)
+        logger.debug("Decoded embeddings")
+
+        assert len(self.handler.records) == 1
+
+    def test_unit_full_queue_drops_records(self):
+        """Test a full queue drops records instead of blocking the request"""
+        handler = DroppingQueueHandler(queue.Queue(1))
+        dropped = DroppingQueueHandler.dropped
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", (), None)
+
+        handler.enqueue(record)
+        handler.enqueue(record)
+
+        assert handler.queue.qsize() == 1
+        assert DroppingQueueHandler.dropped == dropped + 1
@@ -0,0 +1,121 @@
+import pytest
+import json
+import torch
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.metrics import MetricsService
+from routes.search import SearchService
+from routes.cache import QueryEmbeddingCacheService
+
+
+class TestMetricsService:
+    """Test suite for MetricsService class"""
+
+    def setup_method(self):
+        """Start every test without recorded observations"""
+        MetricsService.reset()
+
+    def teardown_method(self):
+        """Leave no observations behind for other tests"""
+        MetricsService.reset()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR RECORDING"""
+
+    def test_unit_observe_counts_into_buckets(self):
+        """Test each duration lands in the first bucket whose bound it does not exceed"""
+        with patch.object(MetricsService, 'BUCKETS', (0.1, 1.0)):
+            for seconds in (0.05, 0.1, 0.5, 3.0):
+                MetricsService.observe("search", "scoring", seconds)
+
+            histogram = MetricsService.snapshot()["search/scoring"]
+
+        assert histogram["buckets"] == [2, 1, 1]
+        assert histogram["count"] == 4
+        assert histogram["sum"] == pytest.approx(3.65)
+
+    def test_unit_timer_records_failed_stages(self):
+        """Test the timer records the stage even when the wrapped block raises"""
+        with pytest.raises(ValueError):
+            with MetricsService.timer("extract", "save"):
+                raise ValueError("disk full")
+
+        assert MetricsService.snapshot()["extract/save"]["count"] == 1
+
+    def test_unit_disabled_records_nothing(self):
+        """Test METRICS_ENABLED=false turns observe into a no-op"""
+        with patch.object(MetricsService, 'ENABLED', False):
+            MetricsService.observe("search", "scoring", 0.01)
+
+        assert MetricsService.snapshot() == {}
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR EXPORT"""
+
+    def test_unit_render_prometheus_histogram(self):
+        """Test the exposition format: cumulative buckets ending in +Inf, then sum and count"""
+        with patch.object(MetricsService, 'BUCKETS', (0.1, 1.0)):
+            MetricsService.observe("search", "db_fetch", 0.05)
+            MetricsService.observe("search", "db_fetch", 0.5)
+            text = MetricsService.render_prometheus()
+
+        assert text.splitlines() == [
+            "# HELP search_stage_seconds Seconds spent in each stage of a search request",
+            "# TYPE search_stage_seconds histogram",
+            'search_stage_seconds_bucket{stage="db_fetch",le="0.1"} 1',
+            'search_stage_seconds_bucket{stage="db_fetch",le="1.0"} 2',
+            'search_stage_seconds_bucket{stage="db_fetch",le="+Inf"} 2',
+            'search_stage_seconds_sum{stage="db_fetch"} 0.55',
+            'search_stage_seconds_count{stage="db_fetch"} 2'
+        ]
+
+    def test_unit_collect_merges_other_workers(self, tmp_path):
+        """Test histograms written by other workers are added to this process's, skipping mismatched bounds"""
+        worker = {"bounds": [0.1, 1.0], "histograms": {"search/scoring": {"buckets": [1, 0, 2], "sum": 6.05, "count": 3}}}
+        (tmp_path / "1.json").write_text(json.dumps(worker))
+        (tmp_path / "2.json").write_text(json.dumps({**worker, "bounds": [0.5]}))
+
+        with patch.object(MetricsService, 'BUCKETS', (0.1, 1.0)), \
+             patch.object(MetricsService, 'DIR', str(tmp_path)):
+            MetricsService.observe("search", "scoring", 0.5)
+            merged = MetricsService.collect()
+
+        assert merged["search/scoring"]["buckets"] == [1, 1, 2]
+        assert merged["search/scoring"]["count"] == 4
+        assert os.path.exists(tmp_path / f"{os.getpid()}.json")
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SEARCH INSTRUMENTATION"""
+
+    @patch('routes.search.SearchService.integrate_extraction')
+    def test_integration_search_records_every_stage(self, mock_extraction):
+        """Test a search records its query encode, scoring, top-k, formatting and total stages"""
+        mock_extraction.return_value = {
+            "doc_embeddings": torch.eye(3),
+            "data": {"a": "A", "b": "B", "c": "C"},
+            "keys": ["a", "b", "c"],
+            "normalized": True,
+            "ann_index": None
+        }
+        model = Mock()
+        model.encode.return_value = torch.tensor([0.0, 1.0, 0.0])
+
+        with patch.object(QueryEmbeddingCacheService, 'MAX_ENTRIES', 0):
+            results = SearchService.search_documents_and_extract_results("uuid", "query", 2, model)
+
+        assert results["results"][0]["key"] == "b"
+        stages = {key.split("/", 1)[1] for key in MetricsService.snapshot()}
+        assert {"query_encode", "scoring", "top_k", "result_formatting", "total"} <= stages
+
+    @patch('routes.search.DatabaseService.STORAGE_MODE', 'pgvector')
+    @patch('routes.search.SearchService.search_with_pgvector', return_value=[])
+    def test_integration_search_batch_records_one_total(self, mock_pgvector):
+        """Test a batch search counts into the total histogram once for the whole batch"""
+        SearchService.search_batch("uuid", ["first", "second"], 2, Mock())
+
+        assert MetricsService.snapshot()["search/total"]["count"] == 1
@@ -1,6 +1,7 @@
 import pytest
 import json
 import psycopg
+import numpy as np
 from unittest.mock import Mock, patch, MagicMock
 import sys
 import os
@@ -9,6 +10,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database.postgres import DatabaseService, DatabaseServiceException, TableNotFoundException, UserNotFoundException
+from database.document_codec import DocumentCodec
 
 
 class TestDatabaseService:
@@ -134,12 +136,14 @@ class TestDatabaseService:
     """----------------------------------------------------------------------------------------------------------------------------"""
     """TESTS FOR GET_DATABASE_CONNECTION() SUBROOT FUNCTION"""
 
+    @patch('database.postgres.DatabaseService._get_connection_pool')
     @patch('database.postgres.DatabaseService._attempt_connection')
     @patch('database.postgres.DatabaseService._validate_connection_params')
-    def test_integration_get_database_connection_success(self, mock_validate, mock_attempt):
+    def test_integration_get_database_connection_success(self, mock_validate, mock_attempt, mock_get_pool):
         """Test successful get_database_connection execution"""
         mock_validate.return_value = True
         mock_attempt.return_value = self.mock_connection
+        mock_get_pool.return_value = None
         
         result = DatabaseService.get_database_connection()
         
@@ -147,6 +151,59 @@ class TestDatabaseService:
         mock_validate.assert_called_once()
         mock_attempt.assert_called_once()
 
+    @patch('database.postgres.DatabaseService._attempt_connection')
+    @patch('database.postgres.DatabaseService._get_connection_pool')
+    @patch('database.postgres.DatabaseService._validate_connection_params')
+    def test_integration_get_database_connection_from_pool(self, mock_validate, mock_get_pool, mock_attempt):
+        """Test get_database_connection borrows from the shared pool instead of connecting"""
+        mock_validate.return_value = True
+        mock_pool = Mock()
+        mock_pool.getconn.return_value = self.mock_connection
+        mock_get_pool.return_value = mock_pool
+        
+        result = DatabaseService.get_database_connection()
+        
+        assert result == self.mock_connection
+        mock_pool.getconn.assert_called_once_with(timeout=DatabaseService.POOL_PARAMS["timeout"])
+        mock_attempt.assert_not_called()
+
+    @patch('database.postgres.DatabaseService._get_connection_pool')
+    @patch('database.postgres.DatabaseService._validate_connection_params')
+    def test_unit_get_database_connection_pool_failure(self, mock_validate, mock_get_pool):
+        """Test get_database_connection wraps pool errors"""
+        mock_validate.return_value = True
+        mock_pool = Mock()
+        mock_pool.getconn.side_effect = RuntimeError("pool exhausted")
+        mock_get_pool.return_value = mock_pool
+        
+        with pytest.raises(DatabaseServiceException) as exc_info:
+            DatabaseService.get_database_connection()
+        assert "Database connection failed" in str(exc_info.value)
+
+    @patch('database.postgres.ConnectionPool', None)
+    def test_unit_get_connection_pool_unavailable(self):
+        """Test pooling is skipped when psycopg_pool is not installed"""
+        assert DatabaseService._get_connection_pool() is None
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    def test_integration_forked_child_opens_fresh_pool(self):
+        """Test a forked process (e.g. a gunicorn worker) drops the inherited pool and creates its own"""
+        inherited_pool, fresh_pool = Mock(), Mock()
+        
+        with patch.object(DatabaseService, '_pool', inherited_pool), \
+             patch.object(DatabaseService, '_create_connection_pool', return_value=fresh_pool), \
+             patch.dict(DatabaseService.POOL_PARAMS, {"enabled": True}):
+            pid = os.fork()
+            if pid == 0:
+                fresh = DatabaseService._pool is None and DatabaseService._get_connection_pool() is fresh_pool
+                os._exit(0 if fresh else 1)
+            _pid, status = os.waitpid(pid, 0)
+            
+            assert DatabaseService._pool is inherited_pool
+        
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+        inherited_pool.close.assert_not_called()
+
     @patch('database.postgres.DatabaseService._validate_connection_params')
     def test_unit_get_database_connection_invalid_params(self, mock_validate):
         """Test get_database_connection with invalid parameters"""
@@ -487,6 +544,65 @@ class TestDatabaseService:
         assert "embedding_shape_json" in result
         assert result["embeddings"] == self.test_embeddings
 
+    def test_unit_prepare_save_data_packs_documents(self):
+        """Test _prepare_save_data adds the packed documents search reads instead of the data JSON"""
+        result = DatabaseService._prepare_save_data(
+            self.test_processed_data, self.test_key_order, self.test_embeddings, self.test_embedding_shape
+        )
+        documents = DocumentCodec.open(result["documents"], result["document_offsets"])
+        
+        assert documents.fetch([0]) == {0: ("How do I learn Python?", "Start with basics")}
+        assert result["data_json"] is None
+        unpacked = DatabaseService._prepare_save_data(self.test_processed_data, ["missing"], b"", (0,))
+        assert unpacked["documents"] is None
+        assert json.loads(unpacked["data_json"]) == self.test_processed_data
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_user_version(self, mock_get_conn):
+        """Test load_user_version reads the write time of the row search loads (None for unknown users)"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = ("2026-01-01 00:00:00",)
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'normalized'):
+            assert DatabaseService.load_user_version(self.test_uuid) == "2026-01-01 00:00:00"
+        assert "user_embeddings" in self.mock_cursor.execute.call_args[0][0]
+        
+        self.mock_cursor.fetchone.return_value = None
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'blob'):
+            assert DatabaseService.load_user_version(self.test_uuid) is None
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_user_search_data_packed_documents(self, mock_get_conn):
+        """Test search data of a packed users row comes back as PackedDocuments without the data JSON"""
+        mock_get_conn.return_value = self.mock_connection
+        documents, offsets = DocumentCodec.pack(self.test_key_order, self.test_processed_data)
+        self.mock_cursor.fetchone.return_value = (
+            self.test_embeddings, '[1, 4]', '{"normalized": true}', None, documents, offsets, None, None
+        )
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            result = DatabaseService.load_user_search_data_from_database(self.test_uuid)
+        
+        assert result["document_count"] == 1
+        assert result["documents"].get(0) == ("How do I learn Python?", "Start with basics")
+        assert result["embedding_meta"] == {"normalized": True}
+        assert "processed_data" not in result
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_user_search_data_legacy_row(self, mock_get_conn):
+        """Test rows written before the packed columns existed fall back to the data JSON"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = (
+            self.test_embeddings, '[1, 4]', None, None, None, None, self.test_raw_data[0], self.test_raw_data[1]
+        )
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            result = DatabaseService.load_user_search_data_from_database(self.test_uuid)
+        
+        assert result["processed_data"] == self.test_processed_data
+        assert result["key_order"] == self.test_key_order
+        assert "documents" not in result
+
     def test_unit_convert_to_json_dict(self):
         """Test successful _convert_to_json execution with dict"""
         test_dict = {"key": "value"}
@@ -513,6 +629,37 @@ class TestDatabaseService:
         assert "embedding_shape" in result
         assert result["embeddings"] == self.test_raw_data[2]
 
+    def test_unit_process_loaded_data_embedding_meta(self):
+        """Test the embedding_meta column is parsed and legacy rows without it read as {}"""
+        result = DatabaseService._process_loaded_data(self.test_raw_data + ('{"normalized": true}',))
+        
+        assert result["embedding_meta"] == {"normalized": True}
+        assert DatabaseService._process_loaded_data(self.test_raw_data)["embedding_meta"] == {}
+
+    def test_unit_process_loaded_data_packed_documents(self):
+        """Test rows with packed documents (and no data JSON) are decoded from the packed columns"""
+        documents, document_offsets = DocumentCodec.pack(["Prompt one"], {"Prompt one": "Response one"})
+        
+        result = DatabaseService._process_loaded_data((None, None, b"", [1, 2], None, None, documents, document_offsets))
+        
+        assert result["processed_data"] == {"Prompt one": "Response one"}
+        assert result["key_order"] == ["Prompt one"]
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_content_index_packed_documents(self, mock_get_conn):
+        """Test a blob-layout row is indexed from its packed documents without reading the data JSON"""
+        mock_get_conn.return_value = self.mock_connection
+        documents, document_offsets = DocumentCodec.pack(["Prompt one"], {"Prompt one": "Response one"})
+        self.mock_cursor.fetchone.side_effect = [[True], (None, None, self.test_embeddings, [1, 2], None, None, documents, document_offsets)]
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'blob'):
+            result = DatabaseService.load_content_index(self.test_uuid)
+        
+        assert result["layout"] == "blob"
+        assert result["key_order"] == ["Prompt one"]
+        assert result["content_hashes"] == [DatabaseService.compute_content_hash("Prompt one", "Response one")]
+        assert "CASE WHEN documents IS NULL THEN data END" in self.mock_cursor.execute.call_args[0][0]
+
     def test_unit_parse_processed_data_json_string(self):
         """Test successful _parse_processed_data execution with JSON string"""
         test_json = '{"test": "data"}'
@@ -579,6 +726,338 @@ class TestDatabaseService:
         self.mock_cursor.close.assert_called_once()
         self.mock_connection.close.assert_called_once()
 
+    def test_unit_close_connection_returns_pooled_connection(self):
+        """Test _close_connection hands pooled connections back instead of closing them"""
+        mock_pool = Mock()
+        self.mock_connection._pool = mock_pool
+        
+        with patch.object(DatabaseService, '_pool', mock_pool):
+            DatabaseService._close_connection(self.mock_cursor, self.mock_connection)
+        
+        mock_pool.putconn.assert_called_once_with(self.mock_connection)
+        self.mock_connection.close.assert_not_called()
+
+    def test_unit_close_connection_ends_read_transaction(self):
+        """Test a pooled connection still inside a read transaction is rolled back before it is returned"""
+        mock_pool = Mock()
+        self.mock_connection._pool = mock_pool
+        
+        with patch.object(DatabaseService, '_pool', mock_pool):
+            self.mock_connection.info.transaction_status = psycopg.pq.TransactionStatus.INTRANS
+            DatabaseService._close_connection(self.mock_cursor, self.mock_connection)
+            self.mock_connection.info.transaction_status = psycopg.pq.TransactionStatus.IDLE
+            DatabaseService._close_connection(self.mock_cursor, self.mock_connection)
+        
+        self.mock_connection.rollback.assert_called_once()
+        assert mock_pool.putconn.call_count == 2
+
+    def test_unit_create_tables_runs_once(self):
+        """Test _create_tables only issues CREATE TABLE until the tables are known to exist"""
+        with patch.object(DatabaseService, '_tables_ready', False):
+            DatabaseService._create_tables(self.mock_cursor)
+            DatabaseService._create_tables(self.mock_cursor)
+        
+        self.mock_cursor.execute.assert_called_once()
+
+    def test_unit_create_tables_skipped_without_auto_migrate(self):
+        """Test saves leave the schema alone when DB_SCHEMA_AUTO_MIGRATE is off"""
+        with patch.object(DatabaseService, '_tables_ready', False), patch.object(DatabaseService, 'SCHEMA_AUTO_MIGRATE', False):
+            DatabaseService._create_tables(self.mock_cursor)
+        
+        self.mock_cursor.execute.assert_not_called()
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_search_load_runs_no_ddl(self, mock_get_conn):
+        """Test the search read path never issues DDL, even before the tables are known to exist"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = (self.test_embeddings, '[1, 4]', None, None, None, None, '{}', '[]')
+        
+        with patch.object(DatabaseService, '_tables_ready', False):
+            DatabaseService.load_user_search_data_from_database(self.test_uuid)
+        
+        statements = " ".join(call[0][0] for call in self.mock_cursor.execute.call_args_list)
+        assert "ALTER" not in statements and "CREATE" not in statements
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_execute_user_save_single_connection(self, mock_get_conn):
+        """Test a save uses one connection for both table creation and the upsert"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.rowcount = 1
+        prepared_data = {
+            'data_json': '{"test": "data"}',
+            'key_order_json': '["test"]',
+            'embeddings': self.test_embeddings,
+            'embedding_shape_json': '[1, 4]'
+        }
+        
+        with patch.object(DatabaseService, '_tables_ready', False):
+            DatabaseService._execute_user_save(self.test_uuid, prepared_data)
+        
+        mock_get_conn.assert_called_once()
+        self.mock_connection.commit.assert_called_once()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR NORMALIZED STORAGE MODE"""
+
+    @patch('database.postgres.DatabaseService._execute_normalized_save')
+    @patch('database.postgres.DatabaseService._execute_user_save')
+    def test_integration_execute_save_query_normalized_mode(self, mock_blob_save, mock_normalized_save):
+        """Test execute_save_query writes the normalized layout when configured"""
+        mock_normalized_save.return_value = {"rows_affected": 1, "storage_mode": "normalized"}
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'normalized'):
+            result = DatabaseService.execute_save_query(
+                self.test_uuid, self.test_processed_data, self.test_key_order,
+                self.test_embeddings, self.test_embedding_shape
+            )
+        
+        assert result["storage_mode"] == "normalized"
+        mock_normalized_save.assert_called_once_with(
+            self.test_uuid, self.test_processed_data, self.test_key_order,
+            self.test_embeddings, self.test_embedding_shape, None, None, None
+        )
+        mock_blob_save.assert_not_called()
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_execute_normalized_save_writes_rows(self, mock_get_conn):
+        """Test a normalized save copies one documents row per key and upserts the embeddings row"""
+        mock_get_conn.return_value = self.mock_connection
+        mock_copy = MagicMock()
+        self.mock_cursor.copy.return_value = mock_copy
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            result = DatabaseService._execute_normalized_save(
+                self.test_uuid, self.test_processed_data, self.test_key_order,
+                self.test_embeddings, self.test_embedding_shape
+            )
+        
+        mock_copy.__enter__.return_value.write_row.assert_called_once_with(
+            (self.test_uuid, 0, "How do I learn Python?", "Start with basics",
+             DatabaseService.compute_content_hash("How do I learn Python?", "Start with basics"))
+        )
+        assert result["key_order_saved"] == 1
+        assert result["embedding_shape"] == [1, 4]
+        self.mock_connection.commit.assert_called_once()
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_execute_normalized_save_patches_changed_rows(self, mock_get_conn):
+        """Test a save with changed_ordinals upserts only those documents rows"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = (1,)
+        processed_data = {"Old prompt": "Old answer", "New prompt": "New answer"}
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            result = DatabaseService._execute_normalized_save(
+                self.test_uuid, processed_data, ["Old prompt", "New prompt"],
+                self.test_embeddings, [2, 2], [1]
+            )
+        
+        rows = self.mock_cursor.executemany.call_args[0][1]
+        assert rows == [(self.test_uuid, 1, "New prompt", "New answer",
+                         DatabaseService.compute_content_hash("New prompt", "New answer"))]
+        self.mock_cursor.copy.assert_not_called()
+        assert result["operation"] == "patch"
+        assert result["rows_affected"] == 1
+        assert result["key_order_saved"] == 2
+        self.mock_connection.commit.assert_called_once()
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_execute_normalized_save_patch_without_rows_writes_everything(self, mock_get_conn):
+        """Test a patch for a user without normalized rows falls back to a full write"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.copy.return_value = MagicMock()
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            result = DatabaseService._execute_normalized_save(
+                self.test_uuid, self.test_processed_data, self.test_key_order,
+                self.test_embeddings, self.test_embedding_shape, [0]
+            )
+        
+        self.mock_cursor.copy.assert_called_once()
+        assert result["operation"] == "replace"
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_content_index_documents(self, mock_get_conn):
+        """Test load_content_index returns stored hashes, hashing rows saved before the column existed"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.side_effect = [[True], (self.test_embeddings, [2, 2], 2)]
+        self.mock_cursor.fetchall.return_value = [("Prompt one", "abc", None), ("Prompt two", None, "Response two")]
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'normalized'):
+            result = DatabaseService.load_content_index(self.test_uuid)
+        
+        assert result["layout"] == "documents"
+        assert result["key_order"] == ["Prompt one", "Prompt two"]
+        assert result["content_hashes"] == ["abc", DatabaseService.compute_content_hash("Prompt two", "Response two")]
+        assert result["embedding_shape"] == (2, 2)
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_content_index_not_found(self, mock_get_conn):
+        """Test load_content_index raises UserNotFoundException when nothing is stored"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.side_effect = [[True], None]
+        
+        with pytest.raises(UserNotFoundException):
+            DatabaseService.load_content_index(self.test_uuid)
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_cached_embeddings(self, mock_get_conn):
+        """Test load_cached_embeddings maps hashes to embedding bytes and commits the last_used_at touch"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchall.return_value = [("hash1", memoryview(b"\x00\x01"))]
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            result = DatabaseService.load_cached_embeddings("test-model", ["hash1", "hash2"])
+        
+        assert result == {"hash1": b"\x00\x01"}
+        assert self.mock_cursor.execute.call_args[0][1] == ("test-model", ["hash1", "hash2"])
+        self.mock_connection.commit.assert_called_once()
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_user_embeddings_not_found(self, mock_get_conn):
+        """Test load_user_embeddings_from_database raises UserNotFoundException for unmigrated users"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.side_effect = [[True], None]
+        
+        with pytest.raises(UserNotFoundException):
+            DatabaseService.load_user_embeddings_from_database(self.test_uuid)
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_user_embeddings_success(self, mock_get_conn):
+        """Test load_user_embeddings_from_database returns only the embedding data"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.side_effect = [[True], (self.test_embeddings, [1, 4], 1)]
+        
+        result = DatabaseService.load_user_embeddings_from_database(self.test_uuid)
+        
+        assert result["embeddings"] == self.test_embeddings
+        assert result["embedding_shape"] == (1, 4)
+        assert result["document_count"] == 1
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_load_documents_by_ordinal(self, mock_get_conn):
+        """Test load_documents_by_ordinal maps ordinals to (prompt, response)"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchall.return_value = [(2, "Prompt two", "Response two")]
+        
+        result = DatabaseService.load_documents_by_ordinal(self.test_uuid, [2])
+        
+        assert result == {2: ("Prompt two", "Response two")}
+        assert self.mock_cursor.execute.call_args[0][1] == (self.test_uuid, [2])
+
+    @patch('database.postgres.DatabaseService._execute_delete_query')
+    @patch('database.postgres.DatabaseService._execute_normalized_delete_query')
+    def test_integration_delete_user_data_normalized_only(self, mock_normalized_delete, mock_execute):
+        """Test deleting a normalized-layout user that has no users row"""
+        mock_normalized_delete.return_value = 3
+        mock_execute.side_effect = UserNotFoundException("not in users")
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'normalized'):
+            result = DatabaseService.delete_user_data(self.test_uuid)
+        
+        assert result == {"success": True, "deleted_rows": 3, "uuid": self.test_uuid}
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_migrate_user_to_normalized_not_found(self, mock_get_conn):
+        """Test migrating a user without a users row"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = None
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            with pytest.raises(UserNotFoundException):
+                DatabaseService.migrate_user_to_normalized(self.test_uuid)
+        self.mock_connection.rollback.assert_called_once()
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_integration_migrate_user_to_normalized_success(self, mock_get_conn):
+        """Test migrating a users row rewrites it as documents rows and removes the blob row"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = self.test_raw_data
+        self.mock_cursor.copy.return_value = MagicMock()
+        
+        with patch.object(DatabaseService, '_tables_ready', True):
+            result = DatabaseService.migrate_user_to_normalized(self.test_uuid)
+        
+        assert result == {"success": True, "uuid": self.test_uuid, "documents_migrated": 1}
+        executed = [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+        assert "DELETE FROM users WHERE uuid = %s;" in executed
+        self.mock_connection.commit.assert_called_once()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR PGVECTOR STORAGE MODE"""
+
+    def test_unit_to_vector_literal(self):
+        """Test vectors are formatted as pgvector text literals"""
+        assert DatabaseService._to_vector_literal([0.5, -1.0, 2]) == "[0.5,-1.0,2.0]"
+
+    def test_unit_write_vector_rows_success(self):
+        """Test one vector row is copied per document inside a released savepoint"""
+        mock_copy = MagicMock()
+        self.mock_cursor.copy.return_value = mock_copy
+        embeddings = np.array([[0.5, 1.0], [1.5, 2.0]], dtype=np.float32).tobytes()
+        
+        with patch.object(DatabaseService, '_vector_tables_ready', True):
+            result = DatabaseService._write_vector_rows(self.mock_cursor, self.test_uuid, embeddings, [2, 2])
+        
+        assert result is True
+        rows = [call[0][0] for call in mock_copy.__enter__.return_value.write_row.call_args_list]
+        assert rows == [(self.test_uuid, 0, "[0.5,1.0]"), (self.test_uuid, 1, "[1.5,2.0]")]
+        executed = [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+        assert executed[-1] == "RELEASE SAVEPOINT document_vectors_write;"
+
+    def test_unit_write_vector_rows_extension_missing(self):
+        """Test a pgvector failure rolls back to the savepoint instead of failing the save"""
+        self.mock_cursor.execute.side_effect = [None, psycopg.Error('type "vector" does not exist'), None]
+        
+        with patch.object(DatabaseService, '_vector_tables_ready', False):
+            result = DatabaseService._write_vector_rows(self.mock_cursor, self.test_uuid, b"", [0, 2])
+        
+        assert result is False
+        executed = [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+        assert executed[-1] == "ROLLBACK TO SAVEPOINT document_vectors_write;"
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_search_nearest_documents_success(self, mock_get_conn):
+        """Test search_nearest_documents pushes ORDER BY <=> LIMIT k into Postgres"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchall.return_value = [(0, "How do I learn Python?", "Start with basics", 0.9)]
+        
+        with patch.object(DatabaseService, '_iterative_scan', True):
+            result = DatabaseService.search_nearest_documents(self.test_uuid, [0.5, 1.0], 6)
+        
+        assert result == [(0, "How do I learn Python?", "Start with basics", 0.9)]
+        query, params = self.mock_cursor.execute.call_args[0]
+        assert "ORDER BY v.embedding <=> %s::vector" in query
+        assert params == ("[0.5,1.0]", self.test_uuid, "[0.5,1.0]", 6)
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_search_nearest_documents_old_pgvector(self, mock_get_conn):
+        """Test pgvector < 0.8 skips hnsw.iterative_scan and leaves short result lists to the caller's fallback"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.fetchone.return_value = ("0.7.4",)
+        self.mock_cursor.fetchall.return_value = [(0, "How do I learn Python?", "Start with basics", 0.9)]
+        
+        with patch.object(DatabaseService, '_iterative_scan', None):
+            assert DatabaseService.search_nearest_documents(self.test_uuid, [0.5, 1.0], 6) == []
+            assert DatabaseService.search_nearest_documents(self.test_uuid, [0.5, 1.0], 1) == self.mock_cursor.fetchall.return_value
+            assert DatabaseService._iterative_scan is False
+        
+        executed = [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+        assert not any("iterative_scan" in statement for statement in executed)
+        assert sum("pg_extension" in statement for statement in executed) == 1
+
+    @patch('database.postgres.DatabaseService.get_database_connection')
+    def test_unit_search_nearest_documents_failure(self, mock_get_conn):
+        """Test search_nearest_documents wraps database errors"""
+        mock_get_conn.return_value = self.mock_connection
+        self.mock_cursor.execute.side_effect = psycopg.Error('relation "document_vectors" does not exist')
+        
+        with pytest.raises(DatabaseServiceException) as exc_info, patch.object(DatabaseService, '_iterative_scan', True):
+            DatabaseService.search_nearest_documents(self.test_uuid, [0.5, 1.0], 6)
+        assert "pgvector search failed" in str(exc_info.value)
+        self.mock_connection.rollback.assert_called_once()
+
     def test_unit_close_connection_none_values(self):
         """Test _close_connection with None values"""
         # Should not raise any exceptions
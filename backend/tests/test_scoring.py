@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+import torch
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.scoring import ScoringService, ScoringServiceException, TorchScoringBackend, NumpyScoringBackend
+from routes.search import SearchService
+
+
+class TestScoringService:
+    """Test suite for the torch and NumPy scoring backends"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        rng = np.random.default_rng(0)
+        self.doc_embeddings = rng.standard_normal((50, 8)).astype(np.float32)
+        self.query_embedding = torch.from_numpy(rng.standard_normal(8).astype(np.float32))
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR BACKEND PARITY"""
+
+    def test_unit_cosine_similarities_match(self):
+        """Test both backends give the same cosine similarities for unnormalized rows"""
+        torch_scores = TorchScoringBackend.cosine_similarities(self.query_embedding, torch.from_numpy(self.doc_embeddings))
+        numpy_scores = NumpyScoringBackend.cosine_similarities(self.query_embedding, self.doc_embeddings)
+
+        assert isinstance(numpy_scores, np.ndarray)
+        assert numpy_scores.shape == (1, 50)
+        assert np.allclose(numpy_scores, torch_scores.numpy(), atol=1e-6)
+
+    def test_unit_normalized_similarities_match(self):
+        """Test both backends give the same dot products for unit-length rows"""
+        normalized = self.doc_embeddings / np.linalg.norm(self.doc_embeddings, axis=1, keepdims=True)
+
+        torch_scores = TorchScoringBackend.normalized_similarities(self.query_embedding, torch.from_numpy(normalized))
+        numpy_scores = NumpyScoringBackend.normalized_similarities(self.query_embedding, normalized)
+
+        assert np.allclose(numpy_scores, torch_scores.numpy(), atol=1e-6)
+
+    @pytest.mark.parametrize("k", [1, 6, 50])
+    def test_unit_top_k_match(self, k):
+        """Test argpartition ranking returns the same indices in the same order as torch.topk"""
+        scores = NumpyScoringBackend.cosine_similarities(self.query_embedding, self.doc_embeddings)
+
+        numpy_flat, numpy_top = NumpyScoringBackend.top_k(scores, k)
+        torch_flat, torch_top = TorchScoringBackend.top_k(torch.from_numpy(scores), k)
+
+        assert numpy_flat.shape == (50,)
+        assert numpy_top.shape == (1, k)
+        assert numpy_top.tolist() == torch_top.tolist()
+
+    def test_unit_numpy_zero_query(self):
+        """Test an all-zero query scores 0 instead of NaN"""
+        scores = NumpyScoringBackend.cosine_similarities(np.zeros(8, dtype=np.float32), self.doc_embeddings)
+
+        assert not np.isnan(scores).any()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR BATCH SCORING"""
+
+    @pytest.mark.parametrize("normalized", [True, False])
+    def test_unit_batch_scoring_matches_single_queries(self, normalized):
+        """Test one matrix-matrix product scores and ranks every query like the per-query path"""
+        doc_embeddings = self.doc_embeddings
+        if normalized:
+            doc_embeddings = doc_embeddings / np.linalg.norm(doc_embeddings, axis=1, keepdims=True)
+        queries = np.random.default_rng(1).standard_normal((4, 8)).astype(np.float32)
+
+        for backend in (TorchScoringBackend, NumpyScoringBackend):
+            score = backend.normalized_similarities if normalized else backend.cosine_similarities
+            matrix = backend.as_matrix(doc_embeddings)
+            batch_scores = backend.batch_similarities(backend.as_matrix(queries), matrix, normalized)
+            batch_top = backend.batch_top_k(batch_scores, 6)
+
+            assert tuple(batch_scores.shape) == (4, 50)
+            for row, query in enumerate(queries):
+                single_scores = score(torch.from_numpy(query), matrix)
+                _flat, single_top = backend.top_k(single_scores, 6)
+                assert np.allclose(np.asarray(batch_scores[row]), np.asarray(single_scores).reshape(-1), atol=1e-6)
+                assert np.asarray(batch_top[row]).tolist() == np.asarray(single_top).reshape(-1).tolist()
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR GET_BACKEND()"""
+
+    def test_unit_get_backend(self):
+        """Test backends are selected by name and the configured default"""
+        assert ScoringService.get_backend("numpy") is NumpyScoringBackend
+        with patch.object(ScoringService, 'BACKEND', 'torch'):
+            assert ScoringService.get_backend() is TorchScoringBackend
+
+    def test_unit_get_backend_unknown(self):
+        """Test an unknown backend name raises"""
+        with pytest.raises(ScoringServiceException):
+            ScoringService.get_backend("jax")
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SEARCH INTEGRATION"""
+
+    @patch('routes.search.SearchService.encode_query_to_embedding')
+    def test_integration_numpy_backend_search_path(self, mock_encode):
+        """Test the NumPy backend decodes, scores, ranks and formats results without torch tensors"""
+        embeddings_bytes = np.array([[0.6, 0.8], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32).tobytes()
+        mock_encode.return_value = torch.tensor([1.0, 0.0])
+        keys = ["a", "b", "c"]
+
+        with patch.object(ScoringService, 'BACKEND', 'numpy'):
+            doc_embeddings = SearchService.recreate_doc_embeddings_from_database(embeddings_bytes, (3, 2), {"normalized": True})
+            cos_package = SearchService.query_doc_similarity_scores_UNCHANGED("query", 2, Mock(), doc_embeddings, keys, normalized=True)
+            results = SearchService.create_results_from_scores_UNCHANGED(
+                cos_package['cos_scores'], cos_package['top_indices'], {"a": "A", "b": "B", "c": "C"}, keys
+            )
+
+        assert isinstance(doc_embeddings, np.ndarray)
+        assert isinstance(cos_package['cos_scores'], np.ndarray)
+        assert [result["key"] for result in results] == ["b", "a"]
+        assert results[1]["similarity"] == pytest.approx(0.6)
@@ -1,7 +1,8 @@
 import pytest
 import torch
 import numpy as np
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch
+from sentence_transformers import util
 import sys
 import os
 
@@ -9,7 +10,10 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from routes.search import SearchService, SearchServiceException
-from database.postgres import DatabaseServiceException
+from routes.cache import CacheService
+from routes.scoring import ScoringService
+from database.postgres import DatabaseService, DatabaseServiceException, UserNotFoundException
+from database.document_codec import DocumentCodec
 
 
 class TestSearchService:
@@ -146,6 +150,90 @@ class TestSearchService:
             )
         assert "Results formatting failed" in str(exc_info.value)
 
+    @patch('routes.search.SearchService.integrate_extraction')
+    @patch('routes.search.DatabaseService.search_nearest_documents')
+    def test_integration_search_documents_pgvector_mode(self, mock_nearest, mock_integrate):
+        """Test pgvector mode answers the search inside Postgres without loading embeddings"""
+        mock_nearest.return_value = [(0, "How do I learn Python?", "Start with basics", 0.95)]
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'pgvector'):
+            result = SearchService.search_documents_and_extract_results(
+                self.test_uuid, self.test_query, self.test_top_k, self.mock_model
+            )
+        
+        assert result["results"] == [{"key": "How do I learn Python?", "similarity": 0.95, "content": "Start with basics"}]
+        assert result["total_results"] == 1
+        mock_integrate.assert_not_called()
+
+    @patch('routes.search.SearchService.create_results_from_scores_UNCHANGED')
+    @patch('routes.search.SearchService.query_doc_similarity_scores_UNCHANGED')
+    @patch('routes.search.SearchService.integrate_extraction')
+    @patch('routes.search.DatabaseService.search_nearest_documents')
+    def test_integration_search_documents_pgvector_falls_back(self, mock_nearest, mock_integrate, mock_similarity, mock_create_results):
+        """Test pgvector mode falls back to the stored embeddings when the vector search fails"""
+        mock_nearest.side_effect = DatabaseServiceException("extension vector is not available")
+        mock_integrate.return_value = self.mock_database_extraction
+        mock_similarity.return_value = self.mock_similarity_scores
+        mock_create_results.return_value = [{"key": "How do I learn Python?", "content": "Start with basics", "similarity": 0.9}]
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'pgvector'):
+            result = SearchService.search_documents_and_extract_results(
+                self.test_uuid, self.test_query, self.test_top_k, self.mock_model
+            )
+        
+        assert result["total_results"] == 1
+        mock_integrate.assert_called_once_with(self.test_uuid)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SEARCH_BATCH()"""
+
+    @patch('routes.search.SearchService.integrate_extraction')
+    def test_integration_search_batch_matches_single_searches(self, mock_integrate):
+        """Test a batch encodes all queries in one call and ranks each like /search would"""
+        queries = ["How do I learn Python?", "What is machine learning?", "How do I learn Python?"]
+        vectors = {
+            "How do I learn Python?": [0.1, 0.2, 0.3, 0.4],
+            "What is machine learning?": [1.2, 1.1, 1.0, 0.9]
+        }
+        self.mock_model.encode.side_effect = lambda texts, **kwargs: (
+            torch.tensor([vectors[text] for text in texts]) if isinstance(texts, list) else torch.tensor(vectors[texts])
+        )
+        mock_integrate.return_value = self.mock_database_extraction
+
+        batch = SearchService.search_batch(self.test_uuid, queries, 2, self.mock_model)
+        batch_encode_calls = self.mock_model.encode.call_count
+        singles = [SearchService.search_documents_and_extract_results(self.test_uuid, query, 2, self.mock_model) for query in queries]
+
+        assert batch_encode_calls == 1
+        assert self.mock_model.encode.call_args_list[0][0][0] == ["How do I learn Python?", "What is machine learning?"]
+        assert mock_integrate.call_count == 1 + len(queries)
+        assert batch["total_queries"] == 3
+        for batch_result, single in zip(batch["results"], singles):
+            assert batch_result["query"] == single["query"]
+            assert [r["key"] for r in batch_result["results"]] == [r["key"] for r in single["results"]]
+            assert [r["similarity"] for r in batch_result["results"]] == pytest.approx([r["similarity"] for r in single["results"]])
+
+    @patch('routes.search.SearchService.integrate_extraction')
+    def test_unit_search_batch_fetches_documents_once(self, mock_integrate):
+        """Test normalized storage fetches the top documents of every query in one call"""
+        self.mock_model.encode.return_value = torch.tensor([[1.0, 0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 1.0]])
+        fetch_documents = Mock(return_value={0: ("k0", "c0"), 1: ("k1", "c1"), 2: ("k2", "c2")})
+        mock_integrate.return_value = {
+            "doc_embeddings": self.mock_doc_embeddings, "data": None, "keys": None,
+            "document_count": 3, "fetch_documents": fetch_documents
+        }
+
+        result = SearchService.search_batch(self.test_uuid, ["first", "second"], 2, self.mock_model)
+
+        fetch_documents.assert_called_once()
+        assert [len(query_result["results"]) for query_result in result["results"]] == [2, 2]
+
+    def test_unit_search_batch_too_many_queries(self):
+        """Test batches above SEARCH_BATCH_MAX_QUERIES are rejected"""
+        with patch.object(SearchService, 'BATCH_MAX_QUERIES', 2):
+            with pytest.raises(SearchServiceException, match="At most 2 queries"):
+                SearchService.search_batch(self.test_uuid, ["a", "b", "c"], 2, self.mock_model)
+
     """----------------------------------------------------------------------------------------------------------------------------"""
     """TESTS FOR INTEGRATE_EXTRACTION() AND CHILD FUNCTIONS"""
 
@@ -183,9 +271,52 @@ class TestSearchService:
             SearchService.integrate_extraction(self.test_uuid)
         assert "Database extraction failed" in str(exc_info.value)
 
+    @patch('routes.search.SearchService.integrate_database_extraction')
+    def test_integration_integrate_extraction_uses_cache(self, mock_db_extract):
+        """Test integrate_extraction serves repeated searches from the user cache"""
+        mock_db_extract.return_value = self.mock_database_extraction
+        
+        first = SearchService.integrate_extraction(self.test_uuid)
+        second = SearchService.integrate_extraction(self.test_uuid)
+        
+        assert first == second == self.mock_database_extraction
+        mock_db_extract.assert_called_once_with(self.test_uuid)
+
+    @patch('routes.search.SearchService.integrate_database_extraction')
+    def test_integration_integrate_extraction_reloads_after_invalidate(self, mock_db_extract):
+        """Test integrate_extraction reloads from the database after the cache entry is invalidated"""
+        mock_db_extract.return_value = self.mock_database_extraction
+        
+        SearchService.integrate_extraction(self.test_uuid)
+        CacheService.invalidate(self.test_uuid)
+        SearchService.integrate_extraction(self.test_uuid)
+        
+        assert mock_db_extract.call_count == 2
     
+    @patch('routes.search.DatabaseService.load_user_version')
+    @patch('routes.search.SearchService.integrate_database_extraction')
+    def test_integration_integrate_extraction_reloads_newer_version(self, mock_db_extract, mock_load_version):
+        """Test a cache hit is reloaded once the stored data was rewritten (e.g. by an upload in another worker)"""
+        mock_db_extract.return_value = dict(self.mock_database_extraction, version=("database", 1))
+        mock_load_version.return_value = 1
+        
+        SearchService.integrate_extraction(self.test_uuid)
+        SearchService.integrate_extraction(self.test_uuid)
+        assert mock_db_extract.call_count == 1
+        
+        mock_load_version.return_value = 2
+        SearchService.integrate_extraction(self.test_uuid)
+        assert mock_db_extract.call_count == 2
+
+    @patch('routes.search.DatabaseService.load_user_version')
+    def test_unit_is_current_version_serves_cache_when_database_unreachable(self, mock_load_version):
+        """Test an unreadable version keeps the cached copy (bounded by the cache TTL)"""
+        mock_load_version.side_effect = DatabaseServiceException("connection refused")
+        
+        assert SearchService.is_current_version(self.test_uuid, ("database", 1)) is True
+
     @patch('routes.search.SearchService.recreate_doc_embeddings_from_database')
-    @patch('routes.search.DatabaseService.load_user_data_from_database')
+    @patch('routes.search.DatabaseService.load_user_search_data_from_database')
     def test_unit_integrate_database_extraction_success(self, mock_load_data, mock_recreate_embeddings):
         """Test successful integrate_database_extraction execution"""
         mock_user_data = {
@@ -203,7 +334,91 @@ class TestSearchService:
         assert result["keys"] == self.mock_keys
         assert torch.equal(result["doc_embeddings"], self.mock_doc_embeddings)
         mock_load_data.assert_called_once_with(self.test_uuid)
-        mock_recreate_embeddings.assert_called_once_with(b'mock_embeddings_bytes', (3, 4))
+        mock_recreate_embeddings.assert_called_once_with(
+            b'mock_embeddings_bytes', (3, 4), None, share_key=(self.test_uuid, ("database", None))
+        )
+
+    @patch('routes.search.SearchService.recreate_doc_embeddings_from_database')
+    @patch('routes.search.DatabaseService.load_user_search_data_from_database')
+    def test_unit_integrate_database_extraction_packed_documents(self, mock_load_data, mock_recreate_embeddings):
+        """Test a users row with packed documents is served through fetch_documents instead of a data dict"""
+        documents = DocumentCodec.open(*DocumentCodec.pack(self.mock_keys, self.mock_processed_data))
+        mock_load_data.return_value = {
+            'embeddings': b'mock_embeddings_bytes',
+            'embedding_shape': (3, 4),
+            'embedding_meta': {"normalized": True},
+            'ann_index': None,
+            'documents': documents,
+            'document_count': len(documents)
+        }
+        mock_recreate_embeddings.return_value = self.mock_doc_embeddings
+        
+        result = SearchService.integrate_database_extraction(self.test_uuid)
+        
+        assert result["data"] is None and result["keys"] is None
+        assert result["document_count"] == 3
+        assert result["fetch_documents"]([2]) == {2: (self.mock_keys[2], self.mock_processed_data[self.mock_keys[2]])}
+
+    @patch('routes.search.SearchService.integrate_normalized_extraction')
+    @patch('routes.search.DatabaseService.load_user_search_data_from_database')
+    def test_unit_integrate_database_extraction_normalized_mode(self, mock_load_data, mock_normalized):
+        """Test integrate_database_extraction reads the normalized layout when configured"""
+        mock_normalized.return_value = {"doc_embeddings": self.mock_doc_embeddings, "data": None, "keys": None}
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'normalized'):
+            result = SearchService.integrate_database_extraction(self.test_uuid)
+        
+        assert result["data"] is None
+        mock_normalized.assert_called_once_with(self.test_uuid)
+        mock_load_data.assert_not_called()
+
+    @patch('routes.search.SearchService.recreate_doc_embeddings_from_database')
+    @patch('routes.search.DatabaseService.load_user_search_data_from_database')
+    @patch('routes.search.SearchService.integrate_normalized_extraction')
+    def test_unit_integrate_database_extraction_normalized_falls_back_to_blob(self, mock_normalized, mock_load_data, mock_recreate_embeddings):
+        """Test an unmigrated user is still read from the blob users row in normalized mode"""
+        mock_normalized.side_effect = UserNotFoundException("not migrated")
+        mock_load_data.return_value = {
+            'processed_data': self.mock_processed_data,
+            'key_order': self.mock_keys,
+            'embeddings': b'mock_embeddings_bytes',
+            'embedding_shape': (3, 4)
+        }
+        mock_recreate_embeddings.return_value = self.mock_doc_embeddings
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'normalized'):
+            result = SearchService.integrate_database_extraction(self.test_uuid)
+        
+        assert result["data"] == self.mock_processed_data
+        mock_load_data.assert_called_once_with(self.test_uuid)
+
+    @patch('routes.search.DatabaseService.load_documents_by_ordinal')
+    @patch('routes.search.DatabaseService.load_user_embeddings_from_database')
+    def test_integration_search_normalized_fetches_only_top_k(self, mock_load_embeddings, mock_load_documents):
+        """Test a normalized-layout search fetches only the winning documents by ordinal"""
+        mock_load_embeddings.return_value = {
+            "embeddings": self.mock_doc_embeddings.numpy().tobytes(),
+            "embedding_shape": (3, 4),
+            "document_count": 3
+        }
+        mock_load_documents.return_value = {2: ("How to use TensorFlow?", "Deep learning framework")}
+        self.mock_model.encode.return_value = torch.tensor([0.9, 1.0, 1.1, 1.2])
+        
+        with patch.object(DatabaseService, 'STORAGE_MODE', 'normalized'):
+            result = SearchService.search_documents_and_extract_results(self.test_uuid, self.test_query, 1, self.mock_model)
+        
+        assert result["total_results"] == 1
+        assert result["results"][0]["key"] == "How to use TensorFlow?"
+        assert result["results"][0]["content"] == "Deep learning framework"
+        mock_load_documents.assert_called_once_with(self.test_uuid, [2])
+
+    def test_unit_create_results_from_documents_missing_document(self):
+        """Test create_results_from_documents when a ranked document is missing from storage"""
+        with pytest.raises(SearchServiceException) as exc_info:
+            SearchService.create_results_from_documents(
+                torch.tensor([0.9, 0.8]), torch.tensor([[1]]), lambda ordinals: {}
+            )
+        assert "missing from storage" in str(exc_info.value)
 
     def test_unit_recreate_doc_embeddings_from_database_success(self):
         """Test successful recreate_doc_embeddings_from_database execution"""
@@ -218,6 +433,16 @@ class TestSearchService:
         assert torch.allclose(result, torch.from_numpy(original_embeddings))
 
     
+    def test_unit_recreate_doc_embeddings_from_database_zero_copy(self):
+        """Test decoded embeddings share the fetched buffer and can still be scored"""
+        embeddings_bytes = np.array([[0.6, 0.8], [1.0, 0.0]], dtype=np.float32).tobytes()
+        
+        result = SearchService.recreate_doc_embeddings_from_database(embeddings_bytes, (2, 2))
+        scores = SearchService.calculate_normalized_similarities(torch.tensor([1.0, 0.0]), result)
+        
+        assert np.shares_memory(result.numpy(), np.frombuffer(embeddings_bytes, dtype=np.float32))
+        assert scores.tolist() == [[pytest.approx(0.6), 1.0]]
+
     def test_unit_recreate_doc_embeddings_from_database_failure(self):
         """Test successful recreate_doc_embeddings_from_database execution"""
         original_embeddings = np.array([[0.1, 0.2], [0.3, 0.4]], dtype=np.float32)
@@ -290,7 +515,57 @@ class TestSearchService:
         result = SearchService.encode_query_to_embedding(self.test_query, self.mock_model)
         
         assert torch.equal(result, torch.tensor([0.1, 0.2, 0.3, 0.4]))
-        self.mock_model.encode.assert_called_once_with(self.test_query, convert_to_tensor=True)
+        self.mock_model.encode.assert_called_once_with(self.test_query, convert_to_numpy=True)
+
+    def test_unit_encode_query_to_embedding_numpy_backend(self):
+        """Test the numpy scoring backend gets a NumPy query embedding (no torch tensor is built)"""
+        self.mock_model.encode.return_value = np.array([0.1, 0.2, 0.3, 0.4], dtype=np.float32)
+        
+        with patch.object(ScoringService, 'BACKEND', 'numpy'):
+            result = SearchService.encode_query_to_embedding("numpy query", self.mock_model)
+        
+        assert isinstance(result, np.ndarray)
+        assert result.tolist() == pytest.approx([0.1, 0.2, 0.3, 0.4])
+
+    def test_unit_encode_query_to_embedding_cached(self):
+        """Test a repeated query is served from the query embedding cache"""
+        first = SearchService.encode_query_to_embedding(self.test_query, self.mock_model)
+        second = SearchService.encode_query_to_embedding(f"  {self.test_query} ", self.mock_model)
+        
+        assert torch.equal(first, second)
+        self.mock_model.encode.assert_called_once()
+
+    def test_unit_calculate_normalized_similarities_matches_cosine(self):
+        """Test the dot product over pre-normalized rows gives the same scores as pytorch_cos_sim"""
+        query_embedding = torch.tensor([0.1, 0.2, 0.3, 0.4])
+        normalized_docs = torch.nn.functional.normalize(self.mock_doc_embeddings, p=2, dim=-1)
+        
+        result = SearchService.calculate_normalized_similarities(query_embedding, normalized_docs)
+        
+        expected = util.pytorch_cos_sim(query_embedding, self.mock_doc_embeddings)
+        assert result.shape == expected.shape
+        assert torch.allclose(result, expected, atol=1e-6)
+
+    @patch('routes.search.SearchService.calculate_cosine_similarities')
+    @patch('routes.search.SearchService.calculate_normalized_similarities')
+    @patch('routes.search.SearchService.encode_query_to_embedding')
+    def test_unit_query_doc_similarity_scores_normalized(self, mock_encode, mock_normalized, mock_cosine):
+        """Test pre-normalized embeddings skip the cosine normalization pass"""
+        mock_encode.return_value = torch.tensor([0.1, 0.2, 0.3, 0.4])
+        mock_normalized.return_value = torch.tensor([[0.9, 0.8, 0.7]])
+        
+        result = SearchService.query_doc_similarity_scores_UNCHANGED(
+            self.test_query, 2, self.mock_model, self.mock_doc_embeddings, self.mock_keys, normalized=True
+        )
+        
+        assert result["top_indices"].tolist() == [[0, 1]]
+        mock_cosine.assert_not_called()
+
+    def test_unit_is_normalized_legacy_rows(self):
+        """Test rows saved without the normalized flag keep full cosine similarity"""
+        assert SearchService.is_normalized({"normalized": True}) is True
+        assert SearchService.is_normalized({}) is False
+        assert SearchService.is_normalized(None) is False
 
     @patch('sentence_transformers.util.pytorch_cos_sim')
     def test_unit_calculate_cosine_similarities_success(self, mock_cos_sim):
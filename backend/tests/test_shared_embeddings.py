@@ -0,0 +1,116 @@
+import numpy as np
+import torch
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Add the parent directory to the Python path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes.shared_embeddings import SharedEmbeddingsService
+from routes.search import SearchService
+
+
+class TestSharedEmbeddingsService:
+    """Test suite for SharedEmbeddingsService class"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.embeddings = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SHARE()"""
+
+    def test_unit_share_disabled_returns_matrix(self):
+        """Test sharing is a no-op without SHARED_EMBEDDINGS_DIR or without a version"""
+        with patch.object(SharedEmbeddingsService, 'DIR', ''):
+            assert SharedEmbeddingsService.share("uuid-a", 1, (3, 4), lambda: self.embeddings) is self.embeddings
+        with patch.object(SharedEmbeddingsService, 'DIR', '/unused'):
+            assert SharedEmbeddingsService.share("uuid-a", None, (3, 4), lambda: self.embeddings) is self.embeddings
+
+    def test_unit_share_maps_one_file_per_version(self, tmp_path):
+        """Test a shared version is mapped again without decoding, and a new version replaces the old file"""
+        decode = Mock(return_value=self.embeddings)
+
+        with patch.object(SharedEmbeddingsService, 'DIR', str(tmp_path)):
+            first = SharedEmbeddingsService.share("uuid-a", 1, (3, 4), decode)
+            second = SharedEmbeddingsService.share("uuid-a", 1, (3, 4), decode)
+            other_user = SharedEmbeddingsService.share("uuid-b", 1, (3, 4), lambda: self.embeddings + 1)
+            new_version = SharedEmbeddingsService.share("uuid-a", 2, (3, 4), lambda: self.embeddings + 2)
+
+        assert decode.call_count == 1
+        assert isinstance(first, np.memmap)
+        assert np.array_equal(second, self.embeddings)
+        assert first.filename == second.filename != new_version.filename
+        assert not first.flags.writeable
+        assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(m.filename) for m in (other_user, new_version))
+
+    def test_unit_share_over_budget_keeps_private_copy(self, tmp_path):
+        """Test a matrix larger than the budget is not written (a small /dev/shm must not fail every load)"""
+        with patch.object(SharedEmbeddingsService, 'DIR', str(tmp_path)), \
+             patch.object(SharedEmbeddingsService, 'budget_bytes', return_value=16):
+            assert SharedEmbeddingsService.share("uuid-a", 1, (3, 4), lambda: self.embeddings) is self.embeddings
+
+        assert os.listdir(tmp_path) == []
+
+    def test_unit_share_falls_back_to_private_copy(self, tmp_path):
+        """Test a directory that cannot be written keeps the decoded matrix"""
+        blocked = tmp_path / "file"
+        blocked.write_text("not a directory")
+
+        with patch.object(SharedEmbeddingsService, 'DIR', str(blocked)), \
+             patch.object(SharedEmbeddingsService, 'MAX_MB', 1):
+            result = SharedEmbeddingsService.share("uuid-a", 1, (3, 4), lambda: self.embeddings)
+
+        assert np.array_equal(result, self.embeddings) and not isinstance(result, np.memmap)
+
+    def test_unit_budget_defaults_to_half_the_filesystem(self, tmp_path):
+        """Test MAX_MB=0 sizes the budget from the filesystem DIR lives on, even before DIR exists"""
+        stat = os.statvfs(tmp_path)
+
+        with patch.object(SharedEmbeddingsService, 'DIR', str(tmp_path / "missing")), \
+             patch.object(SharedEmbeddingsService, 'MAX_MB', 0):
+            assert SharedEmbeddingsService.budget_bytes() == stat.f_blocks * stat.f_frsize // 2
+
+    def test_unit_delete_removes_only_that_user(self, tmp_path):
+        """Test delete unlinks every shared file of a user and leaves other users' files"""
+        with patch.object(SharedEmbeddingsService, 'DIR', str(tmp_path)):
+            SharedEmbeddingsService.share("uuid-a", 1, (3, 4), lambda: self.embeddings)
+            other = SharedEmbeddingsService.share("uuid-b", 1, (3, 4), lambda: self.embeddings)
+
+            assert SharedEmbeddingsService.delete("uuid-a") == 1
+            assert SharedEmbeddingsService.delete("uuid-a") == 0
+
+        assert os.listdir(tmp_path) == [os.path.basename(other.filename)]
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR PRUNE()"""
+
+    def test_unit_prune_removes_least_recently_used(self, tmp_path):
+        """Test pruning removes the oldest files beyond MAX_MB but never the file just written"""
+        for index, name in enumerate(["old.f32", "middle.f32", "newest.f32"]):
+            path = tmp_path / name
+            path.write_bytes(b"\0" * 1024 * 1024)
+            os.utime(path, (index, index))
+
+        with patch.object(SharedEmbeddingsService, 'DIR', str(tmp_path)), \
+             patch.object(SharedEmbeddingsService, 'MAX_MB', 2):
+            removed = SharedEmbeddingsService.prune(keep=str(tmp_path / "old.f32"))
+
+        assert removed == 1
+        assert sorted(os.listdir(tmp_path)) == ["newest.f32", "old.f32"]
+
+    """----------------------------------------------------------------------------------------------------------------------------"""
+    """TESTS FOR SEARCH INTEGRATION"""
+
+    def test_integration_search_scores_shared_matrix(self, tmp_path):
+        """Test search decodes stored embeddings into a shared memory map and scores it"""
+        with patch.object(SharedEmbeddingsService, 'DIR', str(tmp_path)):
+            doc_embeddings = SearchService.recreate_doc_embeddings_from_database(
+                self.embeddings.tobytes(), (3, 4), share_key=("uuid-a", ("database", 1))
+            )
+
+        scores = SearchService.calculate_cosine_similarities(torch.tensor([8.0, 9.0, 10.0, 11.0]), doc_embeddings)
+
+        assert len(os.listdir(tmp_path)) == 1
+        assert torch.argmax(torch.as_tensor(scores)).item() == 2